@@ -0,0 +1,126 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Compare the cache hits of pooled and pinned ZODB connections.
+
+Usage: bin/zopepy benchmarks/connection_affinity.py [-t THREADS]
+
+Publishes requests in several threads through ``load_app``, once with a
+connection from the pool for each request and once with the connection
+pinned to each thread (``connection-affinity``). Each thread mostly uses
+objects of its own partition of the database, like a load balancer with
+sticky sessions would cause; ``--locality`` sets the share of those.
+The connection caches hold a little more than one partition.
+"""
+
+from __future__ import print_function
+
+import argparse
+import random
+import threading
+import time
+
+import transaction
+
+
+def setup(options):
+    from persistent.mapping import PersistentMapping
+    from ZODB.DB import DB
+    from ZODB.MappingStorage import MappingStorage
+
+    partition = options.objects // options.threads
+    db = DB(MappingStorage(), pool_size=options.threads * 2,
+            cache_size=int(partition * 1.5))
+    connection = db.open()
+    app = connection.root()['Application'] = PersistentMapping()
+    for i in range(options.objects):
+        app['o%d' % i] = PersistentMapping(value=i)
+    transaction.commit()
+    connection.close()
+    return db
+
+
+def run(db, options, affinity):
+    from App.ZApplication import ZApplicationWrapper
+    from ZPublisher.WSGIPublisher import load_app
+
+    db.cacheMinimize()
+    wrapper = ZApplicationWrapper(db, 'Application',
+                                  connection_affinity=affinity)
+    module_info = (wrapper, 'Zope', False)
+    partition = options.objects // options.threads
+    loads = []
+    start = threading.Event()
+
+    def worker(number):
+        rand = random.Random(number)
+        own = range(number * partition, (number + 1) * partition)
+        count = 0
+        start.wait()
+        for i in range(options.requests):
+            with load_app(module_info) as (app, realm, debug_mode):
+                app._p_jar.getTransferCounts(True)
+                transaction.begin()
+                for j in range(options.objects_per_request):
+                    if rand.random() < options.locality:
+                        key = rand.choice(own)
+                    else:
+                        key = rand.randrange(options.objects)
+                    app['o%d' % key]._p_activate()
+                count += app._p_jar.getTransferCounts(True)[0]
+        loads.append(count)
+
+    threads = [threading.Thread(target=worker, args=(i,))
+               for i in range(options.threads)]
+    for thread in threads:
+        thread.start()
+    started = time.time()
+    start.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+    wrapper.closePinned()
+
+    requests = options.threads * options.requests
+    used = requests * options.objects_per_request
+    print('%-8s %8.2f loads/request %6.1f%% hits %8.1f us/request' % (
+        'pinned' if affinity else 'pooled',
+        float(sum(loads)) / requests,
+        100.0 * (1 - float(sum(loads)) / used),
+        elapsed / requests * 1e6))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-t', '--threads', type=int, default=4,
+                        help='number of publishing threads')
+    parser.add_argument('-n', '--requests', type=int, default=2000,
+                        help='number of requests per thread')
+    parser.add_argument('-o', '--objects', type=int, default=4000,
+                        help='number of objects in the database')
+    parser.add_argument('--objects-per-request', type=int, default=20,
+                        help='number of objects each request uses')
+    parser.add_argument('--locality', type=float, default=0.9,
+                        help='share of objects used from the partition '
+                             'of the thread')
+    options = parser.parse_args(args)
+
+    db = setup(options)
+    try:
+        run(db, options, affinity=False)
+        run(db, options, affinity=True)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
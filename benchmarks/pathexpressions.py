@@ -0,0 +1,139 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Measure the cost of path expressions in page templates.
+
+Usage: bin/zopepy benchmarks/pathexpressions.py [-r ROWS]
+
+Renders a ``ZopePageTemplate`` listing the rows of a folder with ten path
+expressions per row, once with the generic path traversal of each
+segment through ``restrictedTraverse`` and once with the traversers
+specialized when the template is compiled. Prints the time per render
+and the number of generic traversals.
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+
+SOURCE = """\
+<table>
+  <tr tal:repeat="row context/rows/objectValues">
+    <td tal:content="row/title" />
+    <td tal:content="row/getId" />
+    <td tal:content="row/meta_type" />
+    <td tal:content="row/title_or_id" />
+    <td tal:content="row/title_and_id" />
+    <td tal:content="row/isPrincipiaFolderish" />
+    <td tal:content="row/zmi_icon" />
+    <td tal:content="row/id" />
+    <td tal:content="row/sub/title" />
+    <td tal:content="row/sub/getId" />
+  </tr>
+</table>
+"""
+
+
+def setup(rows):
+    from AccessControl.SecurityManagement import newSecurityManager
+    from OFS.Folder import manage_addFolder
+    from Testing.makerequest import makerequest
+    from Testing.ZopeTestCase import ZopeLite
+    from Zope2.App import zcml
+    import Products.PageTemplates
+
+    zcml.load_config('configure.zcml', Products.PageTemplates)
+    app = makerequest(ZopeLite.app())
+    app.acl_users._doAddUser('manager', 'secret', ['Manager'], [])
+    user = app.acl_users.getUser('manager').__of__(app.acl_users)
+    newSecurityManager(None, user)
+
+    manage_addFolder(app, 'rows')
+    for i in range(rows):
+        manage_addFolder(app.rows, 'row%d' % i, 'Row %d' % i)
+        row = app.rows._getOb('row%d' % i)
+        manage_addFolder(row, 'sub', 'Sub %d' % i)
+    return app
+
+
+def generic_program():
+    from Products.PageTemplates.engine import Program
+    from Products.PageTemplates.expression import PathExpr
+    from z3c.pt import expressions
+
+    class GenericPathExpr(PathExpr):
+        translate = expressions.PathExpr.translate
+
+    class GenericProgram(Program):
+        secure_expression_types = dict(Program.secure_expression_types,
+                                       path=GenericPathExpr)
+
+    return GenericProgram
+
+
+def count_traversals():
+    from OFS.Traversable import Traversable
+
+    counts = [0]
+    unrestrictedTraverse = Traversable.unrestrictedTraverse
+
+    def counting(self, *args, **kw):
+        counts[0] += 1
+        return unrestrictedTraverse(self, *args, **kw)
+
+    Traversable.unrestrictedTraverse = counting
+
+    def stop():
+        Traversable.unrestrictedTraverse = unrestrictedTraverse
+        return counts[0]
+    return stop
+
+
+def measure(app, name, program, repeat):
+    from Products.PageTemplates.ZopePageTemplate import \
+        manage_addPageTemplate
+    from zope.component import provideUtility
+    from zope.pagetemplate.interfaces import IPageTemplateEngine
+
+    provideUtility(program, IPageTemplateEngine)
+    manage_addPageTemplate(app, name, text=SOURCE)
+    template = app._getOb(name)
+    template()  # compile and warm up caches
+
+    stop = count_traversals()
+    template()
+    traversals = stop()
+
+    best = min(timeit.repeat(template, number=repeat, repeat=3))
+    print('%-12s %8.2f ms/render %6d generic traversals' % (
+        name, best / repeat * 1e3, traversals))
+
+
+def main(args=None):
+    from Products.PageTemplates.engine import Program
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-r', '--rows', type=int, default=500,
+                        help='number of rows in the listing')
+    parser.add_argument('-n', '--renders', type=int, default=10,
+                        help='number of renders to time')
+    options = parser.parse_args(args)
+
+    app = setup(options.rows)
+    measure(app, 'generic', generic_program(), options.renders)
+    measure(app, 'specialized', Program, options.renders)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Measure the time to the first byte of a streamed template.
+
+Usage: bin/zopepy benchmarks/template_streaming.py [-r ROWS]
+
+Renders a large ``ZopePageTemplate`` as the published object of a
+request whose response streams written data, like with the
+``response-streaming`` option, once as one string and once with the
+``streaming`` property. Prints the time until the first byte is passed
+to the server and the time until the whole page is.
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+
+SOURCE = """\
+<table>
+  <tr tal:repeat="row python:range(options.get('rows'))">
+    <td tal:content="row" />
+    <td tal:content="python:'Row %d' % row" />
+    <td tal:content="template/getId" />
+  </tr>
+</table>
+"""
+
+
+def setup():
+    from Testing.makerequest import makerequest
+    from Testing.ZopeTestCase import ZopeLite
+    from Zope2.App import zcml
+    import Products.PageTemplates
+
+    zcml.load_config('configure.zcml', Products.PageTemplates)
+    return makerequest(ZopeLite.app())
+
+
+def measure(app, template, streaming, rows, repeat):
+    from ZPublisher.HTTPResponse import WSGIResponse
+
+    first = []
+    total = []
+    for i in range(repeat):
+        start = time.time()
+        times = []
+
+        def write(data):
+            if not times:
+                times.append(time.time() - start)
+
+        response = app.REQUEST.response = WSGIResponse()
+        response._start_response = lambda status, headers: write
+        app.REQUEST['PUBLISHED'] = template
+        template.streaming = streaming
+        result = template(rows=rows)
+        if not streaming:
+            response.setBody(result)
+            result = [response.body]
+        for data in result:
+            write(data)
+        first.append(times[0])
+        total.append(time.time() - start)
+    print('%-10s first byte %8.2f ms, complete %8.2f ms' % (
+        'streaming' if streaming else 'buffered',
+        min(first) * 1e3, min(total) * 1e3))
+
+
+def main(args=None):
+    from Products.PageTemplates.ZopePageTemplate import \
+        manage_addPageTemplate
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-r', '--rows', type=int, default=20000,
+                        help='number of rows in the table')
+    parser.add_argument('-n', '--renders', type=int, default=5,
+                        help='number of renders to time')
+    options = parser.parse_args(args)
+
+    app = setup()
+    template = manage_addPageTemplate(app, 'table', text=SOURCE)
+    template(rows=1)  # compile
+    measure(app, template, False, options.rows, options.renders)
+    measure(app, template, True, options.rows, options.renders)
+
+
+if __name__ == '__main__':
+    main()
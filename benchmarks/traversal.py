@@ -0,0 +1,83 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Measure the cost of publishing traversal per path segment.
+
+Usage: bin/zopepy benchmarks/traversal.py [-n REQUESTS]
+
+Builds a chain of nested folders in a ZopeLite application and times
+``request.traverse`` for paths of increasing depth. The cost per segment
+is the slope between the shortest and the longest path.
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+
+DEPTHS = (1, 4, 8, 12)
+
+
+def setup():
+    from OFS.Folder import manage_addFolder
+    from Testing.ZopeTestCase import ZopeLite
+
+    app = ZopeLite.app()
+    ob = app
+    for i in range(max(DEPTHS)):
+        manage_addFolder(ob, 'f%d' % i)
+        ob = ob._getOb('f%d' % i)
+    return app
+
+
+def make_traverse(app, depth):
+    from Testing.makerequest import makerequest
+
+    path = '/%s/title_or_id' % '/'.join('f%d' % i for i in range(depth))
+    environ = {
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'REQUEST_METHOD': 'GET',
+    }
+
+    def traverse():
+        request = makerequest(app, environ=environ).REQUEST
+        request['PARENTS'] = [app]
+        request.traverse(path)
+    return traverse
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--requests', type=int, default=2000,
+                        help='number of requests per depth')
+    options = parser.parse_args(args)
+
+    app = setup()
+    timings = {}
+    for depth in DEPTHS:
+        traverse = make_traverse(app, depth)
+        traverse()  # warm up caches
+        best = min(timeit.repeat(traverse, number=options.requests,
+                                 repeat=3))
+        timings[depth] = best / options.requests * 1e6
+        print('%2d segments: %8.1f us/request' % (depth + 1,
+                                                  timings[depth]))
+
+    low, high = min(DEPTHS), max(DEPTHS)
+    print('per segment: %8.1f us' % (
+        (timings[high] - timings[low]) / (high - low)))
+
+
+if __name__ == '__main__':
+    main()
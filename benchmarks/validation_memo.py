@@ -0,0 +1,122 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Measure the effect of the validation memo on a heavy template.
+
+Usage: bin/zopepy benchmarks/validation_memo.py [-r ROWS]
+
+Renders a ``ZopePageTemplate`` listing the rows of a folder, which like
+the templates of the ZMI and of skins traverses the same objects in
+several path expressions of each row, as a user who is not a manager
+but has a local role. Each render gets a new memo, like each request
+does with the ``validation-memo`` option. Prints the time per render
+and the share of security checks answered by the memo.
+"""
+
+from __future__ import print_function
+
+import argparse
+import timeit
+
+
+SOURCE = """\
+<table tal:define="rows context/rows">
+  <tr tal:repeat="row rows/objectValues">
+    <td tal:content="row/title" />
+    <td tal:content="row/getId" />
+    <td tal:content="row/title_or_id" />
+    <td tal:content="row/sub/title" />
+    <td tal:content="row/sub/getId" />
+    <td tal:content="row/sub/title_or_id" />
+    <td tal:content="row/sub/leaf/title" />
+    <td tal:content="row/sub/leaf/getId" />
+    <td tal:content="context/rows/title" />
+    <td tal:content="context/rows/getId" />
+  </tr>
+</table>
+"""
+
+
+def setup(rows):
+    from AccessControl.SecurityManagement import newSecurityManager
+    from OFS.Folder import manage_addFolder
+    from Testing.makerequest import makerequest
+    from Testing.ZopeTestCase import ZopeLite
+    from Zope2.App import zcml
+    from zope.globalrequest import setRequest
+    import Products.PageTemplates
+
+    zcml.load_config('configure.zcml', Products.PageTemplates)
+    app = makerequest(ZopeLite.app())
+    setRequest(app.REQUEST)
+
+    manage_addFolder(app, 'rows', 'Rows')
+    app.rows.manage_permission('View', ['Reader'], acquire=0)
+    app.rows.manage_permission('Access contents information', ['Reader'],
+                               acquire=0)
+    app.rows.manage_setLocalRoles('reader', ['Reader'])
+    for i in range(rows):
+        manage_addFolder(app.rows, 'row%d' % i, 'Row %d' % i)
+        row = app.rows._getOb('row%d' % i)
+        manage_addFolder(row, 'sub', 'Sub %d' % i)
+        manage_addFolder(row.sub, 'leaf', 'Leaf %d' % i)
+
+    app.acl_users._doAddUser('reader', 'secret', [], [])
+    user = app.acl_users.getUser('reader').__of__(app.acl_users)
+    newSecurityManager(None, user)
+    return app
+
+
+def measure(app, template, memo, repeat):
+    from ZPublisher.validation import ValidationMemo
+
+    memos = []
+
+    def render():
+        if memo:
+            app.REQUEST._validation_memo = ValidationMemo()
+            memos.append(app.REQUEST._validation_memo)
+        try:
+            template()
+        finally:
+            app.REQUEST._validation_memo = None
+
+    render()  # compile and warm up caches
+    best = min(timeit.repeat(render, number=repeat, repeat=3))
+    line = '%-8s %8.2f ms/render' % (
+        'memo' if memo else 'no memo', best / repeat * 1e3)
+    if memos:
+        hits, misses = memos[-1].hits, memos[-1].misses
+        line += ' %6d checks, %5.1f%% memoized' % (
+            hits + misses, 100.0 * hits / (hits + misses))
+    print(line)
+
+
+def main(args=None):
+    from Products.PageTemplates.ZopePageTemplate import \
+        manage_addPageTemplate
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-r', '--rows', type=int, default=500,
+                        help='number of rows in the listing')
+    parser.add_argument('-n', '--renders', type=int, default=10,
+                        help='number of renders to time')
+    options = parser.parse_args(args)
+
+    app = setup(options.rows)
+    template = manage_addPageTemplate(app, 'listing', text=SOURCE)
+    measure(app, template, False, options.renders)
+    measure(app, template, True, options.renders)
+
+
+if __name__ == '__main__':
+    main()
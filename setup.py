@@ -128,6 +128,7 @@ setup(
     zip_safe=False,
     extras_require={
         'docs': ['Sphinx', 'sphinx_rtd_theme', 'repoze.sphinx.autointerface'],
+        'brotli': ['brotli'],
     },
     entry_points={
         'paste.app_factory': [
@@ -28,6 +28,11 @@ from App.version_txt import version_txt
 from OFS.Traversable import Traversable
 from Persistence import Persistent
 from Products.PageTemplates.PageTemplateFile import PageTemplateFile
+from ZPublisher import activity
+from ZPublisher import timing
+from ZPublisher.WSGIPublisher import get_request_timing
+from ZPublisher.WSGIPublisher import get_retry_policy
+from ZPublisher.WSGIPublisher import get_zodb_activity
 
 
 class FakeConnection(object):
@@ -58,6 +63,8 @@ class DatabaseChooser(Tabs, Traversable, Implicit):
         {'label': 'Control Panel', 'action': '../manage_main'},
         {'label': 'Databases', 'action': 'manage_main'},
         {'label': 'Configuration', 'action': '../Configuration/manage_main'},
+        {'label': 'Request Timing', 'action': '../Timing/manage_main'},
+        {'label': 'ZODB Activity', 'action': '../Activity/manage_main'},
     )
     MANAGE_TABS_NO_BANNER = True
 
@@ -101,6 +108,8 @@ class ConfigurationViewer(Tabs, Traversable, Implicit):
         {'label': 'Control Panel', 'action': '../manage_main'},
         {'label': 'Databases', 'action': '../Database/manage_main'},
         {'label': 'Configuration', 'action': 'manage_main'},
+        {'label': 'Request Timing', 'action': '../Timing/manage_main'},
+        {'label': 'ZODB Activity', 'action': '../Activity/manage_main'},
     )
     MANAGE_TABS_NO_BANNER = True
 
@@ -131,6 +140,116 @@ class ConfigurationViewer(Tabs, Traversable, Implicit):
 InitializeClass(ConfigurationViewer)
 
 
+class RequestTimingViewer(Tabs, Traversable, Implicit):
+    """ Shows how long requests spend in the phases of publishing
+    """
+    manage = manage_main = manage_workspace = DTMLFile('dtml/cpTiming',
+                                                       globals())
+    manage_main._setName('manage_main')
+    id = 'Timing'
+    name = title = 'Request Timing'
+    meta_type = name
+    zmi_icon = 'fa fa-stopwatch'
+    manage_options = (
+        {'label': 'Control Panel', 'action': '../manage_main'},
+        {'label': 'Databases', 'action': '../Database/manage_main'},
+        {'label': 'Configuration', 'action': '../Configuration/manage_main'},
+        {'label': 'Request Timing', 'action': 'manage_main'},
+        {'label': 'ZODB Activity', 'action': '../Activity/manage_main'},
+    )
+    MANAGE_TABS_NO_BANNER = True
+
+    def isTimingEnabled(self):
+        return get_request_timing()
+
+    def getBucketLabels(self):
+        labels = ['<= %d ms' % bound for bound in timing.BUCKETS[:-1]]
+        labels.append('> %d ms' % timing.BUCKETS[-2])
+        return labels
+
+    def getTimingSummary(self):
+        statistics = timing.statistics
+        requests = statistics.requests
+        return {
+            'requests': requests,
+            'since': time.strftime('%Y-%m-%d %H:%M:%S',
+                                   time.localtime(statistics.since)),
+            'loads': statistics.loads // requests if requests else 0,
+            'load_bytes': statistics.load_bytes // requests if requests else 0,
+        }
+
+    def getTimingReport(self):
+        return timing.statistics.getReport()
+
+    @requestmethod('POST')
+    def manage_resetTiming(self, REQUEST=None):
+        """Forget the timings of previous requests."""
+        timing.statistics.reset()
+        if REQUEST is not None:
+            msg = 'Request timings reset.'
+            url = '%s/manage_main?manage_tabs_message=%s' % (REQUEST['URL1'],
+                                                             msg)
+            REQUEST['RESPONSE'].redirect(url)
+
+
+InitializeClass(RequestTimingViewer)
+
+
+class ZODBActivityViewer(Tabs, Traversable, Implicit):
+    """ Shows which URL patterns load the most objects from the ZODB
+    """
+    manage = manage_main = manage_workspace = DTMLFile('dtml/cpActivity',
+                                                       globals())
+    manage_main._setName('manage_main')
+    id = 'Activity'
+    name = title = 'ZODB Activity'
+    meta_type = name
+    zmi_icon = 'fa fa-database'
+    manage_options = (
+        {'label': 'Control Panel', 'action': '../manage_main'},
+        {'label': 'Databases', 'action': '../Database/manage_main'},
+        {'label': 'Configuration', 'action': '../Configuration/manage_main'},
+        {'label': 'Request Timing', 'action': '../Timing/manage_main'},
+        {'label': 'ZODB Activity', 'action': 'manage_main'},
+    )
+    MANAGE_TABS_NO_BANNER = True
+
+    def isActivityEnabled(self):
+        return get_zodb_activity()
+
+    def getMaxPatterns(self):
+        return activity.statistics.max_patterns
+
+    def getActivityReport(self, sort_on='loads'):
+        if sort_on not in activity.SORT_KEYS:
+            sort_on = 'loads'
+        return activity.statistics.getReport(sort_on)
+
+    def getRetryMetrics(self):
+        return get_retry_policy().getMetrics()
+
+    def getConflictReport(self):
+        report = get_retry_policy().getConflictReport()
+        for entry in report:
+            entry['last'] = time.strftime('%Y-%m-%d %H:%M:%S',
+                                          time.localtime(entry['last']))
+        return report
+
+    @requestmethod('POST')
+    def manage_resetActivity(self, REQUEST=None):
+        """Forget the activity and conflicts of previous requests."""
+        activity.statistics.reset()
+        get_retry_policy().reset()
+        if REQUEST is not None:
+            msg = 'ZODB activity reset.'
+            url = '%s/manage_main?manage_tabs_message=%s' % (REQUEST['URL1'],
+                                                             msg)
+            REQUEST['RESPONSE'].redirect(url)
+
+
+InitializeClass(ZODBActivityViewer)
+
+
 class ApplicationManager(Persistent, Tabs, Traversable, Implicit):
     """System management
     """
@@ -145,6 +264,8 @@ class ApplicationManager(Persistent, Tabs, Traversable, Implicit):
 
     Database = DatabaseChooser()
     Configuration = ConfigurationViewer()
+    Timing = RequestTimingViewer()
+    Activity = ZODBActivityViewer()
 
     manage = manage_main = DTMLFile('dtml/cpContents', globals())
     manage_main._setName('manage_main')
@@ -152,6 +273,8 @@ class ApplicationManager(Persistent, Tabs, Traversable, Implicit):
         {'label': 'Control Panel', 'action': 'manage_main'},
         {'label': 'Databases', 'action': 'Database/manage_main'},
         {'label': 'Configuration', 'action': 'Configuration/manage_main'},
+        {'label': 'Request Timing', 'action': 'Timing/manage_main'},
+        {'label': 'ZODB Activity', 'action': 'Activity/manage_main'},
     )
     MANAGE_TABS_NO_BANNER = True
 
@@ -24,10 +24,9 @@ from Acquisition import Explicit
 from App import bbb
 from App.Common import package_home
 from App.Common import rfc1123_date
+from App.StaticAsset import getStaticAsset
 from App.config import getConfiguration
-from DateTime.DateTime import DateTime
 from zope.contenttype import guess_content_type
-from ZPublisher.Iterators import filestream_iterator
 
 
 PREFIX = os.path.realpath(
@@ -63,6 +62,7 @@ class ImageFile(Explicit):
         else:
             # A longer time reduces latency in production mode
             max_age = 3600  # One hour
+        self.max_age = max_age
         self.cch = 'public,max-age=%d' % max_age
 
         # First try to get the content_type by name
@@ -86,48 +86,35 @@ class ImageFile(Explicit):
         self.size = stat_info[stat.ST_SIZE]
         self.lmt = float(stat_info[stat.ST_MTIME]) or time.time()
         self.lmh = rfc1123_date(self.lmt)
+        # Compute the content hash at startup
+        self._asset()
 
     def index_html(self, REQUEST, RESPONSE):
         """Default document"""
-        # HTTP If-Modified-Since header handling. This is duplicated
-        # from OFS.Image.Image - it really should be consolidated
-        # somewhere...
-        RESPONSE.setHeader('Content-Type', self.content_type)
-        RESPONSE.setHeader('Last-Modified', self.lmh)
-        RESPONSE.setHeader('Cache-Control', self.cch)
-        header = REQUEST.get_header('If-Modified-Since', None)
-        if header is not None:
-            header = header.split(';')[0]
-            # Some proxies seem to send invalid date strings for this
-            # header. If the date string is not valid, we ignore it
-            # rather than raise an error to be generally consistent
-            # with common servers such as Apache (which can usually
-            # understand the screwy date string as a lucky side effect
-            # of the way they parse it).
-            try:
-                mod_since = int(DateTime(header).timeTime())
-            except Exception:
-                mod_since = None
-            if mod_since is not None:
-                if getattr(self, 'lmt', None):
-                    last_mod = int(self.lmt)
-                else:
-                    last_mod = int(0)
-                if last_mod > 0 and last_mod <= mod_since:
-                    RESPONSE.setHeader('Content-Length', '0')
-                    RESPONSE.setStatus(304)
-                    return ''
-
-        RESPONSE.setHeader('Content-Length', str(self.size).replace('L', ''))
-        return filestream_iterator(self.path, mode='rb')
+        return self._asset().serve(REQUEST, RESPONSE, self.max_age)
+
+    def _asset(self):
+        return getStaticAsset(self.path, self.content_type)
+
+    @property
+    def fingerprint(self):
+        """Hash of the file content, see ``fingerprintURL``."""
+        return self._asset().fingerprint
+
+    @security.private
+    def fingerprintURL(self, url):
+        """Return url, the URL of this file, with the fingerprint added.
+
+        Browsers cache fingerprinted URLs forever.
+        """
+        return self._asset().fingerprintURL(url)
 
     if bbb.HAS_ZSERVER:
         @security.public
         def HEAD(self, REQUEST, RESPONSE):
             """ """
-            RESPONSE.setHeader('Content-Type', self.content_type)
-            RESPONSE.setHeader('Last-Modified', self.lmh)
-            return ''
+            return self._asset().serve(
+                REQUEST, RESPONSE, self.max_age, head=True)
 
     def __len__(self):
         # This is bogus and needed because of the way Python tests truth.
@@ -0,0 +1,223 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Serving of static files from the file system.
+
+Used by ``App.ImageFile`` and the Five file resources. The content hash,
+the headers and the data of small files are computed once per file, so
+serving an asset costs little more than a dictionary lookup.
+
+Precompressed siblings of a file (``style.css.br``, ``style.css.gz``)
+are served to clients accepting the coding. URLs carrying the
+fingerprint of the file (``style.css?v=<fingerprint>``) are cached
+forever by the browser.
+"""
+
+import hashlib
+import os
+import time
+from email.utils import mktime_tz
+from email.utils import parsedate_tz
+
+from App.Common import rfc1123_date
+from App.config import getConfiguration
+from DateTime.DateTime import DateTime
+from zope.contenttype import guess_content_type
+from ZPublisher.compression import parse_accept_encoding
+from ZPublisher.Iterators import filestream_iterator
+
+
+# Files up to this size are kept in memory.
+SMALL_ASSET_SIZE = 1 << 18
+
+# Name of the query string variable holding the fingerprint.
+FINGERPRINT_KEY = 'v'
+
+IMMUTABLE_CACHE_CONTROL = 'public,max-age=31536000,immutable'
+
+# Precompressed siblings in order of preference.
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+_assets = {}
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_small(path, size):
+    if size > SMALL_ASSET_SIZE:
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class _Representation(object):
+    """The data of an asset in one content coding."""
+
+    def __init__(self, path, size, etag, coding=None):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.coding = coding
+        self.content_length = str(size)
+        self.data = _read_small(path, size)
+
+    def body(self):
+        if self.data is not None:
+            return self.data
+        return filestream_iterator(self.path, mode='rb')
+
+
+class StaticAsset(object):
+    """A file served as is."""
+
+    def __init__(self, path, content_type=None):
+        self.path = path
+        stat_info = os.stat(path)
+        self._stat = (stat_info.st_mtime, stat_info.st_size)
+        self.size = stat_info.st_size
+        self.lmt = float(stat_info.st_mtime) or time.time()
+        self.lmh = rfc1123_date(self.lmt)
+
+        if content_type is None:
+            content_type, enc = guess_content_type(path, default='failed')
+            if content_type == 'failed':
+                with open(path, 'rb') as f:
+                    data = f.read(1024)
+                content_type, enc = guess_content_type(path, data)
+        self.content_type = content_type
+
+        self.fingerprint = _hash_file(path)[:16]
+        self.etag = '"%s"' % self.fingerprint
+        self.identity = _Representation(path, self.size, self.etag)
+
+        # Siblings older than the file itself are stale and ignored.
+        self.encoded = []
+        for coding, suffix in PRECOMPRESSED:
+            try:
+                sibling = os.stat(path + suffix)
+            except OSError:
+                continue
+            if sibling.st_mtime < stat_info.st_mtime:
+                continue
+            etag = '"%s-%s"' % (self.fingerprint, coding)
+            self.encoded.append(_Representation(
+                path + suffix, sibling.st_size, etag, coding))
+        self.etags = frozenset(
+            [self.etag] + [rep.etag for rep in self.encoded])
+
+    def isStale(self):
+        """Return whether the file changed since it was read."""
+        try:
+            stat_info = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat_info.st_mtime, stat_info.st_size) != self._stat
+
+    def fingerprintURL(self, url):
+        """Return url with the fingerprint of the file added."""
+        sep = '&' if '?' in url else '?'
+        return '%s%s%s=%s' % (url, sep, FINGERPRINT_KEY, self.fingerprint)
+
+    def isNotModified(self, request):
+        """Return whether the client has a current copy."""
+        header = request.getHeader('If-None-Match', None)
+        if header is not None:
+            # If-None-Match uses the weak comparison.
+            for tag in header.split(','):
+                tag = tag.strip()
+                if tag.startswith('W/'):
+                    tag = tag[2:]
+                if tag == '*' or tag in self.etags:
+                    return True
+            return False
+
+        header = request.getHeader('If-Modified-Since', None)
+        if header is None:
+            return False
+        header = header.split(';')[0].strip()
+        if header == self.lmh:
+            # Most clients send back the Last-Modified value as is.
+            return True
+        try:
+            mod_since = mktime_tz(parsedate_tz(header))
+        except (TypeError, ValueError, OverflowError):
+            # Some proxies send invalid date strings, which DateTime
+            # might still understand. Otherwise the header is ignored.
+            try:
+                mod_since = DateTime(header).timeTime()
+            except Exception:
+                return False
+        return 0 < int(self.lmt) <= int(mod_since)
+
+    def negotiate(self, request):
+        """Return the representation to send to the client."""
+        if self.encoded:
+            accepted = parse_accept_encoding(
+                request.getHeader('Accept-Encoding', None))
+            if accepted:
+                for rep in self.encoded:
+                    quality = accepted.get(
+                        rep.coding, accepted.get('*', 0.0))
+                    if quality > 0:
+                        return rep
+        return self.identity
+
+    def serve(self, request, response, max_age=3600, head=False):
+        """Set the response headers and return the body.
+
+        max_age is the time in seconds the client may cache the file.
+        Requests carrying the current fingerprint are cached forever.
+        If head is true, only the headers are set.
+        """
+        rep = self.negotiate(request)
+        form = getattr(request, 'form', None) or {}
+        if form.get(FINGERPRINT_KEY) == self.fingerprint:
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = 'public,max-age=%d' % max_age
+
+        response.setHeader('Content-Type', self.content_type)
+        response.setHeader('Last-Modified', self.lmh)
+        response.setHeader('Cache-Control', cache_control)
+        response.setHeader('ETag', rep.etag)
+        if self.encoded:
+            response.setHeader('Vary', 'Accept-Encoding')
+
+        if self.isNotModified(request):
+            response.setHeader('Content-Length', '0')
+            response.setStatus(304)
+            return b''
+
+        if rep.coding is not None:
+            response.setHeader('Content-Encoding', rep.coding)
+        if head:
+            return b''
+        response.setHeader('Content-Length', rep.content_length)
+        return rep.body()
+
+
+def getStaticAsset(path, content_type=None):
+    """Return the StaticAsset for path.
+
+    Assets are created once per path. In debug mode changed files are
+    read again.
+    """
+    asset = _assets.get(path)
+    if asset is None or (getConfiguration().debug_mode and asset.isStale()):
+        asset = _assets[path] = StaticAsset(path, content_type)
+    return asset
@@ -17,18 +17,33 @@ This module provides a wrapper that causes a database connection to be created
 and used when bobo publishes a bobo_application object.
 """
 
+import logging
 import sys
+import threading
+
+import transaction
 
 
 if sys.version_info >= (3, ):
     basestring = str
 
+logger = logging.getLogger('Zope')
+
 
 class ZApplicationWrapper(object):
 
-    def __init__(self, db, name, klass=None):
+    # If true, the publisher uses a connection pinned to each thread.
+    connection_affinity = False
+
+    def __init__(self, db, name, klass=None, connection_affinity=False):
         self._db = db
         self._name = name
+        self.connection_affinity = connection_affinity
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # thread -> the connection pinned to it
+        self._pinned = {}
+        self._warned = False
         if klass is not None:
             conn = db.open()
             root = conn.root()
@@ -78,6 +93,74 @@ class ZApplicationWrapper(object):
 
         return connection.root()[self._name]
 
+    def pinned(self):
+        """Return the application object using the connection pinned to
+        the current thread.
+
+        The connection is opened on the first call in a thread and stays
+        open, so the thread keeps its objects in the cache of its own
+        connection. At most pool-size connections are pinned, threads
+        beyond that get a connection from the pool. Pass the connection
+        to release instead of closing it.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._pin()
+        return connection.root()[self._name]
+
+    def _pin(self):
+        db = self._db
+        thread = threading.current_thread()
+        with self._lock:
+            self._closeAbandoned()
+            if len(self._pinned) >= db.getPoolSize():
+                if not self._warned:
+                    logger.warning(
+                        'More threads than the pool-size of %d connections '
+                        'of the database, some threads do not get a '
+                        'connection of their own.', db.getPoolSize())
+                    self._warned = True
+                return db.open()
+            # Use the transaction manager of the thread, not the thread
+            # local one, so the connection can be closed by other threads.
+            connection = db.open(
+                transaction_manager=transaction.manager.manager)
+            self._pinned[thread] = connection
+        self._local.connection = connection
+        return connection
+
+    def _closeAbandoned(self):
+        for thread, connection in list(self._pinned.items()):
+            if not thread.is_alive():
+                del self._pinned[thread]
+                self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.transaction_manager.abort()
+            connection.close()
+        except Exception:
+            logger.exception('Cannot close the connection %r', connection)
+
+    def release(self, connection):
+        """Close connection, unless it is pinned to the current thread."""
+        if connection is not getattr(self._local, 'connection', None):
+            connection.close()
+
+    def getPinnedCount(self):
+        """Return the number of connections pinned to threads."""
+        with self._lock:
+            return len(self._pinned)
+
+    def closePinned(self):
+        """Close all pinned connections, of all threads."""
+        with self._lock:
+            pinned, self._pinned = self._pinned, {}
+            self._warned = False
+        self._local = threading.local()
+        for connection in pinned.values():
+            self._close(connection)
+
 
 class Cleanup(object):
     def __init__(self, jar):
@@ -0,0 +1,120 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Profile the startup of Zope.
+
+With the ``startup-profile`` option Zope measures how long it takes to
+import and initialize each product, to execute the ZCML of each
+configuration file and to open the databases, and logs the slowest
+steps when it has started.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+
+try:
+    clock = time.perf_counter
+except AttributeError:  # PY2
+    clock = time.time
+
+logger = logging.getLogger('Zope')
+
+_profile = None
+
+
+class StartupProfile(object):
+    """The time taken by the steps of the startup."""
+
+    def __init__(self):
+        # (category, name) -> seconds
+        self.timings = {}
+        self.started = clock()
+        self.duration = None
+
+    def add(self, category, name, seconds):
+        key = (category, name)
+        self.timings[key] = self.timings.get(key, 0.0) + seconds
+
+    def getTotals(self):
+        """Return a mapping of categories to their total time."""
+        totals = {}
+        for (category, name), seconds in self.timings.items():
+            totals[category] = totals.get(category, 0.0) + seconds
+        return totals
+
+    def getSlowest(self, limit=20):
+        """Return up to limit (category, name, seconds) tuples, the
+        slowest first.
+        """
+        slowest = sorted(self.timings.items(), key=lambda item: -item[1])
+        return [(category, name, seconds)
+                for (category, name), seconds in slowest[:limit]]
+
+    def getReport(self, limit=20):
+        lines = []
+        if self.duration is not None:
+            lines.append('Zope started in %.2f seconds.' % self.duration)
+        for category, seconds in sorted(self.getTotals().items()):
+            lines.append('%-12s %8.3f s' % (category, seconds))
+        lines.append('Slowest steps:')
+        for category, name, seconds in self.getSlowest(limit):
+            lines.append('%8.3f s  %-12s %s' % (seconds, category, name))
+        return '\n'.join(lines)
+
+
+def start():
+    """Start profiling the startup."""
+    global _profile
+    _profile = StartupProfile()
+    return _profile
+
+
+def stop():
+    """Stop profiling, log the report and return the profile, or None
+    if the startup was not profiled.
+    """
+    global _profile
+    profile, _profile = _profile, None
+    if profile is not None:
+        profile.duration = clock() - profile.started
+        logger.info('Startup profile:\n%s', profile.getReport())
+    return profile
+
+
+def isProfiling():
+    return _profile is not None
+
+
+@contextmanager
+def measure(category, name):
+    """Add the time the block takes to the profile, if profiling."""
+    profile = _profile
+    if profile is None:
+        yield
+        return
+    started = clock()
+    try:
+        yield
+    finally:
+        profile.add(category, name, clock() - started)
+
+
+def timed(category, name, func):
+    """Return a function calling func and adding the time it takes to
+    the profile.
+    """
+    def wrapper(*args, **kw):
+        with measure(category, name):
+            return func(*args, **kw)
+    return wrapper
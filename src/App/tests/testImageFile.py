@@ -1,5 +1,6 @@
 import io
 import os.path
+import shutil
 import unittest
 from io import BytesIO
 
@@ -64,11 +65,13 @@ class TestImageFileFunctional(unittest.TestCase):
         image = App.ImageFile.ImageFile(path)
         result = image.index_html(request, response)
         self.assertEqual(stdout.getvalue(), b'')
-        self.assertIsInstance(result, io.FileIO)
-        self.assertTrue(b''.join(result).startswith(b'\x89PNG\r\n'))
+        # Small files are served from memory.
+        self.assertIsInstance(result, bytes)
+        self.assertTrue(result.startswith(b'\x89PNG\r\n'))
         self.assertEqual(len(result), image.size)
         self.assertEqual(response.getHeader('Content-Length'), str(image.size))
-        result.close()
+        self.assertEqual(response.getHeader('ETag'),
+                         '"%s"' % image.fingerprint)
 
     def test_304(self):
         env = {
@@ -88,3 +91,51 @@ class TestImageFileFunctional(unittest.TestCase):
         self.assertEqual(stdout.getvalue(), b'')
         self.assertEqual(len(result), 0)
         self.assertEqual(response.getHeader('Content-Length'), '0')
+
+    def test_index_html_large_file(self):
+        import tempfile
+        from App.StaticAsset import SMALL_ASSET_SIZE
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'large.png')
+        with open(path, 'wb') as f:
+            f.write(b'\x89PNG\r\n' + b'x' * SMALL_ASSET_SIZE)
+        env = {
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REQUEST_METHOD': 'GET',
+        }
+        response = WSGIResponse(BytesIO())
+        request = WSGIRequest(BytesIO(), env, response)
+        image = App.ImageFile.ImageFile(path)
+        result = image.index_html(request, response)
+        self.assertIsInstance(result, io.FileIO)
+        self.assertEqual(len(result), image.size)
+        result.close()
+
+    def test_fingerprint_immutable(self):
+        env = {
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REQUEST_METHOD': 'GET',
+        }
+        path = os.path.join(os.path.dirname(App.__file__),
+                            'www', 'zopelogo.png')
+        image = App.ImageFile.ImageFile(path)
+        url = image.fingerprintURL('/p_/zopelogo_png')
+        self.assertEqual(url, '/p_/zopelogo_png?v=%s' % image.fingerprint)
+
+        response = WSGIResponse(BytesIO())
+        request = WSGIRequest(BytesIO(), env, response)
+        request.form['v'] = image.fingerprint
+        image.index_html(request, response)
+        self.assertEqual(response.getHeader('Cache-Control'),
+                         'public,max-age=31536000,immutable')
+
+        response = WSGIResponse(BytesIO())
+        request = WSGIRequest(BytesIO(), env, response)
+        request.form['v'] = 'outdated'
+        image.index_html(request, response)
+        self.assertEqual(response.getHeader('Cache-Control'), image.cch)
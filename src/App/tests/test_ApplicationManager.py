@@ -122,6 +122,127 @@ class ConfigurationViewerTests(ConfigTestBase, unittest.TestCase):
                              str(getattr(cfg, info_dict['name'])))
 
 
+class RequestTimingViewerTests(unittest.TestCase):
+
+    def setUp(self):
+        from ZPublisher.timing import statistics
+        statistics.reset()
+
+    def tearDown(self):
+        from ZPublisher.timing import statistics
+        statistics.reset()
+
+    def _getTargetClass(self):
+        from App.ApplicationManager import RequestTimingViewer
+        return RequestTimingViewer
+
+    def _makeOne(self):
+        return self._getTargetClass()()
+
+    def test_defaults(self):
+        viewer = self._makeOne()
+        self.assertEqual(viewer.id, 'Timing')
+        self.assertEqual(viewer.title, 'Request Timing')
+        self.assertFalse(viewer.isTimingEnabled())
+
+    def test_getBucketLabels(self):
+        from ZPublisher.timing import BUCKETS
+        labels = self._makeOne().getBucketLabels()
+        self.assertEqual(len(labels), len(BUCKETS))
+        self.assertEqual(labels[0], '<= 1 ms')
+        self.assertEqual(labels[-1], '> 5000 ms')
+
+    def test_getTimingSummary_and_report(self):
+        from ZPublisher.timing import RequestTimings
+        from ZPublisher.timing import statistics
+        viewer = self._makeOne()
+        self.assertEqual(viewer.getTimingSummary()['requests'], 0)
+        timings = RequestTimings()
+        timings.loads = 4
+        timings.load_bytes = 400
+        timings.lap('call')
+        statistics.record(timings)
+        statistics.record(RequestTimings())
+        summary = viewer.getTimingSummary()
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['loads'], 2)
+        self.assertEqual(summary['load_bytes'], 200)
+        phases = [r['phase'] for r in viewer.getTimingReport()]
+        self.assertEqual(phases[0], 'input')
+        self.assertEqual(phases[-1], 'total')
+
+    def test_manage_resetTiming(self):
+        from ZPublisher.timing import RequestTimings
+        from ZPublisher.timing import statistics
+        statistics.record(RequestTimings())
+        self._makeOne().manage_resetTiming()
+        self.assertEqual(statistics.requests, 0)
+
+
+class ZODBActivityViewerTests(unittest.TestCase):
+
+    def setUp(self):
+        from ZPublisher.activity import statistics
+        statistics.reset()
+
+    def tearDown(self):
+        from ZPublisher.activity import statistics
+        statistics.reset()
+
+    def _getTargetClass(self):
+        from App.ApplicationManager import ZODBActivityViewer
+        return ZODBActivityViewer
+
+    def _makeOne(self):
+        return self._getTargetClass()()
+
+    def _record(self, pattern, loads):
+        from ZPublisher.activity import RequestActivity
+        from ZPublisher.activity import statistics
+        activity = RequestActivity()
+        activity.loads = loads
+        statistics.record(pattern, activity)
+
+    def test_defaults(self):
+        viewer = self._makeOne()
+        self.assertEqual(viewer.id, 'Activity')
+        self.assertEqual(viewer.title, 'ZODB Activity')
+        self.assertFalse(viewer.isActivityEnabled())
+        self.assertEqual(viewer.getMaxPatterns(), 100)
+
+    def test_getActivityReport(self):
+        viewer = self._makeOne()
+        self._record('GET Folder', 5)
+        self._record('GET File', 10)
+        report = viewer.getActivityReport()
+        self.assertEqual([r['pattern'] for r in report],
+                         ['GET File', 'GET Folder'])
+        # Unknown sort keys are ignored.
+        self.assertEqual(viewer.getActivityReport('pattern'), report)
+
+    def test_getConflictReport(self):
+        from ZODB.POSException import ConflictError
+        from ZODB.utils import p64
+        from ZPublisher.WSGIPublisher import get_retry_policy
+        self.addCleanup(get_retry_policy().reset)
+        get_retry_policy().recordConflict(ConflictError(oid=p64(1)), True)
+        viewer = self._makeOne()
+        self.assertEqual(viewer.getRetryMetrics()['conflicts'], 1)
+        report = viewer.getConflictReport()
+        self.assertEqual(report[0]['oid'], '0x01')
+        self.assertTrue(report[0]['last'].startswith('20'))
+
+    def test_manage_resetActivity(self):
+        from ZODB.POSException import ConflictError
+        from ZPublisher.WSGIPublisher import get_retry_policy
+        viewer = self._makeOne()
+        self._record('GET Folder', 5)
+        get_retry_policy().recordConflict(ConflictError(), True)
+        viewer.manage_resetActivity()
+        self.assertEqual(viewer.getActivityReport(), [])
+        self.assertEqual(viewer.getRetryMetrics()['conflicts'], 0)
+
+
 class DatabaseChooserTests(ConfigTestBase, unittest.TestCase):
 
     def _getTargetClass(self):
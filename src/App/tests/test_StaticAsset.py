@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+import App.config
+from ZPublisher.HTTPRequest import WSGIRequest
+from ZPublisher.HTTPResponse import WSGIResponse
+
+
+class StaticAssetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'style.css')
+        with open(self.path, 'wb') as f:
+            f.write(b'body { color: red; }' * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _makeOne(self):
+        from App.StaticAsset import StaticAsset
+        return StaticAsset(self.path)
+
+    def _addSibling(self, suffix, mtime=None):
+        data = b'compressed' + suffix.encode('ascii')
+        with open(self.path + suffix, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(self.path + suffix, (mtime, mtime))
+        return data
+
+    def _serve(self, asset, head=False, form=None, **env):
+        env.update({
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REQUEST_METHOD': 'GET',
+        })
+        response = WSGIResponse(BytesIO())
+        request = WSGIRequest(BytesIO(), env, response)
+        request.form.update(form or {})
+        body = asset.serve(request, response, 60, head=head)
+        return body, response
+
+    def test_attributes(self):
+        asset = self._makeOne()
+        self.assertEqual(asset.content_type, 'text/css')
+        self.assertEqual(asset.size, 2000)
+        self.assertEqual(len(asset.fingerprint), 16)
+        self.assertEqual(asset.etag, '"%s"' % asset.fingerprint)
+        self.assertEqual(asset.encoded, [])
+
+    def test_serve(self):
+        asset = self._makeOne()
+        body, response = self._serve(asset)
+        self.assertEqual(body, b'body { color: red; }' * 100)
+        self.assertEqual(response.getStatus(), 200)
+        self.assertEqual(response.getHeader('Content-Length'), '2000')
+        self.assertEqual(response.getHeader('ETag'), asset.etag)
+        self.assertEqual(response.getHeader('Last-Modified'), asset.lmh)
+        self.assertEqual(response.getHeader('Cache-Control'),
+                         'public,max-age=60')
+        self.assertIsNone(response.getHeader('Vary'))
+
+    def test_serve_head(self):
+        body, response = self._serve(self._makeOne(), head=True)
+        self.assertEqual(body, b'')
+        self.assertTrue(
+            response.getHeader('Content-Type').startswith('text/css'))
+
+    def test_if_none_match(self):
+        asset = self._makeOne()
+        body, response = self._serve(
+            asset, HTTP_IF_NONE_MATCH='"other", W/%s' % asset.etag)
+        self.assertEqual(response.getStatus(), 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(response.getHeader('ETag'), asset.etag)
+
+    def test_if_none_match_takes_precedence(self):
+        asset = self._makeOne()
+        body, response = self._serve(
+            asset, HTTP_IF_NONE_MATCH='"other"',
+            HTTP_IF_MODIFIED_SINCE=asset.lmh)
+        self.assertEqual(response.getStatus(), 200)
+
+    def test_if_modified_since(self):
+        asset = self._makeOne()
+        for header, status in [
+                (asset.lmh, 304),
+                ('Fri, 31 Dec 2049 23:59:59 GMT', 304),
+                ('2049/12/31', 304),
+                ('Thu, 01 Jan 1970 00:00:01 GMT', 200),
+                ('bogus', 200)]:
+            body, response = self._serve(
+                asset, HTTP_IF_MODIFIED_SINCE=header)
+            self.assertEqual(response.getStatus(), status, header)
+
+    def test_precompressed(self):
+        data = self._addSibling('.gz')
+        asset = self._makeOne()
+        self.assertEqual([rep.coding for rep in asset.encoded], ['gzip'])
+
+        body, response = self._serve(
+            asset, HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(body, data)
+        self.assertEqual(response.getHeader('Content-Encoding'), 'gzip')
+        self.assertEqual(response.getHeader('Content-Length'),
+                         str(len(data)))
+        self.assertEqual(response.getHeader('Vary'), 'Accept-Encoding')
+        etag = response.getHeader('ETag')
+        self.assertNotEqual(etag, asset.etag)
+
+        body, response = self._serve(asset, HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(len(body), 2000)
+        self.assertIsNone(response.getHeader('Content-Encoding'))
+        self.assertEqual(response.getHeader('Vary'), 'Accept-Encoding')
+
+        body, response = self._serve(
+            asset, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.getStatus(), 304)
+
+    def test_precompressed_stale(self):
+        mtime = os.stat(self.path).st_mtime - 10
+        self._addSibling('.gz', mtime)
+        asset = self._makeOne()
+        self.assertEqual(asset.encoded, [])
+
+    def test_fingerprint(self):
+        asset = self._makeOne()
+        url = asset.fingerprintURL('/++resource++x/style.css')
+        self.assertEqual(url,
+                         '/++resource++x/style.css?v=' + asset.fingerprint)
+        self.assertEqual(asset.fingerprintURL('/style.css?a=1'),
+                         '/style.css?a=1&v=' + asset.fingerprint)
+
+        body, response = self._serve(asset, form={'v': asset.fingerprint})
+        self.assertEqual(response.getHeader('Cache-Control'),
+                         'public,max-age=31536000,immutable')
+
+    def test_isStale(self):
+        asset = self._makeOne()
+        self.assertFalse(asset.isStale())
+        with open(self.path, 'ab') as f:
+            f.write(b'/* more */')
+        self.assertTrue(asset.isStale())
+        os.remove(self.path)
+        self.assertTrue(asset.isStale())
+
+
+class GetStaticAssetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.oldcfg = App.config._config
+        self.config = App.config.getConfiguration()
+        self.old_debug_mode = self.config.debug_mode
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'script.js')
+        with open(self.path, 'wb') as f:
+            f.write(b'alert(1);')
+
+    def tearDown(self):
+        self.config.debug_mode = self.old_debug_mode
+        App.config._config = self.oldcfg
+        shutil.rmtree(self.tmpdir)
+
+    def _setDebugMode(self, debug_mode):
+        self.config.debug_mode = debug_mode
+
+    def _change(self):
+        with open(self.path, 'ab') as f:
+            f.write(b'alert(2);')
+
+    def _callFUT(self):
+        from App.StaticAsset import getStaticAsset
+        return getStaticAsset(self.path)
+
+    def test_cached(self):
+        self._setDebugMode(False)
+        asset = self._callFUT()
+        self._change()
+        self.assertIs(self._callFUT(), asset)
+
+    def test_debug_mode_reloads(self):
+        self._setDebugMode(True)
+        asset = self._callFUT()
+        self.assertIs(self._callFUT(), asset)
+        self._change()
+        new_asset = self._callFUT()
+        self.assertIsNot(new_asset, asset)
+        self.assertEqual(new_asset.size, 18)
@@ -0,0 +1,114 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+
+import threading
+import unittest
+
+import transaction
+from persistent.mapping import PersistentMapping
+from ZODB.DB import DB
+from ZODB.MappingStorage import MappingStorage
+
+
+class ZApplicationWrapperTests(unittest.TestCase):
+
+    def _makeOne(self, pool_size=7):
+        from App.ZApplication import ZApplicationWrapper
+        self.db = DB(MappingStorage(), pool_size=pool_size)
+        self.addCleanup(self.db.close)
+        wrapper = ZApplicationWrapper(self.db, 'Application',
+                                      PersistentMapping,
+                                      connection_affinity=True)
+        self.addCleanup(wrapper.closePinned)
+        return wrapper
+
+    def _inThread(self, func):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def test_call_opens_new_connection(self):
+        wrapper = self._makeOne()
+        app = wrapper()
+        self.assertIsNot(wrapper()._p_jar, app._p_jar)
+        self.assertEqual(wrapper.getPinnedCount(), 0)
+
+    def test_pinned_keeps_connection(self):
+        wrapper = self._makeOne()
+        app = wrapper.pinned()
+        connection = app._p_jar
+        wrapper.release(connection)
+        self.assertIsNotNone(connection.opened)
+        self.assertIs(wrapper.pinned()._p_jar, connection)
+        self.assertEqual(wrapper.getPinnedCount(), 1)
+
+    def test_pinned_per_thread(self):
+        wrapper = self._makeOne()
+        connection = wrapper.pinned()._p_jar
+        other = self._inThread(lambda: wrapper.pinned()._p_jar)
+        self.assertIsNot(other, connection)
+
+    def test_pinned_sees_changes(self):
+        wrapper = self._makeOne()
+        app = wrapper.pinned()
+        wrapper.release(app._p_jar)
+
+        connection = self.db.open(transaction.TransactionManager())
+        connection.root()['Application']['key'] = 'value'
+        connection.transaction_manager.commit()
+        connection.close()
+
+        transaction.begin()
+        self.assertEqual(wrapper.pinned()['key'], 'value')
+        transaction.abort()
+
+    def test_release_closes_unpinned(self):
+        wrapper = self._makeOne()
+        connection = wrapper()._p_jar
+        wrapper.release(connection)
+        self.assertIsNone(connection.opened)
+
+    def test_pinned_at_most_pool_size(self):
+        wrapper = self._makeOne(pool_size=1)
+        wrapper.pinned()
+
+        def other():
+            connection = wrapper.pinned()._p_jar
+            wrapper.release(connection)
+            return connection
+
+        connection = self._inThread(other)
+        self.assertIsNone(connection.opened)
+        self.assertEqual(wrapper.getPinnedCount(), 1)
+
+    def test_closes_connections_of_ended_threads(self):
+        wrapper = self._makeOne(pool_size=1)
+        connection = self._inThread(lambda: wrapper.pinned()._p_jar)
+        manager = connection.transaction_manager
+        self.assertIsNot(manager, transaction.manager.manager)
+        # The pool has room for one connection, the one of the ended
+        # thread is closed and opened again for this thread.
+        self.assertIs(wrapper.pinned()._p_jar.transaction_manager,
+                      transaction.manager.manager)
+        self.assertEqual(wrapper.getPinnedCount(), 1)
+
+    def test_closePinned(self):
+        wrapper = self._makeOne()
+        connection = wrapper.pinned()._p_jar
+        wrapper.closePinned()
+        self.assertIsNone(connection.opened)
+        self.assertEqual(wrapper.getPinnedCount(), 0)
+        self.assertIsNotNone(wrapper.pinned()._p_jar.opened)
+        self.assertEqual(wrapper.getPinnedCount(), 1)
@@ -0,0 +1,109 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from App import startupprofile
+
+
+class StartupProfileTests(unittest.TestCase):
+
+    def tearDown(self):
+        startupprofile.stop()
+
+    def test_measure_not_profiling(self):
+        self.assertFalse(startupprofile.isProfiling())
+        with startupprofile.measure('import', 'Products.Foo'):
+            pass
+        self.assertIsNone(startupprofile.stop())
+
+    def test_measure(self):
+        profile = startupprofile.start()
+        self.assertTrue(startupprofile.isProfiling())
+        with startupprofile.measure('import', 'Products.Foo'):
+            pass
+        with startupprofile.measure('import', 'Products.Foo'):
+            pass
+        self.assertEqual(list(profile.timings), [('import', 'Products.Foo')])
+        self.assertIs(startupprofile.stop(), profile)
+        self.assertFalse(startupprofile.isProfiling())
+        self.assertIsNotNone(profile.duration)
+
+    def test_measure_exception(self):
+        profile = startupprofile.start()
+        with self.assertRaises(ValueError):
+            with startupprofile.measure('initialize', 'Products.Foo'):
+                raise ValueError()
+        self.assertIn(('initialize', 'Products.Foo'), profile.timings)
+
+    def test_timed(self):
+        profile = startupprofile.start()
+        func = startupprofile.timed('zcml', 'configure.zcml',
+                                    lambda a, b=0: a + b)
+        self.assertEqual(func(1, b=2), 3)
+        self.assertIn(('zcml', 'configure.zcml'), profile.timings)
+
+    def test_report(self):
+        profile = startupprofile.StartupProfile()
+        profile.add('import', 'Products.Foo', 0.5)
+        profile.add('import', 'Products.Bar', 0.25)
+        profile.add('zcml', 'configure.zcml', 1.0)
+        self.assertEqual(profile.getTotals(),
+                         {'import': 0.75, 'zcml': 1.0})
+        self.assertEqual(profile.getSlowest(2),
+                         [('zcml', 'configure.zcml', 1.0),
+                          ('import', 'Products.Foo', 0.5)])
+        report = profile.getReport()
+        self.assertIn('Products.Bar', report)
+        self.assertLess(report.index('configure.zcml'),
+                        report.index('Products.Foo'))
+
+
+class ProfiledZCMLTests(unittest.TestCase):
+
+    def setUp(self):
+        from zope.component.testing import setUp
+        setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.zcml = os.path.join(self.tempdir, 'site.zcml')
+        with open(self.zcml, 'w') as f:
+            f.write('''\
+<configure xmlns="http://namespaces.zope.org/zope">
+  <include package="zope.component" file="meta.zcml" />
+  <utility
+      component="App.tests.test_startupprofile.utility"
+      provides="zope.interface.Interface" />
+</configure>
+''')
+
+    def tearDown(self):
+        from zope.component.testing import tearDown
+        startupprofile.stop()
+        shutil.rmtree(self.tempdir)
+        tearDown()
+
+    def test_load_profiled(self):
+        from zope.component import getUtility
+        from zope.interface import Interface
+        from Zope2.App.zcml import _load_profiled
+        profile = startupprofile.start()
+        _load_profiled(self.zcml)
+        self.assertIs(getUtility(Interface), utility)
+        self.assertIn(('zcml', '(parsing)'), profile.timings)
+        self.assertIn(('zcml', self.zcml), profile.timings)
+
+
+utility = object()
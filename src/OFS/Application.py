@@ -26,6 +26,7 @@ from Acquisition import aq_base
 from App import FactoryDispatcher
 from App.ApplicationManager import ApplicationManager
 from App.ProductContext import ProductContext
+from App.startupprofile import measure
 from DateTime import DateTime
 from OFS import bbb
 from OFS.FindSupport import FindSupport
@@ -323,12 +324,14 @@ def install_products(app=None):
         if product_name in done:
             continue
         done[product_name] = 1
-        install_product(app, product_dir, product_name, meta_types,
-                        folder_permissions)
+        with measure('initialize', 'Products.%s' % product_name):
+            install_product(app, product_dir, product_name, meta_types,
+                            folder_permissions)
 
     # Delayed install of packages-as-products
     for module, init_func in tuple(get_packages_to_initialize()):
-        install_package(app, module, init_func)
+        with measure('initialize', module.__name__):
+            install_package(app, module, init_func)
 
     Products.meta_types = Products.meta_types + tuple(meta_types)
     InitializeClass(Folder.Folder)
@@ -377,7 +380,8 @@ def import_products():
                     product_name, done[product_name], product_dir))
             continue
         done[product_name] = product_dir
-        import_product(product_dir, product_name)
+        with measure('import', 'Products.%s' % product_name):
+            import_product(product_dir, product_name)
     return list(done.keys())
 
 
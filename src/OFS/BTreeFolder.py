@@ -0,0 +1,398 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Object managers and folders for large numbers of subobjects.
+
+Subobjects are kept in BTrees instead of attributes and the ``_objects``
+tuple, so adding or removing an item only changes a few BTree buckets and
+listings are computed lazily.
+"""
+
+import six
+from six.moves.urllib.parse import quote
+
+from AccessControl.class_init import InitializeClass
+from AccessControl.Permissions import access_contents_information
+from AccessControl.Permissions import view_management_screens
+from AccessControl.SecurityInfo import ClassSecurityInfo
+from AccessControl.SecurityManagement import getSecurityManager
+from Acquisition import aq_base
+from App.special_dtml import DTMLFile
+from BTrees.Length import Length
+from BTrees.OIBTree import OIBTree
+from BTrees.OIBTree import union
+from BTrees.OOBTree import OOBTree
+from OFS.event import ObjectWillBeAddedEvent
+from OFS.event import ObjectWillBeRemovedEvent
+from OFS.Folder import Folder
+from OFS.interfaces import IBTreeFolder
+from OFS.ObjectManager import ObjectManager
+from OFS.subscribers import compatibilityCall
+from zope.container.contained import notifyContainerModified
+from zope.event import notify
+from zope.interface import implementer
+from zope.lifecycleevent import ObjectAddedEvent
+from zope.lifecycleevent import ObjectRemovedEvent
+
+
+_marker = []
+
+
+class LazyMap(object):
+    """A read-only sequence applying a function to the items of another
+    sequence when they are accessed.
+    """
+
+    __allow_access_to_unprotected_subobjects__ = 1
+
+    def __init__(self, func, seq):
+        self._func = func
+        self._seq = seq
+
+    def __len__(self):
+        return len(self._seq)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyMap(self._func, self._seq[index])
+        return self._func(self._seq[index])
+
+    def __iter__(self):
+        func = self._func
+        for item in self._seq:
+            yield func(item)
+
+    def __bool__(self):
+        return bool(len(self))
+
+    __nonzero__ = __bool__
+
+
+def _identity(value):
+    return value
+
+
+class BTreeObjectManager(ObjectManager):
+    """ObjectManager keeping its subobjects in BTrees.
+
+    The subobjects are stored in an OOBTree keyed by id. A second BTree maps
+    each meta type to the set of ids of that type, so listing the objects
+    of some meta types does not need to look at every subobject. The
+    listing methods return lazy sequences.
+    """
+
+    security = ClassSecurityInfo()
+
+    # Maximum number of items listed at once in the management interface.
+    manage_batch_size = 1000
+
+    _tree = None  # id -> subobject
+    _count = None  # number of subobjects
+    _mt_index = None  # meta_type -> OIBTree of ids
+
+    def __init__(self, id=None):
+        if id is not None:
+            self.id = str(id)
+        self._initBTrees()
+
+    def _initBTrees(self):
+        self._tree = OOBTree()
+        self._count = Length()
+        self._mt_index = OOBTree()
+
+    def __getattr__(self, name):
+        # Make subobjects available as attributes like in a regular
+        # ObjectManager, e.g. for acquisition and ``restrictedTraverse``.
+        tree = self._tree
+        if tree is not None and name[:1] != '_':
+            try:
+                return tree[name]
+            except (KeyError, TypeError):
+                pass
+        raise AttributeError(name)
+
+    def _getOb(self, id, default=_marker):
+        try:
+            ob = self._tree[id]
+        except (KeyError, TypeError):
+            if default is _marker:
+                raise AttributeError(id)
+            return default
+        return ob.__of__(self) if hasattr(ob, '__of__') else ob
+
+    def _setOb(self, id, object):
+        tree = self._tree
+        if id in tree:
+            raise KeyError('There is already an item named %s.' % id)
+        tree[id] = object
+        self._count.change(1)
+
+        meta_type = getattr(aq_base(object), 'meta_type', None)
+        if meta_type is not None:
+            ids = self._mt_index.get(meta_type)
+            if ids is None:
+                ids = self._mt_index[meta_type] = OIBTree()
+            ids[id] = 1
+
+    def _delOb(self, id):
+        tree = self._tree
+        meta_type = getattr(aq_base(tree[id]), 'meta_type', None)
+        del tree[id]
+        self._count.change(-1)
+
+        if meta_type is not None:
+            ids = self._mt_index.get(meta_type)
+            if ids is not None and id in ids:
+                del ids[id]
+                if not ids:
+                    del self._mt_index[meta_type]
+
+    @security.protected(access_contents_information)
+    def hasObject(self, id):
+        # Indicate whether the folder has an item by ID.
+        try:
+            return id in self._tree
+        except TypeError:
+            return False
+
+    @security.protected(access_contents_information)
+    def objectCount(self):
+        # Return the number of subobjects.
+        return self._count()
+
+    def _setObject(self, id, object, roles=None, user=None, set_owner=1,
+                   suppress_events=False):
+        """Set an object into this container.
+
+        Also sends IObjectWillBeAddedEvent and IObjectAddedEvent.
+        """
+        ob = object  # better name, keep original function signature
+        v = self._checkId(id)
+        if v is not None:
+            id = v
+
+        # If an object by the given id already exists, remove it.
+        if self.hasObject(id):
+            self._delObject(id)
+
+        if not suppress_events:
+            notify(ObjectWillBeAddedEvent(ob, self, id))
+
+        self._setOb(id, ob)
+        ob = self._getOb(id)
+
+        if set_owner:
+            # TODO: eventify manage_fixupOwnershipAfterAdd
+            # This will be called for a copy/clone, or a normal _setObject.
+            ob.manage_fixupOwnershipAfterAdd()
+
+            # Try to give user the local role "Owner", but only if
+            # no local roles have been set on the object yet.
+            if getattr(ob, '__ac_local_roles__', _marker) is None:
+                user = getSecurityManager().getUser()
+                if user is not None:
+                    userid = user.getId()
+                    if userid is not None:
+                        ob.manage_setLocalRoles(userid, ['Owner'])
+
+        if not suppress_events:
+            notify(ObjectAddedEvent(ob, self, id))
+            notifyContainerModified(self)
+
+        compatibilityCall('manage_afterAdd', ob, ob, self)
+
+        return id
+
+    def _delObject(self, id, dp=1, suppress_events=False):
+        """Delete an object from this container.
+
+        Also sends IObjectWillBeRemovedEvent and IObjectRemovedEvent.
+        """
+        ob = self._getOb(id)
+
+        compatibilityCall('manage_beforeDelete', ob, ob, self)
+
+        if not suppress_events:
+            notify(ObjectWillBeRemovedEvent(ob, self, id))
+
+        self._delOb(id)
+
+        # Indicate to the object that it has been deleted. This is
+        # necessary for object DB mount points. Note that we have to
+        # tolerate failure here because the object being deleted could
+        # be a Broken object, and it is not possible to set attributes
+        # on Broken objects.
+        try:
+            ob._v__object_deleted__ = 1
+        except Exception:
+            pass
+
+        if not suppress_events:
+            notify(ObjectRemovedEvent(ob, self, id))
+            notifyContainerModified(self)
+
+    @security.protected(access_contents_information)
+    def objectIds(self, spec=None):
+        # Returns a lazy sequence of subobject ids of the current object,
+        # sorted by id. If 'spec' is specified, returns the ids of the
+        # objects whose meta_type matches 'spec'.
+        if spec is None:
+            ids = self._tree.keys()
+        else:
+            if isinstance(spec, six.string_types):
+                spec = [spec]
+            ids = None
+            for meta_type in spec:
+                ids = union(ids, self._mt_index.get(meta_type))
+            if ids is None:
+                return ()
+            ids = ids.keys()
+        return LazyMap(_identity, ids)
+
+    @security.protected(access_contents_information)
+    def objectValues(self, spec=None):
+        # Returns a lazy sequence of actual subobjects of the current object.
+        # If 'spec' is specified, returns only objects whose meta_type
+        # match 'spec'.
+        return LazyMap(self._getOb, self.objectIds(spec))
+
+    @security.protected(access_contents_information)
+    def objectItems(self, spec=None):
+        # Returns a lazy sequence of (id, subobject) tuples of the current
+        # object. If 'spec' is specified, returns only objects whose
+        # meta_type match 'spec'
+        return LazyMap(lambda id: (id, self._getOb(id)),
+                       self.objectIds(spec))
+
+    def objectMap(self):
+        # Return a lazy sequence of mappings containing subobject meta-data
+        # without loading the subobjects.
+        return LazyMap(
+            lambda id: {'id': id, 'meta_type': self._getMetaType(id)},
+            self.objectIds())
+
+    def _getMetaType(self, id):
+        for meta_type, ids in self._mt_index.items():
+            if id in ids:
+                return meta_type
+        return None
+
+    @security.protected(access_contents_information)
+    def objectMap_d(self, t=None):
+        if hasattr(self, '_reserved_names'):
+            n = self._reserved_names
+        else:
+            n = ()
+        if not n:
+            return self.objectMap()
+        return [d for d in self.objectMap() if d['id'] not in n]
+
+    @security.protected(access_contents_information)
+    def tpValues(self):
+        # Return a list of subobjects, used by tree tag.
+        if hasattr(aq_base(self), 'tree_ids'):
+            return super(BTreeObjectManager, self).tpValues()
+        return [o for o in self.objectValues()
+                if getattr(aq_base(o), 'isPrincipiaFolderish', 0)]
+
+    def __contains__(self, name):
+        return self.hasObject(name)
+
+    def __iter__(self):
+        return iter(self._tree.keys())
+
+    def __len__(self):
+        return self.objectCount()
+
+    def _get_batch_start(self):
+        request = getattr(self, 'REQUEST', None)
+        try:
+            b_start = int(request.get('b_start', 0))
+        except (AttributeError, TypeError, ValueError):
+            b_start = 0
+        return max(min(b_start, len(self) - 1), 0)
+
+    @security.protected(view_management_screens)
+    def manage_get_batchInfo(self):
+        """Return information about the batch listed in the management
+        interface, or None if all items are listed.
+        """
+        total = len(self)
+        size = self.manage_batch_size
+        if total <= size:
+            return None
+        start = self._get_batch_start()
+        end = min(start + size, total)
+        return {
+            'start': start + 1,
+            'end': end,
+            'total': total,
+            'previous': max(start - size, 0) if start else None,
+            'next': end if end < total else None,
+        }
+
+    @security.protected(view_management_screens)
+    def manage_get_sortedObjects(self, sortkey, revkey):
+        '''
+        Return dictionaries used for the management page. Small containers
+        are sorted like any other ObjectManager. Large containers only
+        return the batch of items selected by the 'b_start' request
+        variable, in the order of objectIds() or reversed if revkey is
+        'desc'.
+        '''
+        total = len(self)
+        size = self.manage_batch_size
+        if total <= size:
+            return super(BTreeObjectManager, self).manage_get_sortedObjects(
+                sortkey, revkey)
+
+        ids = self.objectIds()
+        start = self._get_batch_start()
+        if revkey == 'desc':
+            batch = [ids[i] for i in range(total - start - 1,
+                                           max(total - start - size, 0) - 1,
+                                           -1)]
+        else:
+            batch = ids[start:start + size]
+        return [{'id': id, 'quoted_id': quote(id), 'obj': self._getOb(id)}
+                for id in batch]
+
+
+InitializeClass(BTreeObjectManager)
+
+
+manage_addBTreeFolderForm = DTMLFile('dtml/addBTreeFolder', globals())
+
+
+def manage_addBTreeFolder(self, id, title='', REQUEST=None):
+    """Add a new BTree Folder object with id *id*.
+    """
+    ob = BTreeFolder(id)
+    ob.title = title
+    self._setObject(id, ob)
+    ob = self._getOb(id)
+    if REQUEST is not None:
+        return self.manage_main(self, REQUEST)
+
+
+@implementer(IBTreeFolder)
+class BTreeFolder(BTreeObjectManager, Folder):
+    """A Folder for large numbers of subobjects.
+    """
+    meta_type = 'Folder (BTree)'
+    zmi_icon = 'far fa-folder zmi-icon-folder-btree'
+
+    def __init__(self, id=None):
+        BTreeObjectManager.__init__(self, id)
+
+
+InitializeClass(BTreeFolder)
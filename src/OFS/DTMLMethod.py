@@ -120,7 +120,7 @@ class DTMLMethod(
         if not self._cache_namespace_keys:
             data = self.ZCacheable_get(default=_marker)
             if data is not _marker:
-                if IStreamIterator.isImplementedBy(data) and \
+                if IStreamIterator.providedBy(data) and \
                    RESPONSE is not None:
                     # This is a stream iterator and we need to set some
                     # headers now before giving it to medusa
@@ -12,14 +12,24 @@
 ##############################################################################
 """Find support
 """
+import sys
+import threading
+
 import six
 
+import transaction
+
 from AccessControl import ClassSecurityInfo
 from AccessControl.class_init import InitializeClass
 from AccessControl.Permission import getPermissionIdentifier
 from AccessControl.Permissions import view_management_screens
+from AccessControl.SecurityManagement import getSecurityManager
+from AccessControl.SecurityManagement import newSecurityManager
+from AccessControl.SecurityManagement import noSecurityManager
 from AccessControl.tainted import TaintedString
 from Acquisition import aq_base
+from Acquisition import aq_chain
+from Acquisition import aq_inner
 from Acquisition import aq_parent
 from App.special_dtml import DTMLFile
 from DateTime.DateTime import DateTime
@@ -83,23 +93,12 @@ class FindSupport(Base):
 
         if result is None:
             result = []
-
-            if obj_metatypes and 'all' in obj_metatypes:
-                obj_metatypes = None
-
-            if obj_mtime and isinstance(obj_mtime, str):
-                obj_mtime = DateTime(obj_mtime).timeTime()
-
-            if obj_permission:
-                obj_permission = getPermissionIdentifier(obj_permission)
-
-            if obj_roles and isinstance(obj_roles, str):
-                obj_roles = [obj_roles]
-
-            if obj_expr:
-                # Setup expr machinations
-                md = td()
-                obj_expr = (Eval(obj_expr), md, md._push, md._pop)
+            (obj_ids, obj_metatypes, obj_searchterm, obj_expr, obj_mtime,
+             obj_mspec, obj_permission, obj_roles) = find_criteria(
+                obj_ids, obj_metatypes, obj_searchterm, obj_expr,
+                obj_mtime, obj_mspec, obj_permission, obj_roles)
+        else:
+            obj_searchterm = searchterm_text(obj_searchterm)
 
         base = aq_base(obj)
 
@@ -126,42 +125,9 @@ class FindSupport(Base):
                 dflag = 1
 
             bs = aq_base(ob)
-            if obj_searchterm:
-                if isinstance(obj_searchterm, TaintedString):
-                    obj_searchterm = str(obj_searchterm)
-                    if six.PY3 and not isinstance(obj_searchterm, str):
-                        obj_searchterm = obj_searchterm.decode(
-                            default_encoding)
-                if hasattr(ob, 'PrincipiaSearchSource'):
-                    pss = ob.PrincipiaSearchSource()
-                    if six.PY3 and not isinstance(pss, str):
-                        try:
-                            pss = pss.decode(default_encoding)
-                        except UnicodeDecodeError:
-                            pss = ''
-                if hasattr(ob, 'SearchableText'):
-                    st = ob.SearchableText()
-                    if six.PY3 and not isinstance(st, str):
-                        try:
-                            st = st.decode(default_encoding)
-                        except UnicodeDecodeError:
-                            st = ''
-            else:
-                pss = st = ''
-
-            if ((not obj_ids or absattr(bs.getId()) in obj_ids)
-                and (not obj_metatypes
-                     or (hasattr(bs, 'meta_type')
-                         and bs.meta_type in obj_metatypes))
-                and (not obj_searchterm
-                     or (hasattr(ob, 'PrincipiaSearchSource')
-                         and obj_searchterm in pss)
-                     or (hasattr(ob, 'SearchableText')
-                         and obj_searchterm in st))
-                and (not obj_expr or expr_match(ob, obj_expr))
-                and (not obj_mtime or mtime_match(ob, obj_mtime, obj_mspec))
-                and ((not obj_permission or not obj_roles)
-                     or role_match(ob, obj_permission, obj_roles))):
+            if find_match(ob, obj_ids, obj_metatypes, obj_searchterm,
+                          obj_expr, obj_mtime, obj_mspec,
+                          obj_permission, obj_roles):
 
                 if apply_func:
                     apply_func(ob, (apply_path + '/' + p))
@@ -182,10 +148,396 @@ class FindSupport(Base):
 
         return result
 
+    @security.protected(view_management_screens)
+    def iterZopeFind(self, obj, obj_ids=None, obj_metatypes=None,
+                     obj_searchterm=None, obj_expr=None,
+                     obj_mtime=None, obj_mspec=None,
+                     obj_permission=None, obj_roles=None,
+                     search_sub=0, REQUEST=None, pre='',
+                     token=None, budget=None, gc_interval=None,
+                     parallel=0):
+        """Zope Find interface returning an iterator.
+
+        The iterator yields the same (path, object) tuples as ZopeFind
+        while walking the object tree, without building a result list.
+
+        - budget limits the number of objects looked at, at least 1. When
+          the budget is used up the iterator stops and its ``token``
+          attribute is set.
+
+        - token resumes a previous search after the last object it looked
+          at.
+
+        - gc_interval calls ``cacheGC`` on the ZODB connection every
+          gc_interval objects to keep the pickle cache within its limits.
+
+        - parallel walks the subtrees of the subobjects of obj in that many
+          threads, each using its own ZODB connection. It can not be
+          combined with token or budget.
+        """
+        arguments = (obj_ids, obj_metatypes, obj_searchterm, obj_expr,
+                     obj_mtime, obj_mspec, obj_permission, obj_roles)
+        return ZopeFindIterator(obj, find_criteria(*arguments),
+                                search_sub=search_sub, pre=pre, token=token,
+                                budget=budget, gc_interval=gc_interval,
+                                parallel=parallel, arguments=arguments)
+
 
 InitializeClass(FindSupport)
 
 
+class ZopeFindIterator(object):
+    """Iterator over the results of a Zope Find.
+
+    Objects are visited depth first in the order of ``objectItems``. The
+    ``token`` attribute is None unless the iteration stopped because the
+    budget was used up. In that case it holds the path of the last object
+    looked at, relative to the object searched, and can be passed to
+    ``iterZopeFind`` to resume the search.
+
+    Parallel walks need the search arguments the criteria were made
+    from, each worker thread makes its own criteria from them.
+    """
+
+    security = ClassSecurityInfo()
+    security.declareObjectPublic()
+
+    # Allows restricted code to iterate over the results, an empty
+    # mapping allows no attributes.
+    __allow_access_to_unprotected_subobjects__ = {}
+
+    security.declarePublic('token', 'visited')  # NOQA: D001
+
+    token = None
+    visited = 0  # number of objects looked at
+
+    def __init__(self, obj, criteria, search_sub=0, pre='', token=None,
+                 budget=None, gc_interval=None, parallel=0, arguments=None):
+        if parallel and (token or budget is not None):
+            raise ValueError(
+                'Parallel find can not be combined with token or budget.')
+        if budget is not None and budget < 1:
+            raise ValueError('The budget must be at least 1.')
+        self.obj = obj
+        self.criteria = criteria
+        self.search_sub = search_sub
+        self.pre = pre
+        self.resume = token
+        self.budget = budget
+        self.gc_interval = gc_interval
+        self.parallel = parallel
+        self.arguments = arguments
+
+    def __iter__(self):
+        jar = getattr(aq_base(self.obj), '_p_jar', None)
+        if self.parallel > 1 and self.search_sub and jar is not None \
+           and self.arguments is not None:
+            return self._walk_parallel(jar)
+        return self._walk()
+
+    def _path(self, path):
+        path = '/'.join(path)
+        if self.pre:
+            return '%s/%s' % (self.pre, path)
+        return path
+
+    def _push(self, stack, ob, path, dflag):
+        # Add the subobjects of ob to the objects to visit.
+        items = None
+        if hasattr(aq_base(ob), 'objectItems'):
+            try:
+                items = iter(ob.objectItems())
+            except Exception:
+                pass
+        if items is not None:
+            stack.append((ob, path, items, dflag))
+        elif dflag:
+            ob._p_deactivate()
+
+    def _resume(self, stack):
+        # Rebuild the stack as it was after visiting the object at the
+        # path of the token. If an object along the path was removed, the
+        # search continues after the container it was in.
+        parts = self.resume.split('/')
+        ob = self.obj
+        path = ()
+        for part in parts:
+            try:
+                items = iter(ob.objectItems())
+            except Exception:
+                return
+            stack.append((ob, path, items, False))
+            for id, child in items:
+                if id == part:
+                    break
+            else:
+                return
+            ob = child
+            path = path + (part, )
+            if not hasattr(aq_base(ob), 'objectItems'):
+                return
+        if self.search_sub:
+            self._push(stack, ob, path, False)
+
+    def _walk(self):
+        criteria = self.criteria
+        budget = self.budget
+        gc_interval = self.gc_interval
+        jar = getattr(aq_base(self.obj), '_p_jar', None)
+        self.token = None
+
+        stack = []
+        if self.resume:
+            self._resume(stack)
+        else:
+            self._push(stack, self.obj, (), False)
+
+        last = None
+        while stack:
+            container, path, items, dflag = stack[-1]
+            try:
+                id, ob = next(items)
+            except StopIteration:
+                stack.pop()
+                if dflag:
+                    container._p_deactivate()
+                continue
+
+            if budget is not None and self.visited >= budget:
+                self.token = '/'.join(last)
+                return
+            self.visited += 1
+            last = path + (id, )
+
+            dflag = getattr(ob, '_p_changed', 0) is None
+            if find_match(ob, *criteria):
+                dflag = False
+                yield self._path(last), ob
+
+            if self.search_sub:
+                self._push(stack, ob, last, dflag)
+            elif dflag:
+                ob._p_deactivate()
+
+            if gc_interval and jar is not None and \
+               not self.visited % gc_interval:
+                jar.cacheGC()
+
+    def _walk_parallel(self, jar):
+        # Visit the subobjects of obj in this thread and hand their subtrees
+        # to worker threads. Results are yielded in the same order as a
+        # sequential walk.
+        tasks = []
+        queue = six.moves.queue.Queue()
+        user = _UserReference(getSecurityManager().getUser())
+        workers = [
+            threading.Thread(target=_find_worker,
+                             args=(jar.db(), queue, user, self.arguments,
+                                   self.gc_interval))
+            for i in range(self.parallel)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        try:
+            items = []
+            if hasattr(aq_base(self.obj), 'objectItems'):
+                try:
+                    items = self.obj.objectItems()
+                except Exception:
+                    pass
+            for id, ob in items:
+                self.visited += 1
+                if find_match(ob, *self.criteria):
+                    tasks.append(((id, ), ob, None))
+                if hasattr(aq_base(ob), 'objectItems'):
+                    task = _FindTask(ob)
+                    queue.put(task)
+                    tasks.append(((id, ), ob, task))
+
+            for path, ob, task in tasks:
+                if task is None:
+                    yield self._path(path), ob
+                    continue
+                task.done.wait()
+                if task.error is not None:
+                    six.reraise(*task.error)
+                self.visited += task.visited
+                for subpath in task.result:
+                    found = ob
+                    for id in subpath:
+                        found = found._getOb(id)
+                    yield self._path(path + subpath), found
+        finally:
+            for task in tasks:
+                if task[2] is not None:
+                    task[2].cancelled = True
+            for worker in workers:
+                queue.put(None)
+            for worker in workers:
+                worker.join()
+
+
+InitializeClass(ZopeFindIterator)
+
+
+class _FindTask(object):
+    # A subtree to search in a worker thread.
+
+    cancelled = False
+    error = None
+    visited = 0
+
+    def __init__(self, ob):
+        self.chain = aq_chain(ob)
+        self.result = []
+        self.done = threading.Event()
+
+
+class _UserReference(object):
+    # Identifies a user without holding on to persistent objects of the
+    # connection of the thread it was created in.
+
+    def __init__(self, user):
+        user_folder = aq_parent(aq_inner(user))
+        if getattr(aq_base(user_folder), '_p_oid', None) is None:
+            # Not stored in the database, like the special users.
+            self.user = user
+            self.chain = None
+        else:
+            self.user = user.getId()
+            self.chain = aq_chain(user_folder)
+
+    def get(self, conn):
+        """Return the user with its user folder loaded from conn."""
+        if self.chain is None:
+            return self.user
+        user_folder = _rewrap(self.chain, conn)
+        user = user_folder.getUserById(self.user)
+        if user is None:
+            raise ValueError('Unknown user: %s' % self.user)
+        return user.__of__(user_folder)
+
+
+def _find_worker(db, queue, user, arguments, gc_interval):
+    # The criteria hold the namespace of obj_expr, which is changed while
+    # matching, so each task gets its own.
+    tm = transaction.TransactionManager()
+    conn = db.open(transaction_manager=tm)
+    try:
+        while True:
+            task = queue.get()
+            if task is None:
+                break
+            try:
+                if not task.cancelled:
+                    newSecurityManager(None, user.get(conn))
+                    ob = _rewrap(task.chain, conn)
+                    found = ZopeFindIterator(ob, find_criteria(*arguments),
+                                             search_sub=1,
+                                             gc_interval=gc_interval)
+                    task.result = [tuple(path.split('/'))
+                                   for path, child in found]
+                    task.visited = found.visited
+            except Exception:
+                task.error = sys.exc_info()
+            finally:
+                task.done.set()
+                tm.abort()
+    finally:
+        noSecurityManager()
+        conn.close()
+
+
+def _rewrap(chain, conn):
+    # Rebuild the acquisition chain of an object with the persistent objects
+    # loaded from conn.
+    ob = None
+    for item in reversed(chain):
+        item = aq_base(item)
+        oid = getattr(item, '_p_oid', None)
+        if oid is not None:
+            item = conn.get(oid)
+        ob = item if ob is None else item.__of__(ob)
+    return ob
+
+
+def find_criteria(obj_ids, obj_metatypes, obj_searchterm, obj_expr,
+                  obj_mtime, obj_mspec, obj_permission, obj_roles):
+    # Convert the search arguments to the form used by find_match.
+    if obj_metatypes and 'all' in obj_metatypes:
+        obj_metatypes = None
+
+    if obj_mtime and isinstance(obj_mtime, str):
+        obj_mtime = DateTime(obj_mtime).timeTime()
+
+    if obj_permission:
+        obj_permission = getPermissionIdentifier(obj_permission)
+
+    if obj_roles and isinstance(obj_roles, str):
+        obj_roles = [obj_roles]
+
+    if obj_expr:
+        # Setup expr machinations
+        md = td()
+        obj_expr = (Eval(obj_expr), md, md._push, md._pop)
+
+    return (obj_ids, obj_metatypes, searchterm_text(obj_searchterm),
+            obj_expr, obj_mtime, obj_mspec, obj_permission, obj_roles)
+
+
+def searchterm_text(obj_searchterm):
+    if isinstance(obj_searchterm, TaintedString):
+        obj_searchterm = str(obj_searchterm)
+        if six.PY3 and not isinstance(obj_searchterm, str):
+            obj_searchterm = obj_searchterm.decode(default_encoding)
+    return obj_searchterm
+
+
+def text_match(ob, obj_searchterm):
+    if hasattr(ob, 'PrincipiaSearchSource'):
+        pss = ob.PrincipiaSearchSource()
+        if six.PY3 and not isinstance(pss, str):
+            try:
+                pss = pss.decode(default_encoding)
+            except UnicodeDecodeError:
+                pss = ''
+        if obj_searchterm in pss:
+            return 1
+    if hasattr(ob, 'SearchableText'):
+        st = ob.SearchableText()
+        if six.PY3 and not isinstance(st, str):
+            try:
+                st = st.decode(default_encoding)
+            except UnicodeDecodeError:
+                st = ''
+        if obj_searchterm in st:
+            return 1
+    return 0
+
+
+def find_match(ob, obj_ids, obj_metatypes, obj_searchterm, obj_expr,
+               obj_mtime, obj_mspec, obj_permission, obj_roles):
+    # Cheap tests come first, the searchable text of an object is only
+    # computed if everything else matched.
+    bs = aq_base(ob)
+    if obj_ids and absattr(bs.getId()) not in obj_ids:
+        return 0
+    if obj_metatypes and not (hasattr(bs, 'meta_type')
+                              and bs.meta_type in obj_metatypes):
+        return 0
+    if obj_mtime and not mtime_match(ob, obj_mtime, obj_mspec):
+        return 0
+    if obj_permission and obj_roles and \
+       not role_match(ob, obj_permission, obj_roles):
+        return 0
+    if obj_expr and not expr_match(ob, obj_expr):
+        return 0
+    if obj_searchterm and not text_match(ob, obj_searchterm):
+        return 0
+    return 1
+
+
 class td(RestrictedDTML, TemplateDict):
     pass
 
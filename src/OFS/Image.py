@@ -29,8 +29,10 @@ from AccessControl.Permissions import view as View
 from AccessControl.Permissions import view_management_screens
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from Acquisition import Implicit
+from Acquisition import aq_base
 from App.Common import rfc1123_date
 from App.special_dtml import DTMLFile
+from BTrees.LOBTree import LOBTree
 from DateTime.DateTime import DateTime
 from OFS import bbb
 from OFS.Cache import Cacheable
@@ -42,6 +44,9 @@ from OFS.SimpleItem import PathReprProvider
 from Persistence import Persistent
 from zExceptions import Redirect
 from zExceptions import ResourceLockedError
+from ZODB.blob import Blob
+from ZODB.interfaces import BlobError
+from ZODB.interfaces import IBlobStorage
 from zope.contenttype import guess_content_type
 from zope.event import notify
 from zope.interface import implementer
@@ -49,6 +54,7 @@ from zope.lifecycleevent import ObjectCreatedEvent
 from zope.lifecycleevent import ObjectModifiedEvent
 from ZPublisher import HTTPRangeSupport
 from ZPublisher.HTTPRequest import FileUpload
+from ZPublisher.Iterators import filestream_iterator
 
 
 try:
@@ -126,6 +132,13 @@ class File(
     precondition = ''
     size = None
 
+    # Store data of 64 KiB and more in a ZODB blob instead of a chain of
+    # Pdata objects, if the storage supports blobs.
+    use_blob_storage = False
+
+    # Maps the offset of each link in a chain of Pdata objects to the link.
+    _pdata_index = None
+
     manage_editForm = DTMLFile('dtml/fileEdit', globals(),
                                Kind='File', kind='file')
     manage_editForm._setName('manage_editForm')
@@ -269,35 +282,8 @@ class File(
                     )
                     RESPONSE.setStatus(206)  # Partial content
 
-                    data = self.data
-                    if isinstance(data, binary_type):
-                        RESPONSE.write(data[start:end])
-                        return True
-
-                    # Linked Pdata objects. Urgh.
-                    pos = 0
-                    while data is not None:
-                        length = len(data.data)
-                        pos = pos + length
-                        if pos > start:
-                            # We are within the range
-                            lstart = length - (pos - start)
-
-                            if lstart < 0:
-                                lstart = 0
-
-                            # find the endpoint
-                            if end <= pos:
-                                lend = length - (pos - end)
-
-                                # Send and end transmission
-                                RESPONSE.write(data[lstart:lend])
-                                break
-
-                            # Not yet at the end, transmit what we have.
-                            RESPONSE.write(data[lstart:])
-
-                        data = data.next
+                    for chunk in self._iter_data_range(start, end):
+                        RESPONSE.write(chunk)
 
                     return True
 
@@ -333,12 +319,6 @@ class File(
                     )
                     RESPONSE.setStatus(206)  # Partial content
 
-                    data = self.data
-                    # The Pdata map allows us to jump into the Pdata chain
-                    # arbitrarily during out-of-order range searching.
-                    pdata_map = {}
-                    pdata_map[0] = data
-
                     for start, end in ranges:
                         RESPONSE.write(
                             b'\r\n--'
@@ -360,60 +340,61 @@ class File(
                             + b'\r\n\r\n'
                         )
 
-                        if isinstance(data, binary_type):
-                            RESPONSE.write(data[start:end])
-
-                        else:
-                            # Yippee. Linked Pdata objects. The following
-                            # calculations allow us to fast-forward through the
-                            # Pdata chain without a lot of dereferencing if we
-                            # did the work already.
-                            first_size = len(pdata_map[0].data)
-                            if start < first_size:
-                                closest_pos = 0
-                            else:
-                                closest_pos = (
-                                    ((start - first_size) >> 16 << 16)
-                                    + first_size
-                                )
-                            pos = min(closest_pos, max(pdata_map.keys()))
-                            data = pdata_map[pos]
-
-                            while data is not None:
-                                length = len(data.data)
-                                pos = pos + length
-                                if pos > start:
-                                    # We are within the range
-                                    lstart = length - (pos - start)
-
-                                    if lstart < 0:
-                                        lstart = 0
-
-                                    # find the endpoint
-                                    if end <= pos:
-                                        lend = length - (pos - end)
-
-                                        # Send and loop to next range
-                                        RESPONSE.write(data[lstart:lend])
-                                        break
-
-                                    # Not yet at the end,
-                                    # transmit what we have.
-                                    RESPONSE.write(data[lstart:])
-
-                                data = data.next
-                                # Store a reference to a Pdata chain link
-                                # so we don't have to deref during
-                                # this request again.
-                                pdata_map[pos] = data
-
-                    # Do not keep the link references around.
-                    del pdata_map
+                        for chunk in self._iter_data_range(start, end):
+                            RESPONSE.write(chunk)
 
                     RESPONSE.write(
                         b'\r\n--' + boundary.encode('ascii') + b'--\r\n')
                     return True
 
+    def _iter_data_range(self, start, end):
+        # Yield the data between the offsets start and end in chunks.
+        data = self.data
+        if isinstance(data, binary_type):
+            yield data[start:end]
+            return
+
+        if isinstance(data, BlobData):
+            for chunk in data.iter_range(start, end):
+                yield chunk
+            return
+
+        # Linked Pdata objects. Use the index to jump to the link
+        # containing the start offset instead of walking the chain.
+        pos = 0
+        index = self._pdata_index
+        if start and index is not None and index.get(0) is aq_base(data):
+            pos = index.maxKey(start)
+            data = index[pos]
+
+        while data is not None and pos < end:
+            chunk = data.data
+            length = len(chunk)
+            if pos + length > start:
+                yield chunk[max(start - pos, 0):end - pos]
+            pos = pos + length
+            data = data.next
+
+    def _update_pdata_index(self, data):
+        # Maintain the offset index for chains of Pdata objects.
+        index = None
+        pending = self.__dict__.get('_v_pdata_index')
+        if pending is not None:
+            del self._v_pdata_index
+        if isinstance(data, Pdata) and data.next is not None:
+            data = aq_base(data)
+            if pending is not None and pending[0] is data:
+                index = pending[1]
+            else:
+                index = LOBTree()
+                pos = 0
+                while data is not None:
+                    index[pos] = data
+                    pos = pos + len(data.data)
+                    data = aq_base(data.next)
+        if index is not None or self._pdata_index is not None:
+            self._pdata_index = index
+
     @security.protected(View)
     def index_html(self, REQUEST, RESPONSE):
         """
@@ -468,6 +449,16 @@ class File(
             RESPONSE.setBase(None)
             return data
 
+        if isinstance(data, BlobData):
+            # Serve committed blobs straight from the blob file, without
+            # loading anything into the ZODB cache.
+            stream = data.stream_iterator()
+            if stream is not None:
+                return stream
+            for chunk in data.iter_range(0, self.size):
+                RESPONSE.write(chunk)
+            return b''
+
         while data is not None:
             RESPONSE.write(data.data)
             data = data.next
@@ -498,6 +489,7 @@ class File(
             size = len(data)
         self.size = size
         self.data = data
+        self._update_pdata_index(data)
         self.ZCacheable_invalidate()
         self.ZCacheable_set(None)
         self.http__refreshEtag()
@@ -570,7 +562,9 @@ class File(
         if headers and 'content-type' in headers:
             content_type = headers['content-type']
         else:
-            if not isinstance(body, bytes):
+            if isinstance(body, BlobData):
+                body = body[:1 << 16]
+            elif not isinstance(body, bytes):
                 body = body.data
             content_type, enc = guess_content_type(
                 getattr(file, 'filename', id), body, content_type)
@@ -598,12 +592,26 @@ class File(
             size = len(file)
             return (file, size)
 
+        if isinstance(file, BlobData):
+            return (file, len(file))
+
         seek = file.seek
         read = file.read
 
         seek(0, 2)
         size = end = file.tell()
 
+        if size >= n and self._supports_blob_storage():
+            seek(0)
+            blob = Blob()
+            with blob.open('w') as f:
+                while True:
+                    chunk = read(n)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            return BlobData(blob, size), size
+
         if size <= 2 * n:
             seek(0)
             if size < n:
@@ -622,7 +630,9 @@ class File(
         # Now we're going to build a linked list from back
         # to front to minimize the number of database updates
         # and to allow us to get things out of memory as soon as
-        # possible.
+        # possible. The offset of each link is recorded for the index
+        # set up by update_data.
+        index = LOBTree()
         _next = None
         while end > 0:
             pos = end - n
@@ -636,6 +646,7 @@ class File(
             data = Pdata(read(end - pos))
             self._p_jar.add(data)
             data.next = _next
+            index[pos] = data
 
             # Save the object so that we can release its memory.
             transaction.savepoint(optimistic=True)
@@ -647,8 +658,48 @@ class File(
             _next = data
             end = pos
 
+        self._v_pdata_index = (_next, index)
         return (_next, size)
 
+    def _supports_blob_storage(self):
+        # Blobs are only used if enabled and if the storage supports them.
+        if not self.use_blob_storage:
+            return False
+        if self._p_jar is None:
+            # Make sure we have a _p_jar if we are a new object.
+            import transaction
+            transaction.savepoint(optimistic=True)
+            if self._p_jar is None:
+                return False
+        return IBlobStorage.providedBy(self._p_jar.db().storage)
+
+    @security.private
+    def migrateToBlob(self):
+        """Move data stored in a chain of Pdata objects into a ZODB blob.
+
+        Return True if the data was migrated. Data that is stored as a
+        string or already in a blob is left alone, as is any data if the
+        storage does not support blobs.
+        """
+        data = self.data
+        if isinstance(data, (binary_type, BlobData)):
+            return False
+        if self._p_jar is None or \
+           not IBlobStorage.providedBy(self._p_jar.db().storage):
+            return False
+
+        blob = Blob()
+        with blob.open('w') as f:
+            while data is not None:
+                f.write(data.data)
+                _next = data.next
+                data._p_deactivate()
+                data = _next
+        self.data = BlobData(blob, self.size)
+        self._update_pdata_index(self.data)
+        self.ZCacheable_invalidate()
+        return True
+
     @security.protected(View)
     def get_size(self):
         # Get the size of a file or image.
@@ -682,8 +733,7 @@ class File(
     __nonzero__ = __bool__
 
     def __len__(self):
-        data = bytes(self.data)
-        return len(data)
+        return self.get_size()
 
     if bbb.HAS_ZSERVER:
         @security.protected(change_images_and_files)
@@ -923,6 +973,7 @@ class Image(File):
 
         self.size = size
         self.data = data
+        self._update_pdata_index(data)
 
         ct, width, height = getImageInfo(data)
         if ct:
@@ -1044,8 +1095,12 @@ class Pdata(Persistent, Implicit):
         return self.data[key]
 
     def __len__(self):
-        data = bytes(self)
-        return len(data)
+        size = len(self.data)
+        _next = self.next
+        while _next is not None:
+            size = size + len(_next.data)
+            _next = _next.next
+        return size
 
     def __bytes__(self):
         _next = self.next
@@ -1062,3 +1117,68 @@ class Pdata(Persistent, Implicit):
 
     if PY2:
         __str__ = __bytes__
+
+
+class BlobData(object):
+    # Wrapper for data stored in a ZODB blob. It provides the parts of the
+    # Pdata API used to read data, so code walking a Pdata chain keeps
+    # working, but it never loads the data into the ZODB cache.
+
+    next = None
+
+    def __init__(self, blob, size):
+        self.blob = blob
+        self.size = size
+
+    def open(self):
+        return self.blob.open('r')
+
+    def committed(self):
+        # Return the name of the committed blob file, or None.
+        try:
+            return self.blob.committed()
+        except BlobError:
+            return None
+
+    def stream_iterator(self):
+        # Return a stream iterator on the committed blob file, or None.
+        filename = self.committed()
+        if filename is None:
+            return None
+        return filestream_iterator(filename, 'rb')
+
+    def iter_range(self, start, end, chunk_size=1 << 16):
+        with self.open() as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    @property
+    def data(self):
+        return bytes(self)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step == 1:
+                return b''.join(self.iter_range(start, stop))
+        return bytes(self)[key]
+
+    if PY2:
+        def __getslice__(self, i, j):
+            return self[i:j]
+
+    def __len__(self):
+        return self.size
+
+    def __bytes__(self):
+        with self.open() as f:
+            return f.read()
+
+    if PY2:
+        __str__ = __bytes__
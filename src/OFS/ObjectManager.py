@@ -520,16 +520,23 @@ class ObjectManager(
             if not hasattr(obj, '_getOb'):
                 break
             get = obj._getOb
-            if hasattr(obj, '_objects'):
-                for i in obj._objects:
-                    try:
-                        id = i['id']
-                        physicalPath = relativePhysicalPath + (id,)
-                        if physicalPath not in seen and i['meta_type'] in t:
-                            vals.append(get(id))
-                            seen[physicalPath] = 1
-                    except Exception:
-                        pass
+            # Containers not using ``_objects`` (e.g. BTree folders) look
+            # up the ids of a meta type themselves.
+            if getattr(aq_base(obj), '_mt_index', None) is not None:
+                ids = obj.objectIds(t)
+            elif hasattr(obj, '_objects'):
+                ids = [i.get('id') for i in obj._objects
+                       if i.get('meta_type') in t]
+            else:
+                ids = ()
+            for id in ids:
+                try:
+                    physicalPath = relativePhysicalPath + (id,)
+                    if physicalPath not in seen:
+                        vals.append(get(id))
+                        seen[physicalPath] = 1
+                except Exception:
+                    pass
 
             if hasattr(obj, '__parent__'):
                 obj = aq_parent(obj)
@@ -0,0 +1,249 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Persistent order of the subobject ids of ordered BTree containers.
+"""
+
+from BTrees.IOBTree import IOBTree
+from BTrees.OIBTree import OIBTree
+from Persistence import Persistent
+from persistent.list import PersistentList
+
+
+class OrderIndex(Persistent):
+    """Persistent sequence of unique ids.
+
+    The ids are kept in persistent buckets of at most ``bucket_size`` ids.
+    The index object itself only stores the order and the sizes of the
+    buckets, and a BTree maps each id to its bucket. Looking up the position
+    of an id or moving an id only loads and changes the buckets involved
+    instead of the whole sequence.
+
+    Positions are found in a binary indexed tree over the bucket sizes,
+    which is built when the index is loaded and whenever buckets are
+    split or removed, in O(n / bucket_size). Otherwise looking up and
+    changing a position takes O(log n + bucket_size).
+
+    Every change also changes the index object itself, which stores the
+    sizes of the buckets, so concurrent changes of the same index
+    conflict, like those of the ``_objects`` tuple of regular folders.
+    """
+
+    bucket_size = 256
+
+    def __init__(self, ids=()):
+        self.clear()
+        for id in ids:
+            self.append(id)
+
+    def clear(self):
+        self._buckets = IOBTree()  # bucket key -> PersistentList of ids
+        self._bucket_of = OIBTree()  # id -> bucket key
+        self._keys = []  # bucket keys in order
+        self._sizes = []  # number of ids in each bucket
+        self._length = 0
+        self._next_key = 0
+        self._reindex()
+
+    def _reindex(self):
+        # Drop the lookup structures after the buckets changed.
+        self._v_tree = None
+        self._v_slots = None
+
+    def _tree(self):
+        # The binary indexed tree of the bucket sizes, 1-based.
+        tree = getattr(self, '_v_tree', None)
+        if tree is None:
+            tree = [0] + self._sizes
+            length = len(tree)
+            for j in range(1, length):
+                parent = j + (j & -j)
+                if parent < length:
+                    tree[parent] += tree[j]
+            self._v_tree = tree
+        return tree
+
+    def _resize(self, i, delta):
+        # Add delta to the size of bucket i.
+        tree = self._tree()
+        self._sizes[i] += delta
+        j = i + 1
+        while j < len(tree):
+            tree[j] += delta
+            j += j & -j
+
+    def _start(self, i):
+        # Return the position of the first id in bucket i.
+        tree = self._tree()
+        position = 0
+        while i > 0:
+            position += tree[i]
+            i -= i & -i
+        return position
+
+    def _slot(self, key):
+        # Return the index of the bucket with key in the order.
+        slots = getattr(self, '_v_slots', None)
+        if slots is None:
+            slots = self._v_slots = dict(
+                (key, i) for i, key in enumerate(self._keys))
+        return slots[key]
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, id):
+        try:
+            return id in self._bucket_of
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        buckets = self._buckets
+        for key in list(self._keys):
+            for id in buckets[key]:
+                yield id
+
+    def _locate(self, position):
+        # Return the index of the bucket holding position and the offset
+        # of position within that bucket.
+        tree = self._tree()
+        length = len(tree)
+        i = 0
+        step = 1
+        while step * 2 < length:
+            step *= 2
+        while step:
+            j = i + step
+            if j < length and tree[j] <= position:
+                i = j
+                position -= tree[j]
+            step //= 2
+        if i >= len(self._sizes):
+            raise IndexError('order index out of range')
+        return i, position
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return list(self)[index]
+            result = []
+            if start >= stop:
+                return result
+            i, offset = self._locate(start)
+            keys = self._keys
+            count = stop - start
+            while len(result) < count:
+                bucket = self._buckets[keys[i]]
+                result.extend(bucket[offset:offset + count - len(result)])
+                i += 1
+                offset = 0
+            return result
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('order index out of range')
+        i, offset = self._locate(index)
+        return self._buckets[self._keys[i]][offset]
+
+    def __setitem__(self, index, id):
+        """Put id at position index, replacing the id stored there.
+
+        Callers are responsible for keeping the ids unique, e.g. by
+        assigning a permutation of existing ids to their positions.
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('order index out of range')
+        i, offset = self._locate(index)
+        key = self._keys[i]
+        self._buckets[key][offset] = id
+        self._bucket_of[id] = key
+
+    def index(self, id):
+        """Return the position of id."""
+        try:
+            key = self._bucket_of[id]
+        except (KeyError, TypeError):
+            raise ValueError('%r is not in the order index' % (id, ))
+        return self._start(self._slot(key)) + self._buckets[key].index(id)
+
+    def _newBucket(self, ids):
+        key = self._next_key
+        self._next_key = key + 1
+        self._buckets[key] = PersistentList(ids)
+        for id in ids:
+            self._bucket_of[id] = key
+        return key
+
+    def insert(self, position, id):
+        """Insert id before position."""
+        if id in self:
+            raise ValueError('%r is already in the order index' % (id, ))
+        position = max(0, min(position, self._length))
+        if not self._keys:
+            self._keys.append(self._newBucket(()))
+            self._sizes.append(0)
+            self._reindex()
+        if position == self._length:
+            i = len(self._keys) - 1
+            offset = self._sizes[i]
+        else:
+            i, offset = self._locate(position)
+
+        key = self._keys[i]
+        self._buckets[key].insert(offset, id)
+        self._bucket_of[id] = key
+        self._resize(i, 1)
+        self._length += 1
+
+        if self._sizes[i] > self.bucket_size:
+            # Split the bucket in two.
+            bucket = self._buckets[key]
+            half = len(bucket) // 2
+            moved = bucket[half:]
+            del bucket[half:]
+            self._keys.insert(i + 1, self._newBucket(moved))
+            self._sizes[i] = half
+            self._sizes.insert(i + 1, len(moved))
+            self._reindex()
+        self._p_changed = True
+
+    def append(self, id):
+        """Add id at the end."""
+        self.insert(self._length, id)
+
+    def remove(self, id):
+        """Remove id."""
+        try:
+            key = self._bucket_of.pop(id)
+        except (KeyError, TypeError):
+            raise ValueError('%r is not in the order index' % (id, ))
+        i = self._slot(key)
+        self._buckets[key].remove(id)
+        self._resize(i, -1)
+        self._length -= 1
+
+        if not self._sizes[i]:
+            del self._keys[i]
+            del self._sizes[i]
+            del self._buckets[key]
+            self._reindex()
+        self._p_changed = True
+
+    def move(self, id, position):
+        """Move id to position."""
+        self.remove(id)
+        self.insert(position, id)
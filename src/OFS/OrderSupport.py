@@ -21,7 +21,10 @@ from AccessControl.Permissions import manage_properties
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from Acquisition import aq_base
 from DocumentTemplate.sequence import sort
+from OFS.BTreeFolder import LazyMap
+from OFS.BTreeFolder import _identity
 from OFS.interfaces import IOrderedContainer as IOrderedContainer
+from OFS.OrderIndex import OrderIndex
 from zope.container.contained import notifyContainerModified
 from zope.interface import implementer
 
@@ -30,6 +33,57 @@ if sys.version_info >= (3, ):
     basestring = str
 
 
+def _moveIdsByDelta(ids, delta, subset_ids):
+    # Move ids by delta within the list subset_ids, which is changed in
+    # place. Return the number of ids which changed their position.
+    min_position = 0
+    # unify moving direction
+    if delta > 0:
+        ids = list(ids)
+        ids.reverse()
+        subset_ids.reverse()
+    counter = 0
+
+    for id in ids:
+        old_position = subset_ids.index(id)
+        new_position = max(old_position - abs(delta), min_position)
+        if new_position == min_position:
+            min_position += 1
+        if not old_position == new_position:
+            subset_ids.remove(id)
+            subset_ids.insert(new_position, id)
+            counter += 1
+
+    if delta > 0:
+        subset_ids.reverse()
+    return counter
+
+
+def _moveInIndex(order, ids, delta):
+    # Same algorithm as _moveIdsByDelta, moving the ids in the OrderIndex
+    # order, which finds positions in O(log n) instead of O(n).
+    length = len(order)
+    min_position = 0
+    if delta > 0:
+        ids = list(ids)
+        ids.reverse()
+    counter = 0
+
+    for id in ids:
+        old_position = order.index(id)
+        if delta > 0:
+            old_position = length - 1 - old_position
+        new_position = max(old_position - abs(delta), min_position)
+        if new_position == min_position:
+            min_position += 1
+        if not old_position == new_position:
+            if delta > 0:
+                new_position = length - 1 - new_position
+            order.move(id, new_position)
+            counter += 1
+    return counter
+
+
 @implementer(IOrderedContainer)
 class OrderSupport(object):
 
@@ -140,38 +194,21 @@ class OrderSupport(object):
         """Move specified sub-objects by delta."""
         if isinstance(ids, basestring):
             ids = (ids,)
-        min_position = 0
         objects = list(self._objects)
         if subset_ids is None:
             subset_ids = self.getIdsSubset(objects)
         else:
             subset_ids = list(subset_ids)
-        # unify moving direction
-        if delta > 0:
-            ids = list(ids)
-            ids.reverse()
-            subset_ids.reverse()
-        counter = 0
-
-        for id in ids:
-            old_position = subset_ids.index(id)
-            new_position = max(old_position - abs(delta), min_position)
-            if new_position == min_position:
-                min_position += 1
-            if not old_position == new_position:
-                subset_ids.remove(id)
-                subset_ids.insert(new_position, id)
-                counter += 1
+        counter = _moveIdsByDelta(ids, delta, subset_ids)
 
         if counter > 0:
-            if delta > 0:
-                subset_ids.reverse()
             obj_dict = {}
             for obj in objects:
                 obj_dict[obj['id']] = obj
+            subset = set(subset_ids)
             pos = 0
             for i in range(len(objects)):
-                if objects[i]['id'] in subset_ids:
+                if objects[i]['id'] in subset:
                     try:
                         objects[i] = obj_dict[subset_ids[pos]]
                         pos += 1
@@ -198,12 +235,14 @@ class OrderSupport(object):
     @security.protected(manage_properties)
     def moveObjectsToTop(self, ids, subset_ids=None):
         # Move specified sub-objects to top of container.
-        return self.moveObjectsByDelta(ids, -len(self._objects), subset_ids)
+        return self.moveObjectsByDelta(ids, -len(self.objectIds()),
+                                       subset_ids)
 
     @security.protected(manage_properties)
     def moveObjectsToBottom(self, ids, subset_ids=None):
         # Move specified sub-objects to bottom of container.
-        return self.moveObjectsByDelta(ids, len(self._objects), subset_ids)
+        return self.moveObjectsByDelta(ids, len(self.objectIds()),
+                                       subset_ids)
 
     @security.protected(manage_properties)
     def orderObjects(self, key, reverse=None):
@@ -212,7 +251,7 @@ class OrderSupport(object):
             self.objectItems(), ((key, 'cmp', 'asc'), ))]
         if reverse:
             ids.reverse()
-        return self.moveObjectsByDelta(ids, -len(self._objects))
+        return self.moveObjectsByDelta(ids, -len(self.objectIds()))
 
     @security.protected(access_contents_information)
     def getObjectPosition(self, id):
@@ -284,3 +323,91 @@ class OrderSupport(object):
 
 
 InitializeClass(OrderSupport)
+
+
+class BTreeOrderSupport(OrderSupport):
+
+    """ Order support for BTree based object managers.
+
+    The order of the subobjects is kept in an OrderIndex, so moving an
+    object only changes the few buckets of the index involved instead of
+    rewriting the complete order.
+    """
+    security = ClassSecurityInfo()
+
+    _order = None
+
+    def _initBTrees(self):
+        super(BTreeOrderSupport, self)._initBTrees()
+        self._order = OrderIndex()
+
+    def _setOb(self, id, object):
+        super(BTreeOrderSupport, self)._setOb(id, object)
+        self._order.append(id)
+
+    def _delOb(self, id):
+        super(BTreeOrderSupport, self)._delOb(id)
+        self._order.remove(id)
+
+    @security.protected(access_contents_information)
+    def objectIds(self, spec=None):
+        # Returns a lazy sequence of subobject ids in the order of the
+        # container. If 'spec' is specified, returns the ids of the
+        # objects whose meta_type matches 'spec'.
+        if spec is None:
+            return LazyMap(_identity, self._order)
+        ids = super(BTreeOrderSupport, self).objectIds(spec)
+        if not ids:
+            return ()
+        ids = set(ids)
+        return [id for id in self._order if id in ids]
+
+    def __iter__(self):
+        return iter(self._order)
+
+    @security.protected(manage_properties)
+    def moveObjectsByDelta(
+        self,
+        ids,
+        delta,
+        subset_ids=None,
+        suppress_events=False
+    ):
+        """Move specified sub-objects by delta."""
+        if isinstance(ids, basestring):
+            ids = (ids,)
+        order = self._order
+        for id in ids:
+            if id not in order:
+                raise ValueError('The object with the id "%s" does '
+                                 'not exist.' % id)
+
+        if subset_ids is not None:
+            # Reorder the subset in an index of its own and store it at
+            # the positions its members had before.
+            subset = OrderIndex(subset_ids)
+            positions = sorted(order.index(id) for id in subset)
+            counter = _moveInIndex(subset, ids, delta)
+            if counter > 0:
+                for position, id in zip(positions, subset):
+                    if order[position] != id:
+                        order[position] = id
+        else:
+            counter = _moveInIndex(order, ids, delta)
+
+        if not suppress_events:
+            notifyContainerModified(self)
+
+        return counter
+
+    @security.protected(access_contents_information)
+    def getObjectPosition(self, id):
+        # Get the position of an object by its id.
+        try:
+            return self._order.index(id)
+        except ValueError:
+            raise ValueError(
+                'The object with the id "%s" does not exist.' % id)
+
+
+InitializeClass(BTreeOrderSupport)
@@ -14,8 +14,11 @@
 """
 
 from App.special_dtml import DTMLFile
+from OFS.BTreeFolder import BTreeFolder
 from OFS.Folder import Folder
+from OFS.interfaces import IBTreeFolder
 from OFS.interfaces import IOrderedFolder
+from OFS.OrderSupport import BTreeOrderSupport
 from OFS.OrderSupport import OrderSupport
 from zope.interface import implementer
 
@@ -44,3 +47,29 @@ class OrderedFolder(OrderSupport, Folder):
     zmi_icon = 'far fa-folder zmi-icon-folder-ordered'
 
     manage_options = OrderSupport.manage_options + Folder.manage_options[1:]
+
+
+manage_addOrderedBTreeFolderForm = DTMLFile('dtml/addOrderedBTreeFolder',
+                                            globals())
+
+
+def manage_addOrderedBTreeFolder(self, id, title='', REQUEST=None):
+    """Add a new ordered BTree Folder object with id *id*.
+    """
+    ob = OrderedBTreeFolder(id)
+    ob.title = title
+    self._setObject(id, ob)
+    ob = self._getOb(id)
+    if REQUEST:
+        return self.manage_main(self, REQUEST)
+
+
+@implementer(IOrderedFolder, IBTreeFolder)
+class OrderedBTreeFolder(BTreeOrderSupport, BTreeFolder):
+
+    """ Ordered folder for large numbers of subobjects.
+    """
+    meta_type = 'Folder (Ordered BTree)'
+    zmi_icon = 'far fa-folder zmi-icon-folder-ordered'
+
+    manage_options = OrderSupport.manage_options + Folder.manage_options[1:]
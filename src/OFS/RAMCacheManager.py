@@ -0,0 +1,691 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""A cache manager keeping rendered results in memory.
+
+The cache is shared by all threads of the process. Its size is limited
+by the number of entries and by the estimated size of the cached data in
+bytes. Least recently used entries are evicted first. Optionally a
+frequency based admission policy (TinyLFU) keeps new entries which are
+unlikely to be used again from evicting frequently used ones.
+
+With dependency tracking enabled, the cache records the persistent
+objects used while a view renders and the serials they had. Once a
+transaction was committed, an entry is only used again if the storage
+still has the same serials, so views depending on other objects than the
+one they are cached for, like folder listings, do not go stale, whichever
+process commits the change.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from threading import local
+from weakref import WeakKeyDictionary
+
+from six import binary_type
+from six import text_type
+from six.moves import cPickle as pickle
+
+from AccessControl.class_init import InitializeClass
+from AccessControl.Permissions import view_management_screens
+from AccessControl.SecurityInfo import ClassSecurityInfo
+from Acquisition import aq_base
+from Acquisition import aq_get
+from Acquisition import aq_inner
+from Acquisition import aq_parent
+from App.special_dtml import DTMLFile
+from OFS.Cache import Cache
+from OFS.Cache import CacheManager
+from OFS.Cache import ChangeCacheSettingsPermission
+from OFS.SimpleItem import SimpleItem
+from persistent import Persistent
+from ZODB.POSException import POSKeyError
+from ZODB.utils import load_current
+from zope.component import adapter
+from ZPublisher.interfaces import IPubEnd
+
+
+# Process-wide caches keyed by the cache id of their manager.
+caches = {}
+caches_lock = Lock()
+
+POLICIES = ('lru', 'tinylfu')
+
+
+def cacheKeyValue(value):
+    """Return a hashable value representing value in a cache key.
+
+    Users are represented by their id and the path of their user folder,
+    other objects with a physical path by that path. Raises TypeError for
+    objects whose representation contains their memory address, as it
+    changes between processes and is reused by other objects.
+    """
+    if isinstance(value, (binary_type, text_type, int, float)):
+        return value
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return tuple(sorted(
+            (str(k), cacheKeyValue(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(cacheKeyValue(v) for v in value)
+    # Wrappers acquire getPhysicalPath, users acquire the one of their
+    # user folder, so only methods of the object itself count.
+    base = aq_base(value)
+    if getattr(base, 'getUserName', None) is not None:
+        user_folder = aq_parent(aq_inner(value))
+        getPhysicalPath = getattr(user_folder, 'getPhysicalPath', None)
+        path = tuple(getPhysicalPath()) if getPhysicalPath else None
+        return ('user', path, value.getUserName())
+    if getattr(base, 'getPhysicalPath', None) is not None:
+        return tuple(value.getPhysicalPath())
+    text = repr(value)
+    if ' at 0x' in text:
+        raise TypeError('No stable cache key for %s' % text)
+    return text
+
+
+def getCacheKey(ob, view_name, keywords, request_vars=()):
+    """Return a hashable key for a cache entry.
+
+    The key is made of the physical path of ob, the view name, the
+    values of request_vars in the request and keywords. Returns None if
+    they cannot be represented in a key, the result is not cached then.
+    """
+    path = tuple(ob.getPhysicalPath())
+    vary = ()
+    try:
+        if request_vars:
+            request = aq_get(ob, 'REQUEST', None)
+            if request is not None:
+                vary = tuple(cacheKeyValue(request.get(name, None))
+                             for name in request_vars)
+        if keywords:
+            keywords = cacheKeyValue(keywords)
+        else:
+            keywords = None
+    except TypeError:
+        return None
+    return (path, view_name, vary, keywords)
+
+
+def estimateSize(data):
+    """Return the approximate size of data in bytes, or None if it cannot
+    be cached.
+    """
+    if isinstance(data, (binary_type, text_type)):
+        return len(data)
+    try:
+        return len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        # Unpicklable data (acquisition wrappers, open files) is
+        # neither safe nor useful to share between requests.
+        return None
+
+
+class FrequencySketch(object):
+    """Approximate number of recent accesses of keys.
+
+    A count-min sketch with 4 rows of small counters. The counters are
+    halved after ``10 * size`` increments, so the estimates follow the
+    recent popularity of the keys.
+    """
+
+    depth = 4
+    max_count = 15
+
+    def __init__(self, size):
+        width = 16
+        while width < size:
+            width *= 2
+        self.width = width
+        self.table = [0] * (width * self.depth)
+        self.sample_size = 10 * width
+        self.additions = 0
+
+    def _indexes(self, key):
+        h = hash(key)
+        mask = self.width - 1
+        for row in range(self.depth):
+            h = hash((h, row))
+            yield row * self.width + (h & mask)
+
+    def increment(self, key):
+        table = self.table
+        for i in self._indexes(key):
+            if table[i] < self.max_count:
+                table[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = [c >> 1 for c in table]
+            self.additions //= 2
+
+    def frequency(self, key):
+        table = self.table
+        return min(table[i] for i in self._indexes(key))
+
+
+_local = local()
+
+
+class DependencyMarker(Persistent):
+    """Marks the position in the pickle cache of a connection where a
+    recording started.
+
+    Its oid is allocated by the storage, but it is never stored.
+    """
+
+
+# Connections mapped to the markers they can reuse.
+_markers = WeakKeyDictionary()
+
+
+class DependencyRecorder(object):
+    """Records the persistent objects a connection uses while a view
+    renders.
+
+    The pickle cache keeps its objects in least recently used order, an
+    object moves to the end whenever it is used or loaded. The recorder
+    puts a marker at the end, the objects behind it when recording stops
+    are the ones used meanwhile. The pickle cache only hands out its
+    order as a copy of the whole ring, so this takes time in proportion
+    to the number of objects in the cache.
+    """
+
+    def __init__(self, cache, key, jar):
+        self.cache = cache
+        self.key = key
+        self.jar = jar
+        # Dependencies of cache entries used while rendering.
+        self.serials = {}
+        markers = _markers.setdefault(jar, [])
+        if markers:
+            marker = markers.pop()
+        else:
+            marker = DependencyMarker()
+            marker._p_oid = jar.db().new_oid()
+        marker._p_jar = jar
+        jar._cache[marker._p_oid] = marker
+        self.marker = marker
+
+    def stop(self):
+        """Remove the marker and return a mapping of the oids of the used
+        objects to their serials, or None if the marker got lost.
+        """
+        pickle_cache = self.jar._cache
+        marker = self.marker
+        serials = self.serials
+        found = False
+        # A ghost marker was removed from the ring by the cache
+        # garbage collection.
+        if marker._p_changed is not None:
+            for oid, ob in reversed(pickle_cache.lru_items()):
+                if ob is marker:
+                    found = True
+                    break
+                if not isinstance(ob, DependencyMarker):
+                    serials.setdefault(oid, ob._p_serial)
+        try:
+            del pickle_cache[marker._p_oid]
+        except KeyError:
+            pass
+        if not found:
+            return None
+        _markers.setdefault(self.jar, []).append(marker)
+        return serials
+
+
+def _recorders():
+    recorders = getattr(_local, 'recorders', None)
+    if recorders is None:
+        recorders = _local.recorders = []
+    return recorders
+
+
+def startRecording(cache, key, ob):
+    """Start recording the dependencies of the entry for key in cache."""
+    jar = getattr(ob, '_p_jar', None)
+    if not hasattr(getattr(jar, '_cache', None), 'lru_items'):
+        # Not stored in a ZODB yet.
+        return
+    stopRecording(cache, key)
+    _recorders().append(DependencyRecorder(cache, key, jar))
+
+
+def stopRecording(cache, key):
+    """Stop recording for key in cache and return the recorded serials.
+
+    Returns an empty mapping if nothing was recorded and None if the
+    dependencies are unknown.
+    """
+    recorders = _recorders()
+    for recorder in reversed(recorders):
+        if recorder.cache is cache and recorder.key == key:
+            recorders.remove(recorder)
+            return recorder.stop()
+    return {}
+
+
+def addDependencies(serials):
+    """Add the oids and serials of the mapping serials to the
+    dependencies of all recordings of the thread.
+    """
+    for recorder in _recorders():
+        for oid, serial in serials.items():
+            recorder.serials.setdefault(oid, serial)
+
+
+def isCurrent(db, serials):
+    """Return whether the objects with the oids of the mapping serials
+    still have these serials in the storage of db.
+    """
+    storage = db.storage
+    for oid, serial in serials.items():
+        try:
+            if load_current(storage, oid)[1] != serial:
+                return False
+        except POSKeyError:
+            return False
+    return True
+
+
+@adapter(IPubEnd)
+def discardRecordings(event=None):
+    """Stop the recordings of views which were never cached."""
+    recorders = _recorders()
+    while recorders:
+        recorders.pop().stop()
+
+
+class CacheEntry(object):
+    """A value in a RAMCache."""
+
+    __slots__ = ('path', 'view_name', 'data', 'size', 'mtime', 'created',
+                 'hits', 'dependencies', 'checked')
+
+    def __init__(self, path, view_name, data, size, mtime, dependencies=()):
+        self.path = path
+        self.view_name = view_name
+        self.data = data
+        self.size = size
+        self.mtime = mtime
+        self.created = time.time()
+        self.hits = 0
+        self.dependencies = dependencies
+        # The last transaction of the storage when the dependencies
+        # were found unchanged.
+        self.checked = None
+
+
+class RAMCache(Cache):
+    """A thread safe cache in RAM.
+
+    max_entries -- the maximum number of entries
+
+    max_bytes   -- the maximum estimated size of all cached data
+
+    max_age     -- seconds after which an entry expires, 0 for never
+
+    request_vars -- names of request variables which are part of the key,
+                    like AUTHENTICATED_USER or HTTP_ACCEPT_LANGUAGE
+
+    policy      -- 'lru' to always admit new entries and evict the least
+                   recently used ones, 'tinylfu' to only admit a new
+                   entry if it was requested more often recently than
+                   the entries it would evict
+
+    track_dependencies -- record the persistent objects used while
+                    rendering and remove the entry when one of them
+                    was committed since
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=10 * 1024 * 1024,
+                 max_age=3600, request_vars=('AUTHENTICATED_USER',),
+                 policy='lru', track_dependencies=False):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._paths = {}
+        self.hits = self.misses = 0
+        self.evictions = self.rejections = self.invalidations = 0
+        self.bytes = 0
+        self.configure(max_entries, max_bytes, max_age, request_vars, policy,
+                       track_dependencies)
+
+    def configure(self, max_entries=1000, max_bytes=10 * 1024 * 1024,
+                  max_age=3600, request_vars=('AUTHENTICATED_USER',),
+                  policy='lru', track_dependencies=False):
+        if policy not in POLICIES:
+            raise ValueError('Unknown cache policy: %s' % policy)
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self.max_age = max_age
+            self.request_vars = tuple(request_vars)
+            self.policy = policy
+            self.track_dependencies = bool(track_dependencies)
+            self._sketch = FrequencySketch(max_entries)
+            victims = self._victims(0, count=0)
+            for key in victims:
+                self._remove(key)
+            self.evictions += len(victims)
+
+    def getCacheKey(self, ob, view_name, keywords):
+        """Return the key of ob, view_name and keywords."""
+        return getCacheKey(ob, view_name, keywords, self.request_vars)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        keys = self._paths[entry.path]
+        keys.discard(key)
+        if not keys:
+            del self._paths[entry.path]
+        return entry
+
+    def _victims(self, size, count=1):
+        """Return the keys to evict for adding count entries of size
+        bytes, least recently used first.
+        """
+        count = len(self._entries) + count - self.max_entries
+        excess = self.bytes + size - self.max_bytes
+        victims = []
+        for key, entry in self._entries.items():
+            if count <= 0 and excess <= 0:
+                break
+            victims.append(key)
+            count -= 1
+            excess -= entry.size
+        return victims
+
+    def ZCache_get(self, ob, view_name='', keywords=None, mtime_func=None,
+                   default=None):
+        key = self.getCacheKey(ob, view_name, keywords)
+        if key is None:
+            self.misses += 1
+            return default
+        entry = self._entries.get(key)
+        # Checked outside the lock, mtime_func may do anything.
+        valid = entry is not None and self._isValid(entry, ob, mtime_func)
+        with self._lock:
+            self._sketch.increment(key)
+            if entry is not None and self._entries.get(key) is entry:
+                if valid:
+                    # Move to the most recently used end.
+                    self._entries[key] = self._entries.pop(key)
+                    entry.hits += 1
+                    self.hits += 1
+                    if entry.dependencies:
+                        # Views embedding this one depend on them, too.
+                        addDependencies(entry.dependencies)
+                    return entry.data
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+        if self.track_dependencies:
+            startRecording(self, key, ob)
+        return default
+
+    def _isValid(self, entry, ob, mtime_func):
+        if self.max_age and entry.created + self.max_age < time.time():
+            return False
+        if entry.dependencies and not self._isCurrent(entry, ob):
+            return False
+        return ob.ZCacheable_getModTime(mtime_func) <= entry.mtime
+
+    def _isCurrent(self, entry, ob):
+        # Only checks the serials again after a commit.
+        jar = getattr(ob, '_p_jar', None)
+        if jar is None:
+            return False
+        db = jar.db()
+        tid = db.lastTransaction()
+        if entry.checked != tid:
+            if not isCurrent(db, entry.dependencies):
+                return False
+            entry.checked = tid
+        return True
+
+    def ZCache_set(self, ob, data, view_name='', keywords=None,
+                   mtime_func=None):
+        key = self.getCacheKey(ob, view_name, keywords)
+        if key is None:
+            return
+        serials = {}
+        if self.track_dependencies:
+            serials = stopRecording(self, key)
+            if serials is None:
+                return
+        if data is None:
+            # Files and images only use caches to set HTTP headers.
+            return
+        size = estimateSize(data)
+        if size is None or size > self.max_bytes:
+            return
+        mtime = ob.ZCacheable_getModTime(mtime_func)
+        entry = CacheEntry(key[0], view_name, data, size, mtime,
+                           dict(serials))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            victims = self._victims(size)
+            if victims and self.policy == 'tinylfu':
+                frequency = self._sketch.frequency
+                candidate = frequency(key)
+                if any(candidate <= frequency(victim) for victim in victims):
+                    self.rejections += 1
+                    return
+            for victim in victims:
+                self._remove(victim)
+            self.evictions += len(victims)
+            self._entries[key] = entry
+            self._paths.setdefault(entry.path, set()).add(key)
+            self.bytes += size
+
+    def ZCache_invalidate(self, ob):
+        path = tuple(ob.getPhysicalPath())
+        with self._lock:
+            keys = list(self._paths.get(path, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return 'Invalidated %d cache entries.' % len(keys)
+
+    def invalidateAll(self):
+        """Remove all entries."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._paths.clear()
+            self.bytes = 0
+
+    def getStatistics(self):
+        """Return a mapping of the counters of the cache."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'rejections': self.rejections,
+                'invalidations': self.invalidations,
+                'dependencies': len(set().union(
+                    *[entry.dependencies for entry in
+                      self._entries.values()])),
+            }
+
+    def getEntryReport(self):
+        """Return a list of mappings describing the cached objects,
+        most used first.
+        """
+        with self._lock:
+            report = {}
+            for entry in self._entries.values():
+                key = (entry.path, entry.view_name)
+                info = report.get(key)
+                if info is None:
+                    info = report[key] = {
+                        'path': '/'.join(entry.path),
+                        'view_name': entry.view_name,
+                        'entries': 0,
+                        'bytes': 0,
+                        'hits': 0,
+                    }
+                info['entries'] += 1
+                info['bytes'] += entry.size
+                info['hits'] += entry.hits
+        return sorted(report.values(), key=lambda i: -i['hits'])
+
+
+class RAMCacheManager(CacheManager, SimpleItem):
+    """Manage a RAMCache, which stores rendered results in memory."""
+
+    meta_type = 'Memory Cache Manager'
+    zmi_icon = 'fas fa-memory'
+
+    security = ClassSecurityInfo()
+
+    manage_options = (
+        {'label': 'Properties', 'action': 'manage_main'},
+        {'label': 'Statistics', 'action': 'manage_stats'},
+    ) + CacheManager.manage_options + SimpleItem.manage_options
+
+    policies = POLICIES
+
+    _settings = {
+        'max_entries': 1000,
+        'max_bytes': 10 * 1024 * 1024,
+        'max_age': 3600,
+        'request_vars': ('AUTHENTICATED_USER',),
+        'policy': 'lru',
+        'track_dependencies': False,
+    }
+
+    def __init__(self, id, title=''):
+        self.id = id
+        self.title = title
+        self._settings = dict(self._settings)
+        self._resetCacheId()
+
+    def _resetCacheId(self):
+        self._cacheid = '%s_%f' % (id(self), time.time())
+
+    def manage_afterAdd(self, item, container):
+        # Copies must not share the cache of the original.
+        if aq_base(self) is aq_base(item):
+            self._resetCacheId()
+        CacheManager.manage_afterAdd(self, item, container)
+
+    def manage_beforeDelete(self, item, container):
+        if aq_base(self) is aq_base(item):
+            with caches_lock:
+                cache = caches.pop(self._cacheid, None)
+            if cache is not None:
+                cache.invalidateAll()
+        CacheManager.manage_beforeDelete(self, item, container)
+
+    def _makeCache(self):
+        return RAMCache(**self._settings)
+
+    @security.private
+    def ZCacheManager_getCache(self):
+        cacheid = self._cacheid
+        cache = caches.get(cacheid)
+        if cache is None:
+            with caches_lock:
+                cache = caches.get(cacheid)
+                if cache is None:
+                    cache = caches[cacheid] = self._makeCache()
+        return cache
+
+    @security.protected(view_management_screens)
+    def getSettings(self):
+        """Return a copy of the cache settings."""
+        return dict(self._settings)
+
+    security.declareProtected(ChangeCacheSettingsPermission, 'manage_main')  # NOQA: D001,E501
+    manage_main = DTMLFile('dtml/ramCacheManagerEdit', globals())
+
+    @security.protected(ChangeCacheSettingsPermission)
+    def manage_editProps(self, title='', settings=None, REQUEST=None):
+        """Change the cache settings."""
+        if settings is None:
+            settings = REQUEST
+        new = dict(self._settings)
+        self._updateSettings(new, settings)
+        self.title = str(title)
+        self._settings = new
+        self.ZCacheManager_getCache().configure(**new)
+        if REQUEST is not None:
+            return self.manage_main(
+                self, REQUEST, manage_tabs_message='Properties changed.')
+
+    def _updateSettings(self, new, settings):
+        # Update the mapping new with the values in settings.
+        for name in ('max_entries', 'max_bytes', 'max_age'):
+            value = settings.get(name)
+            if value not in (None, ''):
+                new[name] = int(value)
+        request_vars = settings.get('request_vars')
+        if request_vars is not None:
+            if isinstance(request_vars, (binary_type, text_type)):
+                request_vars = request_vars.split()
+            request_vars = [
+                v.decode('utf-8') if isinstance(v, binary_type) else v
+                for v in request_vars]
+            new['request_vars'] = tuple(
+                str(v.strip()) for v in request_vars if v.strip())
+        policy = settings.get('policy')
+        if policy:
+            if policy not in self.policies:
+                raise ValueError('Unknown cache policy: %s' % policy)
+            new['policy'] = policy
+        track_dependencies = settings.get('track_dependencies')
+        if track_dependencies not in (None, '') and \
+                'track_dependencies' in new:
+            new['track_dependencies'] = bool(int(track_dependencies))
+
+    security.declareProtected(view_management_screens, 'manage_stats')
+    manage_stats = DTMLFile('dtml/ramCacheManagerStats', globals())
+
+    @security.protected(view_management_screens)
+    def getCacheStatistics(self):
+        """Return the counters of the cache."""
+        return self.ZCacheManager_getCache().getStatistics()
+
+    @security.protected(view_management_screens)
+    def getCacheReport(self):
+        """Return the cached objects, most used first."""
+        return self.ZCacheManager_getCache().getEntryReport()
+
+    @security.protected(ChangeCacheSettingsPermission)
+    def manage_invalidate(self, REQUEST=None):
+        """Remove all entries from the cache."""
+        self.ZCacheManager_getCache().invalidateAll()
+        if REQUEST is not None:
+            return self.manage_stats(
+                self, REQUEST, manage_tabs_message='Cache invalidated.')
+
+
+InitializeClass(RAMCacheManager)
+
+
+manage_addRAMCacheManagerForm = DTMLFile('dtml/addRAMCacheManager',
+                                         globals())
+
+
+def manage_addRAMCacheManager(self, id, title='', REQUEST=None):
+    """Add a Memory Cache Manager."""
+    self._setObject(id, RAMCacheManager(id, title))
+    if REQUEST is not None:
+        return self.manage_main(self, REQUEST)
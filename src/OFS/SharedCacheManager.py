@@ -0,0 +1,328 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""A cache manager sharing its cache between the processes of a host.
+
+The entries are kept in an SQLite database in a directory which should
+be on a memory file system like ``/dev/shm``. All Zope processes on the
+host using the same cache manager open the same database, so they share
+one warm cache, it survives restarts of the processes and invalidating
+an object removes its entries for all of them.
+
+The database contains pickles, so it is kept in a subdirectory only the
+user running Zope can access. The cache refuses to use a subdirectory
+owned by another user or accessible by others.
+"""
+
+import hashlib
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+
+from six.moves import cPickle as pickle
+
+from AccessControl.class_init import InitializeClass
+from App.special_dtml import DTMLFile
+from OFS.Cache import Cache
+from OFS.RAMCacheManager import RAMCacheManager
+from OFS.RAMCacheManager import caches
+from OFS.RAMCacheManager import caches_lock
+from OFS.RAMCacheManager import getCacheKey
+
+
+def default_directory():
+    """Return the directory for cache files, a memory file system if
+    the host provides one.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def private_directory(directory):
+    """Return the subdirectory of directory for the cache files of the
+    current user, creating it if necessary.
+    """
+    getuid = getattr(os, 'getuid', None)
+    if getuid is None:
+        # No owners and modes to check on this platform.
+        return directory
+    return os.path.join(directory, 'zope-cache-%d' % getuid())
+
+
+def check_private_directory(directory):
+    """Create directory with access for the current user only, or make
+    sure an existing one is owned by the user and private.
+    """
+    if not hasattr(os, 'getuid'):
+        return
+    try:
+        os.mkdir(directory, 0o700)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or info.st_mode & 0o077):
+        raise ValueError(
+            'Cache directory %s must be owned by the Zope user and not be '
+            'accessible by others.' % directory)
+
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    ' key TEXT PRIMARY KEY, path TEXT, view_name TEXT, data BLOB,'
+    ' size INTEGER, mtime REAL, created REAL, accessed REAL,'
+    ' hits INTEGER)',
+    'CREATE INDEX IF NOT EXISTS entries_path ON entries (path)',
+    'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)',
+)
+
+# Access times are only written if they are older than this, so most
+# cache hits do not write to the database.
+ACCESS_RESOLUTION = 1.0
+
+
+class SharedCache(Cache):
+    """A cache in an SQLite database shared between processes.
+
+    See ``OFS.RAMCacheManager.RAMCache`` for the settings. Entries are
+    evicted least recently used first. The counters of hits and misses
+    are kept per process.
+    """
+
+    def __init__(self, filename, max_entries=1000,
+                 max_bytes=10 * 1024 * 1024, max_age=3600,
+                 request_vars=('AUTHENTICATED_USER',), policy='lru',
+                 directory=None):
+        self.filename = filename
+        self._local = threading.local()
+        self.hits = self.misses = 0
+        self.evictions = self.invalidations = 0
+        self.configure(max_entries, max_bytes, max_age, request_vars, policy)
+
+    def configure(self, max_entries=1000, max_bytes=10 * 1024 * 1024,
+                  max_age=3600, request_vars=('AUTHENTICATED_USER',),
+                  policy='lru', directory=None):
+        if policy != 'lru':
+            raise ValueError('Unknown cache policy: %s' % policy)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.request_vars = tuple(request_vars)
+        self.policy = policy
+
+    def _connection(self):
+        # Connections can neither be shared between threads nor be
+        # inherited by forked processes.
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is None or local.pid != os.getpid():
+            check_private_directory(os.path.dirname(self.filename))
+            conn = sqlite3.connect(self.filename, timeout=10,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # The database is a cache, it need not survive a crash.
+            conn.execute('PRAGMA synchronous=OFF')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            local.conn = conn
+            local.pid = os.getpid()
+        return conn
+
+    def getCacheKey(self, ob, view_name, keywords):
+        """Return the key of ob, view_name and keywords, or None."""
+        key = getCacheKey(ob, view_name, keywords, self.request_vars)
+        if key is None:
+            return None
+        # The key only consists of strings, numbers and tuples, so its
+        # representation is the same in all processes.
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def ZCache_get(self, ob, view_name='', keywords=None, mtime_func=None,
+                   default=None):
+        key = self.getCacheKey(ob, view_name, keywords)
+        if key is None:
+            self.misses += 1
+            return default
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT data, mtime, created, accessed FROM entries '
+            'WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        data, mtime, created, accessed = row
+        now = time.time()
+        if ((self.max_age and created + self.max_age < now)
+                or ob.ZCacheable_getModTime(mtime_func) > mtime):
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self.invalidations += 1
+            self.misses += 1
+            return default
+        if accessed + ACCESS_RESOLUTION < now:
+            conn.execute(
+                'UPDATE entries SET accessed = ?, hits = hits + 1 '
+                'WHERE key = ?', (now, key))
+        self.hits += 1
+        return pickle.loads(bytes(data))
+
+    def ZCache_set(self, ob, data, view_name='', keywords=None,
+                   mtime_func=None):
+        if data is None:
+            # Files and images only use caches to set HTTP headers.
+            return
+        try:
+            pickled = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        size = len(pickled)
+        if size > self.max_bytes:
+            return
+        key = self.getCacheKey(ob, view_name, keywords)
+        if key is None:
+            return
+        path = '/'.join(ob.getPhysicalPath())
+        mtime = ob.ZCacheable_getModTime(mtime_func)
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, 0)',
+                (key, path, view_name, sqlite3.Binary(pickled), size,
+                 mtime, now, now))
+            self._evict(conn, now)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _evict(self, conn, now):
+        if self.max_age:
+            conn.execute('DELETE FROM entries WHERE created < ?',
+                         (now - self.max_age,))
+        count, total = conn.execute(
+            'SELECT COUNT(*), TOTAL(size) FROM entries').fetchone()
+        count -= self.max_entries
+        excess = total - self.max_bytes
+        if count <= 0 and excess <= 0:
+            return
+        victims = []
+        for key, size in conn.execute(
+                'SELECT key, size FROM entries ORDER BY accessed').fetchall():
+            if count <= 0 and excess <= 0:
+                break
+            victims.append((key,))
+            count -= 1
+            excess -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+        self.evictions += len(victims)
+
+    def ZCache_invalidate(self, ob):
+        path = '/'.join(ob.getPhysicalPath())
+        cursor = self._connection().execute(
+            'DELETE FROM entries WHERE path = ?', (path,))
+        self.invalidations += cursor.rowcount
+        return 'Invalidated %d cache entries.' % cursor.rowcount
+
+    def invalidateAll(self):
+        """Remove all entries."""
+        cursor = self._connection().execute('DELETE FROM entries')
+        self.invalidations += cursor.rowcount
+
+    def getStatistics(self):
+        """Return a mapping of the counters of the cache."""
+        count, total = self._connection().execute(
+            'SELECT COUNT(*), TOTAL(size) FROM entries').fetchone()
+        return {
+            'entries': count,
+            'bytes': int(total),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'rejections': 0,
+            'invalidations': self.invalidations,
+        }
+
+    def getEntryReport(self):
+        """Return a list of mappings describing the cached objects,
+        most used first. Hits are only counted once per second.
+        """
+        rows = self._connection().execute(
+            'SELECT path, view_name, COUNT(*), TOTAL(size), TOTAL(hits) '
+            'FROM entries GROUP BY path, view_name '
+            'ORDER BY TOTAL(hits) DESC')
+        return [{'path': path, 'view_name': view_name, 'entries': count,
+                 'bytes': int(size), 'hits': int(hits)}
+                for path, view_name, count, size, hits in rows]
+
+
+class SharedCacheManager(RAMCacheManager):
+    """Manage a SharedCache, which stores rendered results in a database
+    shared by the Zope processes of a host.
+    """
+
+    meta_type = 'Shared Cache Manager'
+    zmi_icon = 'fas fa-server'
+
+    policies = ('lru',)
+
+    # The shared cache does not record dependencies.
+    _settings = dict(RAMCacheManager._settings, directory='')
+    del _settings['track_dependencies']
+
+    def getCacheFilename(self):
+        directory = self._settings.get('directory') or default_directory()
+        return os.path.join(private_directory(directory),
+                            'zope-cache-%s.sqlite' % self._cacheid)
+
+    def _makeCache(self):
+        return SharedCache(self.getCacheFilename(), **self._settings)
+
+    def _updateSettings(self, new, settings):
+        RAMCacheManager._updateSettings(self, new, settings)
+        directory = settings.get('directory')
+        if directory is not None:
+            directory = directory.strip()
+            if directory and not os.path.isdir(directory):
+                raise ValueError('Not a directory: %s' % directory)
+            new['directory'] = directory
+
+    def manage_editProps(self, title='', settings=None, REQUEST=None):
+        """Change the cache settings."""
+        filename = self.getCacheFilename()
+        result = RAMCacheManager.manage_editProps(
+            self, title, settings, REQUEST)
+        if self.getCacheFilename() != filename:
+            # Other processes use the new file after a restart.
+            with caches_lock:
+                caches.pop(self._cacheid, None)
+        return result
+
+
+InitializeClass(SharedCacheManager)
+
+
+manage_addSharedCacheManagerForm = DTMLFile('dtml/addSharedCacheManager',
+                                            globals())
+
+
+def manage_addSharedCacheManager(self, id, title='', REQUEST=None):
+    """Add a Shared Cache Manager."""
+    self._setObject(id, SharedCacheManager(id, title))
+    if REQUEST is not None:
+        return self.manage_main(self, REQUEST)
@@ -17,9 +17,7 @@ from six.moves.urllib.parse import quote
 
 from AccessControl.class_init import InitializeClass
 from AccessControl.SecurityInfo import ClassSecurityInfo
-from AccessControl.SecurityManagement import getSecurityManager
 from AccessControl.unauthorized import Unauthorized
-from AccessControl.ZopeGuards import guarded_getattr
 from Acquisition import Acquired
 from Acquisition import aq_acquire
 from Acquisition import aq_base
@@ -38,6 +36,8 @@ from zope.location.interfaces import LocationError
 from zope.traversing.namespace import namespaceLookup
 from zope.traversing.namespace import nsParse
 from ZPublisher.interfaces import UseTraversalDefault
+from ZPublisher.validation import getGuardedGetattr
+from ZPublisher.validation import getValidator
 
 
 _marker = object()
@@ -187,7 +187,8 @@ class Traversable(object):
             path_pop(0)
 
         if restricted:
-            validate = getSecurityManager().validate
+            validate = getValidator()
+            guarded_getattr = getGuardedGetattr()
 
         if not path[-1]:
             # If the path starts with an empty string, go to the root first.
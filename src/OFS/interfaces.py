@@ -771,6 +771,15 @@ class IFindSupport(Interface):
                          apply_func=None, apply_path=''):
         """Zope Find interface and apply"""
 
+    def iterZopeFind(obj, obj_ids=None, obj_metatypes=None,
+                     obj_searchterm=None, obj_expr=None,
+                     obj_mtime=None, obj_mspec=None,
+                     obj_permission=None, obj_roles=None,
+                     search_sub=0, REQUEST=None, pre='',
+                     token=None, budget=None, gc_interval=None,
+                     parallel=0):
+        """Zope Find interface returning an iterator over the results"""
+
 
 # XXX: might contain non-API methods and outdated comments;
 #      not synced with ZopeBook API Reference;
@@ -974,6 +983,18 @@ class IFolder(IObjectManager, IPropertyManager, IRoleManager,
     """
 
 
+class IBTreeFolder(IFolder):
+    """Folder storing its subobjects in BTrees.
+
+    Meant for folders with a large number of subobjects. The object listing
+    methods return lazy sequences sorted by id.
+    """
+
+    def objectCount():
+        """Return the number of subobjects.
+        """
+
+
 # XXX: based on OFS.OrderedFolder.OrderedFolder
 class IOrderedFolder(IOrderedContainer, IFolder):
 
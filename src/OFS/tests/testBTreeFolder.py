@@ -0,0 +1,150 @@
+import unittest
+
+from OFS.BTreeFolder import BTreeObjectManager
+from OFS.interfaces import IItem
+from OFS.SimpleItem import SimpleItem
+from OFS.tests.testObjectManager import FauxRoot
+from OFS.tests.testObjectManager import ObjectManagerTests
+from Testing.makerequest import makerequest
+from zope.interface import implementer
+
+
+@implementer(IItem)
+class BTreeObjectManagerWithIItem(BTreeObjectManager):
+    """The event subscribers work on IItem."""
+
+
+class Item(SimpleItem):
+
+    def __init__(self, id, meta_type='Item'):
+        self.id = id
+        self.meta_type = meta_type
+
+
+class BTreeObjectManagerTests(ObjectManagerTests):
+    # Run the ObjectManager tests against the BTree implementation.
+
+    def _getTargetClass(self):
+        return BTreeObjectManagerWithIItem
+
+    def test_objects_not_stored_in_tuple(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a'))
+        self.assertEqual(om._objects, ())
+        self.assertNotIn('a', om.__dict__)
+        self.assertTrue(om.a.aq_base is om._tree['a'])
+
+    def test_objectIds_sorted_and_lazy(self):
+        om = self._makeOne()
+        for id in ('c', 'a', 'b'):
+            om._setObject(id, Item(id))
+        ids = om.objectIds()
+        self.assertFalse(isinstance(ids, list))
+        self.assertEqual(list(ids), ['a', 'b', 'c'])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids[1], 'b')
+        self.assertEqual(list(ids[1:]), ['b', 'c'])
+        self.assertEqual(om.objectCount(), 3)
+
+    def test_objectIds_spec_uses_meta_type_index(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a', 'Foo'))
+        om._setObject('b', Item('b', 'Bar'))
+        om._setObject('c', Item('c', 'Foo'))
+        self.assertEqual(list(om._mt_index.keys()), ['Bar', 'Foo'])
+        self.assertEqual(list(om.objectIds('Foo')), ['a', 'c'])
+        self.assertEqual(list(om.objectIds(['Foo', 'Bar'])), ['a', 'b', 'c'])
+        self.assertEqual(list(om.objectIds('Baz')), [])
+        self.assertEqual([o.getId() for o in om.objectValues('Bar')], ['b'])
+        self.assertEqual([k for k, v in om.objectItems('Foo')], ['a', 'c'])
+
+        om._delObject('b')
+        self.assertEqual(list(om._mt_index.keys()), ['Foo'])
+        self.assertEqual(list(om.objectIds('Bar')), [])
+
+    def test_objectValues_wrapped(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a'))
+        ob = om.objectValues()[0]
+        self.assertTrue(ob.aq_parent is om)
+
+    def test_objectMap(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a', 'Foo'))
+        self.assertEqual(list(om.objectMap()),
+                         [{'id': 'a', 'meta_type': 'Foo'}])
+
+    def test_objectMap_does_not_load_subobjects(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a', 'Foo'))
+        om._setObject('b', Item('b', 'Bar'))
+        # Stands in for a ghost, which must not be activated.
+        om._tree['a'].meta_type = 'Loaded'
+        self.assertEqual(list(om.objectMap()),
+                         [{'id': 'a', 'meta_type': 'Foo'},
+                          {'id': 'b', 'meta_type': 'Bar'}])
+
+    def test_objectIds_text_spec(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a', 'Foo'))
+        self.assertEqual(list(om.objectIds(u'Foo')), ['a'])
+
+    def test_superValues(self):
+        om = self._makeOne()
+        om._setObject('a', Item('a', 'Foo'))
+        om._setObject('sub', BTreeObjectManager('sub'), set_owner=0)
+        sub = om._getOb('sub')
+        self.assertEqual([o.getId() for o in sub.superValues('Foo')], ['a'])
+
+    def test_manage_get_sortedObjects_batched(self):
+        om = makerequest(self._makeOne())
+        om.manage_batch_size = 3
+        for i in range(8):
+            id = 'item%d' % i
+            om._setObject(id, Item(id))
+
+        om.REQUEST.form['b_start'] = '3'
+        obs = om.manage_get_sortedObjects('id', 'asc')
+        self.assertEqual([d['id'] for d in obs],
+                         ['item3', 'item4', 'item5'])
+        obs = om.manage_get_sortedObjects('id', 'desc')
+        self.assertEqual([d['id'] for d in obs],
+                         ['item4', 'item3', 'item2'])
+
+        info = om.manage_get_batchInfo()
+        self.assertEqual(info, {'start': 4, 'end': 6, 'total': 8,
+                                'previous': 0, 'next': 6})
+
+        om.REQUEST.form['b_start'] = '6'
+        info = om.manage_get_batchInfo()
+        self.assertEqual(info, {'start': 7, 'end': 8, 'total': 8,
+                                'previous': 3, 'next': None})
+
+    def test_manage_get_batchInfo_small(self):
+        om = makerequest(self._makeOne())
+        om._setObject('a', Item('a'))
+        self.assertIsNone(om.manage_get_batchInfo())
+
+
+class TestBTreeFolder(unittest.TestCase):
+
+    def test_interfaces(self):
+        from OFS.BTreeFolder import BTreeFolder
+        from OFS.interfaces import IBTreeFolder
+        from OFS.interfaces import IWriteLock
+        from zope.interface.verify import verifyClass
+
+        verifyClass(IBTreeFolder, BTreeFolder)
+        verifyClass(IWriteLock, BTreeFolder)
+
+    def test_manage_addBTreeFolder(self):
+        from OFS.BTreeFolder import BTreeFolder
+        from OFS.BTreeFolder import manage_addBTreeFolder
+        from OFS.Folder import Folder
+
+        root = Folder('root').__of__(FauxRoot())
+        manage_addBTreeFolder(root, 'big', title='Big')
+        folder = root._getOb('big')
+        self.assertIsInstance(folder, BTreeFolder)
+        self.assertEqual(folder.title, 'Big')
+        self.assertEqual(len(folder), 0)
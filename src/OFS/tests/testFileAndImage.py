@@ -17,6 +17,7 @@ from Acquisition import aq_base
 from App.Common import rfc1123_date
 from OFS.Application import Application
 from OFS.Cache import ZCM_MANAGERS
+from OFS.Image import BlobData
 from OFS.Image import Pdata
 from OFS.SimpleItem import SimpleItem
 from Testing.makerequest import makerequest
@@ -204,6 +205,99 @@ class FileTests(unittest.TestCase):
         data, size = self.file._read_data(s)
         self.assertNotEqual(data.next, None)
 
+    def testPdataIndex(self):
+        s = b'a' * (1 << 16) * 3 + b'b' * 10
+        self.file.manage_upload(BytesIO(s))
+        index = self.file._pdata_index
+        self.assertEqual(list(index.keys()),
+                         [0, (1 << 16) + 10, (1 << 17) + 10])
+        self.assertTrue(index[0] is aq_base(self.file.data))
+        self.assertEqual(len(self.file.data), len(s))
+        self.assertEqual(len(self.file), len(s))
+        self.assertEqual(
+            b''.join(self.file._iter_data_range(len(s) - 20, len(s))),
+            s[-20:])
+
+        # The index is dropped if the data no longer needs one
+        self.file.manage_upload(b'foo')
+        self.assertIsNone(self.file._pdata_index)
+
+    def testPdataIndexFromExistingChain(self):
+        s = b'a' * (1 << 16) * 3
+        data, size = self.file._read_data(BytesIO(s))
+        del self.file._v_pdata_index
+        self.file.update_data(data, size=size)
+        self.assertEqual(list(self.file._pdata_index.keys()),
+                         [0, 1 << 16, 1 << 17])
+
+    def testReadDataBlob(self):
+        self.file.use_blob_storage = True
+        s = b'a' * (2 << 16)
+        data, size = self.file._read_data(BytesIO(s))
+        self.assertIsInstance(data, BlobData)
+        self.assertEqual(bytes(data), s)
+        self.assertEqual(len(data), size)
+        self.assertEqual(len(s), size)
+        self.assertEqual(data[10:20], s[10:20])
+
+    def testReadDataBlobSmallData(self):
+        self.file.use_blob_storage = True
+        data, size = self.file._read_data(BytesIO(b'a' * 100))
+        self.assertEqual(data, b'a' * 100)
+
+    def testReadDataBlobNotSupported(self):
+        from ZODB.interfaces import IBlobStorage
+        from zope.interface import noLongerProvides
+        self.file.use_blob_storage = True
+        noLongerProvides(self.connection.db().storage, IBlobStorage)
+        data, size = self.file._read_data(BytesIO(b'a' * (2 << 16)))
+        self.assertIsInstance(data, Pdata)
+
+    def testIndexHtmlWithBlob(self):
+        from ZPublisher.Iterators import filestream_iterator
+        self.file.use_blob_storage = True
+        s = b'a' * (3 << 16) + b'b'
+        self.file.manage_upload(s)
+        self.assertEqual(self.file.get_size(), len(s))
+
+        # Uncommitted blob data is written to the response
+        response = self.app.REQUEST.RESPONSE
+        self.assertEqual(self.file.index_html(self.app.REQUEST, response),
+                         b'')
+        self.assertTrue(response._wrote)
+
+        # Committed blob data is served from the blob file
+        transaction.commit()
+        result = self.file.index_html(self.app.REQUEST, response)
+        self.assertIsInstance(result, filestream_iterator)
+        try:
+            self.assertEqual(len(result), len(s))
+            self.assertEqual(b''.join(result), s)
+        finally:
+            result.close()
+
+    def testMigrateToBlob(self):
+        s = b'a' * (3 << 16) + b'b'
+        self.file.manage_upload(s)
+        transaction.commit()
+        self.assertIsInstance(self.file.data, Pdata)
+        etag = self.file.http__etag()
+
+        self.assertTrue(self.file.migrateToBlob())
+        self.assertIsInstance(self.file.data, BlobData)
+        self.assertEqual(bytes(self.file.data), s)
+        self.assertEqual(self.file.http__etag(), etag)
+        transaction.commit()
+        self.assertEqual(bytes(self.file.data), s)
+
+        # Already migrated
+        self.assertFalse(self.file.migrateToBlob())
+
+    def testMigrateToBlobString(self):
+        self.file.manage_upload(b'a' * 100)
+        self.assertFalse(self.file.migrateToBlob())
+        self.assertEqual(self.file.data, b'a' * 100)
+
     def testManageEditWithFileData(self):
         self.file.manage_edit('foobar', 'text/plain', filedata=b'ASD')
         self.assertEqual(self.file.title, 'foobar')
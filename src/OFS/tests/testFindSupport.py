@@ -114,3 +114,145 @@ class TestFindSupport(unittest.TestCase):
         res = self.base.ZopeFind(self.base, obj_searchterm=tainted_bytes)
         self.assertEqual(len(res), 2)
         self.assertEqual(set([x[0] for x in res]), set(['doc1', 'doc2']))
+
+
+class TestIterZopeFind(unittest.TestCase):
+
+    def setUp(self):
+        self.base = DummyFolder('base')
+        for id in ('a', 'b', 'c'):
+            folder = self.base[id] = DummyFolder(id)
+            for sub in ('1', '2'):
+                folder[sub] = DummyItem(sub, text='findme')
+
+    def _paths(self, results):
+        return [path for path, ob in results]
+
+    def test_iterZopeFind(self):
+        results = self.base.iterZopeFind(self.base, search_sub=1)
+        self.assertEqual(
+            self._paths(results),
+            ['a', 'a/1', 'a/2', 'b', 'b/1', 'b/2', 'c', 'c/1', 'c/2'])
+        self.assertEqual(results.visited, 9)
+        self.assertIsNone(results.token)
+
+    def test_iterZopeFind_same_as_ZopeFind(self):
+        kw = dict(obj_searchterm='findme', search_sub=1, pre='base')
+        self.assertEqual(self.base.ZopeFind(self.base, **kw),
+                         list(self.base.iterZopeFind(self.base, **kw)))
+
+    def test_iterZopeFind_budget_and_token(self):
+        found = []
+        token = None
+        calls = 0
+        while True:
+            calls += 1
+            results = self.base.iterZopeFind(
+                self.base, obj_searchterm='findme', search_sub=1,
+                budget=2, token=token)
+            found.extend(self._paths(results))
+            token = results.token
+            if token is None:
+                break
+            self.assertEqual(results.visited, 2)
+        self.assertEqual(calls, 5)
+        self.assertEqual(found, ['a/1', 'a/2', 'b/1', 'b/2', 'c/1', 'c/2'])
+
+    def test_iterZopeFind_budget_at_least_one(self):
+        with self.assertRaises(ValueError):
+            self.base.iterZopeFind(self.base, search_sub=1, budget=0)
+
+    def test_iterZopeFind_restricted(self):
+        from AccessControl import Unauthorized
+        from AccessControl.ZopeGuards import guarded_getattr
+        from AccessControl.ZopeGuards import guarded_iter
+        results = self.base.iterZopeFind(self.base, search_sub=1, budget=2)
+        self.assertEqual(self._paths(guarded_iter(results)), ['a', 'a/1'])
+        self.assertEqual(guarded_getattr(results, 'token'), 'a/1')
+        self.assertEqual(guarded_getattr(results, 'visited'), 2)
+        for name in ('obj', 'criteria', 'resume', '_walk'):
+            self.assertRaises(Unauthorized, guarded_getattr, results, name)
+
+    def test_iterZopeFind_token_removed_object(self):
+        del self.base['b']['1']
+        results = self.base.iterZopeFind(self.base, search_sub=1,
+                                         token='b/1')
+        self.assertEqual(self._paths(results), ['c', 'c/1', 'c/2'])
+
+    def test_iterZopeFind_parallel_requires_no_budget(self):
+        with self.assertRaises(ValueError):
+            self.base.iterZopeFind(self.base, search_sub=1, parallel=2,
+                                   budget=10)
+
+
+class TestIterZopeFindZODB(unittest.TestCase):
+
+    def setUp(self):
+        import transaction
+        from OFS.Folder import Folder
+        from OFS.SimpleItem import SimpleItem
+        from ZODB.DB import DB
+        from ZODB.DemoStorage import DemoStorage
+
+        self.db = DB(DemoStorage())
+        self.conn = self.db.open()
+        root = self.conn.root()['Application'] = Folder('root')
+        for id in ('a', 'b', 'c', 'd'):
+            folder = Folder(id)
+            root._setOb(id, folder)
+            root._objects += ({'id': id, 'meta_type': 'Folder'}, )
+            folder = root._getOb(id)
+            for i in range(20):
+                item = SimpleItem()
+                item.id = 'item%02d' % i
+                folder._setOb(item.id, item)
+                folder._objects += (
+                    {'id': item.id, 'meta_type': item.meta_type}, )
+        transaction.commit()
+        self.root = self.conn.root()['Application']
+
+    def tearDown(self):
+        import transaction
+        transaction.abort()
+        self.conn.close()
+        self.db.close()
+
+    def test_parallel(self):
+        kw = dict(obj_ids=['item03', 'item17', 'c'], search_sub=1)
+        expected = list(self.root.iterZopeFind(self.root, **kw))
+        self.assertEqual(len(expected), 9)
+
+        results = self.root.iterZopeFind(self.root, parallel=3, **kw)
+        found = list(results)
+        self.assertEqual(found, expected)
+        self.assertEqual(results.visited, 84)
+        for path, ob in found:
+            self.assertTrue(ob._p_jar is self.conn)
+
+    def test_parallel_expr_and_user(self):
+        import transaction
+        from AccessControl.SecurityManagement import newSecurityManager
+        from AccessControl.SecurityManagement import noSecurityManager
+        from OFS.userfolder import UserFolder
+        self.root._setObject('acl_users', UserFolder())
+        self.root.acl_users._doAddUser('alice', 'secret', ['Manager'], [])
+        transaction.commit()
+        user = self.root.acl_users.getUser('alice')
+        newSecurityManager(None, user.__of__(self.root.acl_users))
+        self.addCleanup(noSecurityManager)
+
+        kw = dict(obj_expr="getId().endswith('3')",
+                  obj_permission='View', search_sub=1)
+        expected = list(self.root.iterZopeFind(self.root, **kw))
+        self.assertEqual(len(expected), 8)
+
+        results = self.root.iterZopeFind(self.root, parallel=4, **kw)
+        self.assertEqual(list(results), expected)
+
+    def test_gc_interval(self):
+        self.conn.cacheMinimize()
+        self.conn._cache.cache_size = 5
+        results = self.root.iterZopeFind(self.root, search_sub=1,
+                                         gc_interval=10)
+        self.assertEqual(len(list(results)), 84)
+        self.assertTrue(self.conn._cache.cache_non_ghost_count <= 20)
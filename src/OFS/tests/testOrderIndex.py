@@ -0,0 +1,143 @@
+import unittest
+
+
+class TestOrderIndex(unittest.TestCase):
+
+    def _makeOne(self, ids=(), bucket_size=4):
+        from OFS.OrderIndex import OrderIndex
+        index = OrderIndex()
+        index.bucket_size = bucket_size
+        for id in ids:
+            index.append(id)
+        return index
+
+    def _ids(self, count):
+        return ['id%02d' % i for i in range(count)]
+
+    def test_empty(self):
+        index = self._makeOne()
+        self.assertEqual(len(index), 0)
+        self.assertEqual(list(index), [])
+        self.assertEqual(index[:], [])
+        self.assertRaises(IndexError, index.__getitem__, 0)
+        self.assertRaises(ValueError, index.index, 'a')
+        self.assertRaises(ValueError, index.remove, 'a')
+        self.assertFalse('a' in index)
+
+    def test_append_splits_buckets(self):
+        ids = self._ids(20)
+        index = self._makeOne(ids)
+        self.assertEqual(len(index), 20)
+        self.assertEqual(list(index), ids)
+        self.assertTrue(len(index._keys) > 1)
+        self.assertTrue(max(index._sizes) <= index.bucket_size)
+        self.assertEqual(sum(index._sizes), 20)
+        for position, id in enumerate(ids):
+            self.assertEqual(index.index(id), position)
+            self.assertEqual(index[position], id)
+        self.assertEqual(index[-1], 'id19')
+
+    def test_slice(self):
+        ids = self._ids(20)
+        index = self._makeOne(ids)
+        self.assertEqual(index[3:15], ids[3:15])
+        self.assertEqual(index[15:], ids[15:])
+        self.assertEqual(index[::3], ids[::3])
+        self.assertEqual(index[10:2], [])
+
+    def test_insert(self):
+        ids = self._ids(10)
+        index = self._makeOne(ids)
+        index.insert(0, 'first')
+        index.insert(5, 'middle')
+        index.insert(100, 'last')
+        ids.insert(0, 'first')
+        ids.insert(5, 'middle')
+        ids.append('last')
+        self.assertEqual(list(index), ids)
+        self.assertRaises(ValueError, index.insert, 0, 'middle')
+
+    def test_remove(self):
+        ids = self._ids(10)
+        index = self._makeOne(ids)
+        for id in ('id00', 'id01', 'id02', 'id03', 'id07'):
+            index.remove(id)
+            ids.remove(id)
+        self.assertEqual(list(index), ids)
+        self.assertEqual(index.index('id08'), 3)
+        self.assertEqual(len(index._buckets), len(index._keys))
+
+    def test_move(self):
+        ids = self._ids(20)
+        index = self._makeOne(ids)
+        index.move('id18', 2)
+        index.move('id01', 19)
+        ids.remove('id18')
+        ids.insert(2, 'id18')
+        ids.remove('id01')
+        ids.insert(19, 'id01')
+        self.assertEqual(list(index), ids)
+        for position, id in enumerate(ids):
+            self.assertEqual(index.index(id), position)
+
+    def test_setitem(self):
+        index = self._makeOne(self._ids(10))
+        index[1], index[8] = 'id08', 'id01'
+        self.assertEqual(index.index('id08'), 1)
+        self.assertEqual(index.index('id01'), 8)
+
+    def test_random_changes(self):
+        import random
+        rnd = random.Random(42)
+        all_ids = self._ids(60)
+        ids = all_ids[:]
+        index = self._makeOne(ids)
+        for i in range(1000):
+            id = rnd.choice(all_ids)
+            if i % 7 == 0:
+                # Loaded again, without the lookup structures.
+                index._reindex()
+            if id not in index:
+                position = rnd.randrange(len(ids) + 1)
+                index.insert(position, id)
+                ids.insert(position, id)
+            elif rnd.random() < 0.3:
+                index.remove(id)
+                ids.remove(id)
+            else:
+                position = rnd.randrange(len(ids))
+                index.move(id, position)
+                ids.remove(id)
+                ids.insert(position, id)
+            self.assertEqual(list(index), ids)
+            if ids:
+                position = rnd.randrange(len(ids))
+                self.assertEqual(index[position], ids[position])
+                self.assertEqual(index.index(ids[position]), position)
+        for position, id in enumerate(ids):
+            self.assertEqual(index.index(id), position)
+            self.assertEqual(index[position], id)
+
+    def test_move_writes_only_touched_buckets(self):
+        import transaction
+        from ZODB.DemoStorage import DemoStorage
+        from ZODB.DB import DB
+
+        db = DB(DemoStorage())
+        try:
+            conn = db.open()
+            index = self._makeOne(self._ids(100), bucket_size=10)
+            conn.root()['index'] = index
+            transaction.commit()
+
+            index.move('id95', 98)
+            registered = conn._registered_objects
+            self.assertTrue(index in registered)
+            # The index itself, the bucket of the moved id and the
+            # mapping of ids to buckets, but none of the other buckets.
+            self.assertEqual(len(registered), 3)
+            transaction.commit()
+            self.assertEqual(index.index('id95'), 98)
+        finally:
+            transaction.abort()
+            db.close()
@@ -162,3 +162,53 @@ class TestOrderSupport(unittest.TestCase):
 
         f.setDefaultSorting('position', True)
         self.assertEqual(f.tpValues(), [f.o4, f.o3, f.o2])
+
+
+class TestBTreeOrderSupport(TestOrderSupport):
+
+    def _makeOne(self):
+        from OFS.BTreeFolder import BTreeObjectManager
+        from OFS.OrderSupport import BTreeOrderSupport
+
+        class OrderedBTreeObjectManager(BTreeOrderSupport,
+                                        BTreeObjectManager):
+            # disable permission verification
+            def _verifyObjectPaste(self, object, validate_src=1):
+                return
+
+        f = OrderedBTreeObjectManager()
+        for id, meta_type in (('o1', 'mt1'), ('o2', 'mt2'),
+                              ('o3', 'mt1'), ('o4', 'mt2')):
+            f._setOb(id, DummyObject(id, meta_type))
+        return f
+
+    def _doCanonTest(self, methodname, table):
+        for args, order, rval in table:
+            f = self._makeOne()
+            method = getattr(f, methodname)
+            if rval == 'ValueError':
+                self.assertRaises(ValueError, method, *args)
+            else:
+                self.assertEqual(method(*args), rval)
+            self.assertEqual(list(f.objectIds()), order)
+
+    def test_interfaces(self):
+        from OFS.interfaces import IOrderedContainer
+        from OFS.OrderSupport import BTreeOrderSupport
+        from zope.interface.verify import verifyClass
+
+        verifyClass(IOrderedContainer, BTreeOrderSupport)
+
+    def test_objectIds_spec_in_order(self):
+        f = self._makeOne()
+        f.moveObjectsToTop(('o3', ))
+        self.assertEqual(list(f.objectIds('mt1')), ['o3', 'o1'])
+        self.assertEqual(list(f.objectIds(['mt1', 'mt2'])),
+                         ['o3', 'o1', 'o2', 'o4'])
+
+    def test_delete_keeps_order(self):
+        f = self._makeOne()
+        f.moveObjectsToBottom(('o1', ))
+        f._delOb('o3')
+        self.assertEqual(list(f.objectIds()), ['o2', 'o4', 'o1'])
+        self.assertEqual(f.getObjectPosition('o1'), 2)
@@ -13,3 +13,17 @@ class TestOrderedFolder(unittest.TestCase):
         verifyClass(IOrderedContainer, OrderedFolder)
         verifyClass(IOrderedFolder, OrderedFolder)
         verifyClass(IWriteLock, OrderedFolder)
+
+
+class TestOrderedBTreeFolder(unittest.TestCase):
+
+    def test_interfaces(self):
+        from OFS.interfaces import IBTreeFolder
+        from OFS.interfaces import IOrderedContainer
+        from OFS.interfaces import IOrderedFolder
+        from OFS.OrderedFolder import OrderedBTreeFolder
+        from zope.interface.verify import verifyClass
+
+        verifyClass(IOrderedContainer, OrderedBTreeFolder)
+        verifyClass(IOrderedFolder, OrderedBTreeFolder)
+        verifyClass(IBTreeFolder, OrderedBTreeFolder)
@@ -0,0 +1,526 @@
+import unittest
+
+import transaction
+from OFS.Folder import Folder
+from OFS.metaconfigure import setDeprecatedManageAddDelete
+from OFS.RAMCacheManager import RAMCacheManager
+from persistent import Persistent
+from ZODB.DB import DB
+from ZODB.MappingStorage import MappingStorage
+
+
+setDeprecatedManageAddDelete(RAMCacheManager)
+
+
+class DummyUser(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def getUserName(self):
+        return self.name
+
+
+class DummyCacheable(object):
+
+    def __init__(self, path, mtime=0, REQUEST=None):
+        self.path = path
+        self.mtime = mtime
+        self.REQUEST = REQUEST if REQUEST is not None else {}
+
+    def getPhysicalPath(self):
+        return tuple(self.path.split('/'))
+
+    def ZCacheable_getModTime(self, mtime_func=None):
+        if mtime_func is not None:
+            return max(mtime_func(), self.mtime)
+        return self.mtime
+
+
+class PersistentCacheable(Persistent):
+
+    def __init__(self, path):
+        self.path = path
+
+    def getPhysicalPath(self):
+        return tuple(self.path.split('/'))
+
+    def ZCacheable_getModTime(self, mtime_func=None):
+        return 0
+
+
+class Item(Persistent):
+
+    def __init__(self, value):
+        self.value = value
+
+
+class RAMCacheTests(unittest.TestCase):
+
+    def _makeOne(self, **kw):
+        from OFS.RAMCacheManager import RAMCache
+        return RAMCache(**kw)
+
+    def test_get_set(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        self.assertIsNone(cache.ZCache_get(ob))
+        cache.ZCache_set(ob, 'data')
+        self.assertEqual(cache.ZCache_get(ob), 'data')
+        self.assertEqual(cache.ZCache_get(ob, view_name='other',
+                                          default=1), 1)
+        stats = cache.getStatistics()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], 4)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_none_not_cached(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, None)
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+
+    def test_unpicklable_not_cached(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, lambda: None)
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+
+    def test_keywords(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        here = DummyCacheable('/here')
+        cache.ZCache_set(ob, 'one', keywords={'here': here, 'x': [1]})
+        self.assertEqual(
+            cache.ZCache_get(ob, keywords={'here': DummyCacheable('/here'),
+                                           'x': [1]}),
+            'one')
+        self.assertIsNone(cache.ZCache_get(ob, keywords={'here': here,
+                                                         'x': [2]}))
+
+    def test_unstable_key_not_cached(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, 'data', keywords={'x': object()})
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+        self.assertIsNone(cache.ZCache_get(ob, keywords={'x': object()}))
+
+    def test_request_vars(self):
+        cache = self._makeOne(request_vars=('AUTHENTICATED_USER',))
+        ob = DummyCacheable(
+            '/a', REQUEST={'AUTHENTICATED_USER': DummyUser('joe')})
+        cache.ZCache_set(ob, 'joe')
+        self.assertEqual(cache.ZCache_get(ob), 'joe')
+        ob.REQUEST['AUTHENTICATED_USER'] = DummyUser('ann')
+        self.assertIsNone(cache.ZCache_get(ob))
+
+    def test_request_vars_user_folder(self):
+        from OFS.userfolder import UserFolder
+        root = Folder('root')
+        root._setObject('acl_users', UserFolder())
+        acl_users = root.acl_users
+        acl_users._doAddUser('alice', 'secret', [], [])
+        acl_users._doAddUser('bob', 'secret', [], [])
+        alice = acl_users.getUser('alice').__of__(acl_users)
+        bob = acl_users.getUser('bob').__of__(acl_users)
+        cache = self._makeOne(request_vars=('AUTHENTICATED_USER',))
+        ob = DummyCacheable('/a', REQUEST={'AUTHENTICATED_USER': alice})
+        cache.ZCache_set(ob, 'alice')
+        self.assertEqual(cache.ZCache_get(ob), 'alice')
+        ob.REQUEST['AUTHENTICATED_USER'] = bob
+        self.assertIsNone(cache.ZCache_get(ob))
+
+    def test_cacheKeyValue(self):
+        from OFS.RAMCacheManager import cacheKeyValue
+        from OFS.userfolder import UserFolder
+        root = Folder('root')
+        root._setObject('acl_users', UserFolder())
+        acl_users = root.acl_users
+        acl_users._doAddUser('alice', 'secret', [], [])
+        alice = acl_users.getUser('alice').__of__(acl_users)
+        self.assertEqual(cacheKeyValue(alice),
+                         ('user', ('root', 'acl_users'), 'alice'))
+        self.assertEqual(cacheKeyValue(DummyUser('joe')),
+                         ('user', None, 'joe'))
+        self.assertEqual(cacheKeyValue(acl_users), ('root', 'acl_users'))
+
+    def test_mtime_invalidation(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a', mtime=10)
+        cache.ZCache_set(ob, 'data')
+        self.assertEqual(cache.ZCache_get(ob), 'data')
+        ob.mtime = 11
+        self.assertIsNone(cache.ZCache_get(ob))
+        stats = cache.getStatistics()
+        self.assertEqual(stats['entries'], 0)
+        self.assertEqual(stats['invalidations'], 1)
+
+    def test_mtime_func(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, 'data', mtime_func=lambda: 5)
+        self.assertEqual(cache.ZCache_get(ob, mtime_func=lambda: 5), 'data')
+        self.assertIsNone(cache.ZCache_get(ob, mtime_func=lambda: 6))
+
+    def test_max_age(self):
+        cache = self._makeOne(max_age=10)
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, 'data')
+        cache._entries[list(cache._entries)[0]].created -= 11
+        self.assertIsNone(cache.ZCache_get(ob))
+
+    def test_lru_max_entries(self):
+        cache = self._makeOne(max_entries=2)
+        a, b, c = [DummyCacheable('/' + n) for n in 'abc']
+        cache.ZCache_set(a, 'a')
+        cache.ZCache_set(b, 'b')
+        cache.ZCache_get(a)
+        cache.ZCache_set(c, 'c')
+        self.assertEqual(cache.ZCache_get(a), 'a')
+        self.assertIsNone(cache.ZCache_get(b))
+        self.assertEqual(cache.ZCache_get(c), 'c')
+        self.assertEqual(cache.getStatistics()['evictions'], 1)
+
+    def test_lru_max_bytes(self):
+        cache = self._makeOne(max_bytes=10)
+        a, b, c = [DummyCacheable('/' + n) for n in 'abc']
+        cache.ZCache_set(a, 'a' * 4)
+        cache.ZCache_set(b, 'b' * 4)
+        cache.ZCache_set(c, 'c' * 7)
+        stats = cache.getStatistics()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], 7)
+        self.assertEqual(stats['evictions'], 2)
+        # Data larger than the cache is not cached at all.
+        cache.ZCache_set(a, 'a' * 11)
+        self.assertEqual(cache.ZCache_get(c), 'c' * 7)
+
+    def test_replace_entry(self):
+        cache = self._makeOne(max_bytes=10)
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, 'a' * 6)
+        cache.ZCache_set(ob, 'b' * 6)
+        stats = cache.getStatistics()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], 6)
+        self.assertEqual(stats['evictions'], 0)
+
+    def test_tinylfu_admission(self):
+        cache = self._makeOne(max_entries=2, policy='tinylfu')
+        hot = DummyCacheable('/hot')
+        warm = DummyCacheable('/warm')
+        for i in range(3):
+            cache.ZCache_get(hot)
+            cache.ZCache_get(warm)
+        cache.ZCache_set(hot, 'hot')
+        cache.ZCache_set(warm, 'warm')
+        # A one-off request does not evict the frequently used entries.
+        once = DummyCacheable('/once')
+        cache.ZCache_get(once)
+        cache.ZCache_set(once, 'once')
+        self.assertEqual(cache.ZCache_get(hot), 'hot')
+        self.assertEqual(cache.ZCache_get(warm), 'warm')
+        self.assertEqual(cache.getStatistics()['rejections'], 1)
+        # An entry requested more often replaces the least recently used.
+        popular = DummyCacheable('/popular')
+        for i in range(10):
+            cache.ZCache_get(popular)
+        cache.ZCache_set(popular, 'popular')
+        self.assertEqual(cache.ZCache_get(popular), 'popular')
+        self.assertIsNone(cache.ZCache_get(hot))
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, self._makeOne, policy='bogus')
+
+    def test_configure_shrinks(self):
+        cache = self._makeOne()
+        for n in 'abc':
+            cache.ZCache_set(DummyCacheable('/' + n), n)
+        cache.configure(max_entries=1)
+        self.assertEqual(cache.getStatistics()['entries'], 1)
+        self.assertEqual(cache.ZCache_get(DummyCacheable('/c')), 'c')
+
+    def test_invalidate(self):
+        cache = self._makeOne()
+        a, b = DummyCacheable('/a'), DummyCacheable('/b')
+        cache.ZCache_set(a, 'a')
+        cache.ZCache_set(a, 'a2', view_name='view')
+        cache.ZCache_set(b, 'b')
+        self.assertEqual(cache.ZCache_invalidate(a),
+                         'Invalidated 2 cache entries.')
+        self.assertIsNone(cache.ZCache_get(a))
+        self.assertEqual(cache.ZCache_get(b), 'b')
+        cache.invalidateAll()
+        self.assertEqual(cache.getStatistics()['bytes'], 0)
+        self.assertIsNone(cache.ZCache_get(b))
+
+    def test_getEntryReport(self):
+        cache = self._makeOne()
+        a, b = DummyCacheable('/a'), DummyCacheable('/b')
+        cache.ZCache_set(a, 'a', keywords={'x': 1})
+        cache.ZCache_set(a, 'a', keywords={'x': 2})
+        cache.ZCache_set(b, 'bb')
+        cache.ZCache_get(b)
+        report = cache.getEntryReport()
+        self.assertEqual(
+            report,
+            [{'path': '/b', 'view_name': '', 'entries': 1, 'bytes': 2,
+              'hits': 1},
+             {'path': '/a', 'view_name': '', 'entries': 2, 'bytes': 2,
+              'hits': 0}])
+
+
+class RAMCacheManagerTests(unittest.TestCase):
+
+    def _makeRoot(self):
+        from OFS.RAMCacheManager import manage_addRAMCacheManager
+        root = Folder('root')
+        manage_addRAMCacheManager(root, 'cache', 'Cache')
+        return root
+
+    def test_getCache_shared(self):
+        from OFS.RAMCacheManager import RAMCache
+        root = self._makeRoot()
+        cache = root.cache.ZCacheManager_getCache()
+        self.assertIsInstance(cache, RAMCache)
+        self.assertIs(root.cache.ZCacheManager_getCache(), cache)
+        self.assertEqual(root.cache.title, 'Cache')
+
+    def test_copy_gets_new_cache(self):
+        from OFS.RAMCacheManager import RAMCacheManager
+        root = self._makeRoot()
+        cache = root.cache.ZCacheManager_getCache()
+        copy = RAMCacheManager('copy')
+        copy.__dict__.update(root.cache.__dict__)
+        copy.id = 'copy'
+        root._setObject('copy', copy)
+        self.assertIsNot(root.copy.ZCacheManager_getCache(), cache)
+
+    def test_manage_editProps(self):
+        root = self._makeRoot()
+        cache = root.cache.ZCacheManager_getCache()
+        root.cache.manage_editProps(
+            'New title',
+            {'max_entries': '5', 'max_bytes': 100, 'max_age': '0',
+             'request_vars': 'AUTHENTICATED_USER HTTP_ACCEPT_LANGUAGE',
+             'policy': 'tinylfu'})
+        self.assertEqual(root.cache.title, 'New title')
+        self.assertEqual(root.cache.getSettings(), {
+            'max_entries': 5,
+            'max_bytes': 100,
+            'max_age': 0,
+            'request_vars': ('AUTHENTICATED_USER', 'HTTP_ACCEPT_LANGUAGE'),
+            'policy': 'tinylfu',
+            'track_dependencies': False,
+        })
+        self.assertEqual(cache.max_entries, 5)
+        self.assertEqual(cache.policy, 'tinylfu')
+        self.assertRaises(ValueError, root.cache.manage_editProps,
+                          '', {'policy': 'bogus'})
+
+    def test_manage_editProps_track_dependencies(self):
+        root = self._makeRoot()
+        root.cache.manage_editProps('', {'track_dependencies': '1'})
+        self.assertTrue(root.cache.getSettings()['track_dependencies'])
+        self.assertTrue(root.cache.ZCacheManager_getCache().track_dependencies)
+        root.cache.manage_editProps('', {'track_dependencies': 0})
+        self.assertFalse(root.cache.getSettings()['track_dependencies'])
+
+    def test_cacheable_dtml_method(self):
+        from OFS.DTMLMethod import addDTMLMethod
+        root = self._makeRoot()
+        addDTMLMethod(root, 'doc', file='<dtml-var title_or_id>')
+        root.doc.ZCacheable_setManagerId('cache')
+        self.assertTrue(root.doc.ZCacheable_isCachingEnabled())
+        root.doc.ZCacheable_set('rendered')
+        self.assertEqual(root.doc.ZCacheable_get(), 'rendered')
+        self.assertEqual(root.cache.getCacheStatistics()['hits'], 1)
+        root.doc.ZCacheable_invalidate()
+        self.assertIsNone(root.doc.ZCacheable_get())
+        self.assertEqual(root.cache.getCacheReport(), [])
+
+    def test_cached_dtml_method_call(self):
+        from OFS.DTMLMethod import addDTMLMethod
+        root = self._makeRoot()
+        addDTMLMethod(root, 'doc', file='rendered')
+        root.doc.ZCacheable_setManagerId('cache')
+        self.assertEqual(root.doc(root, {}), 'rendered')
+        self.assertEqual(root.doc(root, {}), 'rendered')
+        self.assertEqual(root.cache.getCacheStatistics()['hits'], 1)
+
+    def test_manage_beforeDelete_drops_cache(self):
+        from OFS.RAMCacheManager import caches
+        root = self._makeRoot()
+        root.cache.ZCacheManager_getCache()
+        count = len(caches)
+        root._delObject('cache')
+        self.assertEqual(len(caches), count - 1)
+
+
+class DependencyTrackingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = DB(MappingStorage())
+        self.tm = transaction.TransactionManager()
+        self.conn = self.db.open(transaction_manager=self.tm)
+        root = self.root = self.conn.root()
+        root['page'] = PersistentCacheable('/page')
+        root['inner'] = PersistentCacheable('/inner')
+        root['a'] = Item('a')
+        root['b'] = Item('b')
+        self.tm.commit()
+        self.conn.cacheMinimize()
+
+    def tearDown(self):
+        from OFS.RAMCacheManager import caches
+        from OFS.RAMCacheManager import discardRecordings
+        discardRecordings()
+        caches.pop('test', None)
+        self.tm.abort()
+        self.conn.close()
+        self.db.close()
+
+    def _makeOne(self, **kw):
+        from OFS.RAMCacheManager import RAMCache
+        return RAMCache(track_dependencies=True, **kw)
+
+    def _render(self, cache, ob, *items):
+        data = cache.ZCache_get(ob)
+        if data is None:
+            data = ''.join(item.value for item in items)
+            cache.ZCache_set(ob, data)
+        return data
+
+    def _commit(self, item, value):
+        item.value = value
+        self.tm.commit()
+
+    def test_dependencies_recorded(self):
+        cache = self._makeOne()
+        page, a = self.root['page'], self.root['a']
+        self.assertEqual(self._render(cache, page, a), 'a')
+        entry = list(cache._entries.values())[0]
+        self.assertEqual(entry.dependencies[a._p_oid], a._p_serial)
+        self.assertNotIn(self.root['b']._p_oid, entry.dependencies)
+        self.assertEqual(cache.getStatistics()['dependencies'],
+                         len(entry.dependencies))
+
+    def test_hit_does_not_load_dependencies(self):
+        cache = self._makeOne()
+        page, a = self.root['page'], self.root['a']
+        self._render(cache, page, a)
+        a._p_deactivate()
+        self.assertEqual(cache.ZCache_get(page), 'a')
+        self.assertEqual(cache.ZCache_get(page), 'a')
+        self.assertIsNone(a._p_changed)
+        entry = list(cache._entries.values())[0]
+        self.assertEqual(entry.checked, self.db.lastTransaction())
+
+    def test_commit_invalidates(self):
+        cache = self._makeOne()
+        page, a, b = self.root['page'], self.root['a'], self.root['b']
+        self._render(cache, page, a)
+        self._commit(b, 'B')
+        self.assertEqual(cache.ZCache_get(page), 'a')
+        self._commit(a, 'A')
+        self.assertEqual(self._render(cache, page, a), 'A')
+
+    def test_abort_does_not_invalidate(self):
+        cache = self._makeOne()
+        page, a = self.root['page'], self.root['a']
+        self._render(cache, page, a)
+        a.value = 'A'
+        self.tm.abort()
+        self.assertEqual(cache.ZCache_get(page), 'a')
+
+    def test_commit_of_other_connection_invalidates(self):
+        cache = self._makeOne()
+        page, a = self.root['page'], self.root['a']
+        self._render(cache, page, a)
+        tm = transaction.TransactionManager()
+        conn = self.db.open(transaction_manager=tm)
+        conn.root()['a'].value = 'A'
+        tm.commit()
+        conn.close()
+        self.assertIsNone(cache.ZCache_get(page))
+        self.assertEqual(cache.getStatistics()['invalidations'], 1)
+
+    def test_outdated_render_not_used(self):
+        # Another connection commits a change while this one renders
+        # from an older state.
+        cache = self._makeOne()
+        page, a = self.root['page'], self.root['a']
+        tm = transaction.TransactionManager()
+        conn = self.db.open(transaction_manager=tm)
+        conn.root()['a'].value = 'A'
+        tm.commit()
+        conn.close()
+        self.assertEqual(self._render(cache, page, a), 'a')
+        self.assertIsNone(cache.ZCache_get(page))
+
+    def test_nested_hit_adds_dependencies(self):
+        cache = self._makeOne()
+        page, inner = self.root['page'], self.root['inner']
+        a, b = self.root['a'], self.root['b']
+        self._render(cache, inner, a)
+        # Render the page using the cached inner view and b.
+        self.assertIsNone(cache.ZCache_get(page))
+        self.assertEqual(self._render(cache, inner), 'a')
+        cache.ZCache_set(page, 'a' + b.value)
+        self._commit(a, 'A')
+        self.assertIsNone(cache.ZCache_get(inner))
+        self.assertIsNone(cache.ZCache_get(page))
+
+    def test_not_persistent(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        cache.ZCache_get(ob)
+        cache.ZCache_set(ob, 'data')
+        self.assertEqual(cache.ZCache_get(ob), 'data')
+
+    def test_cached_dependencies_recorded(self):
+        # The objects used are recorded even if they are not loaded.
+        cache = self._makeOne()
+        page, a, b = self.root['page'], self.root['a'], self.root['b']
+        self.assertEqual(a.value + b.value, 'ab')
+        self.assertEqual(self._render(cache, page, a), 'a')
+        entry = list(cache._entries.values())[0]
+        self.assertEqual(entry.dependencies[a._p_oid], a._p_serial)
+        self.assertNotIn(b._p_oid, entry.dependencies)
+        self._commit(a, 'A')
+        self.assertEqual(self._render(cache, page, a), 'A')
+
+    def test_marker_removed(self):
+        cache = self._makeOne()
+        page, a = self.root['page'], self.root['a']
+        count = len(self.conn._cache)
+        self._render(cache, page, a)
+        self.assertEqual(len(self.conn._cache), count)
+        cache.ZCache_invalidate(page)
+        self._render(cache, page, a)
+        self.assertEqual(len(self.conn._cache), count)
+
+    def test_marker_lost(self):
+        # The dependencies are unknown if the cache garbage collection
+        # removed the marker.
+        cache = self._makeOne()
+        page = self.root['page']
+        self.assertIsNone(cache.ZCache_get(page))
+        self.conn.cacheMinimize()
+        cache.ZCache_set(page, 'data')
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+        self.assertIsNone(cache.ZCache_get(page))
+        cache.ZCache_set(page, 'data')
+        self.assertEqual(cache.ZCache_get(page), 'data')
+
+    def test_discardRecordings(self):
+        from OFS.RAMCacheManager import _recorders
+        from OFS.RAMCacheManager import discardRecordings
+        cache = self._makeOne()
+        cache.ZCache_get(self.root['page'])
+        self.assertEqual(len(_recorders()), 1)
+        discardRecordings()
+        self.assertEqual(_recorders(), [])
+        cache.ZCache_set(self.root['page'], 'data')
+        self.assertEqual(cache.ZCache_get(self.root['page']), 'data')
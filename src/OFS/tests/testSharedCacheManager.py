@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from OFS.Folder import Folder
+from OFS.metaconfigure import setDeprecatedManageAddDelete
+from OFS.SharedCacheManager import SharedCacheManager
+from OFS.tests.testRAMCacheManager import DummyCacheable
+
+
+setDeprecatedManageAddDelete(SharedCacheManager)
+
+
+class SharedCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _makeOne(self, **kw):
+        from OFS.SharedCacheManager import SharedCache
+        return SharedCache(self.filename, **kw)
+
+    def test_unstable_key_not_cached(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        keywords = {'x': object()}
+        self.assertIsNone(cache.getCacheKey(ob, '', keywords))
+        cache.ZCache_set(ob, 'data', keywords=keywords)
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+        self.assertIsNone(cache.ZCache_get(ob, keywords=keywords))
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), 'needs file owners')
+    def test_private_directory(self):
+        from OFS.SharedCacheManager import private_directory
+        from OFS.SharedCacheManager import SharedCache
+        directory = private_directory(self.tmpdir)
+        cache = SharedCache(os.path.join(directory, 'cache.sqlite'))
+        cache.ZCache_set(DummyCacheable('/a'), 'data')
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+        os.chmod(directory, 0o777)
+        cache = SharedCache(os.path.join(directory, 'cache.sqlite'))
+        self.assertRaises(ValueError, cache.ZCache_get, DummyCacheable('/a'))
+
+    def test_get_set(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        self.assertIsNone(cache.ZCache_get(ob))
+        cache.ZCache_set(ob, {'data': [1, 2]})
+        self.assertEqual(cache.ZCache_get(ob), {'data': [1, 2]})
+        self.assertEqual(cache.ZCache_get(ob, view_name='other',
+                                          default=1), 1)
+        stats = cache.getStatistics()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_not_cached(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, None)
+        cache.ZCache_set(ob, lambda: None)
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+
+    def test_shared_between_caches(self):
+        # Two caches on the same file stand for two processes.
+        first = self._makeOne()
+        second = self._makeOne()
+        ob = DummyCacheable('/a')
+        first.ZCache_set(ob, 'data')
+        self.assertEqual(second.ZCache_get(ob), 'data')
+        self.assertEqual(second.ZCache_invalidate(ob),
+                         'Invalidated 1 cache entries.')
+        self.assertIsNone(first.ZCache_get(ob))
+
+    def test_mtime_invalidation(self):
+        cache = self._makeOne()
+        ob = DummyCacheable('/a', mtime=10)
+        cache.ZCache_set(ob, 'data')
+        self.assertEqual(cache.ZCache_get(ob), 'data')
+        ob.mtime = 11
+        self.assertIsNone(cache.ZCache_get(ob))
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+
+    def test_max_age(self):
+        cache = self._makeOne(max_age=10)
+        ob = DummyCacheable('/a')
+        cache.ZCache_set(ob, 'data')
+        cache._connection().execute('UPDATE entries SET created = 0')
+        self.assertIsNone(cache.ZCache_get(ob))
+
+    def test_lru_max_entries(self):
+        from OFS import SharedCacheManager
+        cache = self._makeOne(max_entries=2)
+        a, b, c = [DummyCacheable('/' + n) for n in 'abc']
+        cache.ZCache_set(a, 'a')
+        cache.ZCache_set(b, 'b')
+        old_resolution = SharedCacheManager.ACCESS_RESOLUTION
+        SharedCacheManager.ACCESS_RESOLUTION = -1
+        try:
+            cache.ZCache_get(a)
+        finally:
+            SharedCacheManager.ACCESS_RESOLUTION = old_resolution
+        cache.ZCache_set(c, 'c')
+        self.assertEqual(cache.ZCache_get(a), 'a')
+        self.assertIsNone(cache.ZCache_get(b))
+        self.assertEqual(cache.ZCache_get(c), 'c')
+        self.assertEqual(cache.getStatistics()['evictions'], 1)
+
+    def test_lru_max_bytes(self):
+        cache = self._makeOne(max_bytes=100)
+        a, b = DummyCacheable('/a'), DummyCacheable('/b')
+        cache.ZCache_set(a, b'a' * 60)
+        cache.ZCache_set(b, b'b' * 60)
+        self.assertIsNone(cache.ZCache_get(a))
+        self.assertEqual(cache.ZCache_get(b), b'b' * 60)
+        cache.ZCache_set(a, b'a' * 200)
+        self.assertIsNone(cache.ZCache_get(a))
+
+    def test_invalidateAll_and_report(self):
+        cache = self._makeOne()
+        a, b = DummyCacheable('/a'), DummyCacheable('/b')
+        cache.ZCache_set(a, 'a', keywords={'x': 1})
+        cache.ZCache_set(a, 'a', keywords={'x': 2})
+        cache.ZCache_set(b, 'b')
+        report = cache.getEntryReport()
+        self.assertEqual(sorted((r['path'], r['entries']) for r in report),
+                         [('/a', 2), ('/b', 1)])
+        cache.invalidateAll()
+        self.assertEqual(cache.getStatistics()['entries'], 0)
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, self._makeOne, policy='tinylfu')
+
+
+class SharedCacheManagerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _makeRoot(self):
+        from OFS.SharedCacheManager import manage_addSharedCacheManager
+        root = Folder('root')
+        manage_addSharedCacheManager(root, 'cache')
+        root.cache.manage_editProps('', {'directory': self.tmpdir})
+        return root
+
+    def test_getCache(self):
+        from OFS.SharedCacheManager import SharedCache
+        root = self._makeRoot()
+        cache = root.cache.ZCacheManager_getCache()
+        self.assertIsInstance(cache, SharedCache)
+        directory = os.path.dirname(cache.filename)
+        self.assertEqual(os.path.dirname(directory), self.tmpdir)
+        self.assertEqual(cache.filename, root.cache.getCacheFilename())
+
+    def test_editProps_directory(self):
+        root = self._makeRoot()
+        self.assertRaises(ValueError, root.cache.manage_editProps,
+                          '', {'directory': os.path.join(self.tmpdir, 'x')})
+        self.assertRaises(ValueError, root.cache.manage_editProps,
+                          '', {'policy': 'tinylfu'})
+
+    def test_cacheable_dtml_method(self):
+        from OFS.DTMLMethod import addDTMLMethod
+        root = self._makeRoot()
+        addDTMLMethod(root, 'doc', file='<dtml-var title_or_id>')
+        root.doc.ZCacheable_setManagerId('cache')
+        root.doc.ZCacheable_set('rendered')
+        self.assertEqual(root.doc.ZCacheable_get(), 'rendered')
+        root.doc.ZCacheable_invalidate()
+        self.assertIsNone(root.doc.ZCacheable_get())
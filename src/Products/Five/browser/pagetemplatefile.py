@@ -20,6 +20,8 @@ from AccessControl import getSecurityManager
 from Acquisition import aq_get
 from Products.PageTemplates.Expressions import SecureModuleImporter
 from Products.PageTemplates.Expressions import createTrustedZopeEngine
+from Products.PageTemplates.streaming import canStream
+from Products.PageTemplates.streaming import renderStream
 from zope.component import getMultiAdapter
 from zope.pagetemplate.engine import TrustedAppPT
 from zope.pagetemplate.pagetemplatefile import PageTemplateFile
@@ -34,12 +36,20 @@ def getEngine():
 
 class ViewPageTemplateFile(TrustedAppPT, PageTemplateFile):
     """Page Template used as class variable of views defined as Python classes.
+
+    If streaming is true and the view is published, its output is streamed
+    to the response, see Products.PageTemplates.streaming. The view must
+    return it unchanged.
     """
-    def __init__(self, filename, _prefix=None, content_type=None):
+    streaming = False
+
+    def __init__(self, filename, _prefix=None, content_type=None,
+                 streaming=False):
         _prefix = self.get_path_from_prefix(_prefix)
         super(ViewPageTemplateFile, self).__init__(filename, _prefix)
         if content_type is not None:
             self.content_type = content_type
+        self.streaming = streaming
 
     def getId(self):
         return basename(self.filename)
@@ -55,12 +65,18 @@ class ViewPageTemplateFile(TrustedAppPT, PageTemplateFile):
             request=instance.request,
             instance=instance, args=args, options=keywords)
         debug_flags = instance.request.debug
-        s = self.pt_render(
-            namespace,
+        options = dict(
             showtal=getattr(debug_flags, 'showTAL', 0),
             sourceAnnotations=getattr(debug_flags, 'sourceAnnotations', 0),
         )
         response = instance.request.response
+        if self.streaming and canStream(instance.request, instance):
+            # The headers are sent with the first chunk.
+            if not response.getHeader("Content-Type"):
+                response.setHeader("Content-Type", self.content_type)
+            return renderStream(
+                lambda: self.pt_render(namespace, **options), response)
+        s = self.pt_render(namespace, **options)
         if not response.getHeader("Content-Type"):
             response.setHeader("Content-Type", self.content_type)
         return s
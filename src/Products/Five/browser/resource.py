@@ -20,6 +20,7 @@ from six.moves.urllib.parse import unquote
 
 import zope.browserresource.directory
 import zope.browserresource.file
+from App.StaticAsset import getStaticAsset
 from Products.Five.browser import BrowserView
 from zope.browserresource.file import File
 from zope.interface import implementer
@@ -72,8 +73,66 @@ class PageTemplateResource(Resource, BrowserView):
         return pt(self.request)
 
 
+class StaticFile(File):
+    """A file on the file system.
+
+    Unlike ``zope.browserresource.file.File`` it does not keep the data
+    itself but uses the shared ``App.StaticAsset.StaticAsset`` for the
+    path, so it is cheap to create for each request.
+    """
+
+    def __init__(self, path, name):
+        self.path = path
+        self.__name__ = name
+        # Compute the content hash at startup
+        getStaticAsset(path)
+
+    @property
+    def asset(self):
+        return getStaticAsset(self.path)
+
+    @property
+    def content_type(self):
+        return self.asset.content_type
+
+    @property
+    def lmt(self):
+        return self.asset.lmt
+
+    @property
+    def lmh(self):
+        return self.asset.lmh
+
+    @property
+    def data(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
 class FileResource(Resource, zope.browserresource.file.FileResource):
-    pass
+
+    def _asset(self):
+        file = self.chooseContext()
+        asset = getattr(file, 'asset', None)
+        if asset is None:
+            asset = getStaticAsset(file.path, file.content_type)
+        return asset
+
+    def GET(self):
+        """Return the file data for GET requests."""
+        return self._asset().serve(
+            self.request, self.request.response, self.cacheTimeout)
+
+    def HEAD(self):
+        """Set the headers for HEAD requests."""
+        return self._asset().serve(
+            self.request, self.request.response, self.cacheTimeout,
+            head=True)
+
+    def fingerprintURL(self):
+        """Return the URL of the resource including the fingerprint of
+        the file, browsers cache it forever."""
+        return self._asset().fingerprintURL(self())
 
 
 class ResourceFactory(object):
@@ -111,14 +170,14 @@ class PageTemplateResourceFactory(ResourceFactory):
 class FileResourceFactory(ResourceFactory):
     """A factory for File resources"""
 
-    factory = File
+    factory = StaticFile
     resource = FileResource
 
 
 class ImageResourceFactory(ResourceFactory):
     """A factory for Image resources"""
 
-    factory = File
+    factory = StaticFile
     resource = FileResource
 
 
@@ -145,6 +145,27 @@ class ViewPageTemplateFileTests(unittest.TestCase):
         vptf(view)
         self.assertEqual(response._headers['Content-Type'], 'text/xhtml')
 
+    def test___call___streaming(self):
+        from Products.PageTemplates.streaming import TemplateStream
+        from ZPublisher.HTTPResponse import WSGIResponse
+        request = DummyPublishingRequest()
+        response = request.response = WSGIResponse()
+        view = request['PUBLISHED'] = self._makeView(request=request)
+        vptf = self._getTargetClass()('templates/dirpage1.pt', streaming=True)
+        body = vptf(view)
+        self.assertIsInstance(body, TemplateStream)
+        self.assertEqual(b''.join(body), DIRPAGE1.encode('utf-8'))
+        self.assertEqual(response.getHeader('Content-Type'),
+                         'text/html; charset=utf-8')
+
+    def test___call___streaming_not_published(self):
+        from ZPublisher.HTTPResponse import WSGIResponse
+        request = DummyPublishingRequest()
+        request.response = WSGIResponse()
+        view = self._makeView(request=request)
+        vptf = self._getTargetClass()('templates/dirpage1.pt', streaming=True)
+        self.assertEqual(vptf(view), DIRPAGE1)
+
     def test___get___(self):
         from Products.Five.browser.pagetemplatefile import BoundPageTemplate
         template = self._makeOne('templates/dirpage1.pt')
@@ -276,6 +297,10 @@ class DummyRequest(object):
     debug = object()
 
 
+class DummyPublishingRequest(dict):
+    debug = object()
+
+
 class DummyResponse(object):
     def __init__(self, headers=None):
         if headers is None:
@@ -11,12 +11,15 @@
 #
 ##############################################################################
 
+import OFS.BTreeFolder
 import OFS.DTMLDocument
 import OFS.DTMLMethod
 import OFS.Folder
 import OFS.Image
 import OFS.OrderedFolder
 import OFS.PropertySheets
+import OFS.RAMCacheManager
+import OFS.SharedCacheManager
 import OFS.userfolder
 from AccessControl.Permissions import add_documents_images_and_files
 from AccessControl.Permissions import add_folders
@@ -72,6 +75,38 @@ def initialize(context):
         legacy=(OFS.OrderedFolder.manage_addOrderedFolder,),
     )
 
+    context.registerClass(
+        OFS.OrderedFolder.OrderedBTreeFolder,
+        permission=add_folders,
+        constructors=(OFS.OrderedFolder.manage_addOrderedBTreeFolderForm,
+                      OFS.OrderedFolder.manage_addOrderedBTreeFolder),
+        legacy=(OFS.OrderedFolder.manage_addOrderedBTreeFolder,),
+    )
+
+    context.registerClass(
+        OFS.BTreeFolder.BTreeFolder,
+        permission=add_folders,
+        constructors=(OFS.BTreeFolder.manage_addBTreeFolderForm,
+                      OFS.BTreeFolder.manage_addBTreeFolder),
+        legacy=(OFS.BTreeFolder.manage_addBTreeFolder,),
+    )
+
+    context.registerClass(
+        OFS.RAMCacheManager.RAMCacheManager,
+        permission='Add Memory Cache Managers',
+        constructors=(OFS.RAMCacheManager.manage_addRAMCacheManagerForm,
+                      OFS.RAMCacheManager.manage_addRAMCacheManager),
+        legacy=(OFS.RAMCacheManager.manage_addRAMCacheManager,),
+    )
+
+    context.registerClass(
+        OFS.SharedCacheManager.SharedCacheManager,
+        permission='Add Shared Cache Managers',
+        constructors=(OFS.SharedCacheManager.manage_addSharedCacheManagerForm,
+                      OFS.SharedCacheManager.manage_addSharedCacheManager),
+        legacy=(OFS.SharedCacheManager.manage_addSharedCacheManager,),
+    )
+
     context.registerClass(
         OFS.userfolder.UserFolder,
         constructors=(OFS.userfolder.manage_addUserFolder,),
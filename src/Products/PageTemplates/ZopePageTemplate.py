@@ -38,6 +38,8 @@ from Products.PageTemplates.Expressions import SecureModuleImporter
 from Products.PageTemplates.PageTemplate import PageTemplate
 from Products.PageTemplates.PageTemplateFile import PageTemplateFile
 from Products.PageTemplates.PageTemplateFile import guess_type
+from Products.PageTemplates.streaming import canStream
+from Products.PageTemplates.streaming import renderStream
 from Products.PageTemplates.utils import convertToUnicode
 from Shared.DC.Scripts.Script import Script
 from Shared.DC.Scripts.Signature import FuncCode
@@ -76,6 +78,9 @@ class ZopePageTemplate(Script, PageTemplate, Cacheable,
     meta_type = 'Page Template'
     zmi_icon = 'far fa-file-code'
     output_encoding = 'utf-8'  # provide default for old instances
+    # Stream the output to the response when published, see
+    # Products.PageTemplates.streaming.
+    streaming = False
 
     __code__ = FuncCode((), 0)
     __defaults__ = None
@@ -96,6 +101,7 @@ class ZopePageTemplate(Script, PageTemplate, Cacheable,
         {'id': 'content_type', 'type': 'string', 'mode': 'w'},
         {'id': 'output_encoding', 'type': 'string', 'mode': 'w'},
         {'id': 'expand', 'type': 'boolean', 'mode': 'w'},
+        {'id': 'streaming', 'type': 'boolean', 'mode': 'w'},
     )
 
     security = ClassSecurityInfo()
@@ -271,6 +277,11 @@ class ZopePageTemplate(Script, PageTemplate, Cacheable,
         security.addContext(self)
 
         try:
+            if self.streaming and keyset is None and \
+               canStream(request, self):
+                return renderStream(
+                    lambda: self.pt_render(extra_context=bound_names),
+                    request.response)
             result = self.pt_render(extra_context=bound_names)
             if keyset is not None:
                 # Store the result in the cache.
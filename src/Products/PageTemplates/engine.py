@@ -1,6 +1,11 @@
+import ast
 import logging
 import re
+from collections import OrderedDict
+from threading import Lock
 
+from chameleon.astutil import Builtin
+from chameleon.nodes import Module
 from chameleon.tal import RepeatDict
 from chameleon.tales import NotExpr
 from chameleon.tales import StringExpr
@@ -23,6 +28,9 @@ from .expression import NocallExpr
 from .expression import PathExpr
 from .expression import TrustedPathExpr
 from .expression import UntrustedPythonExpr
+from .fragments import FragmentCompiler
+from .fragments import FragmentProgram
+from .streaming import popStreamingOutput
 
 
 # Declare Chameleon's repeat dictionary public
@@ -40,6 +48,88 @@ re_match_pi = re.compile(r'<\?python([^\w].*?)\?>', re.DOTALL)
 logger = logging.getLogger('Products.PageTemplates')
 
 
+class ProgramCache(object):
+    """Keeps the size most recently cooked programs in memory.
+
+    Chameleon only reuses compiled templates if a cache directory is set
+    with the ``CHAMELEON_CACHE`` environment variable. Otherwise it
+    compiles a template again whenever it is cooked, for example when a
+    ``ZopePageTemplate`` is loaded again after the ZODB cache dropped it.
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self._lock = Lock()
+        self._programs = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            result = self._programs.pop(key, None)
+            if result is not None:
+                self._programs[key] = result
+            return result
+
+    def set(self, key, result):
+        with self._lock:
+            self._programs.pop(key, None)
+            self._programs[key] = result
+            while len(self._programs) > self.size:
+                self._programs.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._programs.clear()
+
+    def __len__(self):
+        return len(self._programs)
+
+
+program_cache = ProgramCache()
+
+
+class FragmentPageTemplate(ChameleonPageTemplate):
+    """Chameleon page template supporting ``tal:cache`` and streaming.
+
+    Chameleon keys the modules it stores in ``CHAMELEON_CACHE`` by the
+    name of the template class, so this class must not share its name
+    with Chameleon's own page template.
+    """
+
+    def output_stream_factory(self):
+        output = popStreamingOutput()
+        if output is None:
+            return ChameleonPageTemplate.output_stream_factory()
+        return output
+
+    def parse(self, body):
+        if self.literal_false:
+            default_marker = ast.Str(s="__default__")
+        else:
+            default_marker = Builtin("False")
+
+        return FragmentProgram(
+            body, self.mode, self.filename,
+            escape=True if self.mode == "xml" else False,
+            default_marker=default_marker,
+            boolean_attributes=self.boolean_attributes,
+            implicit_i18n_translate=self.implicit_i18n_translate,
+            implicit_i18n_attributes=self.implicit_i18n_attributes,
+            trim_attribute_space=self.trim_attribute_space,
+            enable_data_attributes=self.enable_data_attributes,
+            restricted_namespace=self.restricted_namespace,
+            tokenizer=self.tokenizer
+        )
+
+    def _compile(self, body, builtins):
+        program = self.parse(body)
+        module = Module("initialize", program)
+        compiler = FragmentCompiler(
+            self.engine, module, self.filename, body,
+            builtins, strict=self.strict
+        )
+        return compiler.code
+
+
 @implementer(IPageTemplateProgram)
 @provider(IPageTemplateEngine)
 class Program(object):
@@ -89,7 +179,17 @@ class Program(object):
 
     @classmethod
     def cook(cls, source_file, text, engine, content_type):
-        if engine is getEngine():
+        secure = engine is getEngine()
+        key = (cls, source_file, secure, text)
+        result = program_cache.get(key)
+        if result is None:
+            result = cls._cook(source_file, text, secure)
+            program_cache.set(key, result)
+        return result
+
+    @classmethod
+    def _cook(cls, source_file, text, secure):
+        if secure:
             def sanitize(m):
                 match = m.group(1)
                 logger.info(
@@ -118,9 +218,9 @@ class Program(object):
 
         if source_file is None:
             # Default to '<string>'
-            source_file = ChameleonPageTemplate.filename
+            source_file = FragmentPageTemplate.filename
 
-        template = ChameleonPageTemplate(
+        template = FragmentPageTemplate(
             text, filename=source_file, keep_body=True,
             expression_types=expression_types,
             encoding='utf-8', extra_builtins=cls.extra_builtins,
@@ -1,8 +1,10 @@
+import ast
 from ast import NodeTransformer
 from ast import parse
 
 from chameleon.astutil import Static
 from chameleon.astutil import Symbol
+from chameleon.astutil import load
 from chameleon.codegen import template
 from six import class_types
 
@@ -11,7 +13,10 @@ from AccessControl.ZopeGuards import guarded_getattr
 from AccessControl.ZopeGuards import guarded_getitem
 from AccessControl.ZopeGuards import guarded_iter
 from AccessControl.ZopeGuards import protected_inplacevar
+from Acquisition import aq_base
+from OFS import bbb
 from OFS.interfaces import ITraversable
+from OFS.Traversable import Traversable
 from Products.PageTemplates.Expressions import render
 from RestrictedPython import RestrictingNodeTransformer
 from RestrictedPython.Utilities import utility_builtins
@@ -20,6 +25,9 @@ from zExceptions import NotFound
 from zExceptions import Unauthorized
 from zope.traversing.adapters import traversePathElement
 from zope.traversing.interfaces import TraversalError
+from ZPublisher.BaseRequest import hasBoboTraverse
+from ZPublisher.validation import getGuardedGetattr
+from ZPublisher.validation import getValidator
 
 
 _marker = object()
@@ -103,6 +111,117 @@ class TrustedBoboAwareZopeTraverse(BoboAwareZopeTraverse):
         return base
 
 
+def isPlainName(name):
+    """Check if ``OFS.Traversable`` looks up name as an attribute or item.
+
+    Other names go up to the parent or into a namespace.
+    """
+    return bool(name) and name[0] not in '_@+' and name != '..'
+
+
+_plain_classes = {}
+
+
+def hasPlainTraversal(klass):
+    """Check if the instances of klass use the traversal methods of
+    ``OFS.Traversable``, cached per class.
+    """
+    try:
+        return _plain_classes[klass]
+    except KeyError:
+        result = _plain_classes[klass] = (
+            getattr(klass, 'unrestrictedTraverse', None)
+            is Traversable.unrestrictedTraverse
+            and getattr(klass, 'restrictedTraverse', None)
+            is Traversable.restrictedTraverse
+        )
+        return result
+    except TypeError:  # unhashable class
+        return False
+
+
+def _getNullResource():
+    if bbb.HAS_ZSERVER:
+        from webdav.NullResource import NullResource
+        return NullResource
+    return bbb.NullResource
+
+
+def traversePlainName(obj, name, restricted):
+    """Traverse from obj to the attribute or item name.
+
+    This does what ``OFS.Traversable.unrestrictedTraverse`` does for a
+    plain name of an object without ``__bobo_traverse__``, as long as
+    it finds an attribute or item. Returns ``_marker`` if it does not,
+    traversal then has to look for views and acquired attributes.
+    """
+    if getattr(aq_base(obj), name, _marker) is not _marker:
+        try:
+            if restricted:
+                return getGuardedGetattr()(obj, name)
+            return getattr(obj, name)
+        except AttributeError:
+            return _marker
+    try:
+        next = obj[name]
+    except (AttributeError, TypeError, KeyError, NotFound):
+        return _marker
+    NullResource = _getNullResource()
+    if NullResource is not None and isinstance(next, NullResource):
+        return _marker
+    if restricted and not getValidator()(obj, obj, None, next):
+        raise Unauthorized(name)
+    return next
+
+
+class SpecializedZopeTraverse(BoboAwareZopeTraverse):
+    """Traverses the path of one path expression.
+
+    Path expressions without interpolation get a traverser of their own
+    when the template is compiled. It knows which segments are plain
+    names and traverses those with ``traversePlainName`` instead of
+    ``restrictedTraverse``, if the object uses the traversal methods of
+    ``OFS.Traversable`` and has no ``__bobo_traverse__``. All other
+    segments take the generic path.
+    """
+
+    restricted = True
+
+    __slots__ = ('plain',)
+
+    def __init__(self, path_items):
+        self.plain = tuple(isPlainName(name) for name in path_items)
+
+    def traverse(self, base, request, path_items):
+        plain = self.plain
+        method = self.traverse_method
+        for i, name in enumerate(path_items):
+            if ITraversable.providedBy(base):
+                next = _marker
+                if (
+                    plain[i]
+                    and hasPlainTraversal(aq_base(base).__class__)
+                    and not hasBoboTraverse(base)
+                ):
+                    next = traversePlainName(base, name, self.restricted)
+                if next is _marker:
+                    next = getattr(base, method)(name)
+                base = next
+            else:
+                base = traversePathElement(
+                    base, name, path_items[i + 1:], request=request
+                )
+        return base
+
+
+class TrustedSpecializedZopeTraverse(SpecializedZopeTraverse,
+                                     TrustedBoboAwareZopeTraverse):
+
+    restricted = False
+
+    __slots__ = ()
+
+
 class PathExpr(expressions.PathExpr):
     exceptions = zope2_exceptions
 
@@ -110,12 +229,47 @@ class PathExpr(expressions.PathExpr):
         "cls()", cls=Symbol(BoboAwareZopeTraverse), mode="eval"
     ))
 
+    specialized_traverser = SpecializedZopeTraverse
+
+    def translate(self, string, target):
+        match = self.path_regex.match(string.strip())
+        if match is not None:
+            nocall, path = match.groups()
+            parts = str(path).split("/")
+            names = parts[1:]
+            if names and not any(self.interpolation_regex.search(name)
+                                 for name in names):
+                return self._translateSpecialized(parts[0], names, nocall,
+                                                  target)
+        return super(PathExpr, self).translate(string, target)
+
+    def _translateSpecialized(self, base, names, nocall, target):
+        def path_items():
+            return ast.Tuple(elts=[ast.Str(name) for name in names],
+                             ctx=ast.Load())
+
+        traverser = Static(template(
+            "cls(path_items)", cls=Symbol(self.specialized_traverser),
+            path_items=path_items(), mode="eval"
+        ))
+        call = template(
+            "traverse(base, econtext, call, path_items)",
+            traverse=traverser,
+            base=load(base),
+            call=load(str(not nocall)),
+            path_items=path_items(),
+            mode="eval",
+        )
+        return template("target = value", target=target, value=call)
+
 
 class TrustedPathExpr(PathExpr):
     traverser = Static(template(
         "cls()", cls=Symbol(TrustedBoboAwareZopeTraverse), mode="eval"
     ))
 
+    specialized_traverser = TrustedSpecializedZopeTraverse
+
 
 class NocallExpr(expressions.NocallExpr, PathExpr):
     pass
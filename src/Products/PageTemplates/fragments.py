@@ -0,0 +1,279 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Caching of template fragments with ``tal:cache``.
+
+An element with a ``tal:cache`` attribute is rendered once and its output
+is then taken from the ``IFragmentCache`` utility, until it expires::
+
+  <ul tal:cache="key context/absolute_url; ttl 300; vary Accept-Language">
+    ...
+  </ul>
+
+The attribute has up to three semicolon separated clauses:
+
+key EXPRESSION -- an expression whose value is part of the key, like the
+                  URL of the context or the id of the user. Without it
+                  the fragment is the same for everybody.
+
+ttl SECONDS    -- the number of seconds the output is used, 0 for no
+                  limit. The cache has a default.
+
+vary HEADERS   -- names of request headers whose values are part of the
+                  key.
+
+The template, its source and the position of the element are always part
+of the key, so editing a template invalidates its fragments. The
+attribute is evaluated before all other attributes of the element, it
+can only use variables defined on enclosing elements. Nothing restricts
+who sees a cached fragment: fragments which depend on the user or their
+permissions must have them in their key.
+"""
+
+import ast
+import time
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+
+from chameleon import nodes
+from chameleon.astutil import Symbol
+from chameleon.astutil import load
+from chameleon.astutil import store
+from chameleon.codegen import template
+from chameleon.compiler import Compiler
+from chameleon.exc import LanguageError
+from chameleon.namespaces import TAL_NS
+from chameleon.tal import split_parts
+from chameleon.zpt.program import MacroProgram
+from six import text_type
+
+from OFS.RAMCacheManager import cacheKeyValue
+from Products.PageTemplates.interfaces import IFragmentCache
+from Products.PageTemplates.streaming import holdStream
+from Products.PageTemplates.streaming import releaseStream
+from zope.component import queryUtility
+from zope.interface import implementer
+
+
+class CacheFragment(nodes.Node):
+    """Render node or take its output from the fragment cache."""
+
+    _fields = 'fragment', 'key', 'ttl', 'vary', 'node'
+
+
+def parseCacheClause(clause):
+    """Return the key expression, TTL and header names of clause."""
+    key = ttl = None
+    vary = ()
+    for part in split_parts(clause):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            keyword, value = part.split(None, 1)
+        except ValueError:
+            raise LanguageError('Bad cache clause.', part)
+        value = value.strip()
+        if keyword == 'key':
+            key = value
+        elif keyword == 'ttl':
+            try:
+                ttl = int(value)
+            except ValueError:
+                raise LanguageError('Bad cache TTL.', value)
+        elif keyword == 'vary':
+            vary = tuple(str(name) for name in value.split())
+        else:
+            raise LanguageError('Bad cache clause.', part)
+    return key, ttl, vary
+
+
+class FragmentProgram(MacroProgram):
+    """Page template program supporting ``tal:cache``."""
+
+    def __init__(self, source, mode='xml', filename=None, **kwargs):
+        digest = sha1(source.encode('utf-8', 'ignore')).hexdigest()
+        self._fragment_prefix = '%s:%s' % (filename, digest[:12])
+        super(FragmentProgram, self).__init__(
+            source, mode, filename, **kwargs)
+
+    def visit_element(self, start, end, children):
+        ns = start['ns_attrs']
+        clause = ns.get((TAL_NS, 'cache'))
+        if clause is None:
+            return super(FragmentProgram, self).visit_element(
+                start, end, children)
+        # The namespaced attributes are in the order of the attributes.
+        index = list(ns).index((TAL_NS, 'cache'))
+        ns = OrderedDict(ns)
+        del ns[TAL_NS, 'cache']
+        attrs = list(start['attrs'])
+        del attrs[index]
+        start = dict(start, ns_attrs=ns, attrs=attrs)
+        node = super(FragmentProgram, self).visit_element(
+            start, end, children)
+        key, ttl, vary = parseCacheClause(clause)
+        return CacheFragment(
+            '%s:%d' % (self._fragment_prefix, getattr(clause, 'pos', 0)),
+            None if key is None else nodes.Value(key),
+            ttl, vary, node)
+
+
+class FragmentCompiler(Compiler):
+    """Compiler for the nodes of ``FragmentProgram``.
+
+    The output of ``tal:on-error`` and ``tal:cache`` elements is held
+    back from streaming until the element is complete.
+    """
+
+    def visit_FragmentProgram(self, node):
+        return self.visit_MacroProgram(node)
+
+    def visit_OnError(self, node):
+        mark = '__on_error_hold_%d' % id(node)
+        body = template('MARK = hold(__stream)',
+                        MARK=store(mark), hold=Symbol(holdStream))
+        body += super(FragmentCompiler, self).visit_OnError(node)
+        body += template('release(__stream, MARK)',
+                         MARK=load(mark), release=Symbol(releaseStream))
+        return body
+
+    def visit_CacheFragment(self, node):
+        suffix = node.fragment.rsplit(':', 1)[-1]
+        key = '__fragment_key_%s' % suffix
+        fragment = '__fragment_%s' % suffix
+        start = '__fragment_start_%s' % suffix
+
+        if node.key is None:
+            body = template('KEY = None', KEY=store(key))
+        else:
+            body = self._engine(node.key, store(key))
+        body += template(
+            'FRAGMENT = get(econtext, ID, KEY, VARY, TTL)',
+            FRAGMENT=store(fragment),
+            get=Symbol(getFragment),
+            ID=ast.Str(s=node.fragment),
+            KEY=load(key),
+            VARY=ast.Tuple(elts=[ast.Str(s=name) for name in node.vary],
+                           ctx=ast.Load()),
+            TTL=load('None') if node.ttl is None else ast.Num(n=node.ttl),
+        )
+        render = template('START = hold(__stream)',
+                          START=store(start), hold=Symbol(holdStream))
+        render += self.visit(node.node)
+        render += template(
+            'if FRAGMENT is not None: FRAGMENT.set(__stream, START)',
+            FRAGMENT=load(fragment), START=load(start))
+        render += template('release(__stream, START)',
+                           START=load(start), release=Symbol(releaseStream))
+        body.append(ast.If(
+            test=template('FRAGMENT is not None and FRAGMENT.text is not None',
+                          FRAGMENT=load(fragment), mode='eval'),
+            body=template('__append(FRAGMENT.text)',
+                          FRAGMENT=load(fragment)),
+            orelse=render,
+        ))
+        return body
+
+
+class Fragment(object):
+    """A fragment of a template being rendered."""
+
+    def __init__(self, cache, key, ttl):
+        self.cache = cache
+        self.key = key
+        self.ttl = ttl
+        self.text = cache.get(key)
+
+    def set(self, stream, start):
+        """Cache the output written to stream from start on."""
+        self.cache.set(self.key, u''.join(stream[start:]), self.ttl)
+
+
+def getFragment(econtext, fragment, key, vary, ttl):
+    """Return the Fragment for the arguments, None if there is no
+    fragment cache.
+    """
+    cache = queryUtility(IFragmentCache)
+    if cache is None:
+        return None
+    if vary:
+        request = econtext.get('request')
+        getHeader = getattr(request, 'getHeader', None)
+        if getHeader is None:
+            vary = tuple(None for name in vary)
+        else:
+            vary = tuple(getHeader(name) for name in vary)
+    try:
+        key = cacheKeyValue(key)
+    except TypeError:
+        # Not cached, the key would not identify the value.
+        return None
+    return Fragment(cache, (fragment, key, vary), ttl)
+
+
+@implementer(IFragmentCache)
+class RAMFragmentCache(object):
+    """Keeps the max_entries most recently used fragments in memory,
+    up to max_bytes characters.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=10 * 1024 * 1024,
+                 default_ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = Lock()
+        # key -> (text, expires)
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[1] and entry[1] < time.time():
+                self.bytes -= len(entry[0])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, text, ttl=None):
+        if not isinstance(text, text_type) or len(text) > self.max_bytes:
+            return
+        if ttl is None:
+            ttl = self.default_ttl
+        expires = time.time() + ttl if ttl else 0
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0])
+            self._entries[key] = (text, expires)
+            self.bytes += len(text)
+            while (len(self._entries) > self.max_entries
+                   or self.bytes > self.max_bytes):
+                old_key, old = self._entries.popitem(last=False)
+                self.bytes -= len(old[0])
+                self.evictions += 1
+
+    def invalidateAll(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
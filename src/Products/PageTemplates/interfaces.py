@@ -27,3 +27,23 @@ class IUnicodeEncodingConflictResolver(Interface):
             'expression' is the original expression (can be used for
             logging purposes)
         """
+
+
+class IFragmentCache(Interface):
+    """ A utility storing the output of template fragments marked with
+       ``tal:cache``
+    """
+
+    def get(key):
+        """ Returns the text cached for 'key', or None.
+        """
+
+    def set(key, text, ttl=None):
+        """ Caches 'text' for 'key'.
+            'ttl' is the number of seconds the text may be used, None for
+            the default of the cache and 0 for no limit.
+        """
+
+    def invalidateAll():
+        """ Removes all cached text.
+        """
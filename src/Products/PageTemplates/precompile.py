@@ -0,0 +1,116 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Compile the page templates of a Zope instance ahead of time.
+
+Chameleon writes compiled templates to the directory set with the
+``CHAMELEON_CACHE`` environment variable, keyed by a hash of their
+source, and all processes using that directory load them from there
+instead of compiling them again. Compiling all templates after a deploy,
+with ``zconsole precompile etc/zope.conf``, spares the first requests
+after a restart the compilation.
+"""
+
+import logging
+import sys
+
+from zope.component import getGlobalSiteManager
+from zope.pagetemplate.pagetemplate import PageTemplate
+
+
+logger = logging.getLogger('Products.PageTemplates')
+
+
+def _isFileTemplate(ob):
+    if not isinstance(ob, PageTemplate):
+        return False
+    return getattr(ob, 'filename', None) is not None
+
+
+def _collect(values, templates, seen):
+    for value in values:
+        if isinstance(value, type):
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+            _collect(list(vars(value).values()), templates, seen)
+        elif _isFileTemplate(value) and id(value) not in seen:
+            seen.add(id(value))
+            templates.append(value)
+
+
+def findFileTemplates():
+    """Return the filesystem templates, like ``PageTemplateFile`` and
+    ``ViewPageTemplateFile``, of the imported modules and of the classes
+    of the registered views.
+    """
+    templates = []
+    seen = set()
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if namespace is not None:
+            _collect(list(namespace.values()), templates, seen)
+    gsm = getGlobalSiteManager()
+    factories = [registration.factory
+                 for registration in gsm.registeredAdapters()]
+    for factory in factories:
+        if isinstance(factory, type):
+            _collect([klass for klass in factory.__mro__
+                      if klass is not object], templates, seen)
+    return templates
+
+
+def precompileFileTemplates(templates=None):
+    """Cook templates, by default all filesystem templates.
+
+    Returns the number of templates cooked and the number of templates
+    which failed to compile.
+    """
+    if templates is None:
+        templates = findFileTemplates()
+    cooked = failed = 0
+    for template in templates:
+        try:
+            template._cook_check()
+        except Exception:
+            logger.exception('Cannot compile %s', template.filename)
+            failed += 1
+            continue
+        if template._v_errors:
+            logger.warning('Cannot compile %s: %s', template.filename,
+                           '\n'.join(template._v_errors))
+            failed += 1
+        else:
+            cooked += 1
+    return cooked, failed
+
+
+def precompileObjects(root):
+    """Cook the ``ZopePageTemplate`` objects in and below root.
+
+    Returns the number of templates cooked and the number of templates
+    which failed to compile.
+    """
+    counts = [0, 0]
+
+    def cook(template, path):
+        template._cook()
+        if template._v_errors:
+            logger.warning('Cannot compile %s: %s', path,
+                           '\n'.join(template._v_errors))
+            counts[1] += 1
+        else:
+            counts[0] += 1
+
+    root.ZopeFindAndApply(root, obj_metatypes=['Page Template'],
+                          search_sub=1, apply_func=cook)
+    return tuple(counts)
@@ -0,0 +1,229 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Streaming the output of templates to the response.
+
+A template which is published and has streaming enabled (the
+``streaming`` property of ``ZopePageTemplate``, the ``streaming``
+argument of ``ViewPageTemplateFile``) returns its output as a
+``TemplateStream`` of encoded chunks instead of as one string, which
+the ``WSGIResponse`` publishes as an ``IUnboundStreamIterator``.
+
+The template is still rendered while the request is published, because
+rendering reads the object database and checks permissions. If the
+``response-streaming`` option is enabled, each chunk is passed to
+``RESPONSE.write`` as soon as it is rendered, so the client receives
+the start of the page while the rest is being rendered. Otherwise the
+chunks are sent after the transaction has been committed, which still
+avoids joining, encoding and measuring the page as a whole.
+
+Errors are handled like those of other streamed responses: as long as
+no chunk has been written, the request is retried after conflict errors
+and an error page is shown. Once the first chunk has been written, the
+exception is passed on to the WSGI server, which aborts the connection,
+so the client receives a truncated page. Output in elements with
+``tal:on-error`` or ``tal:cache`` is held back until the element is
+complete, because these replace or record it.
+"""
+
+from collections import deque
+from threading import local
+
+from Acquisition import aq_base
+from zope.interface import implementer
+from ZPublisher.Iterators import IUnboundStreamIterator
+
+
+# Number of pieces of output (texts, tags, values) rendered before they
+# are written as a chunk.
+CHUNK_SIZE = 1 << 12
+
+_pending = local()
+
+
+@implementer(IUnboundStreamIterator)
+class TemplateStream(object):
+    """The encoded output of a template which was not written yet."""
+
+    def __init__(self, chunks=()):
+        self._chunks = deque(chunks)
+
+    def append(self, data):
+        self._chunks.append(data)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self._chunks.popleft()
+        except IndexError:
+            raise StopIteration
+
+    next = __next__
+
+
+class StreamingOutput(list):
+    """Output stream of a template which passes its content on to write
+    in encoded chunks while the template is being rendered.
+
+    Positions are counted from the start of the output, including the
+    chunks already written. Content after a position which is held (see
+    ``holdStream``) is not written until the position is released.
+    """
+
+    def __init__(self, write, encode, chunk_size=CHUNK_SIZE):
+        super(StreamingOutput, self).__init__()
+        self.write = write
+        self.encode = encode
+        self.chunk_size = chunk_size
+        # number of items written
+        self.offset = 0
+        # number of items at which to flush next
+        self.limit = chunk_size
+        # held positions, in ascending order
+        self.holds = []
+
+    def append(self, text, _append=list.append, _len=list.__len__):
+        # Called for each piece of output, so kept short.
+        _append(self, text)
+        if _len(self) >= self.limit:
+            self.flush()
+
+    def flush(self):
+        """Write the content up to the first held position."""
+        end = list.__len__(self)
+        if self.holds:
+            end = min(end, self.holds[0] - self.offset)
+        if end > 0:
+            text = u''.join(list.__getitem__(self, slice(0, end)))
+            list.__delitem__(self, slice(0, end))
+            self.offset += end
+            self.write(self.encode(text))
+        self.limit = list.__len__(self) + self.chunk_size
+
+    def hold(self):
+        position = len(self)
+        self.holds.append(position)
+        return position
+
+    def release(self, position):
+        holds = self.holds
+        while holds and holds[-1] >= position:
+            holds.pop()
+        # The content may have been taken back while held.
+        self.limit = min(self.limit, list.__len__(self) + self.chunk_size)
+
+    def __len__(self):
+        return self.offset + list.__len__(self)
+
+    def _position(self, position):
+        if position is None or position < 0:
+            return position
+        if position < self.offset:
+            raise IndexError('The output was already written.')
+        return position - self.offset
+
+    def _index(self, index):
+        if isinstance(index, slice):
+            return slice(self._position(index.start),
+                         self._position(index.stop), index.step)
+        return self._position(index)
+
+    def __getitem__(self, index):
+        return list.__getitem__(self, self._index(index))
+
+    def __delitem__(self, index):
+        list.__delitem__(self, self._index(index))
+
+    # Python 2 passes slices without steps to these
+    def __getslice__(self, start, stop):
+        return self.__getitem__(slice(start, stop))
+
+    def __delslice__(self, start, stop):
+        self.__delitem__(slice(start, stop))
+
+
+def holdStream(stream):
+    """Return the length of stream and hold it there, so the content
+    from there on can still be taken back.
+    """
+    hold = getattr(stream, 'hold', None)
+    if hold is None:
+        return len(stream)
+    return hold()
+
+
+def releaseStream(stream, position):
+    """Release the holds of stream from position on."""
+    release = getattr(stream, 'release', None)
+    if release is not None:
+        release(position)
+
+
+def popStreamingOutput():
+    """Return the output stream for the template being streamed, or None.
+    """
+    output = getattr(_pending, 'output', None)
+    _pending.output = None
+    return output
+
+
+def canStream(request, published):
+    """Return True if the output of a template rendered for published can
+    be streamed to the response of request.
+    """
+    if request is None:
+        return False
+    if getattr(request.response, 'streamsWrites', None) is None:
+        return False
+    return aq_base(request.get('PUBLISHED', None)) is aq_base(published)
+
+
+class _Encoder(object):
+
+    def __init__(self, response):
+        self.response = response
+        self.first = True
+
+    def __call__(self, text):
+        if self.first:
+            # Fixes the encoding of the XML declaration.
+            self.first = False
+            return self.response._encode_unicode(text)
+        return text.encode(self.response.charset, 'replace')
+
+
+def renderStream(render, response, chunk_size=None):
+    """Call render to render a template and return its output as a
+    ``TemplateStream``.
+
+    If response passes written data to the server right away, the chunks
+    rendered are written to it, the stream only contains the remainder.
+    """
+    result = TemplateStream()
+    if response.streamsWrites():
+        write = response.write
+    else:
+        write = result.append
+    encode = _Encoder(response)
+    output = StreamingOutput(
+        write, encode, CHUNK_SIZE if chunk_size is None else chunk_size)
+    _pending.output = output
+    try:
+        text = render()
+    finally:
+        _pending.output = None
+    if text:
+        # The remainder is sent after the transaction was committed.
+        result.append(encode(text))
+    return result
@@ -108,7 +108,58 @@ class TestPatches(Sandboxed, ZopeTestCase):
         self.assertIn('<i>bar</i><i>bar</i><i>bar</i>', output)
 
 
+class TestProgramCache(unittest.TestCase):
+
+    def setUp(self):
+        from Products.PageTemplates.engine import program_cache
+        program_cache.clear()
+        self.addCleanup(program_cache.clear)
+
+    def _cook(self, source_file, text, engine=None):
+        from Products.PageTemplates.engine import Program
+        from Products.PageTemplates.Expressions import getEngine
+        if engine is None:
+            engine = getEngine()
+        return Program.cook(source_file, text, engine, 'text/html')
+
+    def test_cook_reuses_program(self):
+        program, macros = self._cook('test', u'<p>Hello</p>')
+        self.assertIs(self._cook('test', u'<p>Hello</p>')[0], program)
+        self.assertIsNot(self._cook('test', u'<p>World</p>')[0], program)
+        self.assertIsNot(self._cook('other', u'<p>Hello</p>')[0], program)
+
+    def test_cook_engines(self):
+        from Products.PageTemplates.Expressions import \
+            createTrustedZopeEngine
+        from Products.PageTemplates.Expressions import getEngine
+        secure = self._cook('test', u'<p>Hello</p>', getEngine())[0]
+        trusted = self._cook('test', u'<p>Hello</p>',
+                             createTrustedZopeEngine())[0]
+        self.assertIsNot(secure, trusted)
+
+    def test_size(self):
+        from Products.PageTemplates.engine import ProgramCache
+        cache = ProgramCache(size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_digest_differs_from_chameleon(self):
+        from Products.PageTemplates.engine import FragmentPageTemplate
+        from z3c.pt.pagetemplate import PageTemplate
+        body = u'<p>Hello</p>'
+        self.assertNotEqual(
+            FragmentPageTemplate(body).digest(body, []),
+            PageTemplate(body).digest(body, []))
+
+
 def test_suite():
     return unittest.TestSuite((
         unittest.makeSuite(TestPatches),
+        unittest.makeSuite(TestProgramCache),
     ))
@@ -0,0 +1,141 @@
+import unittest
+
+from OFS.SimpleItem import SimpleItem
+from Products.PageTemplates import expression
+from Products.PageTemplates.ZopePageTemplate import manage_addPageTemplate
+from Testing.ZopeTestCase import ZopeTestCase
+from zExceptions import Unauthorized
+
+
+class Item(SimpleItem):
+
+    secret = 'secret'
+    secret__roles__ = ()
+
+    def __init__(self, id, title):
+        self.id = id
+        self.title = title
+
+
+class BoboItem(Item):
+
+    def __bobo_traverse__(self, request, name):
+        self.bobo_traversed = name
+        return getattr(self, name)
+
+
+class TraversingItem(Item):
+
+    def restrictedTraverse(self, path, default=None):
+        return 'traversed %s' % path
+
+
+class TestSpecializedTraverse(ZopeTestCase):
+
+    def afterSetUp(self):
+        from Zope2.App import zcml
+        import Products.PageTemplates
+        zcml.load_config("configure.zcml", Products.PageTemplates)
+        self.folder._setObject('item', Item('item', 'Item'))
+        self.folder._setObject('bobo', BoboItem('bobo', 'Bobo'))
+        self.folder._setObject('other', TraversingItem('other', 'Other'))
+        self.folder.acquired = 'acquired'
+
+        self.traversed = []
+        traversePlainName = expression.traversePlainName
+
+        def counting(obj, name, restricted):
+            self.traversed.append(name)
+            return traversePlainName(obj, name, restricted)
+
+        expression.traversePlainName = counting
+        self.addCleanup(setattr, expression, 'traversePlainName',
+                        traversePlainName)
+
+    def _render(self, source):
+        template = manage_addPageTemplate(self.folder, 'pt', text=source)
+        return template().strip()
+
+    def test_attribute(self):
+        self.assertEqual(self._render('<p tal:content="context/title" />'),
+                         '<p>%s</p>' % self.folder.title)
+        self.assertEqual(self.traversed, ['title'])
+
+    def test_item(self):
+        self.assertEqual(
+            self._render('<p tal:content="context/item/title" />'),
+            '<p>Item</p>')
+        self.assertEqual(self.traversed, ['item', 'title'])
+
+    def test_unauthorized(self):
+        with self.assertRaises(Unauthorized):
+            self._render('<p tal:content="context/item/secret" />')
+
+    def test_acquired(self):
+        self.assertEqual(
+            self._render('<p tal:content="context/item/acquired" />'),
+            '<p>acquired</p>')
+        self.assertEqual(self.traversed, ['item', 'acquired'])
+
+    def test_bobo_traverse(self):
+        self.assertEqual(
+            self._render('<p tal:content="context/bobo/title" />'),
+            '<p>Bobo</p>')
+        self.assertEqual(self.folder.bobo.bobo_traversed, 'title')
+        self.assertEqual(self.traversed, ['bobo'])
+
+    def test_traversal_method(self):
+        self.assertEqual(
+            self._render('<p tal:content="context/other/title" />'),
+            '<p>traversed title</p>')
+        self.assertEqual(self.traversed, ['other'])
+
+    def test_not_plain(self):
+        self.assertEqual(
+            self._render('<p tal:content="context/item/../title" />'),
+            '<p>%s</p>' % self.folder.title)
+        self.assertEqual(self.traversed, ['item', 'title'])
+
+    def test_interpolation(self):
+        self.assertEqual(
+            self._render('<p tal:define="name string:title"'
+                         '   tal:content="context/item/?name" />'),
+            '<p>Item</p>')
+        self.assertEqual(self.traversed, [])
+
+    def test_trusted(self):
+        from Products.PageTemplates.PageTemplate import PageTemplate
+        from Products.PageTemplates.Expressions import \
+            createTrustedZopeEngine
+
+        class TrustedTemplate(PageTemplate):
+
+            def pt_getEngine(self):
+                return createTrustedZopeEngine()
+
+        template = TrustedTemplate()
+        template.write('<p tal:content="context/item/secret" />')
+        self.assertEqual(template.pt_render(
+            extra_context={'context': self.folder}).strip(),
+            '<p>secret</p>')
+        self.assertEqual(self.traversed, ['item', 'secret'])
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_isPlainName(self):
+        self.assertTrue(expression.isPlainName('title'))
+        for name in ('', '_private', '..', '@@view', '++resource++foo'):
+            self.assertFalse(expression.isPlainName(name), name)
+
+    def test_hasPlainTraversal(self):
+        self.assertTrue(expression.hasPlainTraversal(Item))
+        self.assertFalse(expression.hasPlainTraversal(TraversingItem))
+        self.assertFalse(expression.hasPlainTraversal(dict))
+
+
+def test_suite():
+    return unittest.TestSuite((
+        unittest.makeSuite(TestSpecializedTraverse),
+        unittest.makeSuite(TestHelpers),
+    ))
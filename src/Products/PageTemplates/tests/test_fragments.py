@@ -0,0 +1,207 @@
+import unittest
+
+from AccessControl.class_init import InitializeClass
+from AccessControl.SecurityInfo import ClassSecurityInfo
+from OFS.SimpleItem import SimpleItem
+from Products.PageTemplates import fragments
+from Products.PageTemplates.interfaces import IFragmentCache
+from Products.PageTemplates.ZopePageTemplate import manage_addPageTemplate
+from Testing.ZopeTestCase import ZopeTestCase
+from zope.component import getGlobalSiteManager
+from zope.component import provideUtility
+
+
+class Counter(SimpleItem):
+
+    security = ClassSecurityInfo()
+
+    def __init__(self, id):
+        self.id = id
+        self.count = 0
+
+    @security.public
+    def next(self):
+        self.count += 1
+        return self.count
+
+
+InitializeClass(Counter)
+
+
+class RAMFragmentCacheTests(unittest.TestCase):
+
+    def _makeOne(self, **kw):
+        return fragments.RAMFragmentCache(**kw)
+
+    def test_interface(self):
+        from zope.interface.verify import verifyObject
+        verifyObject(IFragmentCache, self._makeOne())
+
+    def test_get_set(self):
+        cache = self._makeOne()
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', u'<p>a</p>')
+        self.assertEqual(cache.get('a'), u'<p>a</p>')
+        self.assertEqual((cache.hits, cache.misses, cache.bytes), (1, 1, 8))
+        cache.invalidateAll()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.bytes, 0)
+
+    def test_ttl(self):
+        cache = self._makeOne(default_ttl=10)
+        time = fragments.time.time
+        self.addCleanup(setattr, fragments.time, 'time', time)
+        fragments.time.time = lambda: 100.0
+        cache.set('default', u'a')
+        cache.set('short', u'b', 5)
+        cache.set('forever', u'c', 0)
+        fragments.time.time = lambda: 107.0
+        self.assertEqual(cache.get('default'), u'a')
+        self.assertIsNone(cache.get('short'))
+        fragments.time.time = lambda: 1000.0
+        self.assertIsNone(cache.get('default'))
+        self.assertEqual(cache.get('forever'), u'c')
+        self.assertEqual(cache.bytes, 1)
+
+    def test_eviction(self):
+        cache = self._makeOne(max_entries=2, max_bytes=10)
+        cache.set('a', u'aaa')
+        cache.set('b', u'bbb')
+        cache.get('a')
+        cache.set('c', u'ccc')
+        self.assertIsNone(cache.get('b'))
+        cache.set('d', u'dddddd')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('d'), u'dddddd')
+        self.assertEqual((cache.evictions, cache.bytes), (2, 9))
+        cache.set('e', u'e' * 11)
+        self.assertIsNone(cache.get('e'))
+
+
+class ParseCacheClauseTests(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(fragments.parseCacheClause(''), (None, None, ()))
+        self.assertEqual(
+            fragments.parseCacheClause(
+                'key string:a;; b; ttl 60; vary Accept-Language Cookie'),
+            ('string:a; b', 60, ('Accept-Language', 'Cookie')))
+
+    def test_errors(self):
+        from chameleon.exc import LanguageError
+        for clause in ('key', 'ttl soon', 'size 10'):
+            with self.assertRaises(LanguageError):
+                fragments.parseCacheClause(clause)
+
+
+class FragmentCacheTests(ZopeTestCase):
+
+    def afterSetUp(self):
+        from Zope2.App import zcml
+        import Products.PageTemplates
+        zcml.load_config('configure.zcml', Products.PageTemplates)
+        self.cache = fragments.RAMFragmentCache()
+        provideUtility(self.cache, IFragmentCache)
+        self.addCleanup(getGlobalSiteManager().unregisterUtility,
+                        self.cache, IFragmentCache)
+        self.folder._setObject('counter', Counter('counter'))
+
+    def _render(self, source, **kw):
+        template = manage_addPageTemplate(self.folder, 'pt', text=source)
+        result = template(**kw).strip()
+        self.folder._delObject('pt')
+        return result
+
+    def test_cache(self):
+        source = ('<div tal:cache="">${context/counter/next}</div>'
+                  '<p>${context/counter/next}</p>')
+        self.assertEqual(self._render(source), '<div>1</div><p>2</p>')
+        self.assertEqual(self._render(source), '<div>1</div><p>3</p>')
+
+    def test_changed_template(self):
+        self.assertEqual(
+            self._render('<p tal:cache="">${context/counter/next}</p>'),
+            '<p>1</p>')
+        self.assertEqual(
+            self._render('<p  tal:cache="">${context/counter/next}</p>'),
+            '<p>2</p>')
+
+    def test_key(self):
+        source = ('<p tal:cache="key python:options.get(\'key\'); ttl 0"'
+                  '   tal:content="context/counter/next" />')
+        self.assertEqual(self._render(source, key=1), '<p>1</p>')
+        self.assertEqual(self._render(source, key=2), '<p>2</p>')
+        self.assertEqual(self._render(source, key=1), '<p>1</p>')
+
+    def test_vary(self):
+        source = ('<p tal:cache="vary Accept-Language"'
+                  '   tal:content="context/counter/next" />')
+        request = self.app.REQUEST
+        request.environ['HTTP_ACCEPT_LANGUAGE'] = 'en'
+        self.assertEqual(self._render(source), '<p>1</p>')
+        request.environ['HTTP_ACCEPT_LANGUAGE'] = 'de'
+        self.assertEqual(self._render(source), '<p>2</p>')
+        self.assertEqual(self._render(source), '<p>2</p>')
+
+    def test_nested(self):
+        source = ('<div tal:cache="key python:options.get(\'key\')">'
+                  '<p tal:cache="">${context/counter/next}</p>'
+                  '${context/counter/next}</div>')
+        self.assertEqual(self._render(source, key=1),
+                         '<div><p>1</p>2</div>')
+        self.assertEqual(self._render(source, key=2),
+                         '<div><p>1</p>3</div>')
+
+    def test_key_user(self):
+        from AccessControl.SecurityManagement import getSecurityManager
+        from AccessControl.SecurityManagement import newSecurityManager
+        acl_users = self.folder.acl_users
+        acl_users._doAddUser('alice', 'secret', ['Manager'], [])
+        acl_users._doAddUser('bob', 'secret', ['Manager'], [])
+        self.addCleanup(newSecurityManager, None,
+                        getSecurityManager().getUser())
+        source = ('<p tal:cache="key user"'
+                  '   tal:content="context/counter/next" />')
+        for name, expected in (('alice', '<p>1</p>'), ('bob', '<p>2</p>'),
+                               ('alice', '<p>1</p>')):
+            user = acl_users.getUser(name).__of__(acl_users)
+            newSecurityManager(None, user)
+            self.assertEqual(self._render(source), expected)
+
+    def test_without_cache(self):
+        getGlobalSiteManager().unregisterUtility(self.cache, IFragmentCache)
+        source = '<p tal:cache="">${context/counter/next}</p>'
+        self.assertEqual(self._render(source), '<p>1</p>')
+        self.assertEqual(self._render(source), '<p>2</p>')
+
+    def test_error(self):
+        template = manage_addPageTemplate(
+            self.folder, 'pt', text='<p tal:cache="size 10" />')
+        self.assertIn('Bad cache clause.', '\n'.join(template._v_errors))
+
+    def test_trusted(self):
+        from Products.PageTemplates.Expressions import \
+            createTrustedZopeEngine
+        from Products.PageTemplates.PageTemplate import PageTemplate
+
+        class TrustedTemplate(PageTemplate):
+
+            def pt_getEngine(self):
+                return createTrustedZopeEngine()
+
+        template = TrustedTemplate()
+        template.write('<p tal:cache="key context/getId"'
+                       '   tal:content="context/counter/next" />')
+        for i in range(2):
+            self.assertEqual(template.pt_render(
+                extra_context={'context': self.folder}).strip(),
+                '<p>1</p>')
+
+
+def test_suite():
+    return unittest.TestSuite((
+        unittest.makeSuite(RAMFragmentCacheTests),
+        unittest.makeSuite(ParseCacheClauseTests),
+        unittest.makeSuite(FragmentCacheTests),
+    ))
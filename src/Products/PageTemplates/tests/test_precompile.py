@@ -0,0 +1,58 @@
+import os
+import unittest
+
+from Products.PageTemplates.PageTemplateFile import PageTemplateFile
+from Testing.ZopeTestCase import ZopeTestCase
+from Testing.ZopeTestCase.sandbox import Sandboxed
+
+
+path = os.path.dirname(__file__)
+
+module_template = PageTemplateFile(os.path.join(path, 'simple.pt'))
+
+
+class Templates(object):
+
+    class_template = PageTemplateFile(os.path.join(path, 'simple.pt'))
+
+
+class TestPrecompile(Sandboxed, ZopeTestCase):
+
+    def afterSetUp(self):
+        from Zope2.App import zcml
+        import Products.PageTemplates
+        zcml.load_config("configure.zcml", Products.PageTemplates)
+
+    def test_findFileTemplates(self):
+        from Products.PageTemplates.precompile import findFileTemplates
+        templates = findFileTemplates()
+        self.assertIn(module_template, templates)
+        self.assertIn(vars(Templates)['class_template'], templates)
+
+    def test_precompileFileTemplates(self):
+        from Products.PageTemplates.precompile import \
+            precompileFileTemplates
+        template = PageTemplateFile(os.path.join(path, 'simple.pt'))
+        broken = PageTemplateFile(os.path.join(path, 'simple.pt'))
+        broken.filename = os.path.join(path, 'nonexisting.pt')
+        self.assertEqual(precompileFileTemplates([template, broken]),
+                         (1, 1))
+        self.assertIsNotNone(template._v_program)
+
+    def test_precompileObjects(self):
+        from Products.PageTemplates.precompile import precompileObjects
+        from Products.PageTemplates.ZopePageTemplate import \
+            manage_addPageTemplate
+        with open(os.path.join(path, 'simple.pt')) as fd:
+            manage_addPageTemplate(self.folder, 'good', text=fd.read())
+        manage_addPageTemplate(self.folder, 'bad', text='<p tal:foo="">')
+        self.folder.good._v_program = None
+
+        self.assertEqual(precompileObjects(self.folder), (1, 1))
+        self.assertIsNotNone(self.folder.good._v_program)
+
+
+def test_suite():
+    return unittest.TestSuite((
+        unittest.makeSuite(TestPrecompile),
+    ))
@@ -0,0 +1,139 @@
+import unittest
+
+from Products.PageTemplates import streaming
+from Products.PageTemplates.ZopePageTemplate import manage_addPageTemplate
+from Testing.ZopeTestCase import ZopeTestCase
+from ZPublisher.HTTPResponse import WSGIResponse
+
+
+class StreamingOutputTests(unittest.TestCase):
+
+    def _makeOne(self, chunk_size=2):
+        self.written = []
+        return streaming.StreamingOutput(
+            self.written.append, lambda text: text.encode('utf-8'),
+            chunk_size)
+
+    def test_flush(self):
+        output = self._makeOne()
+        output.append(u'12345')
+        self.assertEqual(self.written, [])
+        output.append(u'67890')
+        output.append(u'a')
+        self.assertEqual(self.written, [b'1234567890'])
+        self.assertEqual(len(output), 3)
+        self.assertEqual(u''.join(output), u'a')
+
+    def test_hold(self):
+        output = self._makeOne()
+        output.append(u'12345')
+        self.assertEqual(streaming.holdStream(output), 1)
+        output.append(u'67890')
+        self.assertEqual(self.written, [b'12345'])
+        output.append(u'abcde')
+        output.append(u'fghij')
+        self.assertEqual(self.written, [b'12345'])
+        self.assertEqual(output[1:], [u'67890', u'abcde', u'fghij'])
+        del output[2:]
+        self.assertEqual(len(output), 2)
+        streaming.releaseStream(output, 1)
+        output.append(u'klmno')
+        self.assertEqual(self.written, [b'12345'])
+        output.append(u'pqrst')
+        self.assertEqual(self.written, [b'12345', b'67890klmnopqrst'])
+
+    def test_written_output(self):
+        output = self._makeOne(chunk_size=1)
+        output.append(u'1')
+        with self.assertRaises(IndexError):
+            del output[0:]
+
+    def test_plain_list(self):
+        stream = [u'a']
+        self.assertEqual(streaming.holdStream(stream), 1)
+        streaming.releaseStream(stream, 1)
+
+
+class TemplateStreamTests(unittest.TestCase):
+
+    def test_interface(self):
+        from zope.interface.verify import verifyObject
+        from ZPublisher.Iterators import IUnboundStreamIterator
+        verifyObject(IUnboundStreamIterator, streaming.TemplateStream())
+
+    def test_iteration(self):
+        stream = streaming.TemplateStream([b'a'])
+        stream.append(b'b')
+        self.assertEqual(list(stream), [b'a', b'b'])
+        self.assertEqual(list(stream), [])
+
+
+SOURCE = """\
+<p tal:repeat="i python:range(20)">row ${i}</p>
+<div tal:cache="">
+  <p tal:repeat="i python:range(20)">cached ${i}</p>
+</div>
+<p tal:condition="python:options.get('fail')">${python:1 / 0}</p>
+"""
+
+
+class ZopePageTemplateStreamingTests(ZopeTestCase):
+
+    def afterSetUp(self):
+        from Zope2.App import zcml
+        import Products.PageTemplates
+        zcml.load_config('configure.zcml', Products.PageTemplates)
+        self.template = manage_addPageTemplate(self.folder, 'pt', text=SOURCE)
+        self.expected = self.template().encode('utf-8')
+        self.template.streaming = True
+        self.request = self.app.REQUEST
+        self.response = self.request.response = WSGIResponse()
+        self.request['PUBLISHED'] = self.template
+        chunk_size = streaming.CHUNK_SIZE
+        self.addCleanup(setattr, streaming, 'CHUNK_SIZE', chunk_size)
+        streaming.CHUNK_SIZE = 10
+
+    def _startResponse(self):
+        self.written = []
+        self.response._start_response = \
+            lambda status, headers: self.written.append
+
+    def test_stream(self):
+        result = self.template()
+        self.assertIsInstance(result, streaming.TemplateStream)
+        chunks = list(result)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), self.expected)
+        self.assertEqual(self.response.getHeader('Content-Type'),
+                         'text/html; charset=utf-8')
+
+    def test_write(self):
+        self._startResponse()
+        result = self.template()
+        self.assertTrue(self.response.headersSent())
+        self.assertTrue(self.written)
+        self.assertEqual(b''.join(self.written + list(result)),
+                         self.expected)
+
+    def test_error_after_first_chunk(self):
+        self._startResponse()
+        with self.assertRaises(ZeroDivisionError):
+            self.template(fail=True)
+        self.assertTrue(self.response.headersSent())
+        self.assertTrue(self.expected.startswith(b''.join(self.written)))
+
+    def test_not_published(self):
+        self.request['PUBLISHED'] = self.folder
+        self.assertEqual(self.template().encode('utf-8'), self.expected)
+
+    def test_disabled(self):
+        self.template.streaming = False
+        self.assertEqual(self.template().encode('utf-8'), self.expected)
+
+
+def test_suite():
+    return unittest.TestSuite((
+        unittest.makeSuite(StreamingOutputTests),
+        unittest.makeSuite(TemplateStreamTests),
+        unittest.makeSuite(ZopePageTemplateStreamingTests),
+    ))
@@ -18,6 +18,74 @@ from ZPublisher.BeforeTraverse import unregisterBeforeTraverse
 from ZPublisher.HTTPRequest import splitport
 
 
+class HostRouter(object):
+    """Find the traversal path mapped to a host name and port.
+
+    Compiled from the mappings of a VirtualHostMonster. Exact host
+    names are found with a single lookup of the name and port. Wildcard
+    domains are found by looking up the suffixes of the host name which
+    have as many labels as some mapped domain, longest first. The result
+    for each host name and port is cached.
+    """
+
+    max_cached = 1000
+
+    def __init__(self, fixed_map, sub_map, vhm_id):
+        self.vhm_id = vhm_id
+        self.fixed_map = dict(
+            (hostname, self._compile(ports, vhm_id))
+            for hostname, ports in fixed_map.items())
+        self.sub_map = dict(
+            (hostname, self._compile(ports, vhm_id))
+            for hostname, ports in sub_map.items() if hostname)
+        self.sub_lengths = sorted(
+            set(hostname.count('.') + 1 for hostname in self.sub_map),
+            reverse=True)
+        self._paths = {}
+
+    def _compile(self, ports, vhm_id):
+        compiled = {}
+        for port, pp in ports.items():
+            if pp and pp[0] == '/':
+                # No explicit VirtualHostRoot, add one at the end.
+                pp = pp[:1] + [vhm_id] + pp[1:]
+            compiled[port] = tuple(pp)
+        return compiled
+
+    def __call__(self, hostname, port):
+        """Return the traversal stack elements for hostname and port, or
+        None if the host is not mapped.
+        """
+        key = (hostname, port)
+        try:
+            return self._paths[key]
+        except KeyError:
+            pass
+        path = self._lookup(hostname, port)
+        paths = self._paths
+        if len(paths) >= self.max_cached:
+            paths.clear()
+        paths[key] = path
+        return path
+
+    def _lookup(self, hostname, port):
+        ports = self.fixed_map.get(hostname)
+        if not ports and hostname:
+            labels = hostname.split('.')
+            for length in self.sub_lengths:
+                if length <= len(labels):
+                    ports = self.sub_map.get('.'.join(labels[-length:]))
+                    if ports:
+                        break
+        if not ports:
+            return None
+        path = ports.get(port)
+        if path is None and port is not None:
+            # Try default port
+            path = ports.get(None)
+        return path or None
+
+
 class VirtualHostMonster(Persistent, Item, Implicit):
     """Provide a simple drop-in solution for virtual hosting.
     """
@@ -65,7 +133,7 @@ class VirtualHostMonster(Persistent, Item, Implicit):
                 except Exception:
                     raise ValueError(
                         'Line needs a slash between host and path: %s' % line)
-                pp = filter(None, path.split('/'))
+                pp = [x for x in path.split('/') if x]
                 if pp:
                     obpath = pp[:]
                     if obpath[0] == 'VirtualHostBase':
@@ -109,6 +177,7 @@ class VirtualHostMonster(Persistent, Item, Implicit):
             new_lines.append(line)
         self.lines = tuple(new_lines)
         self.have_map = bool(fixed_map or sub_map)  # booleanize
+        self._v_router = None
         if RESPONSE is not None:
             RESPONSE.redirect(
                 'manage_edit?manage_tabs_message=Changes%20Saved.')
@@ -156,35 +225,36 @@ class VirtualHostMonster(Persistent, Item, Implicit):
             # If it is followed by one or more path elements that each
             # start with '_vh_', use them to construct the path to the
             # virtual root.
-            vh = -1
-            for ii in range(len(stack)):
-                if stack[ii] == 'VirtualHostRoot':
-                    vh_used = 1
-                    pp = ['']
-                    at_end = (ii == len(stack) - 1)
-                    if vh >= 0:
-                        for jj in range(vh, ii):
-                            pp.insert(1, stack[jj][4:])
-                        stack[vh:ii + 1] = ['/'.join(pp), self.id]
-                        ii = vh + 1
-                    elif ii > 0 and stack[ii - 1][:1] == '/':
-                        pp = stack[ii - 1].split('/')
-                        stack[ii] = self.id
-                    else:
-                        stack[ii] = self.id
-                        stack.insert(ii, '/')
-                        ii += 1
-                    if '*' in stack:
-                        stack[stack.index('*')] = host.split('.')[0]
-                    path = stack[:ii]
-                    # If the directive is on top of the stack, go ahead
-                    # and process it right away.
-                    if at_end:
-                        request.setVirtualRoot(pp)
-                        del stack[-2:]
-                    break
-                elif vh < 0 and stack[ii][:4] == '_vh_':
-                    vh = ii
+            if 'VirtualHostRoot' in stack:
+                vh_used = 1
+                ii = stack.index('VirtualHostRoot')
+                vh = -1
+                for jj in range(ii):
+                    if stack[jj][:4] == '_vh_':
+                        vh = jj
+                        break
+                pp = ['']
+                at_end = (ii == len(stack) - 1)
+                if vh >= 0:
+                    for jj in range(vh, ii):
+                        pp.insert(1, stack[jj][4:])
+                    stack[vh:ii + 1] = ['/'.join(pp), self.id]
+                    ii = vh + 1
+                elif ii > 0 and stack[ii - 1][:1] == '/':
+                    pp = stack[ii - 1].split('/')
+                    stack[ii] = self.id
+                else:
+                    stack[ii] = self.id
+                    stack.insert(ii, '/')
+                    ii += 1
+                if '*' in stack:
+                    stack[stack.index('*')] = host.split('.')[0]
+                path = stack[:ii]
+                # If the directive is on top of the stack, go ahead
+                # and process it right away.
+                if at_end:
+                    request.setVirtualRoot(pp)
+                    del stack[-2:]
 
             if vh_used or not self.have_map:
                 if path is not None:
@@ -212,28 +282,22 @@ class VirtualHostMonster(Persistent, Item, Implicit):
             # VirtualHost directives were found.
             host = request['SERVER_URL'].split('://')[1].lower()
             hostname, port = (host.split(':', 1) + [None])[:2]
-            ports = self.fixed_map.get(hostname, 0)
-            if not ports and self.sub_map:
-                get = self.sub_map.get
-                while hostname:
-                    ports = get(hostname, 0)
-                    if ports:
-                        break
-                    if '.' not in hostname:
-                        return
-                    hostname = hostname.split('.', 1)[1]
-            if ports:
-                pp = ports.get(port, 0)
-                if pp == 0 and port is not None:
-                    # Try default port
-                    pp = ports.get(None, 0)
-                if not pp:
-                    return
-                # If there was no explicit VirtualHostRoot, add one at the end
-                if pp[0] == '/':
-                    pp = pp[:]
-                    pp.insert(1, self.id)
-                stack.extend(pp)
+            pp = self.getRouter()(hostname, port)
+            if pp is None:
+                return
+            stack.extend(pp)
+
+    @security.private
+    def getRouter(self):
+        """Return the HostRouter compiled from the mappings."""
+        router = getattr(self, '_v_router', None)
+        if router is None or router.vhm_id != self.id:
+            # Not compiled yet, or for the id the monster had before it
+            # was renamed.
+            router = self._v_router = HostRouter(
+                getattr(self, 'fixed_map', {}), getattr(self, 'sub_map', {}),
+                self.id)
+        return router
 
     def __bobo_traverse__(self, request, name):
         '''Traversing away'''
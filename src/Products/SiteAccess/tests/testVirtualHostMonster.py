@@ -217,6 +217,137 @@ class VHMPort(unittest.TestCase):
                          'http://[::1]:81/folder/')
 
 
+class VHMMapping(unittest.TestCase):
+
+    def setUp(self):
+        import transaction
+        from Testing.makerequest import makerequest
+        from Testing.ZopeTestCase.ZopeLite import app
+        transaction.begin()
+        self.app = makerequest(app())
+        if 'virtual_hosting' not in self.app.objectIds():
+            # If ZopeLite was imported, we have no default virtual
+            # host monster
+            from Products.SiteAccess.VirtualHostMonster \
+                import manage_addVirtualHostMonster
+            manage_addVirtualHostMonster(self.app, 'virtual_hosting')
+        self.app.manage_addFolder('folder')
+        self.app.folder.manage_addFolder('sub')
+        self.app.folder.sub.manage_addDTMLMethod('doc', '')
+        self.app.REQUEST.set('PARENTS', [self.app])
+        self.traverse = self.app.REQUEST.traverse
+        self.app.virtual_hosting.set_map(
+            'www.example.com/folder\n'
+            'www.example.com:8080/folder/sub\n'
+            '*.example.org/folder/VirtualHostRoot/_vh_zope\n')
+
+    def tearDown(self):
+        import transaction
+        transaction.abort()
+        self.app._p_jar.close()
+
+    def _traverse(self, host, port, path):
+        request = self.app.REQUEST
+        request.setServerURL('http', host, port)
+        ob = self.traverse(path)
+        return ob, ob.absolute_url_path()
+
+    def test_fixed_host(self):
+        ob, url = self._traverse('www.example.com', '80', '/sub/doc')
+        self.assertEqual(ob.getPhysicalPath(), ('', 'folder', 'sub', 'doc'))
+        self.assertEqual(url, '/sub/doc')
+
+    def test_fixed_host_port(self):
+        ob, url = self._traverse('www.example.com', '8080', '/doc')
+        self.assertEqual(ob.getPhysicalPath(), ('', 'folder', 'sub', 'doc'))
+        self.assertEqual(url, '/doc')
+
+    def test_fixed_host_default_port(self):
+        ob, url = self._traverse('www.example.com', '81', '/sub/doc')
+        self.assertEqual(ob.getPhysicalPath(), ('', 'folder', 'sub', 'doc'))
+
+    def test_wildcard_host(self):
+        for host in ('example.org', 'www.example.org', 'a.b.example.org'):
+            ob, url = self._traverse(host, '80', '/sub/doc')
+            self.assertEqual(ob.getPhysicalPath(),
+                             ('', 'folder', 'sub', 'doc'))
+            self.assertEqual(url, '/zope/sub/doc')
+
+    def test_unmapped_host(self):
+        ob, url = self._traverse('example.com', '80', '/folder/sub/doc')
+        self.assertEqual(ob.getPhysicalPath(), ('', 'folder', 'sub', 'doc'))
+        self.assertEqual(url, '/folder/sub/doc')
+
+    def test_set_map_resets_router(self):
+        vhm = self.app.virtual_hosting
+        router = vhm.getRouter()
+        self.assertIs(vhm.getRouter(), router)
+        vhm.set_map('www.example.net/folder')
+        self.assertIsNot(vhm.getRouter(), router)
+        self.assertIsNone(vhm.getRouter()('www.example.com', None))
+
+    def test_rename_resets_router(self):
+        import transaction
+        from AccessControl.SecurityManagement import newSecurityManager
+        from AccessControl.SecurityManagement import noSecurityManager
+        from AccessControl.users import system
+        newSecurityManager(None, system)
+        self.addCleanup(noSecurityManager)
+        self.app.virtual_hosting.getRouter()
+        transaction.savepoint(optimistic=True)
+        self.app.manage_renameObject('virtual_hosting', 'vhm')
+        self.assertEqual(
+            self.app.vhm.getRouter()('www.example.com', None),
+            ('/', 'vhm', 'folder'))
+        ob, url = self._traverse('www.example.com', '80', '/sub/doc')
+        self.assertEqual(ob.getPhysicalPath(), ('', 'folder', 'sub', 'doc'))
+        self.assertEqual(url, '/sub/doc')
+
+
+class HostRouterTests(unittest.TestCase):
+
+    def _makeOne(self, fixed_map, sub_map):
+        from Products.SiteAccess.VirtualHostMonster import HostRouter
+        return HostRouter(fixed_map, sub_map, 'vhm')
+
+    def test_fixed(self):
+        router = self._makeOne({'a.com': {None: ['/', 'x'],
+                                          '81': ['VirtualHostRoot', 'y']}},
+                               {})
+        self.assertEqual(router('a.com', None), ('/', 'vhm', 'x'))
+        self.assertEqual(router('a.com', '80'), ('/', 'vhm', 'x'))
+        self.assertEqual(router('a.com', '81'), ('VirtualHostRoot', 'y'))
+        self.assertIsNone(router('b.a.com', None))
+
+    def test_fixed_takes_precedence(self):
+        router = self._makeOne({'a.com': {'81': ['/', 'x']}},
+                               {'a.com': {None: ['/', 'y']}})
+        self.assertIsNone(router('a.com', '80'))
+        self.assertEqual(router('b.a.com', '80'), ('/', 'vhm', 'y'))
+
+    def test_longest_suffix(self):
+        router = self._makeOne({}, {'com': {None: ['/', 'x']},
+                                    'a.com': {None: ['/', 'y']}})
+        self.assertEqual(router('b.a.com', None), ('/', 'vhm', 'y'))
+        self.assertEqual(router('a.com', None), ('/', 'vhm', 'y'))
+        self.assertEqual(router('b.com', None), ('/', 'vhm', 'x'))
+        self.assertIsNone(router('org', None))
+        self.assertIsNone(router('', None))
+
+    def test_empty_path(self):
+        router = self._makeOne({'a.com': {None: []}}, {})
+        self.assertIsNone(router('a.com', None))
+
+    def test_cached(self):
+        router = self._makeOne({'a.com': {None: ['/', 'x']}}, {})
+        router.max_cached = 2
+        path = router('a.com', None)
+        self.assertIs(router('a.com', None), path)
+        router('b.com', None)
+        router('c.com', None)
+        self.assertEqual(len(router._paths), 1)
+
+
 class VHMAddingTests(unittest.TestCase):
 
     def setUp(self):
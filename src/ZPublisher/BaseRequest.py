@@ -13,6 +13,7 @@
 """ Basic ZPublisher request management.
 """
 
+import re
 import types
 
 from six.moves.urllib.parse import quote as urllib_quote
@@ -25,10 +26,12 @@ from App.bbb import HAS_ZSERVER
 from ExtensionClass import Base
 from zExceptions import Forbidden
 from zExceptions import NotFound
+from zope.component import getSiteManager
 from zope.component import queryMultiAdapter
 from zope.event import notify
 from zope.interface import Interface
 from zope.interface import implementer
+from zope.interface import providedBy
 from zope.location.interfaces import LocationError
 from zope.publisher.defaultview import queryDefaultViewName
 from zope.publisher.interfaces import EndRequestEvent
@@ -39,6 +42,7 @@ from zope.traversing.namespace import namespaceLookup
 from zope.traversing.namespace import nsParse
 from ZPublisher.Converters import type_converters
 from ZPublisher.interfaces import UseTraversalDefault
+from ZPublisher.timing import getTimings
 from ZPublisher.xmlrpc import is_xmlrpc_response
 
 
@@ -46,11 +50,71 @@ _marker = []
 UNSPECIFIED_ROLES = ''
 
 
+# Path segments made of these characters are not changed by quote(),
+# whatever the version of Python (older ones quote "~").
+_unquoted_segment = re.compile(r'[A-Za-z0-9_.+@/-]*\Z').match
+
+
 def quote(text):
     # quote url path segments, but leave + and @ intact
+    if isinstance(text, str) and _unquoted_segment(text) is not None:
+        return text
     return urllib_quote(text, '/+@')
 
 
+# class -> whether it defines __bobo_traverse__
+_bobo_traverse_classes = {}
+
+
+def classHasBoboTraverse(klass):
+    """Check if klass defines a __bobo_traverse__ method.
+
+    The result is cached per class, so traversing plain objects does not
+    have to look through the class hierarchy for every path segment.
+    """
+    try:
+        return _bobo_traverse_classes[klass]
+    except KeyError:
+        result = _bobo_traverse_classes[klass] = hasattr(
+            klass, '__bobo_traverse__')
+        return result
+    except TypeError:  # unhashable class
+        return hasattr(klass, '__bobo_traverse__')
+
+
+def hasBoboTraverse(ob):
+    """Check if ob has a __bobo_traverse__ method."""
+    base = aq_base(ob)
+    if classHasBoboTraverse(base.__class__):
+        return True
+    # The hook might have been set on the instance.
+    try:
+        d = base.__dict__
+    except AttributeError:
+        return hasattr(ob, '__bobo_traverse__')
+    if not d and getattr(base, '_p_changed', 0) is None:
+        # load the state of ghosts
+        base._p_activate()
+        d = base.__dict__
+    return '__bobo_traverse__' in d
+
+
+def queryPublishTraverse(ob, request):
+    """Return the IPublishTraverse adapter of ob or None.
+
+    This is queryMultiAdapter((ob, request), IPublishTraverse) using the
+    adapter registry of the current site manager directly.
+    """
+    adapters = getattr(getSiteManager(), 'adapters', None)
+    if adapters is None:
+        return queryMultiAdapter((ob, request), IPublishTraverse)
+    factory = adapters.lookup((providedBy(ob), providedBy(request)),
+                              IPublishTraverse)
+    if factory is None:
+        return None
+    return factory(ob, request)
+
+
 class RequestContainer(Base):
     __roles__ = None
 
@@ -79,7 +143,7 @@ class DefaultPublishTraverse(object):
 
         subobject = UseTraversalDefault  # indicator
         try:
-            if hasattr(object, '__bobo_traverse__'):
+            if hasBoboTraverse(object):
                 try:
                     subobject = object.__bobo_traverse__(request, name)
                     if isinstance(subobject, tuple) and len(subobject) > 1:
@@ -341,7 +405,7 @@ class BaseRequest(object):
         if IPublishTraverse.providedBy(ob):
             ob2 = ob.publishTraverse(self, name)
         else:
-            adapter = queryMultiAdapter((ob, self), IPublishTraverse)
+            adapter = queryPublishTraverse(ob, self)
             if adapter is None:
                 # Zope2 doesn't set up its own adapters in a lot of cases
                 # so we will just use a default adapter.
@@ -517,11 +581,11 @@ class BaseRequest(object):
                         break
                 step = quote(entry_name)
                 _steps.append(step)
-                request['URL'] = URL = '%s/%s' % (request['URL'], step)
+                request['URL'] = URL = '%s/%s' % (URL, step)
 
                 try:
                     subobject = self.traverseName(object, entry_name)
-                    if hasattr(object, '__bobo_traverse__') or \
+                    if hasBoboTraverse(object) or \
                        hasattr(object, entry_name):
                         check_name = entry_name
                     else:
@@ -574,6 +638,8 @@ class BaseRequest(object):
         del self._post_traverse
 
         request['PUBLISHED'] = parents.pop(0)
+        timings = getTimings(request)
+        timings.lap('traversal')
 
         # Do authorization checks
         user = groups = None
@@ -657,6 +723,7 @@ class BaseRequest(object):
                 validated_hook(self, user)
             request['AUTHENTICATED_USER'] = user
             request['AUTHENTICATION_PATH'] = '/'.join(steps[:-i])
+        timings.lap('authentication')
 
         # Remove http request method from the URL.
         request['URL'] = URL
@@ -45,6 +45,7 @@ from ZPublisher import xmlrpc
 from ZPublisher.BaseRequest import BaseRequest
 from ZPublisher.BaseRequest import quote
 from ZPublisher.Converters import get_converter
+from ZPublisher.formparser import parse_form
 from ZPublisher.interfaces import IXmlrpcChecker
 from ZPublisher.utils import basic_auth_decode
 
@@ -88,6 +89,7 @@ tainting_env = str(os.environ.get('ZOPE_DTML_REQUEST_AUTOQUOTE', '')).lower()
 TAINTING_ENABLED = tainting_env not in ('disabled', '0', 'no')
 
 search_type = re.compile(r'(:[a-zA-Z][-a-zA-Z0-9_]+|\.[xy])$').search
+search_method = re.compile(r':(default_)?(method|action)\b').search
 
 _marker = []
 
@@ -187,9 +189,23 @@ class HTTPRequest(BaseRequest):
     charset = default_encoding
     retry_max_count = 0
 
+    # If true, the request body is parsed by ``ZPublisher.formparser`` and
+    # the fields are only converted into ``form`` and ``taintedform`` when
+    # one of them is used first. Uploaded files larger than
+    # ``form_spill_threshold`` bytes are written to temporary files.
+    lazy_form_parsing = False
+    form_spill_threshold = 1 << 20
+
+    # Parsed fields waiting to be converted when lazy form parsing is used.
+    _form_fields = None
+
+    # Set by the WSGI publisher, whose retry policy waits before retries.
+    _retry_policy_waits = False
+
     def supports_retry(self):
         if self.retry_count < self.retry_max_count:
-            time.sleep(random.uniform(0, 2 ** (self.retry_count)))
+            if not self._retry_policy_waits:
+                time.sleep(random.uniform(0, 2 ** (self.retry_count)))
             return 1
 
     def retry(self):
@@ -206,6 +222,10 @@ class HTTPRequest(BaseRequest):
         # removing tempfiles.
         self.stdin = None
         self._file = None
+        fields, self._form_fields = self._form_fields, None
+        for field in fields or ():
+            if field.file is not None:
+                field.file.close()
         self.form.clear()
         # we want to clear the lazy dict here because BaseRequests don't have
         # one.  Without this, there's the possibility of memory leaking
@@ -468,6 +488,30 @@ class HTTPRequest(BaseRequest):
         self.cookies = cookies
         self.taintedcookies = taintedcookies
 
+    @property
+    def form(self):
+        if self._form_fields is not None:
+            self.processInputs()
+        return self._form
+
+    @form.setter
+    def form(self, form):
+        if self._form_fields is not None:
+            self.processInputs()
+        self._form = form
+
+    @property
+    def taintedform(self):
+        if self._form_fields is not None:
+            self.processInputs()
+        return self._taintedform
+
+    @taintedform.setter
+    def taintedform(self, taintedform):
+        if self._form_fields is not None:
+            self.processInputs()
+        self._taintedform = taintedform
+
     def processInputs(
             self,
             # "static" variables that we want to be local for speed
@@ -485,6 +529,10 @@ class HTTPRequest(BaseRequest):
 
         We need to delay input parsing so that it is done under
         publisher control for error handling purposes.
+
+        If lazy form parsing is enabled, the fields are only converted
+        when the form is used first, unless they select the method to
+        publish. This method is called again to convert them then.
         """
         response = self.response
         environ = self.environ
@@ -495,6 +543,9 @@ class HTTPRequest(BaseRequest):
         else:
             fp = None
 
+        # Fields left by a lazy call to processInputs
+        fslist, self._form_fields = self._form_fields, None
+
         form = self.form
         other = self.other
         taintedform = self.taintedform
@@ -506,34 +557,50 @@ class HTTPRequest(BaseRequest):
             environ['QUERY_STRING'] = ''
 
         meth = None
-        fs_kw = {}
-        if PY3:
-            # In Python 3 we need the proper encoding to parse the input.
-            fs_kw['encoding'] = self.charset
-
-        fs = ZopeFieldStorage(
-            fp=fp, environ=environ, keep_blank_values=1, **fs_kw)
-
-        # Keep a reference to the FieldStorage. Otherwise it's
-        # __del__ method is called too early and closing FieldStorage.file.
-        self._hold(fs)
-
-        if not hasattr(fs, 'list') or fs.list is None:
-            if 'HTTP_SOAPACTION' in environ:
-                # Stash XML request for interpretation by a SOAP-aware view
-                other['SOAPXML'] = fs.value
-            elif (method == 'POST'
-                  and 'text/xml' in fs.headers.get('content-type', '')
-                  and use_builtin_xmlrpc(self)):
-                # Ye haaa, XML-RPC!
-                meth, self.args = xmlrpc.parse_input(fs.value)
-                response = xmlrpc.response(response)
-                other['RESPONSE'] = self.response = response
-                self.maybe_webdav_client = 0
-            else:
-                self._file = fs.file
-        else:
-            fslist = fs.list
+        fs = None
+        if fslist is None and self.lazy_form_parsing:
+            fs = parse_form(fp, environ, self.charset,
+                            self.form_spill_threshold)
+            if fs is not None and fs.list is not None and not any(
+                    item.name and search_method(item.name)
+                    for item in fs.list):
+                # Nothing to do before traversal, convert the fields
+                # when they are used.
+                self._form_fields = fs.list
+                return
+
+        if fs is None and fslist is None:
+            fs_kw = {}
+            if PY3:
+                # In Python 3 we need the proper encoding to parse the input.
+                fs_kw['encoding'] = self.charset
+
+            fs = ZopeFieldStorage(
+                fp=fp, environ=environ, keep_blank_values=1, **fs_kw)
+
+            # Keep a reference to the FieldStorage. Otherwise it's
+            # __del__ method is called too early and closing FieldStorage.file.
+            self._hold(fs)
+
+        if fs is not None:
+            fslist = getattr(fs, 'list', None)
+            if fslist is None:
+                if 'HTTP_SOAPACTION' in environ:
+                    # Stash XML request for interpretation by a SOAP-aware
+                    # view
+                    other['SOAPXML'] = fs.value
+                elif (method == 'POST'
+                      and 'text/xml' in fs.headers.get('content-type', '')
+                      and use_builtin_xmlrpc(self)):
+                    # Ye haaa, XML-RPC!
+                    meth, self.args = xmlrpc.parse_input(fs.value)
+                    response = xmlrpc.response(response)
+                    other['RESPONSE'] = self.response = response
+                    self.maybe_webdav_client = 0
+                else:
+                    self._file = fs.file
+
+        if fslist is not None:
             tuple_items = {}
             defaults = {}
             tainteddefaults = {}
@@ -972,6 +972,20 @@ class WSGIResponse(HTTPBaseResponse):
     _http_version = None
     _server_version = None
 
+    # The WSGI ``start_response`` callable. If set (see
+    # ``ZPublisher.WSGIPublisher.set_default_response_streaming``), data
+    # passed to ``write`` is handed to the WSGI server immediately instead
+    # of being buffered until the transaction is committed.
+    _start_response = None
+    _server_write = None
+
+    # The ``ZPublisher.compression.ResponseCompression`` settings and the
+    # Accept-Encoding header of the request if responses are compressed
+    # by the publisher. ``finalize`` sets up the encoder for the body.
+    _compression = None
+    _accept_encoding = None
+    _encoder = None
+
     # Append any "cleanup" functions to this list.
     after_list = ()
 
@@ -1051,8 +1065,52 @@ class WSGIResponse(HTTPBaseResponse):
         if content_length is None and not self._streaming:
             self.setHeader('content-length', len(self.body))
 
+        if self._compression is not None and self._encoder is None:
+            self._setupContentEncoding()
+
         return '%s %s' % (self.status, self.errmsg), self.listHeaders()
 
+    def _setupContentEncoding(self):
+        # Compress a buffered body right away. For other bodies set up
+        # the encoder the publisher compresses them with.
+        compression = self._compression
+        headers = self.headers
+        if self.status < 200 or self.status in (204, 206, 304) or \
+           'content-encoding' in headers or \
+           'content-range' in headers or \
+           'no-transform' in headers.get('cache-control', '') or \
+           not compression.isCompressible(headers.get('content-type')):
+            return
+
+        content_length = headers.get('content-length')
+        if content_length is not None and \
+           int(content_length) < compression.min_size:
+            return
+
+        vary = self.getHeader('Vary')
+        if vary is None or 'accept-encoding' not in vary.lower():
+            self.appendHeader('Vary', 'Accept-Encoding')
+
+        coding = compression.negotiate(self._accept_encoding)
+        if coding is None:
+            return
+        encoder = compression.getEncoder(coding)
+        body = self.body
+        if not self._streaming and isinstance(body, bytes):
+            body = encoder.compress(body) + encoder.finish()
+            if len(body) >= len(self.body):
+                return
+            self.body = body
+            self.setHeader('content-length', len(body))
+        else:
+            self._encoder = encoder
+            headers.pop('content-length', None)
+        self.setHeader('content-encoding', coding)
+        etag = headers.get('etag')
+        if etag is not None and not etag.startswith('W/'):
+            # The encoded body is not the one the strong tag was made for.
+            headers['etag'] = 'W/' + etag
+
     def listHeaders(self):
         result = []
         if self._server_version:
@@ -1068,13 +1126,42 @@ class WSGIResponse(HTTPBaseResponse):
         HTML data may be returned using a stream-oriented interface.
         This allows the browser to display partial results while
         computation of a response proceeds.
+
+        If response streaming is enabled, the status and headers are sent
+        along with the first chunk and every chunk is passed on to the WSGI
+        server right away. Otherwise the data is buffered and sent after
+        the transaction has been committed.
         """
         if not self._streaming:
             notify(pubevents.PubBeforeStreaming(self))
             self._streaming = 1
             self.stdout.flush()
 
-        self.stdout.write(data)
+        if self._start_response is None:
+            self.stdout.write(data)
+            return
+
+        if self._server_write is None:
+            status, headers = self.finalize()
+            self._server_write = self._start_response(status, headers)
+        if self._encoder is not None:
+            data = self._encoder.compress(data, True)
+        self._server_write(data)
+
+    def headersSent(self):
+        """Return True if status and headers were passed to the server.
+
+        From then on neither the status, the headers nor the data already
+        written can be changed anymore.
+        """
+        return self._server_write is not None
+
+    def streamsWrites(self):
+        """Return True if data passed to ``write`` is passed to the server
+        right away instead of being buffered until the transaction has
+        been committed.
+        """
+        return self._start_response is not None
 
     def setBody(self, body, title='', is_error=False, lock=None):
         # allow locking of the body in the same way as the status
@@ -33,16 +33,31 @@ from zExceptions import upgradeException
 from zope.component import queryMultiAdapter
 from zope.event import notify
 from zope.globalrequest import clearRequest
+from zope.globalrequest import getRequest
 from zope.globalrequest import setRequest
 from zope.publisher.skinnable import setDefaultSkin
 from zope.security.management import endInteraction
 from zope.security.management import newInteraction
 from ZPublisher import pubevents
+from ZPublisher.activity import NULL_ACTIVITY
+from ZPublisher.activity import RequestActivity
+from ZPublisher.activity import getActivity
+from ZPublisher.activity import getPattern
+from ZPublisher.activity import statistics as activity_statistics
+from ZPublisher.compression import encode_iterable
 from ZPublisher.HTTPRequest import WSGIRequest
 from ZPublisher.HTTPResponse import WSGIResponse
 from ZPublisher.Iterators import IUnboundStreamIterator
 from ZPublisher.mapply import mapply
+from ZPublisher.retry import RetryPolicy
+from ZPublisher.retry import getConflictOid
+from ZPublisher.timing import NULL_TIMINGS
+from ZPublisher.timing import RequestTimings
+from ZPublisher.timing import getTimings
+from ZPublisher.timing import statistics as timing_statistics
 from ZPublisher.utils import recordMetaData
+from ZPublisher.validation import ValidationMemo
+from ZPublisher.validation import getValidationMemo
 
 
 if sys.version_info >= (3, ):
@@ -53,6 +68,13 @@ else:
 _DEFAULT_DEBUG_EXCEPTIONS = False
 _DEFAULT_DEBUG_MODE = False
 _DEFAULT_REALM = None
+_DEFAULT_REQUEST_TIMING = False
+_DEFAULT_RESPONSE_COMPRESSION = None
+_DEFAULT_RESPONSE_STREAMING = False
+_DEFAULT_RETRY_POLICY = RetryPolicy()
+_DEFAULT_SERVER_TIMING_HEADER = False
+_DEFAULT_VALIDATION_MEMO = False
+_DEFAULT_ZODB_ACTIVITY = False
 _MODULE_LOCK = allocate_lock()
 _MODULES = {}
 
@@ -95,6 +117,90 @@ def set_default_authentication_realm(realm):
     _DEFAULT_REALM = realm
 
 
+def set_default_response_streaming(response_streaming):
+    global _DEFAULT_RESPONSE_STREAMING
+    _DEFAULT_RESPONSE_STREAMING = response_streaming
+
+
+def get_response_streaming():
+    global _DEFAULT_RESPONSE_STREAMING
+    return _DEFAULT_RESPONSE_STREAMING
+
+
+def set_default_response_compression(compression):
+    """Set the ``ZPublisher.compression.ResponseCompression`` settings
+    for compressing responses, or None to not compress them.
+    """
+    global _DEFAULT_RESPONSE_COMPRESSION
+    _DEFAULT_RESPONSE_COMPRESSION = compression
+
+
+def get_response_compression():
+    global _DEFAULT_RESPONSE_COMPRESSION
+    return _DEFAULT_RESPONSE_COMPRESSION
+
+
+def set_default_retry_policy(policy):
+    """Set the ``ZPublisher.retry.RetryPolicy`` for retrying requests
+    which failed with conflict errors.
+    """
+    global _DEFAULT_RETRY_POLICY
+    _DEFAULT_RETRY_POLICY = policy
+
+
+def get_retry_policy():
+    global _DEFAULT_RETRY_POLICY
+    return _DEFAULT_RETRY_POLICY
+
+
+def set_default_request_timing(request_timing, server_timing_header=True):
+    """Measure the phases of publishing requests if request_timing is
+    true, and send them to the client in a Server-Timing header if
+    server_timing_header is true, too.
+    """
+    global _DEFAULT_REQUEST_TIMING, _DEFAULT_SERVER_TIMING_HEADER
+    _DEFAULT_REQUEST_TIMING = request_timing
+    _DEFAULT_SERVER_TIMING_HEADER = server_timing_header
+
+
+def get_request_timing():
+    global _DEFAULT_REQUEST_TIMING
+    return _DEFAULT_REQUEST_TIMING
+
+
+def set_default_zodb_activity(zodb_activity, patterns=100):
+    """Count the ZODB activity of requests if zodb_activity is true and
+    keep the counts of the patterns patterns loading the most objects.
+    """
+    global _DEFAULT_ZODB_ACTIVITY
+    _DEFAULT_ZODB_ACTIVITY = zodb_activity
+    activity_statistics.max_patterns = patterns
+
+
+def get_zodb_activity():
+    global _DEFAULT_ZODB_ACTIVITY
+    return _DEFAULT_ZODB_ACTIVITY
+
+
+def set_default_validation_memo(validation_memo):
+    """Memoize the positive security validations of restricted
+    traversals for the duration of each request if validation_memo is
+    true.
+    """
+    global _DEFAULT_VALIDATION_MEMO
+    _DEFAULT_VALIDATION_MEMO = validation_memo
+
+
+def get_validation_memo():
+    global _DEFAULT_VALIDATION_MEMO
+    return _DEFAULT_VALIDATION_MEMO
+
+
+def _headers_sent(response):
+    headers_sent = getattr(response, 'headersSent', None)
+    return headers_sent is not None and headers_sent()
+
+
 def get_module_info(module_name='Zope2'):
     global _MODULES
     info = _MODULES.get(module_name)
@@ -154,11 +260,17 @@ def transaction_pubevents(request, response, tm=transaction.manager):
 
         yield
 
+        timings = getTimings(request)
+        timings.unwatch()
+        timings.lap('other')
         notify(pubevents.PubBeforeCommit(request))
         if tm.isDoomed():
             tm.abort()
         else:
             tm.commit()
+        timings.lap('commit')
+        if getattr(request, 'retry_count', 0):
+            get_retry_policy().recordRecovery()
         notify(pubevents.PubSuccess(request))
     except Exception as exc:
         # Normalize HTTP exceptions
@@ -180,10 +292,16 @@ def transaction_pubevents(request, response, tm=transaction.manager):
             unauth = False
             debug_exc = getattr(response, 'debug_exceptions', False)
 
+            # If the response was already (partially) sent to the client,
+            # it can neither be retried nor replaced by an exception view.
+            # The exception is passed on to the WSGI server, which aborts
+            # the connection.
+            if _headers_sent(response):
+                exc_view_created = False
             # If the exception is transient and the request can be retried,
             # shortcut further processing. It makes no sense to have an
             # exception view registered for this type of exception.
-            if isinstance(exc, TransientError) and request.supports_retry():
+            elif isinstance(exc, TransientError) and request.supports_retry():
                 retry = True
             else:
                 # Handle exception view. Make sure an exception view that
@@ -203,6 +321,10 @@ def transaction_pubevents(request, response, tm=transaction.manager):
                     response._unauthorized()
                     response.setStatus(exc.getStatus())
 
+            if isinstance(exc, TransientError):
+                getActivity(request).markConflict()
+                get_retry_policy().recordConflict(exc, retry)
+
             # Notify subscribers that this request is failing.
             notify(pubevents.PubBeforeAbort(request, exc_info, retry))
             tm.abort()
@@ -221,8 +343,12 @@ def transaction_pubevents(request, response, tm=transaction.manager):
 
 def publish(request, module_info):
     obj, realm, debug_mode = module_info
+    timings = getTimings(request)
+    timings.watch(getattr(obj, '_p_jar', None))
+    timings.lap('other')
 
     request.processInputs()
+    timings.lap('input')
     response = request.response
 
     response.debug_exceptions = get_debug_exceptions()
@@ -241,6 +367,7 @@ def publish(request, module_info):
     request['PARENTS'] = [obj]
 
     obj = request.traverse(path, validated_hook=validate_user)
+    timings.lap('traversal')
     notify(pubevents.PubAfterTraversal(request))
     recordMetaData(obj, request)
 
@@ -253,8 +380,10 @@ def publish(request, module_info):
                     dont_publish_class,
                     request,
                     bind=1)
+    timings.lap('call')
     if result is not response:
         response.setBody(result)
+        timings.lap('finalize')
 
     return response
 
@@ -262,17 +391,27 @@ def publish(request, module_info):
 @contextmanager
 def load_app(module_info):
     app_wrapper, realm, debug_mode = module_info
+    affinity = getattr(app_wrapper, 'connection_affinity', False)
     # Loads the 'OFS.Application' from ZODB.
-    app = app_wrapper()
+    app = app_wrapper.pinned() if affinity else app_wrapper()
+    request = getRequest()
+    activity = getActivity(request)
+    activity.watch(app._p_jar)
 
     try:
         yield (app, realm, debug_mode)
     finally:
+        activity.unwatch()
+        if activity is not NULL_ACTIVITY:
+            activity_statistics.record(getPattern(request), activity)
         if transaction.manager.manager._txn is not None:
             # Only abort a transaction, if one exists. Otherwise the
             # abort creates a new transaction just to abort it.
             transaction.abort()
-        app._p_jar.close()
+        if affinity:
+            app_wrapper.release(app._p_jar)
+        else:
+            app._p_jar.close()
 
 
 def publish_module(environ, start_response,
@@ -327,37 +466,85 @@ def publish_module(environ, start_response,
                                   environ,
                                   new_response))
 
+        retry_policy = get_retry_policy()
+        conflict_oid = None
         for i in range(getattr(new_request, 'retry_max_count', 3) + 1):
             request = new_request
             response = new_response
+            request._retry_policy_waits = True
+            if get_request_timing():
+                request._timings = RequestTimings()
+            if get_zodb_activity():
+                request._activity = RequestActivity()
+            if get_validation_memo():
+                request._validation_memo = ValidationMemo()
+            if get_response_streaming():
+                response._start_response = start_response
+            compression = get_response_compression()
+            if compression is not None and \
+               environ.get('REQUEST_METHOD') != 'HEAD':
+                response._compression = compression
+                response._accept_encoding = environ.get(
+                    'HTTP_ACCEPT_ENCODING')
             setRequest(request)
             try:
-                with load_app(module_info) as new_mod_info:
-                    with transaction_pubevents(request, response):
-                        response = _publish(request, new_mod_info)
+                # Retries of requests which conflicted on the same object
+                # may have to wait for each other.
+                with retry_policy.serialized(conflict_oid):
+                    with load_app(module_info) as new_mod_info:
+                        with transaction_pubevents(request, response):
+                            response = _publish(request, new_mod_info)
                 break
-            except TransientError:
-                if request.supports_retry():
+            except TransientError as exc:
+                if not _headers_sent(response) and request.supports_retry():
+                    conflict_oid = getConflictOid(exc)
                     new_request = request.retry()
                     new_response = new_request.response
+                    retry_policy.wait(new_request.retry_count)
                 else:
                     raise
             finally:
                 request.close()
                 clearRequest()
-
-        # Start the WSGI server response
-        status, headers = response.finalize()
-        start_response(status, headers)
-
+                memo = getValidationMemo(request)
+                if memo is not None:
+                    memo.clear()
+
+        timings = getTimings(request)
+        timings.lap('other')
+
+        # Start the WSGI server response unless streaming already did.
+        if not _headers_sent(response):
+            status, headers = response.finalize()
+            timings.lap('finalize')
+            if timings is not NULL_TIMINGS and _DEFAULT_SERVER_TIMING_HEADER:
+                headers = headers + [
+                    ('Server-Timing', timings.serverTiming())]
+            start_response(status, headers)
+        if timings is not NULL_TIMINGS:
+            timing_statistics.record(timings)
+
+        encoder = getattr(response, '_encoder', None)
         if isinstance(response.body, _FILE_TYPES) or \
            IUnboundStreamIterator.providedBy(response.body):
             result = response.body
+            file_wrapper = environ.get('wsgi.file_wrapper')
+            if file_wrapper is not None and encoder is None and \
+               isinstance(result, _FILE_TYPES):
+                # Let the server use platform specific means like
+                # sendfile to transmit the file.
+                result = file_wrapper(
+                    result, getattr(result, 'streamsize', 1 << 16))
         else:
             # If somebody used response.write, that data will be in the
             # response.stdout BytesIO, so we put that before the body.
             result = (response.stdout.getvalue(), response.body)
 
+        if encoder is not None:
+            # Compress the body chunk by chunk. Streamed data is flushed
+            # to the client with every chunk.
+            result = encode_iterable(result, encoder, response._streaming)
+
         for func in response.after_list:
             func()
 
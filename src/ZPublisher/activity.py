@@ -0,0 +1,185 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Accounting of the ZODB activity of requests.
+
+The publisher counts the objects each request loads from and writes to
+the ZODB with the transfer counters of its connections, and whether it
+ended with a conflict error. The counts are added up per URL pattern,
+the class and name of the published object, in a table of the patterns
+loading the most objects, which is shown in the Control Panel.
+"""
+
+from threading import Lock
+
+from zope.publisher.interfaces.browser import IBrowserView
+
+
+class RequestActivity(object):
+    """The ZODB activity of one attempt to publish a request."""
+
+    def __init__(self):
+        self.loads = 0
+        self.stores = 0
+        self.conflict = False
+        self._watched = ()
+
+    def watch(self, jar):
+        """Start counting the activity of jar and the connections to
+        other databases it opened.
+        """
+        connections = getattr(jar, 'connections', None)
+        if connections is None:
+            return
+        self._watched = [
+            (connection, connection.getTransferCounts())
+            for connection in connections.values()]
+
+    def unwatch(self):
+        """Stop counting."""
+        for connection, (loads, stores) in self._watched:
+            new_loads, new_stores = connection.getTransferCounts()
+            self.loads += new_loads - loads
+            self.stores += new_stores - stores
+        self._watched = ()
+
+    def markConflict(self):
+        self.conflict = True
+
+
+class NullActivity(object):
+    """Used for requests which are not counted."""
+
+    def watch(self, jar):
+        pass
+
+    def unwatch(self):
+        pass
+
+    def markConflict(self):
+        pass
+
+
+NULL_ACTIVITY = NullActivity()
+
+
+def getActivity(request):
+    """Return the ZODB activity of request."""
+    activity = getattr(request, '_activity', None)
+    return NULL_ACTIVITY if activity is None else activity
+
+
+def getPattern(request):
+    """Return the URL pattern of request.
+
+    Requests publishing the same method or view of objects of the same
+    class share a pattern, like ``GET Folder.manage_main``.
+    """
+    method = request.get('REQUEST_METHOD', 'GET')
+    published = request.get('PUBLISHED')
+    if published is None:
+        return '%s (not published)' % method
+    self = getattr(published, '__self__', None)
+    if self is not None:
+        return '%s %s.%s' % (method, self.__class__.__name__,
+                             published.__name__)
+    name = published.__class__.__name__
+    if IBrowserView.providedBy(published):
+        name = '%s @@%s' % (name, getattr(published, '__name__', ''))
+    return '%s %s' % (method, name)
+
+
+class PatternActivity(object):
+    """The ZODB activity of the requests of a URL pattern."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.requests = 0
+        self.conflicts = 0
+        self.loads = 0
+        self.max_loads = 0
+        self.stores = 0
+
+    def add(self, activity):
+        if activity.conflict:
+            self.conflicts += 1
+        else:
+            self.requests += 1
+        self.loads += activity.loads
+        if activity.loads > self.max_loads:
+            self.max_loads = activity.loads
+        self.stores += activity.stores
+
+
+SORT_KEYS = ('loads', 'mean_loads', 'stores', 'conflicts')
+
+
+class ActivityStatistics(object):
+    """Aggregates the ZODB activity of the requests of the process.
+
+    Only max_patterns patterns are kept. When a new pattern comes along
+    in a full table, the pattern which loaded the fewest objects is
+    dropped.
+    """
+
+    def __init__(self, max_patterns=100):
+        self.max_patterns = max_patterns
+        self._lock = Lock()
+        self._clear()
+
+    def _clear(self):
+        self._patterns = {}
+        self.evictions = 0
+
+    def reset(self):
+        """Forget all recorded requests."""
+        with self._lock:
+            self._clear()
+
+    def record(self, pattern, activity):
+        with self._lock:
+            entry = self._patterns.get(pattern)
+            if entry is None:
+                if len(self._patterns) >= self.max_patterns:
+                    if not self._patterns:
+                        return
+                    victim = min(self._patterns.values(),
+                                 key=lambda entry: entry.loads)
+                    del self._patterns[victim.pattern]
+                    self.evictions += 1
+                entry = self._patterns[pattern] = PatternActivity(pattern)
+            entry.add(activity)
+
+    def getReport(self, sort_on='loads'):
+        """Return a list of mappings describing the patterns, sorted by
+        sort_on, the worst first.
+        """
+        if sort_on not in SORT_KEYS:
+            raise ValueError('Unknown sort key: %s' % sort_on)
+        with self._lock:
+            report = []
+            for entry in self._patterns.values():
+                attempts = entry.requests + entry.conflicts
+                report.append({
+                    'pattern': entry.pattern,
+                    'requests': entry.requests,
+                    'conflicts': entry.conflicts,
+                    'loads': entry.loads,
+                    'mean_loads': float(entry.loads) / attempts,
+                    'max_loads': entry.max_loads,
+                    'stores': entry.stores,
+                })
+        report.sort(key=lambda r: r[sort_on], reverse=True)
+        return report
+
+
+statistics = ActivityStatistics()
@@ -0,0 +1,183 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Content encoding of WSGI responses.
+
+The encoders compress data chunk by chunk, so file bodies, stream
+iterators and data written with ``RESPONSE.write`` can be compressed
+without holding the whole response in memory.
+"""
+
+import zlib
+
+from ZPublisher.HTTPResponse import uncompressableMimeMajorTypes
+
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CHUNK_SIZE = 1 << 16
+
+
+class ZlibEncoder(object):
+    """Encoder for the ``gzip`` and ``deflate`` content codings."""
+
+    def __init__(self, level=6, gzip=True):
+        wbits = 16 + zlib.MAX_WBITS if gzip else zlib.MAX_WBITS
+        self._co = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data, flush=False):
+        """Return compressed data.
+
+        If flush is true, all data passed in so far is returned, so the
+        client can decode it right away.
+        """
+        data = self._co.compress(data)
+        if flush:
+            data += self._co.flush(zlib.Z_SYNC_FLUSH)
+        return data
+
+    def finish(self):
+        """Return the end of the compressed data."""
+        return self._co.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(object):
+    """Encoder for the ``br`` content coding."""
+
+    def __init__(self, level=6):
+        self._co = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data, flush=False):
+        data = self._co.process(data)
+        if flush:
+            data += self._co.flush()
+        return data
+
+    def finish(self):
+        return self._co.finish()
+
+
+def _gzip_encoder(level):
+    return ZlibEncoder(level, gzip=True)
+
+
+def _deflate_encoder(level):
+    return ZlibEncoder(level, gzip=False)
+
+
+# Content codings in order of preference.
+ENCODERS = [('gzip', _gzip_encoder), ('deflate', _deflate_encoder)]
+if brotli is not None:
+    ENCODERS.insert(0, ('br', BrotliEncoder))
+
+
+def parse_accept_encoding(value):
+    """Return a mapping of the codings in an Accept-Encoding header to
+    their quality values.
+    """
+    result = {}
+    for item in (value or '').split(','):
+        parts = item.split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, sep, q = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        result[coding] = quality
+    return result
+
+
+class ResponseCompression(object):
+    """Settings for compressing responses.
+
+    min_size -- responses of known length smaller than this number of
+                bytes are not compressed
+
+    level    -- compression level, from 1 (fastest) to 9 (best); it is
+                also used as the quality for brotli
+
+    exclude  -- content types which are not compressed. An entry
+                ``type/*`` excludes a major type. The major types in
+                ``HTTPResponse.uncompressableMimeMajorTypes`` are always
+                excluded.
+    """
+
+    def __init__(self, min_size=1024, level=6, exclude=()):
+        self.min_size = min_size
+        self.level = level
+        self.exclude = frozenset(t.lower() for t in exclude)
+
+    def isCompressible(self, content_type):
+        """Return whether responses of this content type are compressed.
+        """
+        if not content_type:
+            return False
+        content_type = content_type.split(';')[0].strip().lower()
+        major = content_type.split('/')[0]
+        return not (major in uncompressableMimeMajorTypes
+                    or content_type in self.exclude
+                    or major + '/*' in self.exclude)
+
+    def negotiate(self, accept_encoding):
+        """Return the name of the preferred coding the client accepts or
+        None if it accepts none.
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        best = None
+        best_quality = 0.0
+        for name, factory in ENCODERS:
+            quality = accepted.get(name, accepted.get('*', 0.0))
+            if quality > best_quality:
+                best = name
+                best_quality = quality
+        return best
+
+    def getEncoder(self, coding):
+        """Return a new encoder for coding."""
+        for name, factory in ENCODERS:
+            if name == coding:
+                return factory(self.level)
+        raise ValueError('Unknown content coding: %s' % coding)
+
+
+def encode_iterable(iterable, encoder, flush=False):
+    """Compress the chunks of iterable.
+
+    If flush is true, each chunk is flushed to the client as soon as it
+    is compressed.
+    """
+    read = getattr(iterable, 'read', None)
+    if read is not None:
+        # Files are read in chunks instead of lines.
+        chunks = iter(lambda: read(CHUNK_SIZE), b'')
+    else:
+        chunks = iterable
+    try:
+        for chunk in chunks:
+            if chunk:
+                data = encoder.compress(chunk, flush)
+                if data:
+                    yield data
+        yield encoder.finish()
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,288 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Streaming parser for request bodies and form data.
+
+This is used instead of ``cgi.FieldStorage`` if lazy form parsing is
+enabled (see ``HTTPRequest.lazy_form_parsing``). The body is read in
+chunks. Uploaded files and non-form bodies are kept in memory up to a
+threshold and written to a temporary file beyond.
+
+The result mimics the parts of ``cgi.FieldStorage`` used by
+``HTTPRequest.processInputs`` and produces the same fields.
+"""
+
+from cgi import parse_header
+from email.parser import HeaderParser
+from io import BytesIO
+from tempfile import TemporaryFile
+
+from six import PY3
+from six.moves.urllib.parse import parse_qsl
+
+
+CHUNK_SIZE = 1 << 16
+MAX_LINE_SIZE = 1 << 16
+
+
+class FormField(object):
+    """A single form field.
+
+    Provides the attributes of ``cgi.FieldStorage`` items, ``file`` and
+    ``filename`` are only set for file uploads.
+    """
+
+    def __init__(self, name, value=None, file=None, filename=None,
+                 headers=None):
+        self.name = name
+        self.value = value
+        self.file = file
+        self.filename = filename
+        self.headers = {} if headers is None else headers
+
+    def __repr__(self):
+        return 'FormField(%r, %r)' % (self.name, self.value)
+
+
+class FormData(object):
+    """The parsed request body.
+
+    ``list`` holds the fields of form data, for other bodies it is None
+    and ``file`` holds the body.
+    """
+
+    def __init__(self, list=None, file=None, headers=None):
+        self.list = list
+        self.file = file
+        self.headers = {} if headers is None else headers
+
+    @property
+    def value(self):
+        if self.file is None:
+            return None
+        self.file.seek(0)
+        value = self.file.read()
+        self.file.seek(0)
+        return value
+
+
+class _Spool(object):
+    """File-like object writing to memory up to threshold bytes and to a
+    temporary file beyond.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.file = BytesIO()
+        self.spilled = False
+
+    def write(self, data):
+        file = self.file
+        if not self.spilled and file.tell() + len(data) > self.threshold:
+            self.file = TemporaryFile('w+b')
+            self.file.write(file.getvalue())
+            self.spilled = True
+            file = self.file
+        file.write(data)
+
+
+def _decode(data, encoding):
+    if PY3:
+        return data.decode(encoding, 'replace')
+    return data
+
+
+def _parse_qs(qs, encoding):
+    if PY3:
+        return parse_qsl(qs, True, encoding=encoding, errors='replace')
+    return parse_qsl(qs, True)
+
+
+class _MultipartReader(object):
+    """Buffered reader splitting a multipart body at its delimiters.
+
+    Like ``cgi.FieldStorage`` it accepts bare LF line breaks and a
+    missing close delimiter.
+    """
+
+    def __init__(self, fp, length, boundary):
+        self.fp = fp
+        self.remaining = length
+        self.delimiter = b'\n--' + boundary
+        # The first delimiter does not need a preceding line break.
+        self.buffer = b'\n'
+
+    def _fill(self):
+        size = CHUNK_SIZE
+        if self.remaining >= 0:
+            size = min(size, self.remaining)
+        data = self.fp.read(size) if size else b''
+        if not data:
+            return False
+        if self.remaining >= 0:
+            self.remaining -= len(data)
+        self.buffer += data
+        return True
+
+    def at_end(self):
+        return not self.buffer and not self._fill()
+
+    def peek(self, size):
+        while len(self.buffer) < size and self._fill():
+            pass
+        return self.buffer[:size]
+
+    def readline(self):
+        """Return the next line without its line break."""
+        while True:
+            buffer = self.buffer
+            pos = buffer.find(b'\n')
+            if pos >= 0:
+                self.buffer = buffer[pos + 1:]
+                line = buffer[:pos]
+                return line[:-1] if line.endswith(b'\r') else line
+            if len(buffer) > MAX_LINE_SIZE:
+                raise ValueError('Line too long in multipart form data')
+            if not self._fill():
+                self.buffer = b''
+                return buffer
+
+    def read_data(self, write):
+        """Pass the data up to the next delimiter to write.
+
+        The line break before the delimiter is not part of the data.
+        Return False if the body ended without another delimiter.
+        """
+        delimiter = self.delimiter
+        keep = len(delimiter)
+        while True:
+            buffer = self.buffer
+            pos = buffer.find(delimiter)
+            if pos >= 0:
+                self.buffer = buffer[pos + keep:]
+                if buffer[pos - 1:pos] == b'\r':
+                    pos -= 1
+                write(buffer[:pos])
+                return True
+            if len(buffer) > keep:
+                # Keep enough to find a delimiter and a preceding CR
+                # when more data arrives.
+                write(buffer[:-keep])
+                buffer = self.buffer = buffer[-keep:]
+            if not self._fill():
+                self.buffer = b''
+                if buffer.endswith(b'\r\n'):
+                    buffer = buffer[:-2]
+                elif buffer.endswith(b'\n'):
+                    buffer = buffer[:-1]
+                write(buffer)
+                return False
+
+
+def _discard(data):
+    pass
+
+
+def _parse_multipart(fp, length, boundary, encoding, spill_threshold):
+    reader = _MultipartReader(fp, length, boundary)
+    fields = []
+    more = reader.read_data(_discard)  # skip the preamble
+    while more and reader.peek(2) != b'--':
+        reader.readline()  # the rest of the delimiter line
+
+        lines = []
+        line = reader.readline()
+        while line:
+            lines.append(line)
+            line = reader.readline()
+        if reader.at_end():
+            break
+        headers = HeaderParser().parsestr(
+            _decode(b'\r\n'.join(lines), encoding))
+        disposition, options = parse_header(
+            headers.get('content-disposition', ''))
+        name = options.get('name')
+        filename = options.get('filename')
+
+        if filename is None:
+            chunks = []
+            more = reader.read_data(chunks.append)
+            field = FormField(name, _decode(b''.join(chunks), encoding),
+                              headers=headers)
+        else:
+            spool = _Spool(spill_threshold)
+            more = reader.read_data(spool.write)
+            spool.file.seek(0)
+            field = FormField(name, file=spool.file, filename=filename,
+                              headers=headers)
+        fields.append(field)
+    return fields
+
+
+def _content_length(environ):
+    try:
+        return int(environ.get('CONTENT_LENGTH'))
+    except (TypeError, ValueError):
+        return -1
+
+
+def parse_form(fp, environ, encoding='utf-8', spill_threshold=1 << 20):
+    """Parse the query string and the request body read from fp.
+
+    Return a FormData object, or None if the body cannot be read
+    without reading it line by line.
+    """
+    method = environ.get('REQUEST_METHOD', 'GET').upper()
+    qs = environ.get('QUERY_STRING', '')
+    if fp is None or method in ('GET', 'HEAD'):
+        return FormData([FormField(k, v) for k, v in _parse_qs(qs, encoding)])
+
+    content_type = environ.get('CONTENT_TYPE')
+    if content_type is None:
+        if method == 'POST':
+            content_type = 'application/x-www-form-urlencoded'
+        else:
+            content_type = 'text/plain'
+    ctype, params = parse_header(content_type)
+    length = _content_length(environ)
+    qs_on_post = qs if method == 'POST' else ''
+
+    if ctype == 'application/x-www-form-urlencoded':
+        body = _decode(fp.read(length), encoding)
+        if qs_on_post:
+            body = body + '&' + qs_on_post
+        return FormData(
+            [FormField(k, v) for k, v in _parse_qs(body, encoding)])
+
+    if ctype[:10] == 'multipart/':
+        boundary = params.get('boundary', '')
+        if not boundary:
+            raise ValueError('Invalid boundary in multipart form: %r'
+                             % (boundary, ))
+        if PY3:
+            boundary = boundary.encode('latin-1')
+        fields = [FormField(k, v) for k, v in _parse_qs(qs_on_post, encoding)]
+        fields.extend(
+            _parse_multipart(fp, length, boundary, encoding, spill_threshold))
+        return FormData(fields)
+
+    if length < 0:
+        return None
+    spool = _Spool(spill_threshold)
+    while length > 0:
+        data = fp.read(min(length, CHUNK_SIZE))
+        if not data:
+            break
+        spool.write(data)
+        length -= len(data)
+    spool.file.seek(0)
+    return FormData(file=spool.file, headers={'content-type': content_type})
@@ -0,0 +1,179 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""How the publisher retries requests failing with conflict errors.
+
+Retrying at once lets requests which conflicted on the same object
+collide again. The publisher waits a random time before a retry, up to
+a limit which doubles with each retry of a request, so the retries of a
+conflict storm spread out. Optionally, retries of requests which
+conflicted on the same object run one at a time.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+from ZODB.utils import oid_repr
+
+
+def getConflictOid(exc):
+    """Return the oid of the object exc conflicted on, or None."""
+    return getattr(exc, 'oid', None)
+
+
+class OidConflicts(object):
+    """The conflicts on one object."""
+
+    def __init__(self, oid, class_name):
+        self.oid = oid
+        self.class_name = class_name
+        self.conflicts = 0
+        self.retries = 0
+        self.last = None
+
+
+class RetryPolicy(object):
+    """Delays and serializes retries and counts conflicts.
+
+    The delay before the n-th retry of a request is chosen at random
+    between 0 and ``backoff * 2 ** (n - 1)`` seconds, but at most
+    max_backoff seconds. If serialize is true, the retries of requests
+    which conflicted on the same object wait for each other. Conflicts
+    are counted for the max_oids objects conflicting most.
+    """
+
+    def __init__(self, backoff=0.05, max_backoff=2.0, serialize=False,
+                 max_oids=100):
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.serialize = serialize
+        self.max_oids = max_oids
+        self._lock = Lock()
+        # oid -> [lock, number of threads using it]
+        self._oid_locks = {}
+        self._clear()
+
+    def _clear(self):
+        self._oids = {}
+        self.conflicts = 0
+        self.retries = 0
+        self.recoveries = 0
+        self.failures = 0
+        self.waits = 0
+        self.backoff_time = 0.0
+
+    def reset(self):
+        """Forget all counted conflicts."""
+        with self._lock:
+            self._clear()
+
+    def getDelay(self, retries):
+        """Return the seconds to wait before retry number retries."""
+        limit = min(self.max_backoff, self.backoff * 2 ** (retries - 1))
+        return random.uniform(0, limit)
+
+    def wait(self, retries):
+        """Wait before retry number retries."""
+        delay = self.getDelay(retries)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.backoff_time += delay
+
+    @contextmanager
+    def serialized(self, oid):
+        """Run the block while no other thread runs a block for oid.
+
+        Does not wait if serialization is off or oid is None.
+        """
+        if not self.serialize or oid is None:
+            yield
+            return
+        with self._lock:
+            entry = self._oid_locks.get(oid)
+            if entry is None:
+                entry = self._oid_locks[oid] = [Lock(), 0]
+            entry[1] += 1
+        lock = entry[0]
+        try:
+            if not lock.acquire(False):
+                with self._lock:
+                    self.waits += 1
+                lock.acquire()
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._oid_locks[oid]
+
+    def recordConflict(self, exc, retry):
+        """Count that a request failed with exc and is retried if retry
+        is true.
+        """
+        oid = getConflictOid(exc)
+        with self._lock:
+            self.conflicts += 1
+            if retry:
+                self.retries += 1
+            else:
+                self.failures += 1
+            if oid is None or not self.max_oids:
+                return
+            entry = self._oids.get(oid)
+            if entry is None:
+                if len(self._oids) >= self.max_oids:
+                    victim = min(self._oids.values(),
+                                 key=lambda entry: entry.conflicts)
+                    del self._oids[victim.oid]
+                class_name = getattr(exc, 'class_name', None) or ''
+                entry = self._oids[oid] = OidConflicts(oid, class_name)
+            entry.conflicts += 1
+            if retry:
+                entry.retries += 1
+            entry.last = time.time()
+
+    def recordRecovery(self):
+        """Count that a retried request succeeded."""
+        with self._lock:
+            self.recoveries += 1
+
+    def getMetrics(self):
+        """Return a mapping of the counters."""
+        with self._lock:
+            return {
+                'conflicts': self.conflicts,
+                'retries': self.retries,
+                'recoveries': self.recoveries,
+                'failures': self.failures,
+                'waits': self.waits,
+                'backoff_time': self.backoff_time,
+            }
+
+    def getConflictReport(self):
+        """Return a list of mappings describing the objects conflicts
+        happened on, the most conflicting first.
+        """
+        with self._lock:
+            entries = sorted(self._oids.values(),
+                             key=lambda entry: entry.conflicts, reverse=True)
+            return [{'oid': oid_repr(entry.oid),
+                     'class_name': entry.class_name,
+                     'conflicts': entry.conflicts,
+                     'retries': entry.retries,
+                     'last': entry.last}
+                    for entry in entries]
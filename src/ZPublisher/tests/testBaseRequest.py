@@ -747,6 +747,22 @@ class TestBaseRequestViews(TestRequestViewsBase):
         ob = r.traverse('folder/obj/page3')
         self.assertEqual(ob(), 'Test page')
 
+    def test_traverse_publishTraverse_adapter(self):
+        from zope.component import getGlobalSiteManager
+        from zope.publisher.browser import IDefaultBrowserLayer
+
+        class DummyTraverserAdapter(DummyTraverser):
+            def __init__(self, context, request):
+                pass
+
+        getGlobalSiteManager().registerAdapter(
+            DummyTraverserAdapter,
+            (self._dummyInterface(), IDefaultBrowserLayer),
+            IPublishTraverse)
+        root, folder = self._makeRootAndFolder()
+        r = self._makeOne(root)
+        self.assertEqual(r.traverse('folder/dummy'), 'dummy object')
+
     def test_wrapping_implicit_acquirers(self):
         # when the default publish traverser finds via adaptation
         # an object providing IAcquirer, it should wrap it in the
@@ -759,3 +775,69 @@ class TestBaseRequestViews(TestRequestViewsBase):
         self.assertEqual(ob(), 'Test page')
         # make sure we can acquire
         self.assertEqual(ob.ob2, ob2)
+
+
+class TestTraversalHelpers(unittest.TestCase):
+
+    def test_quote(self):
+        from six.moves.urllib.parse import quote as urllib_quote
+        from ZPublisher.BaseRequest import quote
+        self.assertEqual(quote('plain-name_1.txt'), 'plain-name_1.txt')
+        self.assertEqual(quote('@@view'), '@@view')
+        self.assertEqual(quote('with space'), 'with%20space')
+        self.assertEqual(quote('~user'), urllib_quote('~user', '/+@'))
+        self.assertEqual(quote(u'\xfcml'), '%C3%BCml')
+
+    def test_classHasBoboTraverse(self):
+        from ZPublisher.BaseRequest import _bobo_traverse_classes
+        from ZPublisher.BaseRequest import classHasBoboTraverse
+
+        class Plain(object):
+            pass
+
+        class WithBBT(object):
+            def __bobo_traverse__(self, request, name):
+                pass
+
+        self.assertFalse(classHasBoboTraverse(Plain))
+        self.assertTrue(Plain in _bobo_traverse_classes)
+        self.assertTrue(classHasBoboTraverse(WithBBT))
+
+    def test_hasBoboTraverse(self):
+        from Acquisition import Implicit
+        from ZPublisher.BaseRequest import hasBoboTraverse
+
+        class Plain(Implicit):
+            pass
+
+        class WithBBT(Implicit):
+            def __bobo_traverse__(self, request, name):
+                pass
+
+        parent = WithBBT()
+        self.assertTrue(hasBoboTraverse(parent))
+        # __bobo_traverse__ is not acquired
+        ob = Plain().__of__(parent)
+        self.assertFalse(hasBoboTraverse(ob))
+        # but can be set on instances
+        ob.__bobo_traverse__ = lambda request, name: None
+        self.assertTrue(hasBoboTraverse(ob))
+
+    def test_hasBoboTraverse_ghost(self):
+        import transaction
+        from OFS.SimpleItem import SimpleItem
+        from ZODB.DB import DB
+        from ZODB.DemoStorage import DemoStorage
+        from ZPublisher.BaseRequest import hasBoboTraverse
+
+        db = DB(DemoStorage())
+        try:
+            conn = db.open()
+            item = conn.root()['item'] = SimpleItem()
+            item.__bobo_traverse__ = None
+            transaction.commit()
+            item._p_deactivate()
+            self.assertTrue(hasBoboTraverse(item))
+        finally:
+            transaction.abort()
+            db.close()
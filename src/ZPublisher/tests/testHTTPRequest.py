@@ -825,6 +825,41 @@ class HTTPRequestTests(unittest.TestCase, HTTPRequestFactoryMixin):
         self.assertIsInstance(req.form['foo_dict']['bar'], unicode)
         self.assertEqual(req.form['foo_dict']['bar'], u'EGGS')
 
+    def _patchSleep(self):
+        import ZPublisher.HTTPRequest
+        sleeps = []
+
+        class DummyTime(object):
+            def sleep(self, seconds):
+                sleeps.append(seconds)
+
+        original = ZPublisher.HTTPRequest.time
+        ZPublisher.HTTPRequest.time = DummyTime()
+        self.addCleanup(setattr, ZPublisher.HTTPRequest, 'time', original)
+        return sleeps
+
+    def test_supports_retry_waits(self):
+        # Publishers without a retry policy rely on the request to back off.
+        sleeps = self._patchSleep()
+        req = self._makeOne()
+        req.retry_max_count = 2
+        self.assertTrue(req.supports_retry())
+        req.retry_count = 1
+        self.assertTrue(req.supports_retry())
+        req.retry_count = 2
+        self.assertFalse(req.supports_retry())
+        self.assertEqual(len(sleeps), 2)
+        self.assertTrue(0 <= sleeps[0] <= 1)
+        self.assertTrue(0 <= sleeps[1] <= 2)
+
+    def test_supports_retry_policy_waits(self):
+        sleeps = self._patchSleep()
+        req = self._makeOne()
+        req.retry_max_count = 1
+        req._retry_policy_waits = True
+        self.assertTrue(req.supports_retry())
+        self.assertEqual(sleeps, [])
+
     def test_close_removes_stdin_references(self):
         # Verifies that all references to the input stream go away on
         # request.close().  Otherwise a tempfile may stick around.
@@ -1260,6 +1295,124 @@ class HTTPRequestTests(unittest.TestCase, HTTPRequestFactoryMixin):
         gsm.unregisterUtility(allow, IXmlrpcChecker)
 
 
+class LazyFormParsingTests(HTTPRequestTests):
+    # Run the HTTPRequest tests with lazy form parsing enabled.
+
+    def _getTargetClass(self):
+        from ZPublisher.HTTPRequest import HTTPRequest
+
+        class LazyHTTPRequest(HTTPRequest):
+            lazy_form_parsing = True
+            form_spill_threshold = 1000
+
+        return LazyHTTPRequest
+
+    def _makeMultipartRequest(self, body, **kw):
+        environ = self._makePostEnviron(body=body)
+        environ.update(kw)
+        return self._makeOne(stdin=BytesIO(body), environ=environ)
+
+    def test_processInputs_defers_conversion(self):
+        req = self._makeOne(environ={'QUERY_STRING': 'x:int=1&y:int=bad'})
+        req.processInputs()
+        self.assertEqual(len(req._form_fields), 2)
+        self.assertEqual(req._form, {})
+        self.assertEqual(req.get('PATH_INFO'), '')
+        self.assertIsNotNone(req._form_fields)
+        # The conversion error is raised when the form is used.
+        self.assertRaises(ValueError, req.get, 'x')
+
+    def test_processInputs_converts_on_first_access(self):
+        req = self._makeOne(environ={'QUERY_STRING': 'x:int=1&y:list=a'})
+        req.processInputs()
+        self.assertEqual(req.get('x'), 1)
+        self.assertIsNone(req._form_fields)
+        self.assertEqual(req.form, {'x': 1, 'y': ['a']})
+        self.assertEqual(req.taintedform, {})
+
+    def test_processInputs_setting_form_converts_fields(self):
+        req = self._makeOne(environ={'QUERY_STRING': 'x=<tainted/>'})
+        req.processInputs()
+        req.form = {'y': 1}
+        self.assertEqual(req.form, {'y': 1})
+        self.assertEqual(list(req.taintedform.keys()), ['x'])
+
+    def test_processInputs_w_method_converts_eagerly(self):
+        req = self._makeOne(environ={'QUERY_STRING': 'x=1&edit:method=Save',
+                                     'PATH_INFO': '/foo'})
+        req.processInputs()
+        self.assertIsNone(req._form_fields)
+        self.assertEqual(req.other['PATH_INFO'], '/foo/edit')
+        self.assertEqual(req.form['x'], '1')
+
+    def test_processInputs_multipart_mixed_fields(self):
+        body = (b'preamble\r\n'
+                b'--12345\r\n'
+                b'Content-Disposition: form-data; name="title"\r\n'
+                b'\r\n'
+                b'Hello\r\nWorld\r\n'
+                b'--12345\r\n'
+                b'Content-Disposition: form-data; name="file"; '
+                b'filename="a.txt"\r\n'
+                b'Content-Type: text/plain\r\n'
+                b'\r\n'
+                b'data\r\n'
+                b'--12345--\r\n'
+                b'epilogue')
+        req = self._makeMultipartRequest(body, QUERY_STRING='q=1')
+        req.processInputs()
+        self.assertEqual(req.form['q'], '1')
+        self.assertEqual(req.form['title'], 'Hello\r\nWorld')
+        upload = req.form['file']
+        self.assertEqual(upload.filename, 'a.txt')
+        self.assertEqual(upload.headers['Content-Type'], 'text/plain')
+        self.assertEqual(upload.read(), b'data')
+
+    def test_processInputs_multipart_spills_large_files(self):
+        from ZPublisher.formparser import CHUNK_SIZE
+        data = b'0123456789' * (CHUNK_SIZE // 5)
+        body = (b'--12345\r\n'
+                b'Content-Disposition: form-data; name="file"; '
+                b'filename="big"\r\n'
+                b'\r\n' + data + b'\r\n'
+                b'--12345\r\n'
+                b'Content-Disposition: form-data; name="small"; '
+                b'filename="small"\r\n'
+                b'\r\n'
+                b'small\r\n'
+                b'--12345--\r\n')
+        req = self._makeMultipartRequest(body)
+        req.processInputs()
+        big = req.form['file']
+        self.assertNotIsInstance(big.file, BytesIO)
+        self.assertEqual(big.read(), data)
+        big.close()
+        small = req.form['small']
+        self.assertIsInstance(small.file, BytesIO)
+        self.assertEqual(small.read(), b'small')
+
+    def test_processInputs_body_kept_in_memory(self):
+        body = b'{"a": 1}'
+        environ = {
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'REQUEST_METHOD': 'POST',
+        }
+        req = self._makeOne(stdin=BytesIO(body), environ=environ)
+        req.processInputs()
+        self.assertIsInstance(req.get('BODYFILE'), BytesIO)
+        self.assertEqual(req.get('BODY'), body)
+        self.assertEqual(req.form, {})
+
+    def test_clear_closes_pending_uploads(self):
+        req = self._makeMultipartRequest(TEST_FILE_DATA)
+        req.processInputs()
+        file = req._form_fields[0].file
+        req.clear()
+        self.assertTrue(file.closed)
+        self.assertIsNone(req._form_fields)
+
+
 class TestHTTPRequestZope3Views(TestRequestViewsBase):
 
     def _makeOne(self, root):
@@ -152,6 +152,12 @@ class WSGIResponseTests(unittest.TestCase):
         self.assertEqual(response.getHeader('Content-Length'),
                          '%d' % len(TestStreamIterator.data))
 
+    def test_streamsWrites(self):
+        response = self._makeOne()
+        self.assertFalse(response.streamsWrites())
+        response._start_response = lambda status, headers: None
+        self.assertTrue(response.streamsWrites())
+
     def test_setBody_w_locking(self):
         response = self._makeOne()
         response.setBody(b'BEFORE', lock=True)
@@ -329,6 +335,414 @@ class TestPublishModule(ZopeTestCase):
         app_iter = self._callFUT(environ, start_response, _publish)
         self.assertEqual(app_iter, (b'WRITTEN', b'BODY'))
 
+    def _enableStreaming(self):
+        from ZPublisher import WSGIPublisher
+        WSGIPublisher.set_default_response_streaming(True)
+        self.addCleanup(WSGIPublisher.set_default_response_streaming, False)
+
+    def test_streaming_writes_to_server_before_commit(self):
+        from ZPublisher.HTTPResponse import WSGIResponse
+        self._enableStreaming()
+        environ = self._makeEnviron()
+        written = []
+        committed = []
+
+        def start_response(status, headers):
+            written.append((status, dict(headers)))
+            return written.append
+
+        def _publish(request, mod_info):
+            response = request.response
+            self.assertIsInstance(response, WSGIResponse)
+            response.setHeader('Content-Type', 'text/csv')
+            response.write(b'a,b\n')
+            self.assertTrue(response.headersSent())
+            response.write(b'1,2\n')
+            transaction.get().addBeforeCommitHook(committed.append, (1,))
+            self.assertEqual(committed, [])
+            return response
+
+        app_iter = self._callFUT(environ, start_response, _publish)
+        self.assertEqual(committed, [1])
+        status, headers = written[0]
+        self.assertEqual(status, '200 OK')
+        self.assertTrue(headers['Content-Type'].startswith('text/csv'))
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(written[1:], [b'a,b\n', b'1,2\n'])
+        self.assertEqual(b''.join(app_iter), b'')
+
+    def test_streaming_body_sent_after_written_data(self):
+        self._enableStreaming()
+        environ = self._makeEnviron()
+        written = []
+
+        def start_response(status, headers):
+            return written.append
+
+        def _publish(request, mod_info):
+            request.response.write(b'WRITTEN')
+            request.response.setBody(b'BODY')
+            return request.response
+
+        app_iter = self._callFUT(environ, start_response, _publish)
+        self.assertEqual(written, [b'WRITTEN'])
+        self.assertEqual(b''.join(app_iter), b'BODY')
+
+    def test_streaming_no_exception_view_after_headers_sent(self):
+        from zExceptions import NotFound
+        self._enableStreaming()
+        self._registerView(CustomExceptionView, 'index.html',
+                           provides=IException)
+        environ = self._makeEnviron()
+        start_response = DummyCallable()
+        start_response._result = DummyCallable()
+
+        def _publish(request, mod_info):
+            request.response.write(b'PARTIAL')
+            raise NotFound('TESTING')
+
+        self.assertRaises(NotFound,
+                          self._callFUT, environ, start_response, _publish)
+        self.assertEqual(start_response._result._called_with,
+                         ((b'PARTIAL',), {}))
+
+    def test_streaming_no_retry_after_headers_sent(self):
+        self._enableStreaming()
+        environ = self._makeEnviron()
+        start_response = DummyCallable()
+        start_response._result = DummyCallable()
+        calls = []
+
+        def _publish(request, mod_info):
+            calls.append(request)
+            request.response.write(b'PARTIAL')
+            raise ConflictError
+
+        from ZPublisher.HTTPRequest import HTTPRequest
+        original_retry_max_count = HTTPRequest.retry_max_count
+        HTTPRequest.retry_max_count = 1
+        try:
+            self.assertRaises(ConflictError,
+                              self._callFUT, environ, start_response, _publish)
+        finally:
+            HTTPRequest.retry_max_count = original_retry_max_count
+        self.assertEqual(len(calls), 1)
+
+    def test_streaming_retry_before_headers_sent(self):
+        self._enableStreaming()
+        environ = self._makeEnviron()
+        written = []
+
+        def start_response(status, headers):
+            return written.append
+
+        def _publish(request, mod_info):
+            if request.retry_count < 1:
+                raise ConflictError
+            request.response.write(b'RETRIED')
+            return request.response
+
+        from ZPublisher.HTTPRequest import HTTPRequest
+        original_retry_max_count = HTTPRequest.retry_max_count
+        HTTPRequest.retry_max_count = 1
+        try:
+            self._callFUT(environ, start_response, _publish)
+        finally:
+            HTTPRequest.retry_max_count = original_retry_max_count
+        self.assertEqual(written, [b'RETRIED'])
+
+    def test_retry_policy(self):
+        from ZODB.utils import p64
+        from ZPublisher import WSGIPublisher
+        from ZPublisher.HTTPRequest import HTTPRequest
+        from ZPublisher.retry import RetryPolicy
+        waited = []
+
+        class Policy(RetryPolicy):
+            def wait(self, retries):
+                waited.append(retries)
+
+        policy = Policy(serialize=True)
+        WSGIPublisher.set_default_retry_policy(policy)
+        self.addCleanup(WSGIPublisher.set_default_retry_policy,
+                        RetryPolicy())
+        environ = self._makeEnviron()
+        start_response = DummyCallable()
+
+        def _publish(request, mod_info):
+            # Only the policy waits, the request does not sleep.
+            self.assertTrue(request._retry_policy_waits)
+            if request.retry_count < 2:
+                raise ConflictError(oid=p64(42))
+            request.response.setBody(b'RETRIED')
+            return request.response
+
+        original_retry_max_count = HTTPRequest.retry_max_count
+        HTTPRequest.retry_max_count = 2
+        try:
+            app_iter = self._callFUT(environ, start_response, _publish)
+        finally:
+            HTTPRequest.retry_max_count = original_retry_max_count
+        self.assertEqual(b''.join(app_iter), b'RETRIED')
+        self.assertEqual(waited, [1, 2])
+        metrics = policy.getMetrics()
+        self.assertEqual(metrics['conflicts'], 2)
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['recoveries'], 1)
+        report = policy.getConflictReport()
+        self.assertEqual(report[0]['oid'], '0x2a')
+        self.assertEqual(report[0]['conflicts'], 2)
+        self.assertEqual(policy._oid_locks, {})
+
+    def _enableCompression(self, **kw):
+        from ZPublisher import WSGIPublisher
+        from ZPublisher.compression import ResponseCompression
+        WSGIPublisher.set_default_response_compression(
+            ResponseCompression(**kw))
+        self.addCleanup(WSGIPublisher.set_default_response_compression, None)
+
+    def _publishCompressed(self, _publish, **environ):
+        import zlib
+        environ.setdefault('HTTP_ACCEPT_ENCODING', 'gzip, deflate')
+        environ = self._makeEnviron(**environ)
+        started = []
+
+        def start_response(status, headers):
+            started.append(dict(headers))
+            return started.append
+
+        app_iter = self._callFUT(environ, start_response, _publish)
+        headers = started[0]
+        data = b''.join(app_iter)
+        if headers.get('Content-Encoding') == 'gzip':
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        return headers, data
+
+    def test_compression_buffered_body(self):
+        self._enableCompression()
+        body = b'<html>%s</html>' % (b'x' * 2000)
+
+        def _publish(request, mod_info):
+            request.response.setBody(body)
+            return request.response
+
+        headers, data = self._publishCompressed(_publish)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertLess(int(headers['Content-Length']), len(body))
+        self.assertEqual(data, body)
+
+    def test_compression_weakens_etag(self):
+        self._enableCompression()
+        body = b'x' * 2000
+
+        def _publish(request, mod_info):
+            request.response.setHeader('ETag', '"1234"')
+            request.response.setBody(body)
+            return request.response
+
+        headers, data = self._publishCompressed(_publish)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Etag'], 'W/"1234"')
+
+        headers, data = self._publishCompressed(
+            _publish, HTTP_ACCEPT_ENCODING='identity')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(headers['Etag'], '"1234"')
+
+    def test_compression_not_accepted(self):
+        self._enableCompression()
+        body = b'x' * 2000
+
+        def _publish(request, mod_info):
+            request.response.setBody(body)
+            return request.response
+
+        headers, data = self._publishCompressed(
+            _publish, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(data, body)
+
+    def test_compression_below_min_size(self):
+        self._enableCompression(min_size=100)
+
+        def _publish(request, mod_info):
+            request.response.setBody(b'x' * 99)
+            return request.response
+
+        headers, data = self._publishCompressed(_publish)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertNotIn('Vary', headers)
+
+    def test_compression_excluded_type(self):
+        self._enableCompression(exclude=['application/zip'])
+
+        def _publish(request, mod_info):
+            request.response.setHeader('Content-Type', 'application/zip')
+            request.response.setBody(b'x' * 2000)
+            return request.response
+
+        headers, data = self._publishCompressed(_publish)
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_compression_unbound_stream_iterator(self):
+        from ZPublisher.Iterators import IUnboundStreamIterator
+        from zope.interface import implementer
+        self._enableCompression()
+
+        @implementer(IUnboundStreamIterator)
+        class Chunks(object):
+
+            def __init__(self):
+                self.chunks = iter([b'a' * 1000, b'b' * 1000])
+
+            def __iter__(self):
+                return self.chunks
+
+        def _publish(request, mod_info):
+            request.response.setHeader('Content-Type', 'text/plain')
+            request.response.setBody(Chunks())
+            return request.response
+
+        headers, data = self._publishCompressed(_publish)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(data, b'a' * 1000 + b'b' * 1000)
+
+    def test_compression_file_body_not_wrapped(self):
+        from io import BytesIO
+        self._enableCompression()
+        file_wrapper = DummyCallable()
+
+        def _publish(request, mod_info):
+            request.response.setHeader('Content-Type', 'text/plain')
+            request.response.setBody(BytesIO(b'data\n' * 1000))
+            return request.response
+
+        headers, data = self._publishCompressed(
+            _publish, **{'wsgi.file_wrapper': file_wrapper})
+        self.assertIsNone(file_wrapper._called_with)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(data, b'data\n' * 1000)
+
+    def test_compression_streaming_writes(self):
+        import zlib
+        self._enableStreaming()
+        self._enableCompression()
+        environ = self._makeEnviron(HTTP_ACCEPT_ENCODING='deflate')
+        started = []
+        written = []
+
+        def start_response(status, headers):
+            started.append(dict(headers))
+            return written.append
+
+        def _publish(request, mod_info):
+            request.response.setHeader('Content-Type', 'text/csv')
+            request.response.write(b'a,b\n')
+            # Each chunk can be decompressed when it arrives.
+            self.assertEqual(zlib.decompressobj().decompress(written[0]),
+                             b'a,b\n')
+            request.response.write(b'1,2\n')
+            return request.response
+
+        app_iter = self._callFUT(environ, start_response, _publish)
+        self.assertEqual(started[0]['Content-Encoding'], 'deflate')
+        data = b''.join(written) + b''.join(app_iter)
+        self.assertEqual(zlib.decompress(data), b'a,b\n1,2\n')
+
+    def test_compression_skips_HEAD(self):
+        self._enableCompression()
+
+        def _publish(request, mod_info):
+            request.response.setBody(b'x' * 2000)
+            return request.response
+
+        headers, data = self._publishCompressed(_publish,
+                                                REQUEST_METHOD='HEAD')
+        self.assertNotIn('Content-Encoding', headers)
+
+    def _enableTiming(self, server_timing_header=True):
+        from ZPublisher import WSGIPublisher
+        from ZPublisher.timing import statistics
+        WSGIPublisher.set_default_request_timing(True, server_timing_header)
+        self.addCleanup(WSGIPublisher.set_default_request_timing, False)
+        statistics.reset()
+        self.addCleanup(statistics.reset)
+
+    def _publishTimed(self):
+        from ZPublisher.timing import getTimings
+        environ = self._makeEnviron()
+        started = []
+
+        def start_response(status, headers):
+            started.append(dict(headers))
+
+        def _publish(request, mod_info):
+            getTimings(request).lap('call')
+            request.response.setBody(b'timed')
+            return request.response
+
+        self._callFUT(environ, start_response, _publish)
+        return started[0]
+
+    def test_request_timing_disabled(self):
+        from ZPublisher.timing import statistics
+        statistics.reset()
+        headers = self._publishTimed()
+        self.assertNotIn('Server-Timing', headers)
+        self.assertEqual(statistics.requests, 0)
+
+    def test_request_timing(self):
+        from ZPublisher.timing import statistics
+        self._enableTiming()
+        headers = self._publishTimed()
+        metrics = [m.split(';')[0]
+                   for m in headers['Server-Timing'].split(', ')]
+        self.assertIn('total', metrics)
+        self.assertIn('zodb', metrics)
+        self.assertEqual(statistics.requests, 1)
+        report = dict((r['phase'], r) for r in statistics.getReport())
+        self.assertEqual(sum(report['call']['buckets']), 1)
+        self.assertEqual(sum(report['total']['buckets']), 1)
+
+    def test_request_timing_without_header(self):
+        from ZPublisher.timing import statistics
+        self._enableTiming(server_timing_header=False)
+        headers = self._publishTimed()
+        self.assertNotIn('Server-Timing', headers)
+        self.assertEqual(statistics.requests, 1)
+
+    def _publishValidated(self):
+        from ZPublisher.validation import getValidationMemo
+        from ZPublisher.validation import getValidator
+        memos = []
+
+        def _publish(request, mod_info):
+            memo = getValidationMemo(request)
+            memos.append(memo)
+            if memo is not None:
+                getValidator()(None, None, None, self.app)
+                self.assertEqual(len(memo), 1)
+            request.response.setBody(b'validated')
+            return request.response
+
+        self._callFUT(self._makeEnviron(), DummyCallable(), _publish)
+        return memos[0]
+
+    def test_validation_memo_disabled(self):
+        self.assertIsNone(self._publishValidated())
+
+    def test_validation_memo(self):
+        from ZPublisher import WSGIPublisher
+        WSGIPublisher.set_default_validation_memo(True)
+        self.addCleanup(WSGIPublisher.set_default_validation_memo, False)
+        memo = self._publishValidated()
+        # The memo is discarded at the end of the request.
+        self.assertEqual(len(memo), 0)
+
     def test_raises_unauthorized(self):
         from zExceptions import Unauthorized
         environ = self._makeEnviron()
@@ -389,6 +803,23 @@ class TestPublishModule(ZopeTestCase):
         app_iter = self._callFUT(environ, start_response, _publish)
         self.assertTrue(app_iter is body)
 
+    def test_response_body_is_file_w_file_wrapper(self):
+        from io import BytesIO
+
+        _response = DummyResponse()
+        _response._status = '200 OK'
+        _response._headers = [('Content-Length', '4')]
+        body = _response.body = BytesIO(b'DATA')
+        file_wrapper = DummyCallable()
+        file_wrapper._result = wrapped = object()
+        environ = self._makeEnviron(**{'wsgi.file_wrapper': file_wrapper})
+        start_response = DummyCallable()
+        _publish = DummyCallable()
+        _publish._result = _response
+        app_iter = self._callFUT(environ, start_response, _publish)
+        self.assertTrue(app_iter is wrapped)
+        self.assertEqual(file_wrapper._called_with, ((body, 1 << 16), {}))
+
     def test_response_is_stream(self):
         from ZPublisher.Iterators import IStreamIterator
         from zope.interface import implementer
@@ -778,6 +1209,67 @@ class TestLoadApp(unittest.TestCase):
         self.assertIsNone(transaction.manager.manager._txn)
         self.assertEqual(counter.counts(), (1, 1))
 
+    def test_counts_zodb_activity(self):
+        from persistent.mapping import PersistentMapping
+        from ZODB.DB import DB
+        from ZODB.MappingStorage import MappingStorage
+        from zope.globalrequest import clearRequest
+        from zope.globalrequest import setRequest
+        from ZPublisher.activity import RequestActivity
+        from ZPublisher.activity import statistics
+        load_app = self._getTarget()
+        db = DB(MappingStorage())
+        self.addCleanup(db.close)
+        conn = db.open()
+        conn.root()['folder'] = PersistentMapping()
+        transaction.commit()
+        conn.close()
+        db.cacheMinimize()
+        statistics.reset()
+        self.addCleanup(statistics.reset)
+
+        class Request(dict):
+            _activity = RequestActivity()
+
+        def app_wrapper():
+            return db.open().root()
+
+        request = Request(REQUEST_METHOD='POST')
+        setRequest(request)
+        self.addCleanup(clearRequest)
+        with load_app((app_wrapper, 'Zope', False)) as module_info:
+            folder = module_info[0]['folder']
+            folder['item'] = 1
+            request['PUBLISHED'] = folder
+            transaction.commit()
+
+        report = statistics.getReport()
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['pattern'], 'POST PersistentMapping')
+        self.assertEqual(report[0]['requests'], 1)
+        self.assertEqual(report[0]['loads'], 2)
+        self.assertEqual(report[0]['stores'], 1)
+
+    def test_connection_affinity(self):
+        from App.ZApplication import ZApplicationWrapper
+        from persistent.mapping import PersistentMapping
+        from ZODB.DB import DB
+        from ZODB.MappingStorage import MappingStorage
+        load_app = self._getTarget()
+        db = DB(MappingStorage())
+        self.addCleanup(db.close)
+        app_wrapper = ZApplicationWrapper(db, 'Application',
+                                          PersistentMapping,
+                                          connection_affinity=True)
+        self.addCleanup(app_wrapper.closePinned)
+        module_info = (app_wrapper, 'Zope', False)
+
+        with load_app(module_info) as (app, realm, debug_mode):
+            connection = app._p_jar
+        self.assertIsNotNone(connection.opened)
+        with load_app(module_info) as (app, realm, debug_mode):
+            self.assertIs(app._p_jar, connection)
+
 
 class CustomExceptionView(object):
 
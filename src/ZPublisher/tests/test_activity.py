@@ -0,0 +1,169 @@
+import unittest
+
+import transaction
+from ZPublisher import activity
+
+
+class DummyActivity(object):
+
+    def __init__(self, loads=0, stores=0, conflict=False):
+        self.loads = loads
+        self.stores = stores
+        self.conflict = conflict
+
+
+class RequestActivityTests(unittest.TestCase):
+
+    def setUp(self):
+        from persistent.mapping import PersistentMapping
+        from ZODB.DB import DB
+        from ZODB.MappingStorage import MappingStorage
+        self.db = DB(MappingStorage())
+        conn = self.db.open()
+        root = conn.root()
+        root['a'] = PersistentMapping({'title': 'a'})
+        root['b'] = PersistentMapping({'title': 'b'})
+        transaction.commit()
+        conn.close()
+        self.db.cacheMinimize()
+
+    def tearDown(self):
+        transaction.abort()
+        self.db.close()
+
+    def _makeOne(self):
+        return activity.RequestActivity()
+
+    def test_loads(self):
+        conn = self.db.open()
+        self.addCleanup(conn.close)
+        root = conn.root()
+        self.assertEqual(root['a']['title'], 'a')
+
+        request_activity = self._makeOne()
+        request_activity.watch(conn)
+        self.assertEqual(root['a']['title'], 'a')
+        self.assertEqual(root['b']['title'], 'b')
+        request_activity.unwatch()
+        # root and a were in the cache, b was loaded.
+        self.assertEqual(request_activity.loads, 1)
+        self.assertEqual(request_activity.stores, 0)
+        # Nothing is added to the cache.
+        self.assertEqual(len(conn._cache), 3)
+
+    def test_stores(self):
+        conn = self.db.open()
+        self.addCleanup(conn.close)
+        request_activity = self._makeOne()
+        request_activity.watch(conn)
+        conn.root()['a']['title'] = 'changed'
+        transaction.commit()
+        request_activity.unwatch()
+        self.assertEqual(request_activity.stores, 1)
+        self.assertEqual(request_activity.loads, 2)
+
+    def test_without_connection(self):
+        request_activity = self._makeOne()
+        request_activity.watch(None)
+        request_activity.unwatch()
+        self.assertEqual(request_activity.loads, 0)
+
+
+class GetActivityTests(unittest.TestCase):
+
+    def test_not_counted(self):
+        self.assertIs(activity.getActivity(None), activity.NULL_ACTIVITY)
+
+    def test_counted(self):
+        class Request(object):
+            _activity = activity.RequestActivity()
+        self.assertIs(activity.getActivity(Request()), Request._activity)
+
+
+class GetPatternTests(unittest.TestCase):
+
+    def _callFUT(self, published, method='GET'):
+        request = {'REQUEST_METHOD': method}
+        if published is not None:
+            request['PUBLISHED'] = published
+        return activity.getPattern(request)
+
+    def test_not_published(self):
+        self.assertEqual(self._callFUT(None), 'GET (not published)')
+
+    def test_method(self):
+        from OFS.Folder import Folder
+        self.assertEqual(self._callFUT(Folder('a').manage_delObjects, 'POST'),
+                         'POST Folder.manage_delObjects')
+
+    def test_object(self):
+        from OFS.Folder import Folder
+        self.assertEqual(self._callFUT(Folder('a')), 'GET Folder')
+
+    def test_view(self):
+        from zope.interface import implementer
+        from zope.publisher.interfaces.browser import IBrowserView
+
+        @implementer(IBrowserView)
+        class View(object):
+            __name__ = 'listing'
+
+        self.assertEqual(self._callFUT(View()), 'GET View @@listing')
+
+
+class ActivityStatisticsTests(unittest.TestCase):
+
+    def _makeOne(self, max_patterns=100):
+        return activity.ActivityStatistics(max_patterns)
+
+    def test_record(self):
+        statistics = self._makeOne()
+        statistics.record('GET Folder', DummyActivity(loads=10))
+        statistics.record('GET Folder', DummyActivity(loads=2, stores=1))
+        statistics.record('GET Folder', DummyActivity(conflict=True))
+        report = statistics.getReport()
+        self.assertEqual(len(report), 1)
+        entry = report[0]
+        self.assertEqual(entry['pattern'], 'GET Folder')
+        self.assertEqual(entry['requests'], 2)
+        self.assertEqual(entry['conflicts'], 1)
+        self.assertEqual(entry['loads'], 12)
+        self.assertEqual(entry['max_loads'], 10)
+        self.assertAlmostEqual(entry['mean_loads'], 12 / 3.0)
+        self.assertEqual(entry['stores'], 1)
+        self.assertNotIn('hit_ratio', entry)
+
+    def test_sort(self):
+        statistics = self._makeOne()
+        statistics.record('a', DummyActivity(loads=10))
+        statistics.record('a', DummyActivity())
+        statistics.record('b', DummyActivity(loads=20, stores=5))
+        statistics.record('c', DummyActivity())
+
+        def patterns(sort_on):
+            return [r['pattern'] for r in statistics.getReport(sort_on)]
+
+        self.assertEqual(patterns('loads'), ['b', 'a', 'c'])
+        self.assertEqual(patterns('stores')[0], 'b')
+        self.assertRaises(ValueError, statistics.getReport, 'pattern')
+        self.assertRaises(ValueError, statistics.getReport, 'hit_ratio')
+
+    def test_drops_fewest_loads(self):
+        statistics = self._makeOne(max_patterns=2)
+        statistics.record('a', DummyActivity(loads=10))
+        statistics.record('b', DummyActivity(loads=1))
+        statistics.record('c', DummyActivity(loads=5))
+        self.assertEqual([r['pattern'] for r in statistics.getReport()],
+                         ['a', 'c'])
+        self.assertEqual(statistics.evictions, 1)
+
+    def test_disabled_table(self):
+        statistics = self._makeOne(max_patterns=0)
+        statistics.record('a', DummyActivity(loads=10))
+        self.assertEqual(statistics.getReport(), [])
+
+    def test_reset(self):
+        statistics = self._makeOne()
+        statistics.record('a', DummyActivity(loads=10))
+        statistics.reset()
+        self.assertEqual(statistics.getReport(), [])
@@ -0,0 +1,79 @@
+import unittest
+import zlib
+
+
+class ParseAcceptEncodingTests(unittest.TestCase):
+
+    def _callFUT(self, value):
+        from ZPublisher.compression import parse_accept_encoding
+        return parse_accept_encoding(value)
+
+    def test_empty(self):
+        self.assertEqual(self._callFUT(None), {})
+        self.assertEqual(self._callFUT(''), {})
+
+    def test_qualities(self):
+        self.assertEqual(
+            self._callFUT('gzip;q=0.5, Deflate , br;q=0, *;q=bogus'),
+            {'gzip': 0.5, 'deflate': 1.0, 'br': 0.0, '*': 0.0})
+
+
+class ResponseCompressionTests(unittest.TestCase):
+
+    def _makeOne(self, **kw):
+        from ZPublisher.compression import ResponseCompression
+        return ResponseCompression(**kw)
+
+    def test_negotiate(self):
+        compression = self._makeOne()
+        self.assertEqual(compression.negotiate('deflate, gzip'), 'gzip')
+        self.assertEqual(compression.negotiate('gzip;q=0.5, deflate'),
+                         'deflate')
+        self.assertEqual(compression.negotiate('identity'), None)
+        self.assertEqual(compression.negotiate('*;q=0'), None)
+        self.assertEqual(compression.negotiate(None), None)
+
+    def test_negotiate_wildcard(self):
+        from ZPublisher.compression import ENCODERS
+        compression = self._makeOne()
+        self.assertEqual(compression.negotiate('*'), ENCODERS[0][0])
+
+    def test_isCompressible(self):
+        compression = self._makeOne(exclude=['application/zip', 'video/*'])
+        self.assertTrue(compression.isCompressible('text/html; charset=x'))
+        self.assertFalse(compression.isCompressible(None))
+        self.assertFalse(compression.isCompressible('image/png'))
+        self.assertFalse(compression.isCompressible('Application/Zip'))
+        self.assertFalse(compression.isCompressible('video/mp4'))
+
+    def test_getEncoder_unknown(self):
+        self.assertRaises(ValueError, self._makeOne().getEncoder, 'bogus')
+
+
+class EncodeIterableTests(unittest.TestCase):
+
+    def _callFUT(self, iterable, coding='gzip', flush=False):
+        from ZPublisher.compression import ResponseCompression
+        from ZPublisher.compression import encode_iterable
+        encoder = ResponseCompression().getEncoder(coding)
+        return encode_iterable(iterable, encoder, flush)
+
+    def test_gzip(self):
+        data = b''.join(self._callFUT([b'abc', b'', b'def']))
+        self.assertEqual(zlib.decompress(data, 16 + zlib.MAX_WBITS),
+                         b'abcdef')
+
+    def test_flush_each_chunk(self):
+        chunks = self._callFUT([b'abc', b'def'], coding='deflate',
+                               flush=True)
+        decompressor = zlib.decompressobj()
+        self.assertEqual(decompressor.decompress(next(chunks)), b'abc')
+        self.assertEqual(decompressor.decompress(next(chunks)), b'def')
+
+    def test_file_closed(self):
+        from io import BytesIO
+        body = BytesIO(b'x' * 100000)
+        data = b''.join(self._callFUT(body))
+        self.assertTrue(body.closed)
+        self.assertEqual(zlib.decompress(data, 16 + zlib.MAX_WBITS),
+                         b'x' * 100000)
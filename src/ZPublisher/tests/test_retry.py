@@ -0,0 +1,88 @@
+import threading
+import unittest
+
+from ZODB.POSException import ConflictError
+from ZODB.utils import p64
+
+
+class RetryPolicyTests(unittest.TestCase):
+
+    def _makeOne(self, **kw):
+        from ZPublisher.retry import RetryPolicy
+        return RetryPolicy(**kw)
+
+    def test_getDelay(self):
+        policy = self._makeOne(backoff=0.1, max_backoff=0.3)
+        for retries, limit in ((1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)):
+            for i in range(20):
+                delay = policy.getDelay(retries)
+                self.assertTrue(0 <= delay <= limit, (retries, delay))
+
+    def test_wait(self):
+        policy = self._makeOne(backoff=0)
+        policy.wait(1)
+        self.assertEqual(policy.getMetrics()['backoff_time'], 0)
+
+    def test_recordConflict(self):
+        policy = self._makeOne()
+        policy.recordConflict(ConflictError(oid=p64(1)), True)
+        policy.recordConflict(ConflictError(oid=p64(1)), False)
+        policy.recordConflict(ConflictError(oid=p64(2)), True)
+        policy.recordConflict(ConflictError(), True)
+        policy.recordRecovery()
+        metrics = policy.getMetrics()
+        self.assertEqual(metrics['conflicts'], 4)
+        self.assertEqual(metrics['retries'], 3)
+        self.assertEqual(metrics['failures'], 1)
+        self.assertEqual(metrics['recoveries'], 1)
+        report = policy.getConflictReport()
+        self.assertEqual([(r['oid'], r['conflicts'], r['retries'])
+                          for r in report],
+                         [('0x01', 2, 1), ('0x02', 1, 1)])
+        policy.reset()
+        self.assertEqual(policy.getMetrics()['conflicts'], 0)
+        self.assertEqual(policy.getConflictReport(), [])
+
+    def test_recordConflict_drops_fewest_conflicts(self):
+        policy = self._makeOne(max_oids=2)
+        for oid in (1, 1, 2, 3):
+            policy.recordConflict(ConflictError(oid=p64(oid)), True)
+        self.assertEqual([r['oid'] for r in policy.getConflictReport()],
+                         ['0x01', '0x03'])
+
+    def test_serialized_off(self):
+        policy = self._makeOne()
+        with policy.serialized(p64(1)):
+            with policy.serialized(p64(1)):
+                pass
+        self.assertEqual(policy._oid_locks, {})
+
+    def test_serialized(self):
+        policy = self._makeOne(serialize=True)
+        order = []
+        entered = threading.Event()
+
+        def retry():
+            with policy.serialized(p64(1)):
+                order.append('other')
+
+        with policy.serialized(None):
+            # No lock for requests without a conflicting object.
+            pass
+        with policy.serialized(p64(1)):
+            thread = threading.Thread(target=retry)
+            thread.start()
+            while not policy.getMetrics()['waits']:
+                entered.wait(0.01)
+            order.append('first')
+        thread.join()
+        self.assertEqual(order, ['first', 'other'])
+        self.assertEqual(policy._oid_locks, {})
+
+
+class GetConflictOidTests(unittest.TestCase):
+
+    def test_oid(self):
+        from ZPublisher.retry import getConflictOid
+        self.assertEqual(getConflictOid(ConflictError(oid=p64(1))), p64(1))
+        self.assertIsNone(getConflictOid(ConflictError()))
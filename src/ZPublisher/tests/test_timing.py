@@ -0,0 +1,115 @@
+import unittest
+
+from ZPublisher import timing
+
+
+class RequestTimingsTests(unittest.TestCase):
+
+    def _makeOne(self):
+        return timing.RequestTimings()
+
+    def test_lap(self):
+        timings = self._makeOne()
+        timings._start = timings._last = 0.0
+        clock = timing.clock
+        timing.clock = lambda: 0.25
+        try:
+            timings.lap('traversal')
+            timings.lap('call')
+        finally:
+            timing.clock = clock
+        self.assertEqual(timings.durations['traversal'], 0.25)
+        self.assertEqual(timings.durations['call'], 0.0)
+        self.assertEqual(timings.total, 0.25)
+
+    def test_serverTiming(self):
+        timings = self._makeOne()
+        timings._start = 0.0
+        timings._last = 0.05
+        timings.durations['traversal'] = 0.02
+        timings.durations['call'] = 0.03
+        timings.loads = 3
+        timings.load_bytes = 1200
+        self.assertEqual(
+            timings.serverTiming(),
+            'traversal;dur=20.0, call;dur=30.0, total;dur=50.0, '
+            'zodb;desc="3 loads, 1200 bytes"')
+
+    def test_watch_counts_loads(self):
+        import transaction
+        from persistent.mapping import PersistentMapping
+        from ZODB.DB import DB
+        from ZODB.MappingStorage import MappingStorage
+        db = DB(MappingStorage())
+        self.addCleanup(db.close)
+        conn = db.open()
+        conn.root()['data'] = PersistentMapping({'a': 'x' * 100})
+        transaction.commit()
+        conn.close()
+        db.cacheMinimize()
+
+        conn = db.open()
+        self.addCleanup(conn.close)
+        timings = self._makeOne()
+        timings.watch(conn)
+        self.assertEqual(conn.root()['data']['a'], 'x' * 100)
+        timings.unwatch()
+        self.assertEqual(timings.loads, 2)
+        self.assertGreater(timings.load_bytes, 100)
+        # Further loads are not counted.
+        timings.unwatch()
+        self.assertEqual(timings.loads, 2)
+        transaction.abort()
+
+    def test_watch_without_connection(self):
+        timings = self._makeOne()
+        timings.watch(None)
+        timings.unwatch()
+        self.assertEqual(timings.loads, 0)
+
+
+class GetTimingsTests(unittest.TestCase):
+
+    def test_not_measured(self):
+        self.assertIs(timing.getTimings(object()), timing.NULL_TIMINGS)
+
+    def test_measured(self):
+        class Request(object):
+            _timings = timing.RequestTimings()
+        self.assertIs(timing.getTimings(Request()), Request._timings)
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_add(self):
+        histogram = timing.Histogram()
+        histogram.add(0.0005)
+        histogram.add(0.003)
+        histogram.add(60)
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[timing.BUCKETS.index(5)], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertEqual(histogram.count, 3)
+        self.assertEqual(histogram.max, 60000)
+
+
+class TimingStatisticsTests(unittest.TestCase):
+
+    def test_record_and_reset(self):
+        statistics = timing.TimingStatistics()
+        timings = timing.RequestTimings()
+        timings.durations['call'] = 0.004
+        timings.loads = 5
+        statistics.record(timings)
+        statistics.record(timing.RequestTimings())
+        self.assertEqual(statistics.requests, 2)
+        self.assertEqual(statistics.loads, 5)
+        report = dict((r['phase'], r) for r in statistics.getReport())
+        self.assertEqual(set(report), set(timing.PHASES + ('total',)))
+        self.assertAlmostEqual(report['call']['mean'], 2.0)
+        self.assertAlmostEqual(report['call']['max'], 4.0)
+        self.assertEqual(sum(report['call']['buckets']), 2)
+        statistics.reset()
+        self.assertEqual(statistics.requests, 0)
+        self.assertEqual(statistics.getReport()[0]['buckets'],
+                         [0] * len(timing.BUCKETS))
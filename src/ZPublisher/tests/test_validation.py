@@ -0,0 +1,163 @@
+import unittest
+
+from Acquisition import Implicit
+from Testing.ZopeTestCase import ZopeTestCase
+from zope.globalrequest import clearRequest
+from zope.globalrequest import setRequest
+from ZPublisher import validation
+
+
+class Context(object):
+
+    def __init__(self, user, stack=()):
+        self.user = user
+        self.stack = list(stack)
+
+
+class DummySecurityManager(object):
+
+    def __init__(self, user='user', stack=(), result=1):
+        self._context = Context(user, stack)
+        self.result = result
+        self.calls = []
+
+    def validate(self, accessed=None, container=None, name=None, value=None,
+                 roles=None):
+        self.calls.append((accessed, container, name, value, roles))
+        return self.result
+
+
+class Item(Implicit):
+    pass
+
+
+class ValidationMemoTests(unittest.TestCase):
+
+    def _makeOne(self):
+        return validation.ValidationMemo()
+
+    def test_memoizes_positive_results(self):
+        memo = self._makeOne()
+        manager = DummySecurityManager()
+        parent = Item()
+        parent.child = Item()
+        validate = memo.validator(manager)
+        self.assertTrue(validate(parent, parent, 'child', parent.child))
+        self.assertTrue(validate(parent, parent, 'child', parent.child))
+        self.assertEqual(len(manager.calls), 1)
+        self.assertEqual((memo.hits, memo.misses, len(memo)), (1, 1, 1))
+
+        # A new validator of the same request shares the results.
+        validate = memo.validator(manager)
+        self.assertTrue(validate(parent, parent, 'child', parent.child))
+        self.assertEqual(len(manager.calls), 1)
+
+    def test_does_not_memoize_denials(self):
+        memo = self._makeOne()
+        manager = DummySecurityManager(result=0)
+        validate = memo.validator(manager)
+        item = Item()
+        self.assertFalse(validate(item, item, 'name', 'value'))
+        self.assertFalse(validate(item, item, 'name', 'value'))
+        self.assertEqual(len(manager.calls), 2)
+        self.assertEqual(len(memo), 0)
+
+    def test_key(self):
+        memo = self._makeOne()
+        item = Item()
+        first, second = Item(), Item()
+        manager = DummySecurityManager()
+        validate = memo.validator(manager)
+        validate(first, first, 'item', item.__of__(first))
+        validate(first, first, 'other', item.__of__(first))
+        validate(second, second, 'item', item.__of__(second))
+        self.assertEqual(len(manager.calls), 3)
+
+        # Another user or executable does not share the results.
+        for other in (DummySecurityManager(user='other'),
+                      DummySecurityManager(stack=['script'])):
+            memo.validator(other)(first, first, 'item', item.__of__(first))
+            self.assertEqual(len(other.calls), 1)
+
+    def test_explicit_roles(self):
+        memo = self._makeOne()
+        manager = DummySecurityManager()
+        validate = memo.validator(manager)
+        item = Item()
+        validate(item, item, 'name', 'value', ('Manager',))
+        validate(item, item, 'name', 'value', ('Manager',))
+        self.assertEqual(len(manager.calls), 2)
+        self.assertEqual(manager.calls[0][-1], ('Manager',))
+        self.assertEqual(len(memo), 0)
+
+    def test_containment(self):
+        memo = self._makeOne()
+        parent, item = Item(), Item()
+        ids = memo.containment(item.__of__(parent))
+        self.assertEqual(ids, (id(item), id(parent)))
+        for i in range(10):
+            self.assertEqual(memo.containment(item.__of__(parent)), ids)
+        # Only the unwrapped objects are kept, not the wrappers.
+        self.assertEqual(sorted(memo._objects), sorted(ids))
+
+    def test_clear(self):
+        memo = self._makeOne()
+        memo.validator(DummySecurityManager())(None, None, None, 'value')
+        memo.clear()
+        self.assertEqual(len(memo), 0)
+
+
+class RestrictedTraverseTests(ZopeTestCase):
+
+    def afterSetUp(self):
+        from OFS.Folder import manage_addFolder
+        manage_addFolder(self.folder, 'sub')
+        self.folder.sub.manage_permission('View', ['Manager'], acquire=0)
+        self.memo = validation.ValidationMemo()
+        self.app.REQUEST._validation_memo = self.memo
+        setRequest(self.app.REQUEST)
+        self.addCleanup(clearRequest)
+
+    def test_getValidator(self):
+        from AccessControl.SecurityManagement import getSecurityManager
+        clearRequest()
+        manager = getSecurityManager()
+        self.assertEqual(validation.getValidator(manager), manager.validate)
+
+    def test_memoizes_traversal(self):
+        self.folder.restrictedTraverse('sub')
+        misses = self.memo.misses
+        self.assertTrue(misses)
+        self.folder.restrictedTraverse('sub')
+        self.assertEqual(self.memo.misses, misses)
+        self.assertEqual(self.memo.hits, misses)
+
+    def test_guarded_getattr(self):
+        from zExceptions import Unauthorized
+        guarded_getattr = validation.getGuardedGetattr()
+        self.assertEqual(guarded_getattr(self.folder, 'getId')(),
+                         self.folder.getId())
+        self.assertEqual(guarded_getattr(self.folder, 'getId')(),
+                         self.folder.getId())
+        self.assertEqual((self.memo.hits, self.memo.misses), (1, 1))
+        self.assertIs(guarded_getattr(self.folder, 'missing', None), None)
+        with self.assertRaises(Unauthorized):
+            guarded_getattr(self.folder, '_private')
+        self.assertEqual(len(self.memo), 1)
+
+    def test_denials(self):
+        from zExceptions import Unauthorized
+        self.folder.sub.manage_permission('Access contents information',
+                                          ['Manager'], acquire=0)
+        self.folder.sub._setObject('item', Item())
+        for i in range(2):
+            with self.assertRaises(Unauthorized):
+                self.folder.restrictedTraverse('sub/item')
+        self.assertEqual(self.memo.hits, 0)
+
+
+def test_suite():
+    return unittest.TestSuite((
+        unittest.makeSuite(ValidationMemoTests),
+        unittest.makeSuite(RestrictedTraverseTests),
+    ))
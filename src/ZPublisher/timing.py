@@ -0,0 +1,192 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Timing of the phases of publishing requests.
+
+The publisher measures a request as a sequence of laps: each call of
+``lap`` adds the time since the previous call to a phase. Time spent
+outside of the named phases, like loading the application and
+notifying events, is added to ``other``. The timings are sent to the
+client in a ``Server-Timing`` header and added to process-wide
+histograms shown in the Control Panel.
+"""
+
+import time
+from threading import Lock
+
+
+try:
+    clock = time.perf_counter
+except AttributeError:  # PY2
+    clock = time.time
+
+PHASES = ('input', 'traversal', 'authentication', 'call', 'commit',
+          'finalize', 'other')
+
+# Upper bounds of the histogram buckets in milliseconds.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, None)
+
+
+def _transfer(connections):
+    # The number of loaded objects and the estimated size of the
+    # objects in the caches of connections.
+    loads = size = 0
+    for connection in connections:
+        loads += connection.getTransferCounts()[0]
+        size += connection._cache.total_estimated_size
+    return loads, size
+
+
+class RequestTimings(object):
+    """The durations of the phases of publishing one request in seconds
+    and the ZODB objects it loaded.
+    """
+
+    def __init__(self):
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.loads = 0
+        self.load_bytes = 0
+        self._connections = ()
+        self._transfer = (0, 0)
+        self._start = self._last = clock()
+
+    def lap(self, phase):
+        """Add the time since the last lap to phase."""
+        now = clock()
+        self.durations[phase] += now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self._start
+
+    def watch(self, jar):
+        """Start counting the objects loaded by jar and the connections
+        to other databases it opened.
+        """
+        connections = getattr(jar, 'connections', None)
+        if connections is None:
+            return
+        self._connections = list(connections.values())
+        self._transfer = _transfer(self._connections)
+
+    def unwatch(self):
+        """Stop counting loaded objects."""
+        if self._connections:
+            loads, size = _transfer(self._connections)
+            self.loads += loads - self._transfer[0]
+            # The caches are only garbage collected between
+            # transactions, so their growth is the size of the objects
+            # loaded meanwhile.
+            self.load_bytes += max(size - self._transfer[1], 0)
+            self._connections = ()
+
+    def serverTiming(self):
+        """Return the value of a Server-Timing header."""
+        metrics = ['%s;dur=%.1f' % (phase, self.durations[phase] * 1000)
+                   for phase in PHASES if self.durations[phase]]
+        metrics.append('total;dur=%.1f' % (self.total * 1000))
+        metrics.append('zodb;desc="%d loads, %d bytes"' % (
+            self.loads, self.load_bytes))
+        return ', '.join(metrics)
+
+
+class NullTimings(object):
+    """Used for requests which are not measured."""
+
+    def lap(self, phase):
+        pass
+
+    def watch(self, jar):
+        pass
+
+    def unwatch(self):
+        pass
+
+
+NULL_TIMINGS = NullTimings()
+
+
+def getTimings(request):
+    """Return the timings of request."""
+    timings = getattr(request, '_timings', None)
+    return NULL_TIMINGS if timings is None else timings
+
+
+class Histogram(object):
+    """Counts durations in the buckets of BUCKETS."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        for i, bound in enumerate(BUCKETS):
+            if bound is None or ms <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+
+class TimingStatistics(object):
+    """Aggregates the timings of the requests of the process."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._clear()
+
+    def _clear(self):
+        self.histograms = dict((phase, Histogram())
+                               for phase in PHASES + ('total',))
+        self.requests = 0
+        self.loads = 0
+        self.load_bytes = 0
+        self.since = time.time()
+
+    def reset(self):
+        """Forget all recorded requests."""
+        with self._lock:
+            self._clear()
+
+    def record(self, timings):
+        with self._lock:
+            self.requests += 1
+            self.loads += timings.loads
+            self.load_bytes += timings.load_bytes
+            for phase, seconds in timings.durations.items():
+                self.histograms[phase].add(seconds)
+            self.histograms['total'].add(timings.total)
+
+    def getReport(self):
+        """Return a list of mappings describing the phases."""
+        with self._lock:
+            report = []
+            for phase in PHASES + ('total',):
+                histogram = self.histograms[phase]
+                count = histogram.count
+                report.append({
+                    'phase': phase,
+                    'mean': histogram.total / count if count else 0.0,
+                    'max': histogram.max,
+                    'total': histogram.total,
+                    'buckets': list(histogram.counts),
+                })
+            return report
+
+
+statistics = TimingStatistics()
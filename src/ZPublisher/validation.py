@@ -0,0 +1,163 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Memoize the security checks of restricted traversals.
+
+Templates, scripts and views of the same request traverse the same paths
+over and over again, and each segment of a restricted traversal asks the
+security policy whether the current user may access it. With the
+``validation-memo`` option the publisher keeps the positive results for
+the duration of a request and ``restrictedTraverse`` looks them up first.
+
+The result of a check depends on the user, on the executable on top of
+the security stack (for its proxy roles and owner) and on the
+containment of the objects involved (for acquired roles, local roles and
+containment checks), so these make up the key. Denials are never
+memoized. Changes of roles or permission settings during the request
+only take effect for checks that were not memoized yet.
+"""
+
+from types import MethodType
+
+from AccessControl import ZopeGuards
+from AccessControl.SecurityManagement import getSecurityManager
+from Acquisition import aq_base
+from Acquisition import aq_inner
+from Acquisition import aq_parent
+from zope.globalrequest import getRequest
+
+
+_marker = object()
+
+
+def _principal(security_manager):
+    context = security_manager._context
+    stack = context.stack
+    return (context.user, stack[-1] if stack else None)
+
+
+class ValidationMemo(object):
+    """The positive security checks of one request."""
+
+    def __init__(self):
+        # key -> principal
+        self._results = {}
+        # id(ob) -> ob for the unwrapped objects in the keys, which are
+        # kept alive so their ids stay unique while the request lasts
+        self._objects = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        self._results.clear()
+        self._objects.clear()
+
+    def _id(self, ob):
+        self._objects[id(ob)] = ob
+        return id(ob)
+
+    def containment(self, ob):
+        """Return the ids of ob and of the objects containing it."""
+        if isinstance(ob, MethodType):
+            # Bound methods are created on each access, their function
+            # and the containment of their instance identify them.
+            return (self._id(ob.__func__),) + self.containment(ob.__self__)
+        ids = ()
+        while ob is not None:
+            inner = aq_inner(ob)
+            ids += (self._id(aq_base(inner)),)
+            ob = aq_parent(inner)
+        return ids
+
+    def validator(self, security_manager):
+        """Return a memoizing variant of the validate method of
+        security_manager.
+        """
+        principal = _principal(security_manager)
+        ids = (id(principal[0]), id(principal[1]))
+        results = self._results
+        containment = self.containment
+        validate = security_manager.validate
+
+        def memoized(accessed=None, container=None, name=None, value=None,
+                     roles=_marker):
+            if roles is not _marker:
+                return validate(accessed, container, name, value, roles)
+            key = ('validate', name, ids, containment(accessed),
+                   containment(container), containment(value))
+            if key in results:
+                self.hits += 1
+                return 1
+            self.misses += 1
+            result = validate(accessed, container, name, value)
+            if result:
+                results[key] = principal
+            return result
+
+        return memoized
+
+    def guarded_getattr(self, inst, name, default=_marker):
+        """Memoizing variant of ``AccessControl.ZopeGuards.guarded_getattr``.
+        """
+        if name[:1] == '_':
+            # Never allowed, let guarded_getattr raise.
+            return ZopeGuards.guarded_getattr(inst, name)
+        try:
+            value = getattr(inst, name)
+        except AttributeError:
+            if default is _marker:
+                raise
+            return default
+        principal = _principal(getSecurityManager())
+        ids = (id(principal[0]), id(principal[1]))
+        key = ('getattr', name, ids, self.containment(inst),
+               self.containment(value))
+        if key in self._results:
+            self.hits += 1
+            return value
+        self.misses += 1
+        checked = ZopeGuards.guarded_getattr(inst, name)
+        if checked is not value:
+            value = checked
+            key = key[:-1] + (self.containment(value),)
+        self._results[key] = principal
+        return value
+
+
+def getValidationMemo(request):
+    """Return the validation memo of request, or None."""
+    return getattr(request, '_validation_memo', None)
+
+
+def getValidator(security_manager=None):
+    """Return the validate function for restricted traversals of the
+    current request.
+    """
+    if security_manager is None:
+        security_manager = getSecurityManager()
+    memo = getValidationMemo(getRequest())
+    if memo is None:
+        return security_manager.validate
+    return memo.validator(security_manager)
+
+
+def getGuardedGetattr():
+    """Return the guarded_getattr function for restricted traversals of
+    the current request.
+    """
+    memo = getValidationMemo(getRequest())
+    if memo is None:
+        return ZopeGuards.guarded_getattr
+    return memo.guarded_getattr
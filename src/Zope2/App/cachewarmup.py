@@ -0,0 +1,213 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Warm the ZODB connection caches when Zope starts.
+
+A process starting with empty connection caches loads every object it
+uses from the storage, so the first requests after a restart are slow.
+Zope records the objects most recently used by the connections of each
+database in a file, periodically and when the process exits, and loads
+them into the connections of the pools when it starts again.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from binascii import hexlify
+from binascii import unhexlify
+
+import transaction
+
+
+logger = logging.getLogger('Zope')
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+def getHotOids(db, size):
+    """Return the oids of up to size objects recently used by the
+    connections of db, the hottest first.
+
+    Objects rank higher the more recently they were used and the more
+    connections use them.
+    """
+    scores = {}
+
+    def collect(connection):
+        items = connection._cache.lru_items()[-size:]
+        count = len(items)
+        for rank, (oid, ob) in enumerate(items):
+            scores[oid] = scores.get(oid, 0) + float(rank + 1) / count
+
+    db._connectionMap(collect)
+    oids = sorted(scores, key=lambda oid: (-scores[oid], oid))
+    return oids[:size]
+
+
+def record(databases, filename, size):
+    """Write the hot oids of the databases, a mapping of names to
+    databases, to filename.
+
+    Nothing is written if the connections use no objects, for example
+    because the databases were closed.
+    """
+    data = {}
+    for name, db in databases.items():
+        oids = getHotOids(db, size)
+        if oids:
+            data[name] = [hexlify(oid).decode('ascii') for oid in oids]
+    if not data:
+        return
+    # The processes of a host share the file, each writes its own copy.
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filename)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        _replace(tmp, filename)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+
+def load(filename):
+    """Return a mapping of database names to the oids recorded in
+    filename, an empty mapping if it cannot be read.
+    """
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+        return dict((name, [unhexlify(oid) for oid in oids])
+                    for name, oids in data.items())
+    except (IOError, OSError, ValueError, TypeError) as exc:
+        if os.path.exists(filename):
+            logger.warning('Cannot read cache warmup file %s: %s',
+                           filename, exc)
+        return {}
+
+
+def warm(db, oids, connections=None):
+    """Load the objects of oids into connections connections of the
+    pool of db, all of them by default.
+
+    Returns the number of objects loaded into each connection.
+    """
+    if connections is None:
+        connections = db.getPoolSize()
+    oids = oids[:db.getCacheSize()]
+    # The connections are opened at the same time, so each of them is
+    # a different connection of the pool.
+    tm = transaction.TransactionManager()
+    opened = [db.open(transaction_manager=tm) for i in range(connections)]
+    loaded = 0
+    try:
+        if opened:
+            # Storages like ZEO fetch the objects in the background.
+            opened[0].prefetch(oids)
+        for connection in opened:
+            loaded = 0
+            for oid in oids:
+                try:
+                    connection.get(oid)._p_activate()
+                except Exception:
+                    # The object was removed or cannot be loaded anymore.
+                    continue
+                loaded += 1
+    finally:
+        tm.abort()
+        for connection in opened:
+            connection.close()
+    return loaded
+
+
+def _warm(name, db, oids):
+    start = time.time()
+    loaded = warm(db, oids)
+    logger.info('Loaded %d objects into each connection cache of the %s '
+                'database in %.1f seconds.', loaded, name, time.time() - start)
+
+
+def warmAll(databases, filename, background=False):
+    """Warm the connection caches of the databases, a mapping of names to
+    databases, with the oids recorded in filename.
+
+    If background is true, each database is warmed in a thread and the
+    function returns the threads.
+    """
+    threads = []
+    for name, oids in sorted(load(filename).items()):
+        db = databases.get(name)
+        if db is None or not oids:
+            continue
+        if background:
+            thread = threading.Thread(target=_warm, args=(name, db, oids),
+                                      name='cache warmup %s' % name)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        else:
+            _warm(name, db, oids)
+    return threads
+
+
+class CacheRecorder(threading.Thread):
+    """Records the hot oids of databases every interval seconds and when
+    it is stopped.
+    """
+
+    def __init__(self, databases, filename, size=1000, interval=300):
+        threading.Thread.__init__(self, name='cache recorder')
+        self.daemon = True
+        self.databases = databases
+        self.filename = filename
+        self.size = size
+        self.interval = interval
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            self.record()
+
+    def record(self):
+        try:
+            record(self.databases, self.filename, self.size)
+        except Exception:
+            logger.exception('Cannot write cache warmup file %s',
+                             self.filename)
+
+    def stop(self):
+        """Stop recording periodically and record once more."""
+        self._finished.set()
+        self.record()
+
+
+def setup(configuration, databases):
+    """Warm the caches of databases and start recording their hot oids
+    as configured.
+
+    Returns the CacheRecorder, or None if cache warmup is disabled.
+    """
+    filename = getattr(configuration, 'cache_warmup_file', None)
+    if not filename:
+        return None
+    warmAll(databases, filename, configuration.cache_warmup_background)
+    recorder = CacheRecorder(databases, filename,
+                             configuration.cache_warmup_size,
+                             configuration.cache_warmup_interval)
+    if recorder.interval:
+        recorder.start()
+    atexit.register(recorder.stop)
+    return recorder
@@ -27,6 +27,7 @@ import ZODB
 import Zope2
 from AccessControl.SecurityManagement import newSecurityManager
 from AccessControl.SecurityManagement import noSecurityManager
+from App import startupprofile
 from App.config import getConfiguration
 from zope.deferredimport import deprecated
 from zope.event import notify
@@ -83,11 +84,13 @@ def startup():
 
     global app
 
+    configuration = getConfiguration()
+    if getattr(configuration, 'startup_profile', False):
+        startupprofile.start()
+
     # Import products
     OFS.Application.import_products()
 
-    configuration = getConfiguration()
-
     # Open the database
     dbtab = configuration.dbtab
     DB = None
@@ -122,9 +125,10 @@ def startup():
     # opened at all
     if dbtab is not None:
         for mount, name in dbtab.listMountPaths():
-            _db = dbtab.getDatabase(mount)
-            _conn = _db.open()
-            _conn.close()
+            with startupprofile.measure('database', mount):
+                _db = dbtab.getDatabase(mount)
+                _conn = _db.open()
+                _conn.close()
             del _conn
             del _db
 
@@ -140,18 +144,27 @@ def startup():
     newSecurityManager(None, AccessControl.User.system)
 
     # Set up the CA
-    load_zcml()
+    with startupprofile.measure('startup', 'ZCML'):
+        load_zcml()
 
     # Set up the "app" object that automagically opens
     # connections
     app = App.ZApplication.ZApplicationWrapper(
-        DB, 'Application', OFS.Application.Application)
+        DB, 'Application', OFS.Application.Application,
+        getattr(configuration, 'connection_affinity', False))
     Zope2.bobo_application = app
 
     # Initialize the app object
-    application = app()
-    OFS.Application.initialize(application)
-    application._p_jar.close()
+    with startupprofile.measure('startup', 'initializing the application'):
+        application = app()
+        OFS.Application.initialize(application)
+        application._p_jar.close()
+
+    # Load the objects used most before the last shutdown into the
+    # connection caches.
+    from . import cachewarmup
+    with startupprofile.measure('startup', 'cache warmup'):
+        cachewarmup.setup(configuration, DB.databases)
 
     # "Log off" as system user
     noSecurityManager()
@@ -160,3 +173,5 @@ def startup():
     startup_time = asctime()
 
     notify(DatabaseOpenedWithRoot(DB))
+
+    startupprofile.stop()
@@ -0,0 +1,151 @@
+##############################################################################
+#
+# Copyright (c) 2019 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import transaction
+from persistent.mapping import PersistentMapping
+from ZODB.DB import DB
+from ZODB.MappingStorage import MappingStorage
+
+
+class DummyConfiguration(object):
+    cache_warmup_size = 1000
+    cache_warmup_interval = 0
+    cache_warmup_background = False
+
+    def __init__(self, cache_warmup_file=None):
+        self.cache_warmup_file = cache_warmup_file
+
+
+class CacheWarmupTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'hot.json')
+        self.db = DB(MappingStorage(), pool_size=3)
+        conn = self.db.open()
+        root = conn.root()
+        for name in 'abcd':
+            root[name] = PersistentMapping({'name': name})
+        transaction.commit()
+        self.oids = dict((name, root[name]._p_oid) for name in 'abcd')
+        conn.close()
+
+    def tearDown(self):
+        transaction.abort()
+        self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def _use(self, *names):
+        conn = self.db.open()
+        self.db.cacheMinimize()
+        for name in names:
+            conn.root()[name]['name']
+        conn.close()
+
+    def _cachedOids(self, conn):
+        return set(oid for oid, ob in conn._cache.lru_items())
+
+    def test_getHotOids(self):
+        from Zope2.App.cachewarmup import getHotOids
+        self._use('a', 'b')
+        oids = getHotOids(self.db, 10)
+        # The most recently used first.
+        self.assertEqual(oids[0], self.oids['b'])
+        self.assertEqual(set(oids[1:]), set([self.oids['a'], b'\0' * 8]))
+        self.assertEqual(getHotOids(self.db, 1), [self.oids['b']])
+
+    def test_record_and_load(self):
+        from Zope2.App.cachewarmup import load
+        from Zope2.App.cachewarmup import record
+        self._use('c')
+        record({'main': self.db}, self.filename, 10)
+        loaded = load(self.filename)
+        self.assertEqual(list(loaded), ['main'])
+        self.assertIn(self.oids['c'], loaded['main'])
+
+    def test_record_temporary_file(self):
+        from Zope2.App.cachewarmup import record
+        self._use('c')
+        # Left by another process recording at the same time.
+        with open(self.filename + '.tmp', 'w') as f:
+            f.write('{')
+        record({'main': self.db}, self.filename, 10)
+        record({'main': self.db}, self.filename, 10)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)),
+                         ['hot.json', 'hot.json.tmp'])
+
+    def test_record_nothing_used(self):
+        from Zope2.App.cachewarmup import record
+        self.db.cacheMinimize()
+        record({'main': self.db}, self.filename, 10)
+        self.assertFalse(os.path.exists(self.filename))
+
+    def test_load_missing_or_broken(self):
+        from Zope2.App.cachewarmup import load
+        self.assertEqual(load(self.filename), {})
+        with open(self.filename, 'w') as f:
+            f.write('{broken')
+        self.assertEqual(load(self.filename), {})
+
+    def test_warm(self):
+        from ZODB.utils import p64
+        from Zope2.App.cachewarmup import warm
+        self.db.cacheMinimize()
+        oids = [self.oids['a'], self.oids['d'], p64(4711)]
+        self.assertEqual(warm(self.db, oids), 2)
+        # All connections of the pool hold the objects.
+        conns = [self.db.open() for i in range(3)]
+        for conn in conns:
+            self.assertTrue(set(oids[:2]) <= self._cachedOids(conn))
+        for conn in conns:
+            conn.close()
+
+    def test_warmAll_background(self):
+        from Zope2.App.cachewarmup import record
+        from Zope2.App.cachewarmup import warmAll
+        self._use('b')
+        record({'main': self.db, 'other': self.db}, self.filename, 10)
+        self.db.cacheMinimize()
+        threads = warmAll({'main': self.db}, self.filename, background=True)
+        self.assertEqual(len(threads), 1)
+        threads[0].join()
+        conn = self.db.open()
+        self.assertIn(self.oids['b'], self._cachedOids(conn))
+        conn.close()
+
+    def test_setup_disabled(self):
+        from Zope2.App.cachewarmup import setup
+        self.assertIsNone(setup(DummyConfiguration(), {'main': self.db}))
+        self.assertIsNone(setup(object(), {'main': self.db}))
+
+    def test_setup(self):
+        import atexit
+        from Zope2.App.cachewarmup import setup
+        self._use('a')
+        configuration = DummyConfiguration(self.filename)
+        registered = []
+        register = atexit.register
+        atexit.register = registered.append
+        try:
+            recorder = setup(configuration, {'main': self.db})
+        finally:
+            atexit.register = register
+        self.assertEqual(registered, [recorder.stop])
+        self.assertFalse(recorder.is_alive())
+        recorder.stop()
+        self.assertTrue(os.path.exists(self.filename))
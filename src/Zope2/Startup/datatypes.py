@@ -160,6 +160,8 @@ class ZopeDatabase(ZODBDatabase):
         if self.config.connection_class:
             # set the connection class
             DB.klass = self.config.connection_class
+            # Drop the connection the root was created with.
+            DB.pool.clear()
         if self.config.class_factory is not None:
             DB.classFactory = self.config.class_factory
         return DB
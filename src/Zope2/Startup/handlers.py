@@ -85,6 +85,10 @@ def root_wsgi_handler(cfg):
     else:
         HTTPRequest.retry_max_count = 3
 
+    # set up form parsing
+    HTTPRequest.lazy_form_parsing = cfg.lazy_form_parsing
+    HTTPRequest.form_spill_threshold = cfg.form_spill_threshold
+
 
 def _name_to_ips(host):
     """Map a name *host* to the sequence of its IP addresses.
@@ -75,6 +75,26 @@ class WSGIStarter(object):
         from ZPublisher import WSGIPublisher
         WSGIPublisher.set_default_debug_mode(self.cfg.debug_mode)
         WSGIPublisher.set_default_debug_exceptions(self.cfg.debug_exceptions)
+        WSGIPublisher.set_default_response_streaming(
+            self.cfg.response_streaming)
+        if self.cfg.response_compression:
+            from ZPublisher.compression import ResponseCompression
+            WSGIPublisher.set_default_response_compression(
+                ResponseCompression(
+                    min_size=self.cfg.response_compression_min_size,
+                    level=self.cfg.response_compression_level,
+                    exclude=self.cfg.response_compression_exclude))
+        else:
+            WSGIPublisher.set_default_response_compression(None)
+        WSGIPublisher.set_default_request_timing(
+            self.cfg.request_timing, self.cfg.request_timing_header)
+        WSGIPublisher.set_default_zodb_activity(
+            self.cfg.zodb_activity, self.cfg.zodb_activity_patterns)
+        WSGIPublisher.set_default_validation_memo(self.cfg.validation_memo)
+        from ZPublisher.retry import RetryPolicy
+        WSGIPublisher.set_default_retry_policy(
+            RetryPolicy(backoff=self.cfg.conflict_retry_backoff,
+                        serialize=self.cfg.conflict_retry_serialize))
         WSGIPublisher.set_default_authentication_realm(
             self.cfg.http_realm)
         if self.cfg.trusted_proxies:
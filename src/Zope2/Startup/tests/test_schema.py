@@ -141,3 +141,47 @@ class WSGIStartupTestCase(unittest.TestCase):
             """.format(sep=os.path.sep))
         expected = os.path.join(conf.instancehome, 'Z5.pid')
         self.assertEqual(conf.pid_filename, expected)
+
+    def test_cache_warmup(self):
+        conf, dummy = self.load_config_text(u"""\
+            instancehome <<INSTANCE_HOME>>
+            """)
+        self.assertIsNone(conf.cache_warmup_file)
+        self.assertEqual(conf.cache_warmup_size, 1000)
+        self.assertEqual(conf.cache_warmup_interval, 300)
+        self.assertFalse(conf.cache_warmup_background)
+
+        conf, dummy = self.load_config_text(u"""\
+            instancehome <<INSTANCE_HOME>>
+            cache-warmup-file <<INSTANCE_HOME>>{sep}hot.json
+            cache-warmup-interval 30s
+            cache-warmup-background on
+            """.format(sep=os.path.sep))
+        self.assertEqual(conf.cache_warmup_file,
+                         os.path.join(conf.instancehome, 'hot.json'))
+        self.assertEqual(conf.cache_warmup_interval, 30)
+        self.assertTrue(conf.cache_warmup_background)
+
+    def test_connection_affinity(self):
+        conf, dummy = self.load_config_text(u"""\
+            instancehome <<INSTANCE_HOME>>
+            """)
+        self.assertFalse(conf.connection_affinity)
+
+        conf, dummy = self.load_config_text(u"""\
+            instancehome <<INSTANCE_HOME>>
+            connection-affinity on
+            """)
+        self.assertTrue(conf.connection_affinity)
+
+    def test_startup_profile(self):
+        conf, dummy = self.load_config_text(u"""\
+            instancehome <<INSTANCE_HOME>>
+            """)
+        self.assertFalse(conf.startup_profile)
+
+        conf, dummy = self.load_config_text(u"""\
+            instancehome <<INSTANCE_HOME>>
+            startup-profile on
+            """)
+        self.assertTrue(conf.startup_profile)
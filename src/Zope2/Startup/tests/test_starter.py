@@ -108,6 +108,159 @@ class WSGIStarterTestCase(unittest.TestCase):
         root_wsgi_handler(conf)
         self.assertEqual(HTTPRequest.retry_max_count, 25)
 
+    def testSetupLazyFormParsing(self):
+        from Zope2.Startup.handlers import root_wsgi_handler
+        from ZPublisher.HTTPRequest import HTTPRequest
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        root_wsgi_handler(conf)
+        self.assertFalse(HTTPRequest.lazy_form_parsing)
+        self.assertEqual(HTTPRequest.form_spill_threshold, 1024 * 1024)
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            lazy-form-parsing on
+            form-spill-threshold 64KB""")
+        try:
+            root_wsgi_handler(conf)
+            self.assertTrue(HTTPRequest.lazy_form_parsing)
+            self.assertEqual(HTTPRequest.form_spill_threshold, 64 * 1024)
+        finally:
+            HTTPRequest.lazy_form_parsing = False
+            HTTPRequest.form_spill_threshold = 1024 * 1024
+
+    def testSetupPublisherResponseStreaming(self):
+        from ZPublisher import WSGIPublisher
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        self.assertFalse(WSGIPublisher.get_response_streaming())
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            response-streaming on""")
+        starter = self.get_starter(conf)
+        try:
+            starter.setupPublisher()
+            self.assertTrue(WSGIPublisher.get_response_streaming())
+        finally:
+            WSGIPublisher.set_default_response_streaming(False)
+
+    def testSetupPublisherResponseCompression(self):
+        from ZPublisher import WSGIPublisher
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        self.assertIsNone(WSGIPublisher.get_response_compression())
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            response-compression on
+            response-compression-min-size 2KB
+            response-compression-level 9
+            response-compression-exclude application/zip text/csv""")
+        starter = self.get_starter(conf)
+        try:
+            starter.setupPublisher()
+            compression = WSGIPublisher.get_response_compression()
+            self.assertEqual(compression.min_size, 2048)
+            self.assertEqual(compression.level, 9)
+            self.assertEqual(compression.exclude,
+                             {'application/zip', 'text/csv'})
+        finally:
+            WSGIPublisher.set_default_response_compression(None)
+
+    def testSetupPublisherRequestTiming(self):
+        from ZPublisher import WSGIPublisher
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        self.assertFalse(WSGIPublisher.get_request_timing())
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            request-timing on
+            request-timing-header off""")
+        starter = self.get_starter(conf)
+        try:
+            starter.setupPublisher()
+            self.assertTrue(WSGIPublisher.get_request_timing())
+            self.assertFalse(WSGIPublisher._DEFAULT_SERVER_TIMING_HEADER)
+        finally:
+            WSGIPublisher.set_default_request_timing(False)
+
+    def testSetupPublisherZODBActivity(self):
+        from ZPublisher import WSGIPublisher
+        from ZPublisher.activity import statistics
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        self.assertFalse(WSGIPublisher.get_zodb_activity())
+        self.assertEqual(statistics.max_patterns, 100)
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            zodb-activity on
+            zodb-activity-patterns 20""")
+        starter = self.get_starter(conf)
+        try:
+            starter.setupPublisher()
+            self.assertTrue(WSGIPublisher.get_zodb_activity())
+            self.assertEqual(statistics.max_patterns, 20)
+        finally:
+            WSGIPublisher.set_default_zodb_activity(False)
+
+    def testSetupPublisherValidationMemo(self):
+        from ZPublisher import WSGIPublisher
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        self.assertFalse(WSGIPublisher.get_validation_memo())
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            validation-memo on""")
+        starter = self.get_starter(conf)
+        try:
+            starter.setupPublisher()
+            self.assertTrue(WSGIPublisher.get_validation_memo())
+        finally:
+            WSGIPublisher.set_default_validation_memo(False)
+
+    def testSetupPublisherRetryPolicy(self):
+        from ZPublisher import WSGIPublisher
+        from ZPublisher.retry import RetryPolicy
+        self.addCleanup(WSGIPublisher.set_default_retry_policy, RetryPolicy())
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        policy = WSGIPublisher.get_retry_policy()
+        self.assertEqual(policy.backoff, 0.05)
+        self.assertFalse(policy.serialize)
+
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>
+            conflict-retry-backoff 0.5
+            conflict-retry-serialize on""")
+        starter = self.get_starter(conf)
+        starter.setupPublisher()
+        policy = WSGIPublisher.get_retry_policy()
+        self.assertEqual(policy.backoff, 0.5)
+        self.assertTrue(policy.serialize)
+
+    def testResponseCompressionExcludeDefault(self):
+        conf = self.load_config_text("""
+            instancehome <<INSTANCE_HOME>>""")
+        self.assertIn('application/zip', conf.response_compression_exclude)
+        self.assertIn('video/*', conf.response_compression_exclude)
+
     @unittest.skipUnless(six.PY2, 'Python 2 specific checkinterval test.')
     def testConfigureInterpreter(self):
         oldcheckinterval = sys.getcheckinterval()
@@ -68,6 +68,26 @@ class ZConsoleTestCase(unittest.TestCase):
             sys.stdout = self.stored_stdout
         self.assertEqual(expected, str(got))
 
+    def test_precompile(self):
+        from Products.PageTemplates import precompile as module
+        # Cooking all templates of the test run would cook those of other
+        # tests with the engine registered by this one.
+        findFileTemplates = module.findFileTemplates
+        module.findFileTemplates = lambda: []
+        try:
+            from Zope2.utilities.zconsole import precompile
+            sys.stdout = StringIO()
+            precompile(self.zopeconf)
+            sys.stdout.seek(0)
+            got = sys.stdout.read()
+        finally:
+            module.findFileTemplates = findFileTemplates
+            sys.argv = self.stored_sys_argv
+            sys.stdout = self.stored_stdout
+        self.assertTrue(got.startswith(
+            'Compiled 0 filesystem templates (0 failed) and '))
+        self.assertIn('templates in the database (0 failed)', got)
+
     def test_runscript(self):
         script = os.path.join(self.instancedir, 'test_script.py')
         # Use a backslash to fake windows paths under linux
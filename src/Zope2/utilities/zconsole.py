@@ -1,6 +1,7 @@
 import os
 import sys
 
+import transaction
 import Zope2
 from AccessControl.SecurityManagement import newSecurityManager
 from AccessControl.SpecialUsers import system as user
@@ -29,6 +30,25 @@ def debug(zopeconf):
     return Zope2.app()
 
 
+def precompile(zopeconf):
+    make_wsgi_app({}, zopeconf)
+    from chameleon.config import CACHE_DIRECTORY
+    from Products.PageTemplates.precompile import precompileFileTemplates
+    from Products.PageTemplates.precompile import precompileObjects
+    app = Zope2.app()
+    try:
+        files = precompileFileTemplates()
+        objects = precompileObjects(app)
+    finally:
+        transaction.abort()
+        app._p_jar.close()
+    print('Compiled %d filesystem templates (%d failed) and %d templates '
+          'in the database (%d failed).' % (files + objects))
+    if not CACHE_DIRECTORY:
+        print('CHAMELEON_CACHE is not set, the compiled templates are '
+              'not kept.')
+
+
 def debug_console(zopeconf):
     cmd = '{} -i -c "import sys; sys.path={}; from Zope2.utilities.zconsole import debug; app = debug(\\\"{}\\\")"'.format(sys.executable, sys.path, zopeconf)  # noqa: E501
     os.system(cmd)
@@ -39,8 +59,8 @@ def main(args=sys.argv):
     parser = argparse.ArgumentParser(description='Zope console')
     parser.add_argument(
             'mode',
-            choices=['run', 'debug'],
-            help='mode of operation, run: run script; debug: interactive console')  # noqa: E501
+            choices=['run', 'debug', 'precompile'],
+            help='mode of operation, run: run script; debug: interactive console; precompile: compile all page templates')  # noqa: E501
     parser.add_argument('zopeconf', help='path to zope.conf')
     parser.add_argument('scriptargs', nargs=argparse.REMAINDER)
     namespace, unused = parser.parse_known_args(args[1:])
@@ -48,6 +68,8 @@ def main(args=sys.argv):
         debug_console(namespace.zopeconf)
     elif namespace.mode == 'run':
         runscript(namespace.zopeconf, *namespace.scriptargs)
+    elif namespace.mode == 'precompile':
+        precompile(namespace.zopeconf)
 
 
 if __name__ == '__main__':
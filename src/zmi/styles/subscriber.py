@@ -1,14 +1,27 @@
+import os.path
+
 import zope.component
 import zope.interface
+from App.StaticAsset import getStaticAsset
+
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def _url(name):
+    """Return the URL of the resource `name` including its fingerprint, so
+    browsers cache it until it changes."""
+    asset = getStaticAsset(os.path.join(RESOURCES, *name.split('/')))
+    return asset.fingerprintURL('/++resource++zmi/%s' % name)
 
 
 @zope.component.adapter(zope.interface.Interface)
 def css_paths(context):
     """Return paths to CSS files needed for the Zope 4 ZMI."""
     return (
-        '/++resource++zmi/bootstrap-4.1.1/bootstrap.min.css',
-        '/++resource++zmi/fontawesome-free-5.8.1/css/all.css',
-        '/++resource++zmi/zmi_base.css',
+        _url('bootstrap-4.1.1/bootstrap.min.css'),
+        _url('fontawesome-free-5.8.1/css/all.css'),
+        _url('zmi_base.css'),
     )
 
 
@@ -16,8 +29,8 @@ def css_paths(context):
 def js_paths(context):
     """Return paths to JS files needed for the Zope 4 ZMI."""
     return (
-        '/++resource++zmi/jquery-3.2.1.min.js',
-        '/++resource++zmi/bootstrap-4.1.1/bootstrap.bundle.min.js',
-        '/++resource++zmi/ace.ajax.org/ace.js',
-        '/++resource++zmi/zmi_base.js',
+        _url('jquery-3.2.1.min.js'),
+        _url('bootstrap-4.1.1/bootstrap.bundle.min.js'),
+        _url('ace.ajax.org/ace.js'),
+        _url('zmi_base.js'),
     )